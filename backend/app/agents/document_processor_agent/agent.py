@@ -11,13 +11,13 @@ from typing import Any, AsyncIterator
 from claude_agent_sdk import (
     create_sdk_mcp_server,
     ClaudeAgentOptions,
-    ClaudeSDKClient,
     AssistantMessage,
     TextBlock,
     ToolUseBlock,
 )
 from supabase import Client
 
+from ..shared import RunTelemetry, run_agent
 from .prompts import METADATA_SYSTEM_PROMPT
 from .tools import create_tools
 
@@ -47,8 +47,10 @@ async def process_document_metadata(
         {"complete": True} - Done
         {"error": "..."} - Error occurred
     """
-    # Create scoped tools
-    tools = create_tools(document_id, user_id, db)
+    telemetry = RunTelemetry("metadata", user_id, document_id)
+
+    # Create scoped tools (instrumented for per-tool latency)
+    tools = telemetry.instrument(create_tools(document_id, user_id, db))
 
     # Create MCP server with tools
     metadata_server = create_sdk_mcp_server(
@@ -71,19 +73,18 @@ Start by using read_ocr to read the document text, then use save_metadata to sav
     )
 
     try:
-        async with ClaudeSDKClient(options=options) as client:
-            await client.query(task_prompt)
-
-            async for message in client.receive_response():
-                if isinstance(message, AssistantMessage):
-                    for block in message.content:
-                        if isinstance(block, TextBlock):
-                            yield {"text": block.text}
-                        elif isinstance(block, ToolUseBlock):
-                            yield {"tool": block.name, "input": block.input}
+        async for message in run_agent(options, task_prompt, telemetry):
+            if isinstance(message, AssistantMessage):
+                for block in message.content:
+                    if isinstance(block, TextBlock):
+                        yield {"text": block.text}
+                    elif isinstance(block, ToolUseBlock):
+                        yield {"tool": block.name, "input": block.input}
 
         yield {"complete": True}
+        telemetry.save(db, "completed")
 
     except Exception as e:
         logger.error(f"Metadata generation failed for document {document_id}: {e}")
         yield {"error": str(e)}
+        telemetry.save(db, "failed")
@@ -12,7 +12,7 @@ Your job is to analyze document text and generate helpful metadata that makes do
 ## Available Tools
 
 **Read:**
-- `read_ocr` - Read the OCR text from the document
+- `read_ocr` - Read the OCR text from the document (long documents return an outline; the first pages are usually enough)
 
 **Write:**
 - `save_metadata` - Save display_name, tags, and summary to the document
@@ -5,11 +5,22 @@ Uses Claude Agent SDK with tools that perform real database operations.
 """
 
 from .agent import extract_with_agent, correct_with_session
-from .prompts import EXTRACTION_SYSTEM_PROMPT, CORRECTION_PROMPT_TEMPLATE
+from .prompts import EXTRACTION_PROMPT_VERSION, EXTRACTION_SYSTEM_PROMPT, CORRECTION_PROMPT_TEMPLATE
+from .speculative import (
+    claim_speculative_extraction,
+    get_speculative_run,
+    mark_claimed,
+    run_speculative_extraction,
+)
 
 __all__ = [
     "extract_with_agent",
     "correct_with_session",
+    "run_speculative_extraction",
+    "get_speculative_run",
+    "claim_speculative_extraction",
+    "mark_claimed",
+    "EXTRACTION_PROMPT_VERSION",
     "EXTRACTION_SYSTEM_PROMPT",
     "CORRECTION_PROMPT_TEMPLATE",
 ]
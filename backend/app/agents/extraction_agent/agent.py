@@ -3,7 +3,7 @@ Main extraction agent logic.
 
 Functions:
 - extract_with_agent() - Initial extraction from OCR text
-- correct_with_session() - Resume session for user corrections
+- correct_with_session() - User corrections (session resume or compact snapshot)
 """
 
 import logging
@@ -12,7 +12,6 @@ from typing import Any, AsyncIterator
 from claude_agent_sdk import (
     create_sdk_mcp_server,
     ClaudeAgentOptions,
-    ClaudeSDKClient,
     AssistantMessage,
     TextBlock,
     ToolUseBlock,
@@ -20,7 +19,24 @@ from claude_agent_sdk import (
 )
 from supabase import Client
 
-from .prompts import EXTRACTION_SYSTEM_PROMPT, CORRECTION_PROMPT_TEMPLATE
+from ...config import get_settings
+from ..shared import RunTelemetry, run_agent
+from ...services.ocr_pages import split_legacy_pages
+from ...services.pre_extract import format_hints, get_pre_extraction
+from ..shared.routing import ESCALATION_EXTRA_TURNS
+from .buffer import ExtractionBuffer
+from .compaction import (
+    CorrectionNote,
+    add_correction_note,
+    build_snapshot_prompt,
+    select_ocr_excerpts,
+)
+from .prompts import (
+    EXTRACTION_SYSTEM_PROMPT,
+    CORRECTION_PROMPT_TEMPLATE,
+    ESCALATION_PROMPT_TEMPLATE,
+    VERIFY_PROMPT,
+)
 from .tools import create_tools
 
 logger = logging.getLogger(__name__)
@@ -32,7 +48,12 @@ async def extract_with_agent(
     user_id: str,
     db: Client,
     mode: str = "auto",
-    custom_fields: list[dict] | list[str] | None = None
+    custom_fields: list[dict] | list[str] | None = None,
+    model: str | None = None,
+    max_turns: int = 8,
+    escalation_model: str | None = None,
+    prefill: tuple[dict[str, Any], dict[str, Any]] | None = None,
+    background: bool = False,
 ) -> AsyncIterator[dict[str, Any]]:
     """
     Extract data using Agent SDK with streaming.
@@ -45,20 +66,28 @@ async def extract_with_agent(
         mode: "auto" for automatic extraction, "custom" for specific fields
         custom_fields: List of field names or field objects with name/description
                        (required if mode="custom")
+        model: Model for the run (defaults to Settings.CLAUDE_MODEL)
+        max_turns: Turn budget for the run
+        escalation_model: If set and the run ends without complete, retry
+                          once on this model, continuing from the partial results
+        prefill: (fields, confidences) to start from - the agent verifies and
+                 fixes them instead of extracting from scratch
+        background: Speculative run - interactive runs are admitted to the
+                    Anthropic limiter ahead of it
 
     Yields:
         {"text": "..."} - Claude's user-facing response
         {"tool": "...", "input": {...}} - Tool activity
-        {"complete": True, "extraction_id": "...", "session_id": "..."} - Done
+        {"complete": True, "extraction_id": "...", "session_id": "...", "model": "..."} - Done
         {"error": "..."} - Error occurred
     """
-    # Create scoped tools
-    tools = create_tools(extraction_id, document_id, user_id, db)
+    settings = get_settings()
 
-    # Create MCP server with tools
-    extraction_server = create_sdk_mcp_server(
-        name="extraction",
-        tools=tools
+    # Working copy for this run - tools write here, complete commits it.
+    # Shared across attempts so an escalated attempt sees partial results.
+    buffer = ExtractionBuffer(
+        extraction_id, document_id, user_id, db,
+        flush_interval=settings.EXTRACTION_FLUSH_INTERVAL_SECONDS,
     )
 
     # Build task prompt
@@ -83,29 +112,66 @@ async def extract_with_agent(
         else:
             task_prompt = "Extract the requested fields from the document."
 
-    task_prompt += "\n\nStart by using read_ocr to read the document text."
+    # Pattern-matched candidates from OCR time save the agent re-deriving them
+    pre_extracted = await get_pre_extraction(document_id, user_id)
+    if pre_extracted and (hints := format_hints(pre_extracted)):
+        task_prompt += f"\n\n{hints}"
 
-    options = ClaudeAgentOptions(
-        system_prompt=EXTRACTION_SYSTEM_PROMPT,
-        mcp_servers={"extraction": extraction_server},
-        allowed_tools=[
-            "mcp__extraction__read_ocr",
-            "mcp__extraction__read_extraction",
-            "mcp__extraction__save_extraction",
-            "mcp__extraction__set_field",
-            "mcp__extraction__delete_field",
-            "mcp__extraction__complete",
-        ],
-        max_turns=5,  # read_ocr → analyze → save_extraction → complete → summarize
-    )
+    # Template-filled fields: the agent only verifies
+    if prefill:
+        buffer.replace(*prefill)
+        task_prompt = f"{task_prompt}\n\n{VERIFY_PROMPT}"
+
+    # (model, max_turns, prompt) per attempt; the escalation attempt only
+    # runs if the first one ends without complete
+    first_step = "" if prefill else "\n\nStart by using read_ocr to read the document text."
+    attempts = [(model or settings.CLAUDE_MODEL, max_turns, task_prompt + first_step)]
+    if escalation_model:
+        attempts.append((escalation_model, max_turns + ESCALATION_EXTRA_TURNS,
+                         ESCALATION_PROMPT_TEMPLATE.format(task_prompt=task_prompt)))
 
     session_id: str | None = None
+    telemetry = RunTelemetry("extraction", user_id, document_id, extraction_id)
 
     try:
-        async with ClaudeSDKClient(options=options) as client:
-            await client.query(task_prompt)
-
-            async for message in client.receive_response():
+        for attempt, (attempt_model, attempt_turns, prompt) in enumerate(attempts):
+            if attempt > 0:
+                if buffer.status == "completed":
+                    break
+                # Record the incomplete attempt before escalating
+                telemetry.save(db, "incomplete")
+                telemetry = RunTelemetry("extraction", user_id, document_id, extraction_id)
+                logger.info(f"[{extraction_id}] Escalating extraction to {attempt_model}")
+                yield {"text": "Extraction didn't finish - retrying with a more capable model."}
+
+            # Create scoped tools (instrumented for per-tool latency)
+            tools = telemetry.instrument(create_tools(buffer, db))
+
+            # Create MCP server with tools
+            extraction_server = create_sdk_mcp_server(
+                name="extraction",
+                tools=tools
+            )
+
+            options = ClaudeAgentOptions(
+                system_prompt=EXTRACTION_SYSTEM_PROMPT,
+                model=attempt_model,
+                mcp_servers={"extraction": extraction_server},
+                allowed_tools=[
+                    "mcp__extraction__read_ocr",
+                    "mcp__extraction__query_tables",
+                    "mcp__extraction__read_extraction",
+                    "mcp__extraction__save_extraction",
+                    "mcp__extraction__set_field",
+                    "mcp__extraction__set_fields",
+                    "mcp__extraction__delete_field",
+                    "mcp__extraction__complete",
+                ],
+                max_turns=attempt_turns,  # read_ocr (outline → pages) → analyze → save_extraction → complete → summarize
+            )
+
+            # Limiter slot is held only while the agent runs, not while we yield
+            async for message in run_agent(options, prompt, telemetry, background=background):
                 if isinstance(message, ResultMessage):
                     session_id = message.session_id
 
@@ -119,88 +185,177 @@ async def extract_with_agent(
                         elif isinstance(block, ToolUseBlock):
                             yield {"tool": block.name, "input": block.input}
 
-            # Extraction complete
-            yield {
-                "complete": True,
-                "extraction_id": extraction_id,
-                "session_id": session_id
-            }
+        # Persist anything the agent wrote without calling complete
+        await buffer.flush()
+
+        # Extraction complete
+        yield {
+            "complete": True,
+            "extraction_id": extraction_id,
+            "session_id": session_id,
+            "model": telemetry.model or attempts[-1][0],
+            "context_tokens": telemetry.context_tokens,
+        }
+
+        # Record the run after the client has its complete event
+        telemetry.save(db, "completed" if buffer.status == "completed" else "incomplete")
 
     except Exception as e:
         logger.error(f"Extraction failed: {e}")
 
-        # Mark extraction as failed
+        # Keep partial results, then mark extraction as failed
+        try:
+            await buffer.flush()
+        except Exception as flush_error:
+            logger.error(f"Failed to flush partial extraction: {flush_error}")
+
         db.table("extractions").update({
             "status": "failed"
         }).eq("id", extraction_id).execute()
 
         yield {"error": str(e)}
+        telemetry.save(db, "failed")
 
 
 async def correct_with_session(
-    session_id: str,
+    session_id: str | None,
     extraction_id: str,
     document_id: str,
     user_id: str,
     instruction: str,
-    db: Client
+    db: Client,
+    model: str | None = None,
+    context_tokens: int | None = None,
+    notes: list[CorrectionNote] | None = None,
+    compact: bool = False,
 ) -> AsyncIterator[dict[str, Any]]:
     """
-    Resume session for correction based on user feedback.
+    Apply a user correction, resuming the session or starting from compact state.
+
+    Resuming replays the whole previous conversation, so once the session's
+    context passes CORRECTION_COMPACT_THRESHOLD_TOKENS (or when compact=True,
+    or there is no session) the correction starts a fresh session from a
+    snapshot of the current fields, OCR excerpts and earlier corrections.
 
     Args:
-        session_id: Session ID from previous extraction
+        session_id: Session ID from the previous extraction/correction
         extraction_id: Extraction record to update
         document_id: Document being corrected
         user_id: User who owns the document
         instruction: User's correction instruction
         db: Supabase client
+        model: Model the extraction ran on (defaults to Settings.CLAUDE_MODEL)
+        context_tokens: Context size of the stored session at its last turn
+        notes: Earlier corrections (extractions.correction_notes)
+        compact: Always start from compact state
 
     Yields:
-        Same event types as extract_with_agent
+        Same event types as extract_with_agent; the complete event also has
+        "compacted" and "context_tokens" for the session to store
     """
-    # Create scoped tools
-    tools = create_tools(extraction_id, document_id, user_id, db)
+    settings = get_settings()
+    notes = notes or []
+
+    # Working copy starts from the current extraction state
+    buffer = ExtractionBuffer(
+        extraction_id, document_id, user_id, db,
+        flush_interval=settings.EXTRACTION_FLUSH_INTERVAL_SECONDS,
+    )
+    buffer.load()
+    telemetry = RunTelemetry("correction", user_id, document_id, extraction_id)
+
+    # Create scoped tools (instrumented for per-tool latency)
+    tools = telemetry.instrument(create_tools(buffer, db))
 
     extraction_server = create_sdk_mcp_server(
         name="extraction",
         tools=tools
     )
 
+    use_snapshot = (
+        compact
+        or not session_id
+        or (context_tokens or 0) > settings.CORRECTION_COMPACT_THRESHOLD_TOKENS
+    )
+
+    if use_snapshot:
+        # Fresh session: bounded prompt regardless of correction count
+        ocr = db.table("ocr_results") \
+            .select("raw_text, compact_text, page_texts") \
+            .eq("document_id", document_id) \
+            .eq("user_id", user_id) \
+            .limit(1) \
+            .execute()
+        row = ocr.data[0] if ocr.data else {}
+        page_texts = row.get("page_texts") or split_legacy_pages(
+            row.get("compact_text") or row.get("raw_text") or ""
+        )
+        prompt = build_snapshot_prompt(
+            buffer.snapshot(), notes, select_ocr_excerpts(page_texts, instruction), instruction
+        )
+        session_options: dict[str, Any] = {"system_prompt": EXTRACTION_SYSTEM_PROMPT}
+        logger.info(
+            f"[{extraction_id}] Compact correction "
+            f"(session context {context_tokens or 0} tokens, {len(notes)} earlier corrections)"
+        )
+    else:
+        prompt = CORRECTION_PROMPT_TEMPLATE.format(instruction=instruction)
+        session_options = {"resume": session_id}  # Resume previous conversation
+
     options = ClaudeAgentOptions(
-        resume=session_id,  # Resume previous conversation
+        **session_options,
+        model=model or settings.CLAUDE_MODEL,  # Stay on the extraction's model
         mcp_servers={"extraction": extraction_server},
         allowed_tools=[
             "mcp__extraction__read_ocr",
+            "mcp__extraction__query_tables",
             "mcp__extraction__read_extraction",
             "mcp__extraction__save_extraction",
             "mcp__extraction__set_field",
+            "mcp__extraction__set_fields",
             "mcp__extraction__delete_field",
             "mcp__extraction__complete",
         ],
-        max_turns=3,
+        max_turns=4 if use_snapshot else 3,  # Snapshot runs may page in OCR
     )
 
-    prompt = CORRECTION_PROMPT_TEMPLATE.format(instruction=instruction)
+    reply: list[str] = []
 
     try:
-        async with ClaudeSDKClient(options=options) as client:
-            await client.query(prompt)
+        # Limiter slot is held only while the agent runs, not while we yield
+        async for message in run_agent(options, prompt, telemetry):
+            if isinstance(message, AssistantMessage):
+                for block in message.content:
+                    if isinstance(block, TextBlock):
+                        reply.append(block.text)
+                        yield {"text": block.text}
+                    elif isinstance(block, ToolUseBlock):
+                        yield {"tool": block.name, "input": block.input}
+
+        # Corrections usually end without complete - persist the edits
+        await buffer.flush()
+
+        # Keep a short record so later compact corrections know the history
+        db.table("extractions").update({
+            "correction_notes": add_correction_note(notes, instruction, " ".join(reply))
+        }).eq("id", extraction_id).eq("user_id", user_id).execute()
 
-            async for message in client.receive_response():
-                if isinstance(message, AssistantMessage):
-                    for block in message.content:
-                        if isinstance(block, TextBlock):
-                            yield {"text": block.text}
-                        elif isinstance(block, ToolUseBlock):
-                            yield {"tool": block.name, "input": block.input}
+        yield {
+            "complete": True,
+            "extraction_id": extraction_id,
+            "session_id": telemetry.session_id or session_id,
+            "model": telemetry.model,
+            "compacted": use_snapshot,
+            "context_tokens": telemetry.context_tokens,
+        }
 
-            yield {
-                "complete": True,
-                "extraction_id": extraction_id,
-                "session_id": session_id
-            }
+        telemetry.save(db, "completed")
 
     except Exception as e:
         logger.error(f"Correction failed: {e}")
+        try:
+            await buffer.flush()
+        except Exception as flush_error:
+            logger.error(f"Failed to flush partial correction: {flush_error}")
         yield {"error": str(e)}
+        telemetry.save(db, "failed")
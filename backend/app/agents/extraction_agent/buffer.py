@@ -0,0 +1,258 @@
+"""
+Write-behind buffer for extraction tool mutations.
+
+Holds an in-memory working copy of an extraction for the duration of one
+agent run. Tools read and mutate the copy locally; the database sees (all
+writes run off the event loop in a worker thread):
+- optional throttled background flushes (so the UI can show progress)
+- one commit_extraction RPC on `complete` (fields + extraction status +
+  document status in a single transaction)
+- a final flush when a run ends without `complete` (e.g. corrections)
+
+Path semantics mirror Postgres jsonb_set(create_if_missing=true) and #-
+so the buffered result matches what the per-call RPCs would have written.
+"""
+
+import asyncio
+import copy
+import logging
+import time
+from typing import Any
+
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _as_index(key: str) -> int | None:
+    try:
+        return int(key)
+    except ValueError:
+        return None
+
+
+def _get_child(parent: Any, key: str) -> Any:
+    if isinstance(parent, dict):
+        return parent.get(key, _MISSING)
+    if isinstance(parent, list):
+        index = _as_index(key)
+        if index is not None and -len(parent) <= index < len(parent):
+            return parent[index]
+    return _MISSING
+
+
+def _walk_to_parent(root: dict, path: list[str]) -> Any:
+    """Return the container holding path[-1], or _MISSING if any step is absent."""
+    parent: Any = root
+    for key in path[:-1]:
+        parent = _get_child(parent, key)
+        if parent is _MISSING or not isinstance(parent, (dict, list)):
+            return _MISSING
+    return parent
+
+
+def set_path(root: dict, path: list[str], value: Any) -> bool:
+    """
+    Set value at path like jsonb_set(..., create_if_missing=true).
+
+    Earlier path steps must exist; an out-of-range array index appends
+    (or prepends when negative). Returns False if nothing was set.
+    """
+    if not path:
+        return False
+    parent = _walk_to_parent(root, path)
+    if parent is _MISSING:
+        return False
+
+    last = path[-1]
+    if isinstance(parent, dict):
+        parent[last] = value
+        return True
+
+    index = _as_index(last)
+    if index is None:
+        return False
+    if -len(parent) <= index < len(parent):
+        parent[index] = value
+    elif index < 0:
+        parent.insert(0, value)
+    else:
+        parent.append(value)
+    return True
+
+
+def delete_path(root: dict, path: list[str]) -> bool:
+    """Remove value at path like the jsonb #- operator. Returns False if absent."""
+    if not path:
+        return False
+    parent = _walk_to_parent(root, path)
+    if parent is _MISSING:
+        return False
+
+    last = path[-1]
+    if isinstance(parent, dict):
+        return parent.pop(last, _MISSING) is not _MISSING
+
+    index = _as_index(last)
+    if index is None or not -len(parent) <= index < len(parent):
+        return False
+    del parent[index]
+    return True
+
+
+class ExtractionBuffer:
+    """In-memory working copy of one extraction, scoped to one agent run."""
+
+    def __init__(
+        self,
+        extraction_id: str,
+        document_id: str,
+        user_id: str,
+        db: Client,
+        flush_interval: float = 0,
+    ):
+        """
+        Args:
+            extraction_id: Extraction record being written
+            document_id: Document the extraction belongs to
+            user_id: Owner (all writes are scoped to this user)
+            db: Supabase client
+            flush_interval: Seconds between background flushes for realtime
+                UI updates. 0 disables intermediate flushes.
+        """
+        self.extraction_id = extraction_id
+        self.document_id = document_id
+        self.user_id = user_id
+        self.db = db
+        self.flush_interval = flush_interval
+
+        self.fields: dict[str, Any] = {}
+        self.confidences: dict[str, Any] = {}
+        self.status = "in_progress"
+        self.dirty = False
+
+        self._last_flush = 0.0
+        self._pending_flush: asyncio.Task | None = None
+
+    def load(self) -> None:
+        """Load current state from the database (used when resuming corrections)."""
+        result = self.db.table("extractions") \
+            .select("extracted_fields, confidence_scores, status") \
+            .eq("id", self.extraction_id) \
+            .eq("user_id", self.user_id) \
+            .single() \
+            .execute()
+
+        if result.data:
+            self.fields = result.data.get("extracted_fields") or {}
+            self.confidences = result.data.get("confidence_scores") or {}
+            self.status = result.data.get("status") or self.status
+
+    # ------------------------------------------------------------------
+    # Mutations (local only)
+    # ------------------------------------------------------------------
+
+    def replace(self, fields: dict[str, Any], confidences: dict[str, Any]) -> None:
+        """Replace the whole extraction (save_extraction)."""
+        self.fields = copy.deepcopy(fields)
+        self.confidences = copy.deepcopy(confidences)
+        self.status = "in_progress"
+        self.dirty = True
+
+    def set_field(self, path: list[str], value: Any, confidence: float) -> bool:
+        """Set one field and its confidence. Returns False if the path's parent is missing."""
+        if not set_path(self.fields, path, copy.deepcopy(value)):
+            return False
+        set_path(self.confidences, path, confidence)
+        self.dirty = True
+        return True
+
+    def delete_field(self, path: list[str]) -> bool:
+        """Remove one field and its confidence. Returns False if it didn't exist."""
+        removed = delete_path(self.fields, path)
+        delete_path(self.confidences, path)
+        self.dirty = self.dirty or removed
+        return removed
+
+    def snapshot(self) -> dict[str, Any]:
+        """Current state in the shape read_extraction returns."""
+        return {
+            "extracted_fields": copy.deepcopy(self.fields),
+            "confidence_scores": copy.deepcopy(self.confidences),
+            "status": self.status,
+        }
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _write(self, fields: dict[str, Any], confidences: dict[str, Any], status: str) -> None:
+        self.db.table("extractions").update({
+            "extracted_fields": fields,
+            "confidence_scores": confidences,
+            "status": status,
+        }).eq("id", self.extraction_id).eq("user_id", self.user_id).execute()
+
+    def _on_flush_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and (error := task.exception()):
+            logger.warning(f"[{self.extraction_id}] Background flush failed: {error}")
+            self.dirty = True  # Retry on the next flush
+
+    async def _await_pending(self) -> None:
+        if self._pending_flush and not self._pending_flush.done():
+            await asyncio.wait([self._pending_flush])
+        self._pending_flush = None
+
+    def maybe_flush(self) -> None:
+        """
+        Schedule a background flush if enabled, dirty and the interval has
+        elapsed. Never blocks the calling tool.
+        """
+        if not self.flush_interval or not self.dirty:
+            return
+        if time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        if self._pending_flush and not self._pending_flush.done():
+            return
+
+        snapshot = self.snapshot()
+        self.dirty = False
+        self._last_flush = time.monotonic()
+        self._pending_flush = asyncio.create_task(asyncio.to_thread(
+            self._write, snapshot["extracted_fields"], snapshot["confidence_scores"], snapshot["status"]
+        ))
+        self._pending_flush.add_done_callback(self._on_flush_done)
+
+    async def flush(self) -> None:
+        """Write the working copy now if it has unsaved changes."""
+        await self._await_pending()
+        if not self.dirty:
+            return
+        snapshot = self.snapshot()
+        self.dirty = False
+        self._last_flush = time.monotonic()
+        try:
+            await asyncio.to_thread(
+                self._write, snapshot["extracted_fields"], snapshot["confidence_scores"], snapshot["status"]
+            )
+        except Exception:
+            self.dirty = True
+            raise
+
+    async def commit(self) -> None:
+        """
+        Commit fields, extraction status and document status in one
+        transaction (commit_extraction RPC).
+        """
+        await self._await_pending()
+        await asyncio.to_thread(self.db.rpc("commit_extraction", {
+            "p_extraction_id": self.extraction_id,
+            "p_document_id": self.document_id,
+            "p_user_id": self.user_id,
+            "p_fields": copy.deepcopy(self.fields),
+            "p_scores": copy.deepcopy(self.confidences),
+        }).execute)
+        self.status = "completed"
+        self.dirty = False
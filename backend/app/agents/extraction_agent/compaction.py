@@ -0,0 +1,146 @@
+"""
+Compact state for correction runs.
+
+Resuming the extraction session replays the whole original conversation
+(including the full OCR text) and grows with every correction. A compact
+correction instead starts a fresh session from a snapshot:
+- current extracted fields and confidence scores
+- OCR excerpts around keywords from the instruction
+- a bounded summary of earlier corrections (correction_notes)
+
+The agent can still page in more text with read_ocr, so the snapshot only
+needs to carry what the instruction is likely about.
+"""
+
+import json
+import re
+from datetime import datetime, timezone
+from typing import Any, TypedDict
+
+from ...services.ocr_pages import SNIPPET_CONTEXT_CHARS
+
+# Earlier corrections kept verbatim in the snapshot; older ones are dropped
+# from extractions.correction_notes (their effect is in the fields already)
+MAX_CORRECTION_NOTES = 10
+NOTE_SUMMARY_CHARS = 300
+
+# OCR excerpt budget for the snapshot prompt
+MAX_EXCERPT_KEYWORDS = 8
+MATCHES_PER_KEYWORD = 2
+EXCERPT_CHAR_BUDGET = 4_000
+
+_WORD_RE = re.compile(r'"([^"]+)"|\'([^\']+)\'|([\w$€£.,/-]+)')
+_STOPWORDS = {
+    "about", "actually", "amount", "change", "correct", "field", "fields",
+    "from", "have", "instead", "into", "just", "make", "please", "remove",
+    "should", "that", "their", "there", "this", "update", "value", "what",
+    "when", "with", "wrong", "would",
+}
+
+
+class CorrectionNote(TypedDict):
+    """One earlier correction (stored in extractions.correction_notes)."""
+    instruction: str
+    summary: str  # Agent's reply, truncated
+    at: str
+
+
+def add_correction_note(
+    notes: list[CorrectionNote],
+    instruction: str,
+    summary: str,
+) -> list[CorrectionNote]:
+    """Append a correction and keep only the most recent notes."""
+    summary = " ".join(summary.split())
+    if len(summary) > NOTE_SUMMARY_CHARS:
+        summary = summary[:NOTE_SUMMARY_CHARS].rstrip() + "..."
+    note: CorrectionNote = {
+        "instruction": instruction.strip(),
+        "summary": summary,
+        "at": datetime.now(timezone.utc).isoformat(),
+    }
+    return [*notes, note][-MAX_CORRECTION_NOTES:]
+
+
+def instruction_keywords(instruction: str) -> list[str]:
+    """Quoted phrases, numbers and distinctive words from the instruction."""
+    keywords: list[str] = []
+    for quoted_double, quoted_single, word in _WORD_RE.findall(instruction):
+        phrase = (quoted_double or quoted_single or word).strip(".,")
+        if not phrase:
+            continue
+        is_quoted = bool(quoted_double or quoted_single)
+        has_digit = any(c.isdigit() for c in phrase)
+        if not is_quoted and not has_digit and (len(phrase) < 4 or phrase.lower() in _STOPWORDS):
+            continue
+        if phrase.lower() not in (k.lower() for k in keywords):
+            keywords.append(phrase)
+    return keywords[:MAX_EXCERPT_KEYWORDS]
+
+
+def select_ocr_excerpts(page_texts: list[str], instruction: str) -> list[str]:
+    """OCR context around instruction keywords, within EXCERPT_CHAR_BUDGET."""
+    excerpts: list[str] = []
+    seen: set[tuple[int, int]] = set()
+    used = 0
+
+    for keyword in instruction_keywords(instruction):
+        pattern = re.compile(re.escape(keyword), re.IGNORECASE)
+        found = 0
+        for page, text in enumerate(page_texts):
+            for match in pattern.finditer(text):
+                start = max(0, match.start() - SNIPPET_CONTEXT_CHARS)
+                bucket = (page, start // SNIPPET_CONTEXT_CHARS)
+                if bucket in seen:
+                    continue
+                seen.add(bucket)
+
+                excerpt = f"[Page {page + 1}] ...{text[start:match.end() + SNIPPET_CONTEXT_CHARS].strip()}..."
+                if used + len(excerpt) > EXCERPT_CHAR_BUDGET:
+                    return excerpts
+                excerpts.append(excerpt)
+                used += len(excerpt)
+                found += 1
+                if found >= MATCHES_PER_KEYWORD:
+                    break
+            if found >= MATCHES_PER_KEYWORD:
+                break
+
+    return excerpts
+
+
+def build_snapshot_prompt(
+    snapshot: dict[str, Any],
+    notes: list[CorrectionNote],
+    excerpts: list[str],
+    instruction: str,
+) -> str:
+    """Prompt for a correction run that starts from compact state."""
+    sections = [
+        "You are correcting an existing extraction. The original extraction "
+        "conversation is not available; this is the current state.",
+        "## Current extraction\n" + json.dumps({
+            "extracted_fields": snapshot["extracted_fields"],
+            "confidence_scores": snapshot["confidence_scores"],
+        }, separators=(",", ":")),
+    ]
+
+    if notes:
+        sections.append("## Earlier corrections (oldest first)\n" + "\n".join(
+            f"- User: {note['instruction']}\n  You: {note['summary']}" for note in notes
+        ))
+
+    if excerpts:
+        sections.append(
+            "## Relevant OCR excerpts\n" + "\n\n".join(excerpts)
+            + "\n\nUse read_ocr with 'pages' or 'query' if you need more of the document."
+        )
+    else:
+        sections.append("## OCR\nUse read_ocr with 'query' or 'pages' to check the document.")
+
+    sections.append(
+        f"## Correction\n{instruction}\n\n"
+        "Update the extraction with set_fields (or set_field/delete_field for a "
+        "single change), then summarize what you changed."
+    )
+    return "\n\n".join(sections)
@@ -0,0 +1,251 @@
+"""
+Speculative auto-mode extraction.
+
+Users almost always click extract right after upload. When enabled, the
+OCR pipeline starts an auto-mode extraction as soon as OCR completes, so
+/api/agent/extract can either attach to the in-flight run or adopt the
+finished result instead of starting from scratch.
+
+Spend is capped by:
+- SPECULATIVE_EXTRACTION_ENABLED (off by default)
+- a per-tier daily run limit (SPECULATIVE_EXTRACTION_DAILY_LIMITS)
+- a process-wide concurrency cap; runs are skipped, never queued, when full
+- only documents routed to the fast model, with no escalation
+- background admission to the Anthropic limiter: interactive runs go first,
+  and speculative runs hold at most a share of its concurrency
+
+Speculative runs are tracked in-process; a run started by another worker
+is picked up via the extractions row once it completes. Until a run is
+claimed its commit leaves documents.status alone.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
+
+from supabase import Client
+
+from ...config import get_settings
+from ...services.extraction_cache import build_cache_key, get_ocr_content_hash, store_cached_extraction
+from ...services.layout_templates import learn_template
+from ..shared import get_routing_signals, route_extraction
+from .agent import extract_with_agent
+from .prompts import EXTRACTION_PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeRun:
+    """Events from one in-flight speculative extraction, replayable to late subscribers."""
+
+    def __init__(self, document_id: str, user_id: str, extraction_id: str):
+        self.document_id = document_id
+        self.user_id = user_id
+        self.extraction_id = extraction_id
+        self.events: list[dict[str, Any]] = []
+        self.done = False
+        self._changed = asyncio.Condition()
+
+    async def publish(self, event: dict[str, Any]) -> None:
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    async def follow(self) -> AsyncIterator[dict[str, Any]]:
+        """Yield every event so far, then live events until the run ends."""
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(self.events) or self.done)
+                pending = self.events[index:]
+                done = self.done
+            index += len(pending)
+            for event in pending:
+                yield event
+            if done and index >= len(self.events):
+                return
+
+
+# document_id -> in-flight run (this process only)
+_runs: dict[str, SpeculativeRun] = {}
+
+
+def get_speculative_run(document_id: str, user_id: str) -> SpeculativeRun | None:
+    """In-flight speculative run for a document, if one is running here."""
+    run = _runs.get(document_id)
+    return run if run and run.user_id == user_id else None
+
+
+def parse_tier_limits(spec: str) -> dict[str, int]:
+    """Parse "free:5,pro:500" into {"free": 5, "pro": 500}."""
+    limits: dict[str, int] = {}
+    for part in spec.split(","):
+        tier, _, limit = part.partition(":")
+        if tier.strip() and limit.strip():
+            limits[tier.strip()] = int(limit)
+    return limits
+
+
+def _under_daily_limit(db: Client, user_id: str) -> bool:
+    """Check the user's tier allows another speculative run today."""
+    settings = get_settings()
+    user = db.table("users").select("subscription_tier").eq("id", user_id).limit(1).execute()
+    tier = (user.data[0].get("subscription_tier") if user.data else None) or "free"
+    limit = parse_tier_limits(settings.SPECULATIVE_EXTRACTION_DAILY_LIMITS).get(tier, 0)
+    if limit <= 0:
+        return False
+
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    runs = db.table("extractions") \
+        .select("id", count="exact", head=True) \
+        .eq("user_id", user_id) \
+        .eq("speculative", True) \
+        .gte("created_at", today.isoformat()) \
+        .execute()
+    return (runs.count or 0) < limit
+
+
+async def run_speculative_extraction(document_id: str, user_id: str, db: Client) -> None:
+    """
+    Run an auto-mode extraction right after OCR, if policy allows.
+
+    Never raises - the document is already usable without it.
+    """
+    settings = get_settings()
+    if not settings.SPECULATIVE_EXTRACTION_ENABLED:
+        return
+    if len(_runs) >= settings.SPECULATIVE_EXTRACTION_CONCURRENCY:
+        logger.info(f"[{document_id}] Speculative extraction skipped: at concurrency cap")
+        return
+
+    try:
+        # Skip if the user already started an extraction
+        existing = db.table("extractions").select("id").eq("document_id", document_id).limit(1).execute()
+        if existing.data:
+            return
+        if not _under_daily_limit(db, user_id):
+            logger.info(f"[{document_id}] Speculative extraction skipped: tier limit")
+            return
+
+        # Only cheap documents: fast model, no escalation
+        routing = route_extraction(get_routing_signals(db, document_id, user_id))
+        if routing["model"] != settings.CLAUDE_MODEL:
+            logger.info(f"[{document_id}] Speculative extraction skipped: {routing['reason']}")
+            return
+
+        extraction = db.table("extractions").insert({
+            "document_id": document_id,
+            "user_id": user_id,
+            "extracted_fields": {},
+            "confidence_scores": {},
+            "mode": "auto",
+            "custom_fields": None,
+            "model": routing["model"],
+            "processing_time_ms": 0,
+            "status": "in_progress",
+            "speculative": True,
+        }).execute()
+    except Exception as e:
+        logger.error(f"[{document_id}] Speculative extraction setup failed: {e}")
+        return
+
+    extraction_id = extraction.data[0]["id"]
+    run = SpeculativeRun(document_id, user_id, extraction_id)
+    _runs[document_id] = run
+    start_time = time.time()
+    logger.info(f"[{document_id}] Speculative extraction started ({extraction_id})")
+
+    try:
+        async for event in extract_with_agent(
+            extraction_id=extraction_id,
+            document_id=document_id,
+            user_id=user_id,
+            db=db,
+            mode="auto",
+            model=routing["model"],
+            max_turns=routing["max_turns"],
+            background=True,
+        ):
+            if "complete" in event:
+                processing_time_ms = int((time.time() - start_time) * 1000)
+                completion_update: dict = {"processing_time_ms": processing_time_ms}
+                if event.get("model"):
+                    completion_update["model"] = event["model"]
+                db.table("extractions").update(completion_update).eq("id", extraction_id).execute()
+
+                if event.get("session_id"):
+                    db.table("documents").update({
+                        "session_id": event["session_id"],
+                        "session_context_tokens": event.get("context_tokens"),
+                    }).eq("id", document_id).execute()
+
+                event["processing_time_ms"] = processing_time_ms
+
+            await run.publish(event)
+
+        # Make the result reusable for identical content too
+        content_hash = await get_ocr_content_hash(document_id, user_id)
+        if content_hash:
+            cache_key = build_cache_key(
+                content_hash, "auto", None, get_settings().CLAUDE_MODEL, EXTRACTION_PROMPT_VERSION
+            )
+            await store_cached_extraction(user_id, cache_key, extraction_id)
+        await learn_template(document_id, user_id, extraction_id)
+
+    except Exception as e:
+        logger.error(f"[{document_id}] Speculative extraction failed: {e}")
+        await run.publish({"error": str(e)})
+
+    finally:
+        await run.finish()
+        _runs.pop(document_id, None)
+
+
+def claim_speculative_extraction(db: Client, document_id: str, user_id: str) -> dict[str, Any] | None:
+    """
+    Adopt a finished, unclaimed speculative extraction for this document.
+
+    Returns the claimed extractions row, or None.
+    """
+    result = db.table("extractions") \
+        .update({"claimed_at": datetime.now(timezone.utc).isoformat()}) \
+        .eq("document_id", document_id) \
+        .eq("user_id", user_id) \
+        .eq("speculative", True) \
+        .eq("status", "completed") \
+        .is_("claimed_at", "null") \
+        .execute()
+    if not result.data:
+        return None
+    _complete_document(db, result.data[0])
+    return result.data[0]
+
+
+def mark_claimed(db: Client, extraction_id: str) -> None:
+    """Record that /extract attached to an in-flight speculative run."""
+    result = db.table("extractions").update({
+        "claimed_at": datetime.now(timezone.utc).isoformat()
+    }).eq("id", extraction_id).execute()
+    # Committed before the claim landed: commit_extraction left the document alone
+    if result.data and result.data[0].get("status") == "completed":
+        _complete_document(db, result.data[0])
+
+
+def _complete_document(db: Client, extraction: dict[str, Any]) -> None:
+    """
+    Mark a claimed speculative extraction's document completed.
+
+    commit_extraction skips the document for unclaimed speculative runs, so
+    the UI doesn't show an extraction nobody asked for as done.
+    """
+    db.table("documents").update({"status": "completed"}) \
+        .eq("id", extraction["document_id"]) \
+        .eq("user_id", extraction["user_id"]) \
+        .execute()
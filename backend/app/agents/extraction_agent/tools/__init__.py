@@ -7,33 +7,33 @@ Tools are registered with the MCP server for agent use.
 
 from supabase import Client
 
-from ...shared.tools import create_read_ocr_tool  # Use shared tool
+from ...shared.tools import create_query_tables_tool, create_read_ocr_tool  # Use shared tools
+from ..buffer import ExtractionBuffer
 from .read_extraction import create_read_extraction_tool
 from .save_extraction import create_save_extraction_tool
 from .set_field import create_set_field_tool, parse_json_path
+from .set_fields import create_set_fields_tool
 from .delete_field import create_delete_field_tool
 from .complete import create_complete_tool
 
 
-def create_tools(
-    extraction_id: str,
-    document_id: str,
-    user_id: str,
-    db: Client
-) -> list:
+def create_tools(buffer: ExtractionBuffer, db: Client) -> list:
     """
     Create all extraction tools scoped to a specific context.
 
-    All database queries are locked to the provided IDs.
+    All database queries are locked to the buffer's IDs.
     The agent cannot override these - multi-tenant security is enforced.
+    Write tools mutate the buffer; it is persisted on flush/complete.
     """
     return [
-        create_read_ocr_tool(document_id, user_id, db),
-        create_read_extraction_tool(extraction_id, db),
-        create_save_extraction_tool(extraction_id, user_id, db),
-        create_set_field_tool(extraction_id, user_id, db),
-        create_delete_field_tool(extraction_id, user_id, db),
-        create_complete_tool(extraction_id, document_id, user_id, db),
+        create_read_ocr_tool(buffer.document_id, buffer.user_id, db),
+        create_query_tables_tool(buffer.document_id, buffer.user_id, db),
+        create_read_extraction_tool(buffer),
+        create_save_extraction_tool(buffer),
+        create_set_field_tool(buffer),
+        create_set_fields_tool(buffer),
+        create_delete_field_tool(buffer),
+        create_complete_tool(buffer),
     ]
 
 
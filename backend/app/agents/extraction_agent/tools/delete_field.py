@@ -1,17 +1,18 @@
 """
 Tool: delete_field (WRITE)
 
-Removes a field at a JSON path using Postgres #- operator.
+Removes a field at a JSON path in the run's working copy
+(same semantics as the Postgres #- operator).
 Supports nested paths like 'vendor.name' or 'items[0]'.
 """
 
-from supabase import Client
 from claude_agent_sdk import tool
 
+from ..buffer import ExtractionBuffer
 from .set_field import parse_json_path
 
 
-def create_delete_field_tool(extraction_id: str, user_id: str, db: Client):
+def create_delete_field_tool(buffer: ExtractionBuffer):
     """Create delete_field tool scoped to specific extraction and user."""
 
     @tool(
@@ -20,7 +21,7 @@ def create_delete_field_tool(extraction_id: str, user_id: str, db: Client):
         {"path": str}
     )
     async def delete_field(args: dict) -> dict:
-        """Remove field at JSON path using Postgres RPC."""
+        """Remove field at JSON path in the working copy."""
         path = args.get("path", "")
 
         if not path:
@@ -31,11 +32,12 @@ def create_delete_field_tool(extraction_id: str, user_id: str, db: Client):
 
         pg_path = parse_json_path(path)
 
-        db.rpc("remove_extraction_field", {
-            "p_extraction_id": extraction_id,
-            "p_user_id": user_id,
-            "p_field_path": pg_path
-        }).execute()
+        if not buffer.delete_field(pg_path):
+            return {
+                "content": [{"type": "text", "text": f"No field at '{path}'"}],
+                "is_error": True
+            }
+        buffer.maybe_flush()
 
         return {
             "content": [{"type": "text", "text": f"Removed field at '{path}'"}]
@@ -1,25 +1,26 @@
 """
 Tool: save_extraction (WRITE)
 
-Writes extracted fields and confidence scores directly to the extractions table.
-Validates data structure before saving.
+Writes extracted fields and confidence scores to the run's working copy.
+Validates data structure before saving. Persisted by background flush or complete.
 """
 
 import json
-from supabase import Client
 from claude_agent_sdk import tool
 
+from ..buffer import ExtractionBuffer
 
-def create_save_extraction_tool(extraction_id: str, user_id: str, db: Client):
+
+def create_save_extraction_tool(buffer: ExtractionBuffer):
     """Create save_extraction tool scoped to specific extraction and user."""
 
     @tool(
         "save_extraction",
-        "Save extracted fields and confidence scores to database",
+        "Save extracted fields and confidence scores",
         {"fields": dict, "confidences": dict}
     )
     async def save_extraction(args: dict) -> dict:
-        """Write extraction to database."""
+        """Write extraction to the working copy."""
         fields = args.get("fields", {})
         confidences = args.get("confidences", {})
 
@@ -49,14 +50,11 @@ def create_save_extraction_tool(extraction_id: str, user_id: str, db: Client):
                     "is_error": True
                 }
 
-        db.table("extractions").update({
-            "extracted_fields": fields,
-            "confidence_scores": confidences,
-            "status": "in_progress",
-        }).eq("id", extraction_id).eq("user_id", user_id).execute()
+        buffer.replace(fields, confidences)
+        buffer.maybe_flush()
 
         return {
-            "content": [{"type": "text", "text": f"Saved {len(fields)} fields to database"}]
+            "content": [{"type": "text", "text": f"Saved {len(fields)} fields"}]
         }
 
     return save_extraction
@@ -1,15 +1,17 @@
 """
 Tool: set_field (WRITE)
 
-Updates a specific field at a JSON path using Postgres jsonb_set.
+Updates a specific field at a JSON path in the run's working copy
+(same semantics as Postgres jsonb_set).
 Supports nested paths like 'vendor.name' or 'items[0].price'.
 """
 
 import json
 from typing import Any
-from supabase import Client
 from claude_agent_sdk import tool
 
+from ..buffer import ExtractionBuffer
+
 
 def parse_json_path(path: str) -> list[str]:
     """
@@ -26,7 +28,7 @@ def parse_json_path(path: str) -> list[str]:
     return [p for p in normalized.split(".") if p]
 
 
-def create_set_field_tool(extraction_id: str, user_id: str, db: Client):
+def create_set_field_tool(buffer: ExtractionBuffer):
     """Create set_field tool scoped to specific extraction and user."""
 
     @tool(
@@ -35,7 +37,7 @@ def create_set_field_tool(extraction_id: str, user_id: str, db: Client):
         {"path": str, "value": Any, "confidence": float}
     )
     async def set_field(args: dict) -> dict:
-        """Update field at JSON path using Postgres RPC."""
+        """Update field at JSON path in the working copy."""
         path = args.get("path", "")
         value = args.get("value")
         confidence = args.get("confidence", 0.8)
@@ -62,13 +64,12 @@ def create_set_field_tool(extraction_id: str, user_id: str, db: Client):
             except json.JSONDecodeError:
                 actual_value = value  # Keep as string if not valid JSON
 
-        db.rpc("update_extraction_field", {
-            "p_extraction_id": extraction_id,
-            "p_user_id": user_id,
-            "p_field_path": pg_path,
-            "p_value": actual_value,  # Supabase handles JSONB serialization
-            "p_confidence": confidence
-        }).execute()
+        if not buffer.set_field(pg_path, actual_value, confidence):
+            return {
+                "content": [{"type": "text", "text": f"Cannot set '{path}': parent path does not exist"}],
+                "is_error": True
+            }
+        buffer.maybe_flush()
 
         return {
             "content": [{"type": "text", "text": f"Updated '{path}' = {value} (confidence: {confidence})"}]
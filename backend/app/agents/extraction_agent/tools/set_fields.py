@@ -0,0 +1,145 @@
+"""
+Tool: set_fields (WRITE)
+
+Applies many field updates and deletions in one call, so multi-field
+corrections take one tool round trip instead of N. Changes land in the
+run's working copy together (all or nothing).
+"""
+
+import copy
+import json
+from claude_agent_sdk import tool
+
+from ..buffer import ExtractionBuffer, delete_path, set_path
+from .set_field import parse_json_path
+
+
+SET_FIELDS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "updates": {
+            "type": "array",
+            "description": "Fields to set",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string", "description": "JSON path, e.g. 'vendor.name' or 'items[0].price'"},
+                    "value": {"description": "New value (any JSON type)"},
+                    "confidence": {"type": "number", "description": "Confidence 0.0-1.0 (default 0.8)"},
+                },
+                "required": ["path", "value"],
+            },
+        },
+        "deletions": {
+            "type": "array",
+            "description": "JSON paths of fields to remove",
+            "items": {"type": "string"},
+        },
+    },
+}
+
+
+def create_set_fields_tool(buffer: ExtractionBuffer):
+    """Create set_fields tool scoped to specific extraction and user."""
+
+    @tool(
+        "set_fields",
+        "Update and/or delete several fields at once (all or nothing). Prefer this over repeated set_field calls.",
+        SET_FIELDS_SCHEMA
+    )
+    async def set_fields(args: dict) -> dict:
+        """Apply batched field updates and deletions to the working copy."""
+        updates = args.get("updates") or []
+        deletions = args.get("deletions") or []
+
+        # Handle JSON strings (Claude sometimes stringifies)
+        if isinstance(updates, str):
+            try:
+                updates = json.loads(updates)
+            except json.JSONDecodeError:
+                pass
+        if isinstance(deletions, str):
+            try:
+                deletions = json.loads(deletions)
+            except json.JSONDecodeError:
+                pass
+
+        if not isinstance(updates, list) or not isinstance(deletions, list):
+            return {
+                "content": [{"type": "text", "text": "updates and deletions must be lists"}],
+                "is_error": True
+            }
+
+        if not updates and not deletions:
+            return {
+                "content": [{"type": "text", "text": "No updates or deletions provided"}],
+                "is_error": True
+            }
+
+        # Validate everything before writing anything
+        pg_updates = []
+        for update in updates:
+            path = update.get("path", "") if isinstance(update, dict) else ""
+            if not path:
+                return {
+                    "content": [{"type": "text", "text": f"Each update needs a path, got {update}"}],
+                    "is_error": True
+                }
+
+            confidence = update.get("confidence", 0.8)
+            if not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+                return {
+                    "content": [{"type": "text", "text": f"Confidence for '{path}' must be 0.0-1.0, got {confidence}"}],
+                    "is_error": True
+                }
+
+            # Parse value if it's a JSON string
+            value = update.get("value")
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except json.JSONDecodeError:
+                    pass  # Keep as string if not valid JSON
+
+            pg_updates.append({
+                "path": parse_json_path(path),
+                "value": value,
+                "confidence": confidence,
+            })
+
+        pg_deletions = []
+        for path in deletions:
+            if not isinstance(path, str) or not path:
+                return {
+                    "content": [{"type": "text", "text": f"Deletion paths must be non-empty strings, got {path}"}],
+                    "is_error": True
+                }
+            pg_deletions.append(parse_json_path(path))
+
+        # Apply to a scratch copy first so a bad path leaves nothing half-applied
+        fields = copy.deepcopy(buffer.fields)
+        confidences = copy.deepcopy(buffer.confidences)
+        for update in pg_updates:
+            if not set_path(fields, update["path"], update["value"]):
+                return {
+                    "content": [{"type": "text", "text": f"Cannot set '{'.'.join(update['path'])}': parent path does not exist. No changes applied."}],
+                    "is_error": True
+                }
+            set_path(confidences, update["path"], update["confidence"])
+        for pg_path in pg_deletions:
+            if not delete_path(fields, pg_path):
+                return {
+                    "content": [{"type": "text", "text": f"No field at '{'.'.join(pg_path)}'. No changes applied."}],
+                    "is_error": True
+                }
+            delete_path(confidences, pg_path)
+
+        buffer.fields, buffer.confidences = fields, confidences
+        buffer.dirty = True
+        buffer.maybe_flush()
+
+        return {
+            "content": [{"type": "text", "text": f"Updated {len(pg_updates)} fields, removed {len(pg_deletions)} fields"}]
+        }
+
+    return set_fields
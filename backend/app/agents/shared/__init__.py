@@ -1,5 +1,17 @@
 """Shared agent utilities and tools."""
 
-from .tools import create_read_ocr_tool
+from .routing import RoutingDecision, get_routing_signals, resume_model, route_extraction
+from .runner import run_agent
+from .telemetry import RunTelemetry
+from .tools import create_query_tables_tool, create_read_ocr_tool
 
-__all__ = ["create_read_ocr_tool"]
+__all__ = [
+    "RoutingDecision",
+    "RunTelemetry",
+    "create_query_tables_tool",
+    "create_read_ocr_tool",
+    "get_routing_signals",
+    "resume_model",
+    "route_extraction",
+    "run_agent",
+]
@@ -0,0 +1,163 @@
+"""
+Adaptive model routing for agent runs.
+
+Picks the model and max_turns per run from signals we already store:
+page count, OCR token count, number of tables, requested field count and
+the user's recent correction rate. Cheap documents get the fast model
+(Settings.CLAUDE_MODEL); hard ones get the strong model
+(Settings.CLAUDE_MODEL_STRONG). Runs on the fast model carry an
+escalation model to retry with when `complete` is never reached.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import TypedDict
+
+from supabase import Client
+
+from ...config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Complexity score at or above which the strong model is used
+STRONG_MODEL_SCORE = 3
+
+# Turn budgets
+BASE_MAX_TURNS = 6
+MAX_MAX_TURNS = 16
+ESCALATION_EXTRA_TURNS = 4
+
+# Window for the correction-rate signal
+CORRECTION_RATE_WINDOW_DAYS = 30
+
+# Fallback for OCR rows without compact_token_count
+TOKENS_PER_PAGE_ESTIMATE = 600
+
+
+class RoutingSignals(TypedDict):
+    """Inputs to the routing policy."""
+    page_count: int
+    token_count: int
+    table_count: int
+    field_count: int
+    correction_rate: float  # Corrections per extraction over the recent window
+
+
+class RoutingDecision(TypedDict):
+    """Model and turn budget for one run."""
+    model: str
+    max_turns: int
+    escalation_model: str | None  # Retry model if complete is never reached
+    reason: str
+
+
+def get_routing_signals(
+    db: Client,
+    document_id: str,
+    user_id: str,
+    field_count: int = 0,
+) -> RoutingSignals:
+    """Collect routing signals for a document (missing data counts as small)."""
+    ocr = db.table("ocr_results") \
+        .select("page_count, compact_token_count, html_tables") \
+        .eq("document_id", document_id) \
+        .eq("user_id", user_id) \
+        .limit(1) \
+        .execute()
+    row = ocr.data[0] if ocr.data else {}
+
+    token_count = row.get("compact_token_count")
+    if token_count is None:
+        # Legacy rows have no token count - assume a typical page
+        token_count = TOKENS_PER_PAGE_ESTIMATE * (row.get("page_count") or 1)
+
+    return {
+        "page_count": row.get("page_count") or 1,
+        "token_count": token_count,
+        "table_count": len(row.get("html_tables") or []),
+        "field_count": field_count,
+        "correction_rate": _get_correction_rate(db, user_id),
+    }
+
+
+def _get_correction_rate(db: Client, user_id: str) -> float:
+    """Corrections per extraction for this user over the recent window."""
+    since = (datetime.now(timezone.utc) - timedelta(days=CORRECTION_RATE_WINDOW_DAYS)).isoformat()
+    try:
+        counts = {}
+        for agent in ("extraction", "correction"):
+            result = db.table("agent_runs") \
+                .select("id", count="exact", head=True) \
+                .eq("user_id", user_id) \
+                .eq("agent", agent) \
+                .gte("created_at", since) \
+                .execute()
+            counts[agent] = result.count or 0
+        return counts["correction"] / counts["extraction"] if counts["extraction"] else 0.0
+
+    except Exception as e:
+        logger.warning(f"Correction rate lookup failed for {user_id}: {e}")
+        return 0.0
+
+
+def route_extraction(signals: RoutingSignals) -> RoutingDecision:
+    """
+    Choose model and max_turns for an extraction run.
+
+    Scores document complexity; each signal adds 0-2 points.
+    """
+    settings = get_settings()
+    fast, strong = settings.CLAUDE_MODEL, settings.CLAUDE_MODEL_STRONG
+
+    if not settings.MODEL_ROUTING_ENABLED:
+        return {
+            "model": fast,
+            "max_turns": BASE_MAX_TURNS + 2,
+            "escalation_model": None,
+            "reason": "routing disabled",
+        }
+
+    pages, tokens = signals["page_count"], signals["token_count"]
+    score = 0
+    reasons = []
+    if pages > 10 or tokens > 30_000:
+        score += 2
+        reasons.append(f"long ({pages}p, {tokens}t)")
+    elif pages > 3 or tokens > 8_000:
+        score += 1
+        reasons.append(f"medium ({pages}p, {tokens}t)")
+    if signals["table_count"] > 5:
+        score += 1
+        reasons.append(f"{signals['table_count']} tables")
+    if signals["field_count"] > 15:
+        score += 1
+        reasons.append(f"{signals['field_count']} fields")
+    if signals["correction_rate"] >= 0.3:
+        score += 1
+        reasons.append(f"correction rate {signals['correction_rate']:.0%}")
+
+    # Long documents need extra turns for outline → page reads
+    max_turns = BASE_MAX_TURNS + min(pages // 5, 6) + (2 if signals["field_count"] > 15 else 0)
+    max_turns = min(max_turns, MAX_MAX_TURNS)
+
+    use_strong = score >= STRONG_MODEL_SCORE
+    return {
+        "model": strong if use_strong else fast,
+        "max_turns": max_turns,
+        "escalation_model": None if use_strong or strong == fast else strong,
+        "reason": f"score {score}: " + (", ".join(reasons) or "simple document"),
+    }
+
+
+def resume_model(stored: str | None) -> str | None:
+    """
+    Model to continue an earlier extraction with (corrections), from
+    extractions.model.
+
+    Only real Claude model ids are reused. Legacy rows ("claude-agent-sdk")
+    and results that had no agent model (pattern or template replay) give
+    None, i.e. the default model.
+    """
+    if not stored or not stored.startswith("claude-") or stored == "claude-agent-sdk":
+        return None
+    return stored
@@ -0,0 +1,73 @@
+"""
+Agent runs under the shared Anthropic limiter.
+
+run_agent() holds one limiter admission for exactly as long as the agent
+conversation runs. The conversation executes in its own task and its
+messages are buffered for the caller, so a slow consumer (an SSE client on
+a bad connection, or a route doing database work after each event) never
+keeps the admission - and with it provider concurrency - held.
+
+Background runs (speculative extraction) take a background admission, so
+interactive runs are admitted ahead of them (see ProviderLimiter.acquire).
+
+On completion the slot is settled to the run's real token usage and one
+request per turn, so ANTHROPIC_REQUESTS_PER_MINUTE counts API requests,
+not agent runs.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator
+
+from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+
+from ...services.rate_limit import AGENT_RUN_TOKEN_ESTIMATE, get_limiter, usage_tokens
+from .telemetry import RunTelemetry
+
+_DONE = object()
+
+
+async def run_agent(
+    options: ClaudeAgentOptions,
+    prompt: str,
+    telemetry: RunTelemetry,
+    background: bool = False,
+) -> AsyncIterator[Any]:
+    """
+    Run one agent conversation, yielding its SDK messages.
+
+    Every message is passed to telemetry.observe() as it arrives. Closing
+    the iterator early (client disconnect) cancels the run. Background runs
+    yield the limiter to interactive ones.
+
+    Raises:
+        Whatever the agent run raised
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run() -> None:
+        try:
+            async with get_limiter("anthropic").slot(tokens=AGENT_RUN_TOKEN_ESTIMATE, background=background) as slot:
+                async with ClaudeSDKClient(options=options) as client:
+                    await client.query(prompt)
+                    async for message in client.receive_response():
+                        telemetry.observe(message)
+                        queue.put_nowait(message)
+
+                slot.settle(usage_tokens(telemetry.usage), requests=telemetry.num_turns or 1)
+                if telemetry.rate_limited:
+                    slot.rate_limited()
+        except Exception as e:
+            queue.put_nowait(e)
+        else:
+            queue.put_nowait(_DONE)
+
+    task = asyncio.create_task(run())
+    try:
+        while (item := await queue.get()) is not _DONE:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
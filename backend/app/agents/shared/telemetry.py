@@ -0,0 +1,167 @@
+"""
+Per-run agent telemetry.
+
+Records tokens, cost, turns, model id and per-tool call counts/latencies
+for one agent run and persists them to the agent_runs table.
+
+Usage:
+    telemetry = RunTelemetry("extraction", user_id, document_id, extraction_id)
+    tools = telemetry.instrument(create_tools(...))
+    ...
+    telemetry.observe(message)      # for every SDK message
+    telemetry.save(db, "completed")  # once, after the run
+"""
+
+import dataclasses
+import logging
+import time
+from typing import Any
+
+from claude_agent_sdk import AssistantMessage, ResultMessage, SdkMcpTool
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+
+class RunTelemetry:
+    """Collects usage and tool timings for one agent run."""
+
+    def __init__(
+        self,
+        agent: str,
+        user_id: str,
+        document_id: str | None = None,
+        extraction_id: str | None = None,
+    ):
+        """
+        Args:
+            agent: Run type - "extraction", "correction", "metadata", "stack_row",
+                   "stack_schema" or "stack_batch"
+            user_id: Owner of the run
+            document_id: Document the run operates on
+            extraction_id: Extraction written by the run (if any)
+        """
+        self.agent = agent
+        self.user_id = user_id
+        self.document_id = document_id
+        self.extraction_id = extraction_id
+
+        self.model: str | None = None
+        self.session_id: str | None = None
+        self.usage: dict[str, Any] = {}
+        self.cost_usd: float | None = None
+        self.num_turns: int | None = None
+        self.duration_api_ms: int | None = None
+        self.context_tokens: int | None = None  # Prompt size of the last turn
+        self.rate_limited = False  # Any turn hit a provider rate limit
+        self.tool_calls: dict[str, dict[str, Any]] = {}
+
+        self._start = time.perf_counter()
+
+    # ------------------------------------------------------------------
+    # Collection
+    # ------------------------------------------------------------------
+
+    def instrument(self, tools: list[SdkMcpTool]) -> list[SdkMcpTool]:
+        """Wrap tool handlers to record call counts, errors and latency."""
+        return [
+            dataclasses.replace(tool_def, handler=self._timed(tool_def.name, tool_def.handler))
+            for tool_def in tools
+        ]
+
+    def _timed(self, name: str, handler):
+        async def timed_handler(args: dict) -> dict:
+            start = time.perf_counter()
+            is_error = True
+            try:
+                result = await handler(args)
+                is_error = bool(result.get("is_error"))
+                return result
+            finally:
+                self.record_tool(name, (time.perf_counter() - start) * 1000, is_error)
+        return timed_handler
+
+    def record_tool(self, name: str, latency_ms: float, is_error: bool = False) -> None:
+        """Record one tool call."""
+        stats = self.tool_calls.setdefault(
+            name, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+        )
+        stats["count"] += 1
+        stats["errors"] += int(is_error)
+        stats["total_ms"] = round(stats["total_ms"] + latency_ms, 1)
+        stats["max_ms"] = round(max(stats["max_ms"], latency_ms), 1)
+
+    def observe(self, message: Any) -> None:
+        """Pick up model id, context size and final usage from SDK messages."""
+        if isinstance(message, AssistantMessage):
+            self.model = message.model or self.model
+            if usage := getattr(message, "usage", None):
+                self.context_tokens = (
+                    usage.get("input_tokens", 0)
+                    + usage.get("cache_read_input_tokens", 0)
+                    + usage.get("cache_creation_input_tokens", 0)
+                )
+            if getattr(message, "error", None) == "rate_limit":
+                self.rate_limited = True
+
+        elif isinstance(message, ResultMessage):
+            self.session_id = message.session_id
+            self.usage = message.usage or {}
+            self.cost_usd = message.total_cost_usd
+            self.num_turns = message.num_turns
+            self.duration_api_ms = message.duration_api_ms
+
+            # Prefer the model that actually carried the tokens
+            if model_usage := getattr(message, "model_usage", None):
+                self.model = max(
+                    model_usage,
+                    key=lambda m: model_usage[m].get("outputTokens", 0),
+                )
+
+    def observe_api_response(self, response: Any) -> None:
+        """
+        Pick up model id and usage from a direct Messages API call.
+
+        Repeated calls add up (a batch run observes every result).
+        """
+        self.model = response.model
+        for key, value in response.usage.model_dump(exclude_none=True).items():
+            if isinstance(value, int):
+                self.usage[key] = self.usage.get(key, 0) + value
+        self.num_turns = (self.num_turns or 0) + 1
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    @property
+    def duration_ms(self) -> int:
+        return int((time.perf_counter() - self._start) * 1000)
+
+    def to_row(self, status: str) -> dict[str, Any]:
+        """Shape of the agent_runs row."""
+        return {
+            "user_id": self.user_id,
+            "document_id": self.document_id,
+            "extraction_id": self.extraction_id,
+            "agent": self.agent,
+            "status": status,
+            "model": self.model,
+            "session_id": self.session_id,
+            "input_tokens": self.usage.get("input_tokens", 0),
+            "output_tokens": self.usage.get("output_tokens", 0),
+            "cache_read_tokens": self.usage.get("cache_read_input_tokens", 0),
+            "cache_creation_tokens": self.usage.get("cache_creation_input_tokens", 0),
+            "cost_usd": self.cost_usd,
+            "num_turns": self.num_turns,
+            "duration_ms": self.duration_ms,
+            "duration_api_ms": self.duration_api_ms,
+            "tool_calls": self.tool_calls,
+        }
+
+    def save(self, db: Client, status: str) -> None:
+        """Persist the run (best effort - telemetry never fails a run)."""
+        try:
+            db.table("agent_runs").insert(self.to_row(status)).execute()
+        except Exception as e:
+            logger.warning(f"Failed to save {self.agent} run telemetry: {e}")
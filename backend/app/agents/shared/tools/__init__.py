@@ -1,5 +1,6 @@
 """Shared agent tools."""
 
+from .query_tables import create_query_tables_tool
 from .read_ocr import create_read_ocr_tool
 
-__all__ = ["create_read_ocr_tool"]
+__all__ = ["create_query_tables_tool", "create_read_ocr_tool"]
@@ -0,0 +1,128 @@
+"""
+Shared Tool: query_tables (READ)
+
+Queries the document's OCR tables as typed data.
+Scoped to the current document_id and user_id.
+
+Tables are parsed once at OCR time into typed columns (number, date,
+text) and stored in ocr_results.parsed_tables. Without 'table' the tool
+lists them (columns, types, a few sample rows); with 'table' it returns
+filtered, projected rows and optional column sums - line items become a
+lookup instead of reading HTML or pipe grids.
+
+Used by:
+- extraction_agent
+- stack_agent (per-document row workers)
+"""
+
+import json
+
+from supabase import Client
+from claude_agent_sdk import tool
+
+from ....services.ocr_tables import FILTER_OPS, describe_table, parse_legacy_tables, query_table
+
+DEFAULT_ROW_LIMIT = 100
+MAX_ROW_LIMIT = 500
+
+
+QUERY_TABLES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "table": {
+            "type": "integer",
+            "description": "Table number from the listing (omit to list the document's tables)",
+        },
+        "columns": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Column keys to return (default: all)",
+        },
+        "where": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "column": {"type": "string"},
+                    "op": {"type": "string", "enum": list(FILTER_OPS)},
+                    "value": {},
+                },
+                "required": ["column", "op"],
+            },
+            "description": "Row filters (all must match)",
+        },
+        "sum": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Number columns to total over all matching rows",
+        },
+        "offset": {"type": "integer", "description": "Matching rows to skip"},
+        "limit": {
+            "type": "integer",
+            "description": f"Max rows (default {DEFAULT_ROW_LIMIT}, max {MAX_ROW_LIMIT})",
+        },
+    },
+}
+
+
+def create_query_tables_tool(document_id: str, user_id: str, db: Client):
+    """Create query_tables tool scoped to specific document and user."""
+
+    @tool(
+        "query_tables",
+        "Query the document's tables as typed data. Call without 'table' to list tables "
+        "(columns, types, sample rows); pass 'table' with optional 'columns', 'where' and 'sum' "
+        "to read rows. Prefer this over read_ocr for line items.",
+        QUERY_TABLES_SCHEMA
+    )
+    async def query_tables(args: dict) -> dict:
+        """List or query parsed tables from the ocr_results table."""
+        result = db.table("ocr_results") \
+            .select("parsed_tables, html_tables") \
+            .eq("document_id", document_id) \
+            .eq("user_id", user_id) \
+            .single() \
+            .execute()
+
+        if not result.data:
+            return {
+                "content": [{"type": "text", "text": "No OCR data found for this document"}],
+                "is_error": True
+            }
+
+        # Documents OCR'd before parsed_tables existed are parsed on the fly
+        tables = result.data.get("parsed_tables") or parse_legacy_tables(result.data.get("html_tables"))
+        if not tables:
+            return {"content": [{"type": "text", "text": "This document has no tables"}]}
+
+        number = args.get("table")
+        if number is None:
+            listing = [describe_table(table, i + 1) for i, table in enumerate(tables)]
+            return {"content": [{"type": "text", "text": json.dumps({"tables": listing}, indent=2)}]}
+
+        if not isinstance(number, int) or not 1 <= number <= len(tables):
+            return {
+                "content": [{"type": "text", "text": f"table must be 1-{len(tables)}, got {number}"}],
+                "is_error": True
+            }
+
+        try:
+            offset = max(0, int(args.get("offset") or 0))
+            limit = max(1, min(int(args.get("limit") or DEFAULT_ROW_LIMIT), MAX_ROW_LIMIT))
+            page = query_table(
+                tables[number - 1],
+                columns=args.get("columns") or None,
+                where=args.get("where") or None,
+                offset=offset,
+                limit=limit,
+                sum_columns=args.get("sum") or None,
+            )
+        except (TypeError, ValueError) as e:
+            return {
+                "content": [{"type": "text", "text": f"Invalid query: {e}"}],
+                "is_error": True
+            }
+
+        return {"content": [{"type": "text", "text": json.dumps(page, indent=2)}]}
+
+    return query_tables
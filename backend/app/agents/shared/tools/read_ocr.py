@@ -4,23 +4,62 @@ Shared Tool: read_ocr (READ)
 Reads OCR text from the ocr_results table.
 Scoped to the current document_id and user_id.
 
+Short documents are returned whole. Long documents return an outline
+first; the agent then reads page ranges or searches for keywords so
+token cost scales with relevant content, not document length.
+
 Used by:
 - extraction_agent
 - document_processor_agent
+- stack_agent (per-document row workers)
 """
 
 from supabase import Client
 from claude_agent_sdk import tool
 
+from ....services.ocr_pages import (
+    FULL_TEXT_CHAR_LIMIT,
+    MAX_PAGES_PER_READ,
+    build_outline,
+    find_snippets,
+    format_pages,
+    parse_page_range,
+    split_legacy_pages,
+)
+
+
+READ_OCR_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "pages": {
+            "type": "string",
+            "description": f"1-based page range, e.g. '1-3' or '2,5' (max {MAX_PAGES_PER_READ} pages)",
+        },
+        "query": {
+            "type": "string",
+            "description": "Keyword to search for; returns matching snippets with page numbers",
+        },
+        "outline": {
+            "type": "boolean",
+            "description": "Return a table of contents (headings per page) instead of text",
+        },
+    },
+}
+
 
 def create_read_ocr_tool(document_id: str, user_id: str, db: Client):
     """Create read_ocr tool scoped to specific document and user."""
 
-    @tool("read_ocr", "Read the OCR text from the document", {})
+    @tool(
+        "read_ocr",
+        "Read the OCR text from the document. Long documents return an outline; "
+        "use 'pages' to read a page range or 'query' to search for keywords.",
+        READ_OCR_SCHEMA
+    )
     async def read_ocr(args: dict) -> dict:
         """Read OCR text from ocr_results table."""
         result = db.table("ocr_results") \
-            .select("raw_text") \
+            .select("raw_text, compact_text, page_texts") \
             .eq("document_id", document_id) \
             .eq("user_id", user_id) \
             .single() \
@@ -32,10 +71,45 @@ def create_read_ocr_tool(document_id: str, user_id: str, db: Client):
                 "is_error": True
             }
 
+        # Prefer the compact agent-facing text; older rows only have raw_text
+        full_text = result.data.get("compact_text") or result.data["raw_text"]
+        page_texts = result.data.get("page_texts") or split_legacy_pages(full_text)
+        pages = (args.get("pages") or "").strip()
+        query = (args.get("query") or "").strip()
+
+        if query:
+            text = find_snippets(page_texts, query)
+
+        elif pages:
+            try:
+                indexes = parse_page_range(pages, len(page_texts))
+            except ValueError as e:
+                return {
+                    "content": [{"type": "text", "text": f"Invalid page range: {e}"}],
+                    "is_error": True
+                }
+            if len(indexes) > MAX_PAGES_PER_READ:
+                return {
+                    "content": [{"type": "text", "text": f"Too many pages requested ({len(indexes)}). Max {MAX_PAGES_PER_READ} per read."}],
+                    "is_error": True
+                }
+            text = format_pages(page_texts, indexes)
+
+        elif args.get("outline") or len(full_text) > FULL_TEXT_CHAR_LIMIT:
+            text = build_outline(page_texts)
+            if len(full_text) > FULL_TEXT_CHAR_LIMIT:
+                text += (
+                    f"\n\nDocument is too long to read at once ({len(full_text)} chars). "
+                    "Use read_ocr with 'pages' or 'query' to read the parts you need."
+                )
+
+        else:
+            text = full_text
+
         return {
             "content": [{
                 "type": "text",
-                "text": result.data["raw_text"]
+                "text": text
             }]
         }
 
@@ -3,3 +3,30 @@ Stack agent - extracts structured data across multiple documents into unified ta
 
 Uses Claude Agent SDK with real tools for validation and state management.
 """
+
+from .agent import ExtractionInProgressError, claim_extraction, extract_row, extract_stack, extraction_in_progress
+from .batch import batch_collection_running, collect_stack_batch, submit_stack_batch
+from .columns import StackColumn, table_columns
+from .rows import StackRow, add_column, delete_column, redefine_column, rename_column, upsert_rows
+from .structured import extract_row_structured, infer_columns
+
+__all__ = [
+    "add_column",
+    "batch_collection_running",
+    "claim_extraction",
+    "collect_stack_batch",
+    "delete_column",
+    "extract_row",
+    "extract_row_structured",
+    "extract_stack",
+    "extraction_in_progress",
+    "ExtractionInProgressError",
+    "infer_columns",
+    "redefine_column",
+    "rename_column",
+    "StackColumn",
+    "StackRow",
+    "submit_stack_batch",
+    "table_columns",
+    "upsert_rows",
+]
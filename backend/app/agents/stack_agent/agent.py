@@ -2,6 +2,422 @@
 Main stack agent logic.
 
 Functions:
-- extract_stack() - Extract data from all documents in a stack
-- update_stack() - Resume session for user corrections
+- extract_stack() - Extract a table row from every document in a stack
+  (or, incrementally, only new/changed documents and cells)
+- extract_row() - One document's row (a short, single-document agent run,
+  for documents too long for structured row extraction)
 """
+
+import asyncio
+import logging
+from contextlib import aclosing
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
+
+from claude_agent_sdk import (
+    create_sdk_mcp_server,
+    ClaudeAgentOptions,
+)
+from supabase import Client
+
+from ...config import get_settings
+from ...services.tokens import estimate_tokens
+from ..shared import RunTelemetry, run_agent
+from .columns import StackColumn, format_columns, table_columns
+from .fanout import fan_out
+from .prompts import ROW_PROMPT_TEMPLATE, ROW_SYSTEM_PROMPT
+from .refresh import RefreshPlan, plan_refresh
+from .structured import extract_row_structured, infer_columns
+from .tools import create_row_tools
+
+logger = logging.getLogger(__name__)
+
+# read_ocr (outline -> pages) -> create_row -> done
+ROW_MAX_TURNS = 5
+
+# Max document ids per PostgREST in_() filter (keeps URLs short)
+ID_CHUNK_SIZE = 200
+
+# Rows per page when reading a table's existing rows
+ROW_PAGE_SIZE = 1000
+
+# Heartbeats per STACK_EXTRACTION_STALE_SECONDS while a run is processing
+HEARTBEATS_PER_STALE_WINDOW = 4
+
+
+class ExtractionInProgressError(RuntimeError):
+    """The table already has a live extraction or a pending batch."""
+
+
+async def extract_row(
+    table_id: str,
+    document_id: str,
+    user_id: str,
+    columns: list[StackColumn],
+    db: Client,
+    model: str | None = None,
+    ocr_content_hash: str | None = None,
+    merge: bool = False,
+) -> dict[str, Any]:
+    """
+    Extract one document's row into stack_table_rows.
+
+    With merge=True only the given columns are extracted and merged into
+    the document's existing row.
+
+    Returns:
+        {"row_id": ..., "model": ...}
+
+    Raises:
+        ValueError: If the agent finished without saving a row
+    """
+    telemetry = RunTelemetry("stack_row", user_id, document_id)
+    saved: dict[str, Any] = {}
+    tools = telemetry.instrument(create_row_tools(
+        table_id, document_id, user_id, columns, db, saved,
+        ocr_content_hash=ocr_content_hash, merge=merge,
+    ))
+
+    options = ClaudeAgentOptions(
+        system_prompt=ROW_SYSTEM_PROMPT,
+        model=model or get_settings().CLAUDE_MODEL,
+        mcp_servers={"stack": create_sdk_mcp_server(name="stack", tools=tools)},
+        allowed_tools=["mcp__stack__read_ocr", "mcp__stack__query_tables", "mcp__stack__create_row"],
+        max_turns=ROW_MAX_TURNS,
+    )
+
+    try:
+        async for _ in run_agent(options, ROW_PROMPT_TEMPLATE.format(columns=format_columns(columns)), telemetry):
+            pass
+    except Exception:
+        telemetry.save(db, "failed")
+        raise
+
+    if "row_id" not in saved:
+        telemetry.save(db, "incomplete")
+        raise ValueError("Agent finished without saving a row")
+
+    telemetry.save(db, "completed")
+    return {"row_id": saved["row_id"], "model": telemetry.model}
+
+
+def _ocr_hashes(db: Client, user_id: str, document_ids: list[str]) -> dict[str, str | None]:
+    """content_hash per document that has OCR results (owned by user_id)."""
+    hashes: dict[str, str | None] = {}
+    for start in range(0, len(document_ids), ID_CHUNK_SIZE):
+        chunk = document_ids[start:start + ID_CHUNK_SIZE]
+        result = db.table("ocr_results") \
+            .select("document_id, content_hash") \
+            .eq("user_id", user_id) \
+            .in_("document_id", chunk) \
+            .execute()
+        hashes.update({row["document_id"]: row.get("content_hash") for row in result.data or []})
+    return hashes
+
+
+def _inline_text(db: Client, user_id: str, document_id: str) -> str | None:
+    """Document OCR text if it is short enough to inline in a row call, else None."""
+    limit = get_settings().STACK_ROW_INLINE_MAX_TOKENS
+    if limit <= 0:
+        return None
+    result = db.table("ocr_results") \
+        .select("compact_text, raw_text, compact_token_count") \
+        .eq("document_id", document_id) \
+        .eq("user_id", user_id) \
+        .limit(1) \
+        .execute()
+    if not result.data:
+        return None
+    text = result.data[0].get("compact_text") or result.data[0]["raw_text"]
+    tokens = result.data[0].get("compact_token_count") or estimate_tokens(text)
+    return text if tokens <= limit else None
+
+
+def _ocr_texts(db: Client, user_id: str, document_ids: list[str]) -> dict[str, tuple[str, int]]:
+    """(OCR text, token count) per document, compact text where available."""
+    texts: dict[str, tuple[str, int]] = {}
+    for start in range(0, len(document_ids), ID_CHUNK_SIZE):
+        result = db.table("ocr_results") \
+            .select("document_id, compact_text, raw_text, compact_token_count") \
+            .eq("user_id", user_id) \
+            .in_("document_id", document_ids[start:start + ID_CHUNK_SIZE]) \
+            .execute()
+        for row in result.data or []:
+            text = row.get("compact_text") or row["raw_text"]
+            texts[row["document_id"]] = (text, row.get("compact_token_count") or estimate_tokens(text))
+    return texts
+
+
+def _table_rows(db: Client, table_id: str) -> list[dict[str, Any]]:
+    """Version info of every existing row in a table (paged)."""
+    rows: list[dict[str, Any]] = []
+    while True:
+        page = db.table("stack_table_rows") \
+            .select("document_id, ocr_content_hash, column_versions") \
+            .eq("table_id", table_id) \
+            .order("id") \
+            .range(len(rows), len(rows) + ROW_PAGE_SIZE - 1) \
+            .execute()
+        rows.extend(page.data or [])
+        if len(page.data or []) < ROW_PAGE_SIZE:
+            return rows
+
+
+def _load_table(db: Client, table_id: str, user_id: str) -> dict[str, Any] | None:
+    """The user's stack_tables row, or None."""
+    table = db.table("stack_tables") \
+        .select("id, stack_id, mode, columns, custom_columns, status") \
+        .eq("id", table_id) \
+        .eq("user_id", user_id) \
+        .limit(1) \
+        .execute()
+    return table.data[0] if table.data else None
+
+
+def _set_status(db: Client, table_id: str, status: str) -> None:
+    """Set a table's status (updated_at doubles as the processing heartbeat)."""
+    db.table("stack_tables").update({
+        "status": status,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("id", table_id).execute()
+
+
+def claim_extraction(db: Client, table_id: str, user_id: str) -> str | None:
+    """
+    Mark a table processing unless it has a live extraction (the same test
+    as extraction_in_progress, made atomically by the claim_stack_extraction
+    RPC, so two close requests can't both start a run).
+
+    Returns:
+        The table's status before the claim, or None if it wasn't claimed
+    """
+    result = db.rpc("claim_stack_extraction", {
+        "p_table_id": table_id,
+        "p_user_id": user_id,
+        "p_stale_seconds": int(get_settings().STACK_EXTRACTION_STALE_SECONDS),
+    }).execute()
+    return result.data
+
+
+async def _heartbeat(db: Client, table_id: str, interval: float) -> None:
+    """Refresh a processing table's updated_at every interval until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        db.table("stack_tables").update({
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }).eq("id", table_id).eq("status", "processing").execute()
+
+
+def extraction_in_progress(table: dict[str, Any]) -> bool:
+    """
+    Whether a stack_tables row (status, updated_at, batch_job) has a live
+    extraction.
+
+    A pending batch always counts. An interactive run heartbeats
+    updated_at while processing; one silent for longer than
+    STACK_EXTRACTION_STALE_SECONDS was abandoned (e.g. the server
+    restarted mid-run) and no longer blocks a new extraction.
+    """
+    if table.get("batch_job"):
+        return True
+    if table.get("status") != "processing":
+        return False
+    if not table.get("updated_at"):
+        return True
+    updated_at = datetime.fromisoformat(table["updated_at"].replace("Z", "+00:00"))
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    age = (datetime.now(timezone.utc) - updated_at).total_seconds()
+    return age < get_settings().STACK_EXTRACTION_STALE_SECONDS
+
+
+def _stack_document_ids(db: Client, stack_id: str) -> list[str]:
+    """Ids of every document in a stack."""
+    links = db.table("stack_documents") \
+        .select("document_id") \
+        .eq("stack_id", stack_id) \
+        .execute()
+    return [row["document_id"] for row in links.data or []]
+
+
+def _plan(
+    db: Client,
+    table_id: str,
+    columns: list[StackColumn],
+    document_ids: list[str],
+    ocr_hashes: dict[str, str | None],
+    incremental: bool,
+) -> RefreshPlan:
+    """
+    What to extract: every document with OCR, or (incremental) only the
+    delta since the last extraction. Rows of removed documents are deleted.
+    """
+    if incremental:
+        plan = plan_refresh(document_ids, ocr_hashes, _table_rows(db, table_id), columns)
+        if plan["removed"]:
+            _delete_rows(db, table_id, plan["removed"])
+        return plan
+    return {
+        "todo": {document_id: columns for document_id in document_ids if document_id in ocr_hashes},
+        "partial": [],
+        "unchanged": [],
+        "removed": [],
+    }
+
+
+def _delete_rows(db: Client, table_id: str, document_ids: list[str]) -> None:
+    """Delete a table's rows for documents removed from the stack."""
+    for start in range(0, len(document_ids), ID_CHUNK_SIZE):
+        db.table("stack_table_rows") \
+            .delete() \
+            .eq("table_id", table_id) \
+            .in_("document_id", document_ids[start:start + ID_CHUNK_SIZE]) \
+            .execute()
+
+
+async def extract_stack(
+    table_id: str,
+    user_id: str,
+    db: Client,
+    model: str | None = None,
+    concurrency: int | None = None,
+    incremental: bool = False,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Extract a row for every document in the table's stack, in parallel.
+
+    Auto tables without columns first infer them from a sample of
+    documents (schema phase). Each document then gets its own row call
+    (bounded by concurrency and the shared Anthropic limiter) that writes
+    its row independently: a strict single call for documents that fit
+    inline, a short agent run for long ones.
+
+    Incremental mode only extracts documents without a row, documents
+    re-OCR'd since their row was written, and cells whose column was added
+    or redefined; rows of documents removed from the stack are deleted.
+
+    The table is claimed (claim_extraction) for the whole run and
+    heartbeats while processing; a table with a live extraction or a
+    pending batch only yields an error.
+
+    Args:
+        table_id: stack_tables row to fill (custom tables must have columns)
+        user_id: User who owns the table
+        db: Supabase client
+        model: Model for the row workers (defaults to Settings.CLAUDE_MODEL)
+        concurrency: Max rows in flight (defaults to Settings.STACK_EXTRACTION_CONCURRENCY)
+        incremental: Only process the delta since the last extraction
+
+    Yields:
+        {"schema": "inferring"}, {"columns": [...]} - Schema phase (auto tables)
+        {"started": True, "table_id": ..., "total": N, "skipped": [...],
+         "unchanged": N, "removed": N} - Plan (skipped = documents without OCR)
+        {"document_id": ..., "status": "started" | "completed" | "failed", ...} - Per document
+        {"complete": True, "table_id": ..., "completed": N, "failed": N} - Done
+        {"error": "..."} - Error occurred
+    """
+    settings = get_settings()
+
+    table = _load_table(db, table_id, user_id)
+    if not table:
+        yield {"error": "Table not found"}
+        return
+
+    previous_status = claim_extraction(db, table_id, user_id)
+    if previous_status is None:
+        yield {"error": "Table extraction already in progress"}
+        return
+
+    # updated_at is refreshed on a timer, independent of row progress, so a
+    # run whose rows all take long still doesn't look abandoned
+    heartbeat = asyncio.create_task(_heartbeat(
+        db, table_id, settings.STACK_EXTRACTION_STALE_SECONDS / HEARTBEATS_PER_STALE_WINDOW
+    ))
+    completed = failed = 0
+    status: str | None = None
+    error: str | None = None
+    try:
+        document_ids = _stack_document_ids(db, table["stack_id"])
+        ocr_hashes = _ocr_hashes(db, user_id, document_ids)
+        skipped = [document_id for document_id in document_ids if document_id not in ocr_hashes]
+
+        columns = table_columns(table)
+        if not columns:
+            if table.get("mode") != "auto":
+                status = previous_status
+                yield {"error": "Table has no columns defined"}
+                return
+
+            # Schema phase: infer columns once from a sample of documents
+            yield {"schema": "inferring"}
+            try:
+                columns = await infer_columns(table_id, user_id, list(ocr_hashes), db)
+            except Exception as e:
+                logger.error(f"[{table_id}] Schema inference failed: {e}")
+                status = previous_status
+                yield {"error": f"Could not infer columns: {e}"}
+                return
+            yield {"columns": columns}
+
+        plan = _plan(db, table_id, columns, document_ids, ocr_hashes, incremental)
+        todo = list(plan["todo"])
+        partial = set(plan["partial"])
+
+        async def worker(document_id: str) -> dict[str, Any]:
+            # Row phase: a single strict call when the document fits inline,
+            # otherwise an agent run that pages through the OCR
+            kwargs: dict[str, Any] = {
+                "ocr_content_hash": ocr_hashes.get(document_id),
+                "merge": document_id in partial,
+            }
+            text = _inline_text(db, user_id, document_id)
+            if text is not None:
+                return await extract_row_structured(
+                    table_id, document_id, user_id, plan["todo"][document_id], db, text, model, **kwargs
+                )
+            return await extract_row(
+                table_id, document_id, user_id, plan["todo"][document_id], db, model, **kwargs
+            )
+
+        yield {
+            "started": True,
+            "table_id": table_id,
+            "total": len(todo),
+            "skipped": skipped,
+            "unchanged": len(plan["unchanged"]),
+            "removed": len(plan["removed"]),
+        }
+
+        # aclosing: an interrupted run cancels its row workers before the
+        # table's status is settled
+        async with aclosing(fan_out(todo, worker, concurrency or settings.STACK_EXTRACTION_CONCURRENCY)) as events:
+            async for event in events:
+                if event["status"] == "completed":
+                    completed += 1
+                elif event["status"] == "failed":
+                    failed += 1
+                yield event
+
+        # Partial failures keep the table usable; only a total failure fails it
+        status = "failed" if todo and not completed else "completed"
+
+    except Exception as e:
+        logger.error(f"[{table_id}] Stack extraction failed: {e}")
+        status, error = "failed", str(e)
+
+    finally:
+        heartbeat.cancel()
+        if status is None:
+            # Closed early (client disconnected, request cancelled): rows
+            # written so far are kept, and the table must not stay locked
+            # in processing
+            status = "completed" if completed or previous_status == "completed" else "failed"
+            logger.warning(f"[{table_id}] Stack extraction interrupted after {completed} rows")
+        _set_status(db, table_id, status)
+
+    if error is not None:
+        yield {"error": error}
+        return
+
+    logger.info(f"[{table_id}] Stack extraction {status}: {completed} rows, {failed} failed")
+    yield {"complete": True, "table_id": table_id, "completed": completed, "failed": failed}
@@ -0,0 +1,328 @@
+"""
+Offline batch extraction for large stack tables (backfills).
+
+submit_stack_batch() builds the same strict row request structured row
+extraction sends interactively, one per document, and submits them as
+provider message batches (split to stay within per-batch limits); the
+pending job is recorded in stack_tables.batch_job. collect_stack_batch()
+waits for each batch to end and bulk-writes the rows. One collector runs
+per job: collection is claimed with a lease on the table
+(claim_stack_batch_collection), so resuming never double-writes rows.
+
+Batches are billed at batch pricing and run outside the interactive
+rate limits, so backfills don't compete with interactive extraction.
+There is no SSE progress - the table's status tracks the job.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any
+
+from supabase import Client
+
+from ...config import get_settings
+from ...services.message_batches import (
+    BatchNotFoundError,
+    BatchProvider,
+    BatchRequest,
+    get_batch_provider,
+    split_batches,
+    wait_for_batch,
+)
+from ..shared import RunTelemetry
+from .agent import (
+    ExtractionInProgressError,
+    _load_table,
+    _ocr_hashes,
+    _ocr_texts,
+    _plan,
+    _set_status,
+    _stack_document_ids,
+    claim_extraction,
+)
+from .columns import StackColumn, table_columns
+from .rows import UPSERT_BATCH_SIZE, StackRow, upsert_rows
+from .structured import infer_columns, parse_row, row_request, tool_input
+
+logger = logging.getLogger(__name__)
+
+# Collection lease (stack_tables.batch_collecting_at), renewed on every poll
+# and every write; a collector silent for this long is presumed dead
+COLLECT_LEASE_SECONDS = 600
+
+# Tables this process is collecting (the lease covers other processes)
+_collecting: set[str] = set()
+
+
+def batch_collection_running(table_id: str) -> bool:
+    """Whether this process is collecting the table's batch job."""
+    return table_id in _collecting
+
+
+async def submit_stack_batch(
+    table_id: str,
+    user_id: str,
+    db: Client,
+    provider: BatchProvider | None = None,
+    model: str | None = None,
+    incremental: bool = False,
+) -> dict[str, Any]:
+    """
+    Submit one row request per document as message batches.
+
+    Auto tables without columns infer them first (one interactive call).
+    Documents whose OCR exceeds STACK_BATCH_INLINE_MAX_TOKENS are left out
+    (too_long) - run those through interactive extraction. Requests are
+    split into as many batches as the provider's per-batch limits need;
+    the job is recorded after each one, so a failed submission leaves a
+    job covering exactly the batches that went in.
+
+    Returns:
+        {"batch_ids": [...] (empty if nothing to extract), "total": N,
+         "skipped": [...], "too_long": [...], "unchanged": N, "removed": N}
+
+    Raises:
+        ValueError: If the table doesn't exist or has no columns
+        ExtractionInProgressError: If the table has a live extraction or
+            a pending batch (the table is claimed like an interactive run)
+    """
+    settings = get_settings()
+    provider = provider or get_batch_provider()
+    model = model or settings.CLAUDE_MODEL
+
+    table = _load_table(db, table_id, user_id)
+    if not table:
+        raise ValueError("Table not found")
+
+    previous_status = claim_extraction(db, table_id, user_id)
+    if previous_status is None:
+        raise ExtractionInProgressError("Table extraction already in progress")
+
+    job: dict[str, Any] = {"batches": []}
+    try:
+        document_ids = _stack_document_ids(db, table["stack_id"])
+        ocr_hashes = _ocr_hashes(db, user_id, document_ids)
+        skipped = [document_id for document_id in document_ids if document_id not in ocr_hashes]
+
+        columns = table_columns(table)
+        if not columns:
+            if table.get("mode") != "auto":
+                raise ValueError("Table has no columns defined")
+            columns = await infer_columns(table_id, user_id, list(ocr_hashes), db)
+
+        plan = _plan(db, table_id, columns, document_ids, ocr_hashes, incremental)
+        texts = _ocr_texts(db, user_id, list(plan["todo"]))
+        partial = set(plan["partial"])
+
+        requests: list[BatchRequest] = []
+        documents: dict[str, dict[str, Any]] = {}
+        too_long: list[str] = []
+        for document_id, todo_columns in plan["todo"].items():
+            text, tokens = texts.get(document_id, ("", 0))
+            if tokens > settings.STACK_BATCH_INLINE_MAX_TOKENS:
+                too_long.append(document_id)
+                continue
+            requests.append({"custom_id": document_id, "params": row_request(todo_columns, text, model)})
+            documents[document_id] = {"ocr_content_hash": ocr_hashes.get(document_id)}
+            if document_id in partial:
+                documents[document_id]["columns"] = [column["name"] for column in todo_columns]
+
+        summary: dict[str, Any] = {
+            "batch_ids": [],
+            "total": len(requests),
+            "skipped": skipped,
+            "too_long": too_long,
+            "unchanged": len(plan["unchanged"]),
+            "removed": len(plan["removed"]),
+        }
+        if not requests:
+            return summary
+
+        job = {
+            "batches": [],
+            "provider": provider.name,
+            "model": model,
+            "columns": columns,
+            "documents": {},
+            "submitted_at": datetime.now(timezone.utc).isoformat(),
+        }
+        for chunk in split_batches(requests):
+            batch_id = await provider.submit(chunk)
+            job["batches"].append(batch_id)
+            for request in chunk:
+                job["documents"][request["custom_id"]] = {**documents[request["custom_id"]], "batch": batch_id}
+            db.table("stack_tables").update({"status": "processing", "batch_job": job}).eq("id", table_id).execute()
+    finally:
+        if not job["batches"]:
+            # Nothing was submitted: release the claim
+            _set_status(db, table_id, previous_status)
+
+    summary["batch_ids"] = job["batches"]
+    logger.info(f"[{table_id}] Submitted {len(job['batches'])} batches: {len(requests)} rows")
+    return summary
+
+
+async def collect_stack_batch(
+    table_id: str,
+    user_id: str,
+    db: Client,
+    provider: BatchProvider | None = None,
+    poll_seconds: float | None = None,
+) -> dict[str, Any] | None:
+    """
+    Wait for a table's pending batches to end and write their rows.
+
+    Rows are bulk-upserted UPSERT_BATCH_SIZE at a time as results stream
+    in. Each batch is dropped from the job once written, so an interrupted
+    collection resumes with the batches left. A batch the provider no
+    longer has is skipped and its documents count as failed.
+
+    Returns:
+        {"batch_ids": [...], "completed": N, "failed": [document_id, ...]},
+        or None if another collector (this process or another) holds the job
+
+    Raises:
+        ValueError: If the table has no pending batch
+    """
+    if table_id in _collecting:
+        logger.info(f"[{table_id}] Batch already being collected")
+        return None
+
+    _collecting.add(table_id)
+    try:
+        return await _collect(
+            table_id, user_id, db,
+            provider or get_batch_provider(),
+            poll_seconds or get_settings().STACK_BATCH_POLL_SECONDS,
+        )
+    finally:
+        _collecting.discard(table_id)
+
+
+async def _collect(
+    table_id: str,
+    user_id: str,
+    db: Client,
+    provider: BatchProvider,
+    poll_seconds: float,
+) -> dict[str, Any] | None:
+    table = db.table("stack_tables") \
+        .select("batch_job") \
+        .eq("id", table_id) \
+        .eq("user_id", user_id) \
+        .limit(1) \
+        .execute()
+    job = table.data[0].get("batch_job") if table.data else None
+    if not job:
+        raise ValueError("No batch extraction pending")
+    if job["provider"] != provider.name:
+        raise ValueError(f"Batch was submitted to {job['provider']}, not {provider.name}")
+
+    claimed = db.rpc("claim_stack_batch_collection", {
+        "p_table_id": table_id,
+        "p_user_id": user_id,
+        "p_lease_seconds": max(COLLECT_LEASE_SECONDS, int(3 * poll_seconds)),
+    }).execute()
+    if not claimed.data:
+        logger.info(f"[{table_id}] Batch collection held by another collector")
+        return None
+
+    def renew() -> None:
+        db.table("stack_tables").update({
+            "batch_collecting_at": datetime.now(timezone.utc).isoformat(),
+        }).eq("id", table_id).execute()
+
+    columns = table_columns({"columns": job["columns"]})
+    by_name = {column["name"]: column for column in columns}
+    telemetry = RunTelemetry("stack_batch", user_id)
+    batch_ids = list(job["batches"])
+    remaining = list(batch_ids)
+
+    # Rows waiting to be written, grouped by the columns they were extracted for
+    pending: dict[tuple[str, ...], list[StackRow]] = {}
+    completed = 0
+    failed: list[str] = []
+
+    def flush(names: tuple[str, ...]) -> None:
+        nonlocal completed
+        rows = pending.pop(names, [])
+        if rows:
+            merge = names != tuple(by_name)
+            completed += len(upsert_rows(
+                db, table_id, user_id, [by_name[name] for name in names], rows, merge=merge,
+            ))
+            renew()
+
+    settled = False
+    try:
+        for batch_id in batch_ids:
+            try:
+                await wait_for_batch(provider, batch_id, poll_seconds, on_poll=renew)
+
+                async for result in provider.results(batch_id):
+                    document_id = result["custom_id"]
+                    info = job["documents"].get(document_id)
+                    if info is None:
+                        continue
+                    row_columns: list[StackColumn] = (
+                        [by_name[name] for name in info["columns"]] if info.get("columns") else columns
+                    )
+                    try:
+                        if result["message"] is None:
+                            raise ValueError(result["error"])
+                        telemetry.observe_api_response(result["message"])
+                        row_data, confidence_scores = parse_row(
+                            row_columns, tool_input(result["message"].content, "save_row")
+                        )
+                    except ValueError as e:
+                        logger.warning(f"[{table_id}] Batch row failed for {document_id}: {e}")
+                        failed.append(document_id)
+                        continue
+
+                    names = tuple(column["name"] for column in row_columns)
+                    pending.setdefault(names, []).append({
+                        "document_id": document_id,
+                        "row_data": row_data,
+                        "confidence_scores": confidence_scores,
+                        "ocr_content_hash": info.get("ocr_content_hash"),
+                    })
+                    if len(pending[names]) >= UPSERT_BATCH_SIZE:
+                        flush(names)
+
+            except BatchNotFoundError:
+                # The provider no longer has this batch - its rows are lost
+                logger.error(f"[{table_id}] Batch {batch_id} not found, skipping it")
+                failed.extend(
+                    document_id for document_id, info in job["documents"].items()
+                    if info["batch"] == batch_id
+                )
+
+            for names in list(pending):
+                flush(names)
+
+            # Written: a resumed collection starts after this batch
+            remaining.remove(batch_id)
+            db.table("stack_tables").update({
+                "batch_job": {**job, "batches": remaining},
+                "batch_collecting_at": datetime.now(timezone.utc).isoformat(),
+            }).eq("id", table_id).execute()
+
+        # Batches written by an earlier, interrupted collection count too
+        earlier = any(info["batch"] not in batch_ids for info in job["documents"].values())
+        status = "failed" if job["documents"] and not completed and not earlier else "completed"
+        db.table("stack_tables").update({
+            "status": status,
+            "batch_job": None,
+            "batch_collecting_at": None,
+        }).eq("id", table_id).execute()
+        settled = True
+
+    finally:
+        if not settled:
+            # Let the job be resumed right away rather than after the lease
+            db.table("stack_tables").update({"batch_collecting_at": None}).eq("id", table_id).execute()
+
+    telemetry.save(db, status)
+    logger.info(f"[{table_id}] Batches {', '.join(batch_ids)} {status}: {completed} rows, {len(failed)} failed")
+
+    return {"batch_ids": batch_ids, "completed": completed, "failed": failed}
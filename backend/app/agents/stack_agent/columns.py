@@ -0,0 +1,60 @@
+"""
+Stack table column definitions.
+
+stack_tables.columns holds the table schema as a JSONB list of
+{"name", "type", "description"} objects (older rows may hold plain names).
+Custom tables that haven't been extracted yet only have custom_columns.
+"""
+
+import hashlib
+import json
+from typing import Any, TypedDict
+
+COLUMN_TYPES = ["text", "number", "date", "boolean"]
+
+
+class StackColumn(TypedDict, total=False):
+    """One column of a stack table."""
+    name: str
+    type: str  # text, number, date, boolean
+    description: str
+
+
+def table_columns(table: dict[str, Any]) -> list[StackColumn]:
+    """Normalized column list for a stack_tables row (empty if undefined)."""
+    columns: list[StackColumn] = []
+    for column in table.get("columns") or []:
+        if isinstance(column, str) and column.strip():
+            columns.append({"name": column.strip()})
+        elif isinstance(column, dict) and str(column.get("name") or "").strip():
+            normalized: StackColumn = {"name": str(column["name"]).strip()}
+            if column.get("type"):
+                normalized["type"] = str(column["type"])
+            if column.get("description"):
+                normalized["description"] = str(column["description"])
+            columns.append(normalized)
+
+    if not columns:
+        columns = [{"name": name.strip()} for name in table.get("custom_columns") or [] if name.strip()]
+    return columns
+
+
+def format_columns(columns: list[StackColumn]) -> str:
+    """Column list for prompts: "- name (type): description"."""
+    lines = []
+    for column in columns:
+        line = f"- {column['name']}"
+        if column.get("type"):
+            line += f" ({column['type']})"
+        if column.get("description"):
+            line += f": {column['description']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def column_version(column: StackColumn) -> str:
+    """Short hash of a column definition; changes when its name, type or description do."""
+    definition = json.dumps(
+        {key: column.get(key) for key in ("name", "type", "description")}, sort_keys=True
+    )
+    return hashlib.sha256(definition.encode()).hexdigest()[:12]
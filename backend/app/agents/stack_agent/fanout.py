@@ -0,0 +1,56 @@
+"""
+Bounded-concurrency fan-out over a stack's documents.
+
+One worker per document, at most `concurrency` running at once. Progress
+events stream out as workers start and finish (in completion order), so a
+stack takes about as long as its slowest documents rather than the sum of
+all of them. A failed document doesn't stop the others.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+Worker = Callable[[str], Awaitable[dict[str, Any]]]
+
+
+async def fan_out(
+    document_ids: list[str],
+    worker: Worker,
+    concurrency: int,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Run worker(document_id) for every document and stream progress.
+
+    Yields:
+        {"document_id": ..., "status": "started"}
+        {"document_id": ..., "status": "completed", **worker_result}
+        {"document_id": ..., "status": "failed", "error": "..."}
+
+    Closing the iterator early cancels workers still running.
+    """
+    events: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(document_id: str) -> None:
+        async with semaphore:
+            await events.put({"document_id": document_id, "status": "started"})
+            try:
+                result = await worker(document_id)
+            except Exception as e:
+                logger.error(f"[{document_id}] Stack row failed: {e}")
+                await events.put({"document_id": document_id, "status": "failed", "error": str(e)})
+            else:
+                await events.put({"document_id": document_id, "status": "completed", **result})
+
+    tasks = [asyncio.create_task(run(document_id)) for document_id in document_ids]
+    try:
+        # Each worker emits exactly two events
+        for _ in range(2 * len(tasks)):
+            yield await events.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -2,6 +2,64 @@
 System prompts for the stack agent.
 
 Contains:
-- STACK_SYSTEM_PROMPT - Main agent instructions
-- UPDATE_PROMPT_TEMPLATE - For user corrections
+- ROW_SYSTEM_PROMPT - Per-document row worker instructions
+- ROW_PROMPT_TEMPLATE - Task prompt listing the table's columns
+- SCHEMA_PROMPT_TEMPLATE - Schema phase: infer columns from sample documents
+- ROW_STRUCTURED_PROMPT_TEMPLATE - Row phase: one document inlined, strict columns
 """
+
+ROW_SYSTEM_PROMPT = """You extract one table row from one document.
+
+## Available Tools
+
+- `read_ocr` - Read the OCR text from the document. Long documents return an outline first;
+  pass `pages` (e.g. "1-3") to read a page range or `query` to find keyword snippets
+- `query_tables` - The document's tables as typed rows; list them without `table`, then
+  filter (`where`) or total (`sum`) a table's columns
+- `create_row` - Save the row: a value and confidence score per column
+
+## Workflow
+
+1. Use `read_ocr` to read the document (for long documents, read only the pages you need)
+2. Call `create_row` once with a value for every column
+
+## Guidelines
+
+- Use exactly the column names given - no extra columns
+- Use null when the document doesn't contain a value
+- Dates as YYYY-MM-DD, amounts as plain numbers (no currency symbols)
+- Assign honest confidence scores (0.0-1.0)
+- Don't summarize or explain - the row is the output
+"""
+
+
+ROW_PROMPT_TEMPLATE = """Extract one row with these columns:
+{columns}
+
+Start by using read_ocr to read the document text."""
+
+
+SCHEMA_PROMPT_TEMPLATE = """These {count} documents are a sample from a collection that will become one table with a row per document.
+
+{documents}
+
+Define the table's columns with define_columns:
+- One column per field that most documents in the collection would have
+- snake_case names; type is text, number, date or boolean
+- Prefer flat, scalar values (e.g. total_amount, not a nested object)
+- Skip one-off details that only appear in a single document"""
+
+
+ROW_STRUCTURED_PROMPT_TEMPLATE = """Extract one table row from this document with save_row.
+
+Columns:
+{columns}
+
+Rules:
+- Use null when the document doesn't contain a value
+- Dates as YYYY-MM-DD, amounts as plain numbers (no currency symbols)
+- Honest confidence scores (0.0-1.0)
+
+<document>
+{document}
+</document>"""
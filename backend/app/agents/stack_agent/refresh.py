@@ -0,0 +1,67 @@
+"""
+Incremental stack table refresh planning.
+
+Compares the stack's documents, their OCR content hashes and the table's
+column definitions against the versions recorded on existing rows, and
+decides what each document needs:
+- no row, or OCR changed since the row was written -> full row
+- row up to date except some columns (added or redefined) -> just those cells
+- otherwise nothing
+
+Rows for documents no longer in the stack are reported for removal.
+"""
+
+from typing import Any, TypedDict
+
+from .columns import StackColumn, column_version
+
+
+class RefreshPlan(TypedDict):
+    """What an incremental refresh has to do."""
+    todo: dict[str, list[StackColumn]]  # document_id -> columns to extract
+    partial: list[str]  # Documents whose existing row is merged into, not replaced
+    unchanged: list[str]
+    removed: list[str]  # Documents with rows that are no longer in the stack
+
+
+def plan_refresh(
+    document_ids: list[str],
+    ocr_hashes: dict[str, str | None],
+    rows: list[dict[str, Any]],
+    columns: list[StackColumn],
+) -> RefreshPlan:
+    """
+    Plan the delta between a stack and its table's rows.
+
+    Args:
+        document_ids: Documents in the stack, in stack order
+        ocr_hashes: document_id -> current ocr_results.content_hash (documents
+            without OCR are absent and left out of the plan)
+        rows: Existing rows (document_id, ocr_content_hash, column_versions)
+        columns: The table's current columns
+    """
+    by_document = {row["document_id"]: row for row in rows}
+    versions = {column["name"]: column_version(column) for column in columns}
+
+    plan: RefreshPlan = {"todo": {}, "partial": [], "unchanged": [], "removed": []}
+    for document_id in document_ids:
+        if document_id not in ocr_hashes:
+            continue
+        row = by_document.get(document_id)
+        if row is None or row.get("ocr_content_hash") != ocr_hashes.get(document_id):
+            plan["todo"][document_id] = columns
+            continue
+
+        recorded = row.get("column_versions") or {}
+        stale = [column for column in columns if recorded.get(column["name"]) != versions[column["name"]]]
+        if not stale:
+            plan["unchanged"].append(document_id)
+        elif len(stale) == len(columns):
+            plan["todo"][document_id] = columns
+        else:
+            plan["todo"][document_id] = stale
+            plan["partial"].append(document_id)
+
+    in_stack = set(document_ids)
+    plan["removed"] = [document_id for document_id in by_document if document_id not in in_stack]
+    return plan
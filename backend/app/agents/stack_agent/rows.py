@@ -0,0 +1,238 @@
+"""
+Row and column writes for stack tables.
+
+Shared by the create_row tool (agent row workers) and structured row
+extraction, so both paths validate and version rows the same way.
+
+Writes go through set-based RPCs (migrations 023, 031): many rows upsert
+in one call, and adding, renaming or deleting a column updates every row
+in one statement instead of one request per row.
+"""
+
+from datetime import date
+from typing import Any, TypedDict
+
+from supabase import Client
+
+from .columns import COLUMN_TYPES, StackColumn, column_version, table_columns
+
+# Rows per upsert_stack_rows call (keeps request bodies bounded)
+UPSERT_BATCH_SIZE = 500
+
+
+class StackRow(TypedDict, total=False):
+    """One document's row, as written by upsert_rows()."""
+    document_id: str
+    row_data: dict[str, Any]
+    confidence_scores: dict[str, Any]
+    ocr_content_hash: str | None
+
+
+def _type_error(column: StackColumn, value: Any) -> str | None:
+    """Why value doesn't fit the column's type, or None (null always fits)."""
+    kind = column.get("type")
+    if value is None or kind not in COLUMN_TYPES:
+        return None
+    if kind == "text" and not isinstance(value, str):
+        return "a string"
+    if kind == "number" and (isinstance(value, bool) or not isinstance(value, (int, float))):
+        return "a number"
+    if kind == "boolean" and not isinstance(value, bool):
+        return "true or false"
+    if kind == "date":
+        if not isinstance(value, str) or len(value) != 10:
+            return "a YYYY-MM-DD date"
+        try:
+            date.fromisoformat(value)
+        except ValueError:
+            return "a YYYY-MM-DD date"
+    return None
+
+
+def validate_row(columns: list[StackColumn], row_data: Any, confidence_scores: Any) -> str | None:
+    """Return an error message if the row doesn't fit the columns, else None."""
+    if not isinstance(row_data, dict) or not isinstance(confidence_scores, dict):
+        return "row_data and confidence_scores must be objects"
+
+    by_name = {column["name"]: column for column in columns}
+    unknown = [key for key in row_data if key not in by_name]
+    if unknown:
+        return f"Unknown columns {unknown}. Columns are: {list(by_name)}"
+
+    for name, value in row_data.items():
+        if expected := _type_error(by_name[name], value):
+            return f"'{name}' is a {by_name[name]['type']} column: value must be {expected} or null, got {value!r}"
+
+    for name, score in confidence_scores.items():
+        if not isinstance(score, (int, float)) or not 0 <= score <= 1:
+            return f"Confidence for '{name}' must be 0.0-1.0, got {score}"
+    return None
+
+
+def upsert_rows(
+    db: Client,
+    table_id: str,
+    user_id: str,
+    columns: list[StackColumn],
+    rows: list[StackRow],
+    merge: bool = False,
+) -> dict[str, str]:
+    """
+    Write many documents' rows (one per table and document) in bulk.
+
+    Each row records the OCR hash and column versions its cells were
+    extracted from. With merge=True only the given columns are written;
+    other cells of existing rows are kept. If a document appears twice,
+    the last row wins.
+
+    Returns:
+        document_id -> row id for every row written
+    """
+    names = [column["name"] for column in columns]
+    versions = {column["name"]: column_version(column) for column in columns}
+
+    payload = {
+        row["document_id"]: {
+            "document_id": row["document_id"],
+            "row_data": {name: (row.get("row_data") or {}).get(name) for name in names},
+            "confidence_scores": {
+                k: v for k, v in (row.get("confidence_scores") or {}).items() if k in names
+            },
+            "ocr_content_hash": row.get("ocr_content_hash"),
+            "column_versions": versions,
+        }
+        for row in rows
+    }
+    batch = list(payload.values())
+
+    row_ids: dict[str, str] = {}
+    for start in range(0, len(batch), UPSERT_BATCH_SIZE):
+        result = db.rpc("upsert_stack_rows", {
+            "p_table_id": table_id,
+            "p_user_id": user_id,
+            "p_rows": batch[start:start + UPSERT_BATCH_SIZE],
+            "p_merge": merge,
+        }).execute()
+        row_ids.update({row["document_id"]: row["id"] for row in result.data or []})
+    return row_ids
+
+
+def upsert_row(
+    db: Client,
+    table_id: str,
+    document_id: str,
+    user_id: str,
+    columns: list[StackColumn],
+    row_data: dict[str, Any],
+    confidence_scores: dict[str, Any],
+    ocr_content_hash: str | None = None,
+    merge: bool = False,
+) -> str | None:
+    """Write one document's row (see upsert_rows), returning its id."""
+    row_ids = upsert_rows(db, table_id, user_id, columns, [{
+        "document_id": document_id,
+        "row_data": row_data,
+        "confidence_scores": confidence_scores,
+        "ocr_content_hash": ocr_content_hash,
+    }], merge=merge)
+    return row_ids.get(document_id)
+
+
+def _columns_result(data: Any) -> list[StackColumn]:
+    """Normalize a column RPC's returned columns (None = table not found)."""
+    if data is None:
+        raise ValueError("Table not found")
+    return table_columns({"columns": data})
+
+
+def add_column(
+    db: Client,
+    table_id: str,
+    user_id: str,
+    column: StackColumn,
+    default: Any = None,
+) -> list[StackColumn]:
+    """
+    Add a column to a table's schema, returning the new columns.
+
+    Existing rows are left without the cell (incremental refresh extracts
+    it) unless default is given, which is set in every row in the same
+    statement.
+
+    Raises:
+        ValueError: If the table doesn't exist
+    """
+    result = db.rpc("add_stack_column", {
+        "p_table_id": table_id,
+        "p_user_id": user_id,
+        "p_column": dict(column),
+        "p_default": default,
+    }).execute()
+    return _columns_result(result.data)
+
+
+def rename_column(
+    db: Client,
+    table_id: str,
+    user_id: str,
+    column: StackColumn,
+    new_name: str,
+) -> list[StackColumn]:
+    """
+    Rename a column in the schema and in every row, returning the new columns.
+
+    Cells keep their values and confidence, and are re-versioned under the
+    new name so incremental refresh doesn't re-extract them.
+
+    Raises:
+        ValueError: If the table doesn't exist
+    """
+    result = db.rpc("rename_stack_column", {
+        "p_table_id": table_id,
+        "p_user_id": user_id,
+        "p_old": column["name"],
+        "p_new": new_name,
+        "p_version": column_version({**column, "name": new_name}),
+    }).execute()
+    return _columns_result(result.data)
+
+
+def redefine_column(
+    db: Client,
+    table_id: str,
+    user_id: str,
+    name: str,
+    column: StackColumn,
+) -> list[StackColumn]:
+    """
+    Replace column name's definition with column, returning the new columns.
+
+    column may carry a new name: the rename and the redefinition happen in
+    one statement. Cells are kept (moved to the new name); their versions
+    no longer match the column, so incremental refresh re-extracts it.
+
+    Raises:
+        ValueError: If the table doesn't exist
+    """
+    result = db.rpc("redefine_stack_column", {
+        "p_table_id": table_id,
+        "p_user_id": user_id,
+        "p_name": name,
+        "p_column": dict(column),
+    }).execute()
+    return _columns_result(result.data)
+
+
+def delete_column(db: Client, table_id: str, user_id: str, name: str) -> list[StackColumn]:
+    """
+    Delete a column from the schema and every row, returning the new columns.
+
+    Raises:
+        ValueError: If the table doesn't exist
+    """
+    result = db.rpc("delete_stack_column", {
+        "p_table_id": table_id,
+        "p_user_id": user_id,
+        "p_name": name,
+    }).execute()
+    return _columns_result(result.data)
@@ -0,0 +1,293 @@
+"""
+Two-phase stack extraction for auto tables.
+
+Schema phase: one call on a few representative documents infers the
+table's columns (stored in stack_tables.columns) before any rows run.
+
+Row phase: each document is one forced tool call against a strict,
+fixed JSON schema built from the columns - the OCR text is inlined, so
+there are no exploratory read_ocr turns. Documents too long to inline
+fall back to the agent row worker.
+
+Both phases call the Messages API directly (no Agent SDK session).
+"""
+
+import logging
+from typing import Any
+
+from anthropic import AsyncAnthropic
+from supabase import Client
+
+from ...config import get_settings
+from ...services.rate_limit import get_limiter, usage_tokens
+from ...services.tokens import estimate_tokens
+from ..shared import RunTelemetry
+from .columns import COLUMN_TYPES, StackColumn, format_columns, table_columns
+from .prompts import ROW_STRUCTURED_PROMPT_TEMPLATE, SCHEMA_PROMPT_TEMPLATE
+from .rows import upsert_row, validate_row
+
+logger = logging.getLogger(__name__)
+
+# Documents sampled for the schema phase
+SCHEMA_SAMPLE_SIZE = 3
+
+# Documents considered when choosing the sample
+SCHEMA_CANDIDATES = 200
+
+# OCR characters per sampled document shown to the schema phase
+SCHEMA_SAMPLE_CHARS = 6000
+
+MAX_INFERRED_COLUMNS = 20
+
+# Column type -> JSON schema type for the strict row tool
+JSON_TYPES = {"text": "string", "number": "number", "date": "string", "boolean": "boolean"}
+
+# Lazy client initialization
+_client: AsyncAnthropic | None = None
+
+
+def _get_client() -> AsyncAnthropic:
+    """Get or create Anthropic client (lazy initialization)."""
+    global _client
+    if _client is None:
+        settings = get_settings()
+        _client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+    return _client
+
+
+DEFINE_COLUMNS_TOOL = {
+    "name": "define_columns",
+    "description": "Define the table's columns: one per field that most documents share.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "columns": {
+                "type": "array",
+                "maxItems": MAX_INFERRED_COLUMNS,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string", "description": "snake_case column name"},
+                        "type": {"type": "string", "enum": COLUMN_TYPES},
+                        "description": {"type": "string", "description": "What the column holds, one line"},
+                    },
+                    "required": ["name", "type", "description"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["columns"],
+        "additionalProperties": False,
+    },
+}
+
+
+def row_tool(columns: list[StackColumn]) -> dict[str, Any]:
+    """Strict save_row tool for a fixed column list (every column required, nullable)."""
+    values: dict[str, Any] = {}
+    for column in columns:
+        value: dict[str, Any] = {"type": [JSON_TYPES.get(column.get("type", "text"), "string"), "null"]}
+        if column.get("type") == "date":
+            value["description"] = "YYYY-MM-DD"
+        elif column.get("description"):
+            value["description"] = column["description"]
+        values[column["name"]] = value
+
+    names = [column["name"] for column in columns]
+    return {
+        "name": "save_row",
+        "description": "Save this document's row: a value (or null) and a confidence 0.0-1.0 per column.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "row_data": {
+                    "type": "object",
+                    "properties": values,
+                    "required": names,
+                    "additionalProperties": False,
+                },
+                "confidence_scores": {
+                    "type": "object",
+                    "properties": {name: {"type": "number", "minimum": 0, "maximum": 1} for name in names},
+                    "additionalProperties": False,
+                },
+            },
+            "required": ["row_data", "confidence_scores"],
+            "additionalProperties": False,
+        },
+    }
+
+
+def forced_tool_params(model: str, tool: dict[str, Any], prompt: str, max_tokens: int) -> dict[str, Any]:
+    """Messages API params for one call that must answer with the given tool."""
+    return {
+        "model": model,
+        "max_tokens": max_tokens,
+        "tools": [tool],
+        "tool_choice": {"type": "tool", "name": tool["name"]},
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+
+def tool_input(content: list[Any], name: str) -> dict[str, Any]:
+    """Input of the named tool_use block in a response's content."""
+    for block in content:
+        if block.type == "tool_use" and block.name == name:
+            return block.input
+    raise ValueError(f"Model did not call {name}")
+
+
+async def _create(telemetry: RunTelemetry, request: dict[str, Any]) -> Any:
+    """One Messages API call under the shared Anthropic limiter."""
+    prompt = request["messages"][0]["content"]
+    async with get_limiter("anthropic").slot(
+        tokens=estimate_tokens(prompt) + request["max_tokens"]
+    ) as slot:
+        response = await _get_client().messages.create(**request)
+        telemetry.observe_api_response(response)
+        slot.settle(usage_tokens(telemetry.usage))
+    return response
+
+
+def row_request(columns: list[StackColumn], text: str, model: str) -> dict[str, Any]:
+    """Messages API params for one document's strict row call."""
+    return forced_tool_params(
+        model,
+        row_tool(columns),
+        ROW_STRUCTURED_PROMPT_TEMPLATE.format(columns=format_columns(columns), document=text),
+        max_tokens=200 + 60 * len(columns),
+    )
+
+
+def parse_row(columns: list[StackColumn], result: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
+    """
+    Validated (row_data, confidence_scores) from a save_row tool input.
+
+    Raises:
+        ValueError: If the row doesn't fit the columns
+    """
+    row_data = result.get("row_data")
+    confidence_scores = result.get("confidence_scores") or {}
+    error = validate_row(columns, row_data, confidence_scores)
+    if error:
+        raise ValueError(error)
+    return row_data, confidence_scores
+
+
+def pick_schema_sample(ocr_rows: list[dict[str, Any]], size: int = SCHEMA_SAMPLE_SIZE) -> list[str]:
+    """
+    Choose representative document ids: one per detected document type
+    first (most common type first), then the longest remaining documents.
+    """
+    def document_type(row: dict[str, Any]) -> str | None:
+        return (row.get("pre_extracted") or {}).get("document_type")
+
+    def length(row: dict[str, Any]) -> int:
+        return row.get("compact_token_count") or 0
+
+    type_counts: dict[str | None, int] = {}
+    for row in ocr_rows:
+        type_counts[document_type(row)] = type_counts.get(document_type(row), 0) + 1
+
+    sample: list[str] = []
+    seen_types: set[str | None] = set()
+    for row in sorted(ocr_rows, key=lambda row: (-type_counts[document_type(row)], -length(row))):
+        if document_type(row) not in seen_types:
+            sample.append(row["document_id"])
+            seen_types.add(document_type(row))
+    for row in sorted(ocr_rows, key=length, reverse=True):
+        if row["document_id"] not in sample:
+            sample.append(row["document_id"])
+    return sample[:size]
+
+
+async def infer_columns(
+    table_id: str,
+    user_id: str,
+    document_ids: list[str],
+    db: Client,
+) -> list[StackColumn]:
+    """
+    Schema phase: infer and store columns for an auto table from a sample.
+
+    Raises:
+        ValueError: If no document has OCR or no columns were produced
+    """
+    settings = get_settings()
+    candidates = db.table("ocr_results") \
+        .select("document_id, compact_token_count, pre_extracted") \
+        .eq("user_id", user_id) \
+        .in_("document_id", document_ids[:SCHEMA_CANDIDATES]) \
+        .execute()
+    if not candidates.data:
+        raise ValueError("No OCR text to infer columns from")
+
+    sample = pick_schema_sample(candidates.data)
+    texts = db.table("ocr_results") \
+        .select("compact_text, raw_text") \
+        .eq("user_id", user_id) \
+        .in_("document_id", sample) \
+        .execute()
+    documents = "\n\n".join(
+        f"<document index=\"{i}\">\n{(row.get('compact_text') or row['raw_text'])[:SCHEMA_SAMPLE_CHARS]}\n</document>"
+        for i, row in enumerate(texts.data or [], start=1)
+    )
+
+    telemetry = RunTelemetry("stack_schema", user_id)
+    try:
+        response = await _create(telemetry, forced_tool_params(
+            settings.CLAUDE_MODEL_STRONG,
+            DEFINE_COLUMNS_TOOL,
+            SCHEMA_PROMPT_TEMPLATE.format(count=len(sample), documents=documents),
+            max_tokens=2000,
+        ))
+        result = tool_input(response.content, DEFINE_COLUMNS_TOOL["name"])
+    except Exception:
+        telemetry.save(db, "failed")
+        raise
+
+    columns = table_columns({"columns": result.get("columns")})
+    if not columns:
+        telemetry.save(db, "incomplete")
+        raise ValueError("Schema inference returned no columns")
+    telemetry.save(db, "completed")
+
+    db.table("stack_tables").update({"columns": columns}).eq("id", table_id).execute()
+    logger.info(f"[{table_id}] Inferred {len(columns)} columns from {len(sample)} documents")
+    return columns
+
+
+async def extract_row_structured(
+    table_id: str,
+    document_id: str,
+    user_id: str,
+    columns: list[StackColumn],
+    db: Client,
+    text: str,
+    model: str | None = None,
+    ocr_content_hash: str | None = None,
+    merge: bool = False,
+) -> dict[str, Any]:
+    """
+    Row phase: extract one document's row in a single strict tool call.
+
+    Returns:
+        {"row_id": ..., "model": ...}
+
+    Raises:
+        ValueError: If the response doesn't fit the columns
+    """
+    telemetry = RunTelemetry("stack_row", user_id, document_id)
+    try:
+        response = await _create(telemetry, row_request(columns, text, model or get_settings().CLAUDE_MODEL))
+        row_data, confidence_scores = parse_row(columns, tool_input(response.content, "save_row"))
+    except Exception:
+        telemetry.save(db, "failed")
+        raise
+
+    row_id = upsert_row(
+        db, table_id, document_id, user_id, columns, row_data, confidence_scores,
+        ocr_content_hash=ocr_content_hash, merge=merge,
+    )
+    telemetry.save(db, "completed")
+    return {"row_id": row_id, "model": telemetry.model}
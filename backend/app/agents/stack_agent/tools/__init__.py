@@ -3,4 +3,80 @@ Stack agent tools.
 
 Each tool performs a real action with validation.
 Tools are registered with the MCP server for agent use.
+
+Only create_row_tools() is registered today (per-document row workers).
+create_read_tools() and create_column_tools() are for a stack-level agent
+that doesn't exist in-process yet (stack missions run on the sprite); no
+agent or route uses them.
 """
+
+from typing import Any
+
+from supabase import Client
+
+from ...shared.tools import create_query_tables_tool, create_read_ocr_tool  # Use shared tools
+from ..columns import StackColumn
+from .add_column import create_add_column_tool
+from .create_row import create_create_row_tool
+from .delete_column import create_delete_column_tool
+from .read_documents import create_read_documents_tool
+from .read_rows import create_read_rows_tool
+from .read_tables import create_read_tables_tool
+from .set_column import create_set_column_tool
+
+
+def create_row_tools(
+    table_id: str,
+    document_id: str,
+    user_id: str,
+    columns: list[StackColumn],
+    db: Client,
+    saved: dict[str, Any],
+    ocr_content_hash: str | None = None,
+    merge: bool = False,
+) -> list:
+    """
+    Create the tools for one per-document row worker.
+
+    All database queries are locked to the given table, document and user.
+    """
+    return [
+        create_read_ocr_tool(document_id, user_id, db),
+        create_query_tables_tool(document_id, user_id, db),
+        create_create_row_tool(
+            table_id, document_id, user_id, columns, db, saved,
+            ocr_content_hash=ocr_content_hash, merge=merge,
+        ),
+    ]
+
+
+def create_read_tools(stack_id: str, user_id: str, db: Client) -> list:
+    """
+    Create the paginated read tools for a stack-level agent.
+
+    Queries are locked to the given stack and user; tables and rows are
+    only reachable through the stack's own tables.
+    """
+    return [
+        create_read_documents_tool(stack_id, user_id, db),
+        create_read_tables_tool(stack_id, user_id, db),
+        create_read_rows_tool(stack_id, user_id, db),
+    ]
+
+
+def create_column_tools(stack_id: str, user_id: str, db: Client) -> list:
+    """
+    Create the schema tools for a stack-level agent (add, change and
+    delete columns).
+
+    Changes are locked to the given stack's tables and user; each one
+    updates every row of the table in a single RPC.
+    """
+    return [
+        create_add_column_tool(stack_id, user_id, db),
+        create_set_column_tool(stack_id, user_id, db),
+        create_delete_column_tool(stack_id, user_id, db),
+    ]
+
+
+__all__ = ["create_column_tools", "create_read_tools", "create_row_tools"]
@@ -2,5 +2,81 @@
 Tool: add_column (WRITE)
 
 Adds a new column to a table's schema.
-Updates the columns JSONB in stack_tables.
+Updates the columns JSONB in stack_tables (rows.add_column -> add_stack_column
+RPC, one call regardless of row count).
+
+Existing rows get no cell for the column (incremental refresh extracts
+it) unless a default is given, which is set in every row.
 """
+
+import json
+from typing import Any
+
+from claude_agent_sdk import tool
+from supabase import Client
+
+from ..columns import COLUMN_TYPES, StackColumn, table_columns
+from ..rows import add_column, validate_row
+
+
+ADD_COLUMN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "table_id": {"type": "string", "description": "Table to change (see read_tables)"},
+        "name": {"type": "string", "description": "New column name (snake_case)"},
+        "type": {"type": "string", "enum": COLUMN_TYPES, "description": "Value type"},
+        "description": {"type": "string", "description": "What the column holds"},
+        "default": {"description": "Value to set in every existing row (default: none)"},
+    },
+    "required": ["table_id", "name"],
+}
+
+
+def _error(text: str) -> dict[str, Any]:
+    return {"content": [{"type": "text", "text": text}], "is_error": True}
+
+
+def create_add_column_tool(stack_id: str, user_id: str, db: Client):
+    """Create add_column tool scoped to one stack's tables and user."""
+
+    @tool(
+        "add_column",
+        "Add a column to a table. Existing rows are left empty for it unless 'default' is given.",
+        ADD_COLUMN_SCHEMA
+    )
+    async def add_column_tool(args: dict) -> dict:
+        """Validate and add the column."""
+        table = db.table("stack_tables") \
+            .select("id, columns, custom_columns") \
+            .eq("id", args.get("table_id") or "") \
+            .eq("stack_id", stack_id) \
+            .eq("user_id", user_id) \
+            .limit(1) \
+            .execute()
+        if not table.data:
+            return _error("Table not found in this stack")
+
+        name = str(args.get("name") or "").strip()
+        if not name:
+            return _error("name is required")
+        names = [column["name"] for column in table_columns(table.data[0])]
+        if name in names:
+            return _error(f"Column '{name}' already exists. Columns are: {names}")
+        if args.get("type") and args["type"] not in COLUMN_TYPES:
+            return _error(f"type must be one of {COLUMN_TYPES}, got {args['type']}")
+
+        column: StackColumn = {"name": name}
+        if args.get("type"):
+            column["type"] = args["type"]
+        if args.get("description"):
+            column["description"] = str(args["description"])
+        error = validate_row([column], {name: args.get("default")}, {})
+        if error:
+            return _error(f"Invalid default: {error}")
+
+        columns = add_column(db, table.data[0]["id"], user_id, column, default=args.get("default"))
+        return {
+            "content": [{"type": "text", "text": json.dumps({"columns": columns}, indent=2)}]
+        }
+
+    return add_column_tool
@@ -3,4 +3,94 @@ Tool: create_row (WRITE)
 
 Creates a new row in stack_table_rows.
 Links the row to a specific document in the stack.
+
+Upserts on (table_id, document_id), so re-running a document replaces
+its row. Values are validated against the run's columns and their
+types (text, number, boolean, YYYY-MM-DD date; null always). Partial runs
+(incremental refresh of some columns) merge into the existing row.
 """
+
+import json
+from typing import Any
+
+from claude_agent_sdk import tool
+from supabase import Client
+
+from ..columns import StackColumn
+from ..rows import upsert_row, validate_row
+
+
+CREATE_ROW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "row_data": {
+            "type": "object",
+            "description": "Column name -> value (null if not in the document)",
+        },
+        "confidence_scores": {
+            "type": "object",
+            "description": "Column name -> confidence 0.0-1.0",
+        },
+    },
+    "required": ["row_data"],
+}
+
+
+def create_create_row_tool(
+    table_id: str,
+    document_id: str,
+    user_id: str,
+    columns: list[StackColumn],
+    db: Client,
+    saved: dict[str, Any],
+    ocr_content_hash: str | None = None,
+    merge: bool = False,
+):
+    """
+    Create create_row tool scoped to one table, document and user.
+
+    The saved row's id is written to saved["row_id"] for the caller.
+    With merge=True only the given columns are written; other cells of
+    the existing row are kept.
+    """
+    names = [column["name"] for column in columns]
+
+    @tool(
+        "create_row",
+        "Save this document's row: a value per column, plus confidence scores.",
+        CREATE_ROW_SCHEMA
+    )
+    async def create_row(args: dict) -> dict:
+        """Validate and upsert the document's row."""
+        row_data = args.get("row_data")
+        confidence_scores = args.get("confidence_scores") or {}
+
+        # Handle JSON strings (Claude sometimes stringifies)
+        if isinstance(row_data, str):
+            try:
+                row_data = json.loads(row_data)
+            except json.JSONDecodeError:
+                pass
+        if isinstance(confidence_scores, str):
+            try:
+                confidence_scores = json.loads(confidence_scores)
+            except json.JSONDecodeError:
+                pass
+
+        error = validate_row(columns, row_data, confidence_scores)
+        if error:
+            return {
+                "content": [{"type": "text", "text": error}],
+                "is_error": True
+            }
+
+        saved["row_id"] = upsert_row(
+            db, table_id, document_id, user_id, columns, row_data, confidence_scores,
+            ocr_content_hash=ocr_content_hash, merge=merge,
+        )
+        filled = sum(1 for name in names if row_data.get(name) is not None)
+        return {
+            "content": [{"type": "text", "text": f"Row saved ({filled}/{len(names)} columns filled)."}]
+        }
+
+    return create_row
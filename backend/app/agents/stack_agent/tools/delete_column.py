@@ -2,5 +2,62 @@
 Tool: delete_column (WRITE)
 
 Removes a column from a table's schema.
-Deletes the column definition from columns JSONB.
+Deletes the column definition from columns JSONB and the cell from every
+row in one statement (rows.delete_column -> delete_stack_column RPC).
 """
+
+import json
+from typing import Any
+
+from claude_agent_sdk import tool
+from supabase import Client
+
+from ..columns import table_columns
+from ..rows import delete_column
+
+
+DELETE_COLUMN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "table_id": {"type": "string", "description": "Table to change (see read_tables)"},
+        "name": {"type": "string", "description": "Column to delete"},
+    },
+    "required": ["table_id", "name"],
+}
+
+
+def _error(text: str) -> dict[str, Any]:
+    return {"content": [{"type": "text", "text": text}], "is_error": True}
+
+
+def create_delete_column_tool(stack_id: str, user_id: str, db: Client):
+    """Create delete_column tool scoped to one stack's tables and user."""
+
+    @tool(
+        "delete_column",
+        "Delete a column from a table, including its value in every row.",
+        DELETE_COLUMN_SCHEMA
+    )
+    async def delete_column_tool(args: dict) -> dict:
+        """Validate and delete the column."""
+        table = db.table("stack_tables") \
+            .select("id, columns, custom_columns") \
+            .eq("id", args.get("table_id") or "") \
+            .eq("stack_id", stack_id) \
+            .eq("user_id", user_id) \
+            .limit(1) \
+            .execute()
+        if not table.data:
+            return _error("Table not found in this stack")
+
+        name = args.get("name")
+        names = [column["name"] for column in table_columns(table.data[0])]
+        if name not in names:
+            return _error(f"Unknown column '{name}'. Columns are: {names}")
+
+        columns = delete_column(db, table.data[0]["id"], user_id, name)
+        return {
+            "content": [{"type": "text", "text": json.dumps({"columns": columns}, indent=2)}]
+        }
+
+    return delete_column_tool
@@ -1,6 +1,103 @@
 """
 Tool: read_documents (READ)
 
-Lists all documents in the current stack.
+Lists documents in the current stack, one page at a time.
 Returns document IDs and metadata for the agent to process.
+
+Pages are keyset-paginated on the stack_documents link (pass the returned
+next_cursor as 'after'); 'fields' limits which document metadata is
+returned and 'status' filters by processing status.
 """
+
+import json
+import uuid
+from typing import Any
+
+from claude_agent_sdk import tool
+from supabase import Client
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Document metadata the agent may request (document_id is always included)
+DOCUMENT_FIELDS = ["filename", "display_name", "summary", "tags", "status", "mime_type", "uploaded_at"]
+DEFAULT_FIELDS = ["filename", "display_name", "status"]
+
+
+READ_DOCUMENTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "fields": {
+            "type": "array",
+            "items": {"type": "string", "enum": DOCUMENT_FIELDS},
+            "description": f"Metadata to return (default {DEFAULT_FIELDS})",
+        },
+        "status": {"type": "string", "description": "Only documents with this status"},
+        "limit": {
+            "type": "integer",
+            "description": f"Documents per page (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})",
+        },
+        "after": {"type": "string", "description": "next_cursor from the previous page"},
+    },
+}
+
+
+def create_read_documents_tool(stack_id: str, user_id: str, db: Client):
+    """Create read_documents tool scoped to one stack and user."""
+
+    @tool(
+        "read_documents",
+        "List the stack's documents a page at a time (page with 'after'). "
+        "Choose metadata with 'fields'; filter with 'status'.",
+        READ_DOCUMENTS_SCHEMA
+    )
+    async def read_documents(args: dict) -> dict:
+        """Read one page of the stack's documents."""
+        fields = args.get("fields") or DEFAULT_FIELDS
+        unknown = [field for field in fields if field not in DOCUMENT_FIELDS]
+        if unknown:
+            return {
+                "content": [{"type": "text", "text": f"Unknown fields {unknown}. Fields are: {DOCUMENT_FIELDS}"}],
+                "is_error": True
+            }
+        try:
+            limit = max(1, min(int(args.get("limit") or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+        except (TypeError, ValueError):
+            return {
+                "content": [{"type": "text", "text": f"limit must be an integer, got {args.get('limit')}"}],
+                "is_error": True
+            }
+
+        try:
+            after = str(uuid.UUID(args["after"])) if args.get("after") else None
+        except ValueError:
+            return {
+                "content": [{"type": "text", "text": "'after' must be a next_cursor from a previous page"}],
+                "is_error": True
+            }
+
+        # Inner join so status filters and ownership apply to the link rows
+        query = db.table("stack_documents") \
+            .select(f"id, document_id, documents!inner({', '.join(['user_id', *fields])})") \
+            .eq("stack_id", stack_id) \
+            .eq("documents.user_id", user_id)
+        if args.get("status"):
+            query = query.eq("documents.status", args["status"])
+        if after:
+            query = query.gt("id", after)
+        result = query.order("id").limit(limit).execute()
+
+        documents: list[dict[str, Any]] = []
+        for link in result.data or []:
+            document = link.get("documents") or {}
+            documents.append({
+                "document_id": link["document_id"],
+                **{field: document.get(field) for field in fields},
+            })
+
+        page: dict[str, Any] = {"documents": documents, "count": len(documents)}
+        if len(documents) == limit:
+            page["next_cursor"] = result.data[-1]["id"]
+        return {"content": [{"type": "text", "text": json.dumps(page, indent=2, default=str)}]}
+
+    return read_documents
@@ -1,6 +1,142 @@
 """
 Tool: read_rows (READ)
 
-Reads existing rows from stack_table_rows.
-Returns row data for the specified table.
+Reads existing rows from stack_table_rows, one page at a time.
+
+Large tables are never returned whole: rows come back in pages (keyset
+pagination - pass the returned next_cursor as 'after'), projected to the
+requested columns and optionally filtered to rows with empty or
+low-confidence cells. stats=true returns a per-column summary instead of
+rows. Filtering and projection run in the database (read_stack_rows and
+stack_table_stats RPCs).
 """
+
+import json
+import uuid
+from typing import Any
+
+from claude_agent_sdk import tool
+from supabase import Client
+
+from ..columns import table_columns
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Cells below this confidence count as low confidence
+LOW_CONFIDENCE_THRESHOLD = 0.7
+
+
+READ_ROWS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "table_id": {"type": "string", "description": "Table to read (see read_tables)"},
+        "columns": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Only return these columns (default: all)",
+        },
+        "limit": {
+            "type": "integer",
+            "description": f"Rows per page (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})",
+        },
+        "after": {"type": "string", "description": "next_cursor from the previous page"},
+        "empty": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Only rows where any of these columns is empty",
+        },
+        "low_confidence": {
+            "type": "number",
+            "description": f"Only rows with a cell below this confidence (e.g. {LOW_CONFIDENCE_THRESHOLD})",
+        },
+        "document_ids": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Only rows for these documents",
+        },
+        "stats": {
+            "type": "boolean",
+            "description": "Return per-column stats (filled, empty, low confidence, ...) instead of rows",
+        },
+    },
+    "required": ["table_id"],
+}
+
+
+def _error(text: str) -> dict[str, Any]:
+    return {"content": [{"type": "text", "text": text}], "is_error": True}
+
+
+def create_read_rows_tool(stack_id: str, user_id: str, db: Client):
+    """Create read_rows tool scoped to one stack's tables and user."""
+
+    @tool(
+        "read_rows",
+        "Read a table's rows a page at a time. Project with 'columns', filter with "
+        "'empty' / 'low_confidence', page with 'after'. Use stats=true first on big tables.",
+        READ_ROWS_SCHEMA
+    )
+    async def read_rows(args: dict) -> dict:
+        """Read one page of rows (or column stats) for a table in the stack."""
+        table = db.table("stack_tables") \
+            .select("id, columns, custom_columns") \
+            .eq("id", args.get("table_id") or "") \
+            .eq("stack_id", stack_id) \
+            .eq("user_id", user_id) \
+            .limit(1) \
+            .execute()
+        if not table.data:
+            return _error("Table not found in this stack")
+
+        names = [column["name"] for column in table_columns(table.data[0])]
+        requested = args.get("columns") or None
+        empty = args.get("empty") or None
+        unknown = [name for name in (requested or []) + (empty or []) if name not in names]
+        if unknown:
+            return _error(f"Unknown columns {unknown}. Columns are: {names}")
+
+        threshold = args.get("low_confidence")
+        if threshold is not None and (not isinstance(threshold, (int, float)) or not 0 <= threshold <= 1):
+            return _error(f"low_confidence must be 0.0-1.0, got {threshold}")
+
+        if args.get("stats"):
+            result = db.rpc("stack_table_stats", {
+                "p_table_id": table.data[0]["id"],
+                "p_user_id": user_id,
+                "p_columns": requested or names,
+                "p_below": threshold if threshold is not None else LOW_CONFIDENCE_THRESHOLD,
+            }).execute()
+            stats = {row.pop("column_name"): row for row in result.data or []}
+            text = json.dumps({"columns": stats}, indent=2, default=str)
+            return {"content": [{"type": "text", "text": text}]}
+
+        try:
+            limit = max(1, min(int(args.get("limit") or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+        except (TypeError, ValueError):
+            return _error(f"limit must be an integer, got {args.get('limit')}")
+        try:
+            for value in [args.get("after") or None, *(args.get("document_ids") or [])]:
+                if value is not None:
+                    uuid.UUID(str(value))
+        except ValueError:
+            return _error("'after' must be a next_cursor and document_ids must be document ids")
+
+        result = db.rpc("read_stack_rows", {
+            "p_table_id": table.data[0]["id"],
+            "p_user_id": user_id,
+            "p_columns": requested,
+            "p_after": args.get("after") or None,
+            "p_limit": limit,
+            "p_empty": empty,
+            "p_below": threshold,
+            "p_document_ids": args.get("document_ids") or None,
+        }).execute()
+        rows = result.data or []
+
+        page: dict[str, Any] = {"rows": rows, "count": len(rows)}
+        if len(rows) == limit:
+            page["next_cursor"] = rows[-1]["id"]
+        return {"content": [{"type": "text", "text": json.dumps(page, indent=2, default=str)}]}
+
+    return read_rows
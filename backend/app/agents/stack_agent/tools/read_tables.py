@@ -2,5 +2,53 @@
 Tool: read_tables (READ)
 
 Reads table definitions from stack_tables.
-Returns table schemas including column definitions.
+Returns table schemas including column definitions, plus each table's
+row count (never the rows themselves - use read_rows for those).
 """
+
+import json
+
+from claude_agent_sdk import tool
+from supabase import Client
+
+from ..columns import table_columns
+
+
+def create_read_tables_tool(stack_id: str, user_id: str, db: Client):
+    """Create read_tables tool scoped to one stack and user."""
+
+    @tool(
+        "read_tables",
+        "List the stack's tables: id, name, status, columns and row count.",
+        {}
+    )
+    async def read_tables(args: dict) -> dict:
+        """Read table definitions and row counts for the stack."""
+        result = db.table("stack_tables") \
+            .select("id, name, mode, status, columns, custom_columns") \
+            .eq("stack_id", stack_id) \
+            .eq("user_id", user_id) \
+            .order("created_at") \
+            .execute()
+
+        tables = []
+        for table in result.data or []:
+            rows = db.table("stack_table_rows") \
+                .select("id", count="exact", head=True) \
+                .eq("table_id", table["id"]) \
+                .eq("user_id", user_id) \
+                .execute()
+            tables.append({
+                "id": table["id"],
+                "name": table["name"],
+                "mode": table["mode"],
+                "status": table.get("status"),
+                "columns": table_columns(table),
+                "row_count": rows.count or 0,
+            })
+
+        return {
+            "content": [{"type": "text", "text": json.dumps({"tables": tables}, indent=2)}]
+        }
+
+    return read_tables
@@ -2,5 +2,94 @@
 Tool: set_column (WRITE)
 
 Modifies an existing column definition.
-Updates column properties in the columns JSONB.
+Updates column properties in the columns JSONB (rows.redefine_column ->
+redefine_stack_column RPC). Renames also move the cell in every row
+(rows.rename_column -> rename_stack_column RPC). Every change is one RPC,
+so it applies fully or not at all.
+
+A changed type or description re-versions the column, so incremental
+refresh re-extracts its cells; a rename alone keeps them.
 """
+
+import json
+from typing import Any
+
+from claude_agent_sdk import tool
+from supabase import Client
+
+from ..columns import COLUMN_TYPES, StackColumn, table_columns
+from ..rows import redefine_column, rename_column
+
+
+SET_COLUMN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "table_id": {"type": "string", "description": "Table to change (see read_tables)"},
+        "name": {"type": "string", "description": "Column to change"},
+        "new_name": {"type": "string", "description": "Rename the column (snake_case)"},
+        "type": {"type": "string", "enum": COLUMN_TYPES, "description": "New value type"},
+        "description": {"type": "string", "description": "New description"},
+    },
+    "required": ["table_id", "name"],
+}
+
+
+def _error(text: str) -> dict[str, Any]:
+    return {"content": [{"type": "text", "text": text}], "is_error": True}
+
+
+def create_set_column_tool(stack_id: str, user_id: str, db: Client):
+    """Create set_column tool scoped to one stack's tables and user."""
+
+    @tool(
+        "set_column",
+        "Change a column: rename it (cells move with it) and/or change its type or description "
+        "(its cells are re-extracted on the next refresh).",
+        SET_COLUMN_SCHEMA
+    )
+    async def set_column_tool(args: dict) -> dict:
+        """Validate and apply the column change."""
+        table = db.table("stack_tables") \
+            .select("id, columns, custom_columns") \
+            .eq("id", args.get("table_id") or "") \
+            .eq("stack_id", stack_id) \
+            .eq("user_id", user_id) \
+            .limit(1) \
+            .execute()
+        if not table.data:
+            return _error("Table not found in this stack")
+        table_id = table.data[0]["id"]
+
+        columns = table_columns(table.data[0])
+        by_name = {column["name"]: column for column in columns}
+        column = by_name.get(args.get("name"))
+        if column is None:
+            return _error(f"Unknown column '{args.get('name')}'. Columns are: {list(by_name)}")
+
+        new_name = str(args.get("new_name") or "").strip()
+        renaming = bool(new_name) and new_name != column["name"]
+        if renaming and new_name in by_name:
+            return _error(f"Column '{new_name}' already exists. Columns are: {list(by_name)}")
+        if args.get("type") and args["type"] not in COLUMN_TYPES:
+            return _error(f"type must be one of {COLUMN_TYPES}, got {args['type']}")
+
+        definition: StackColumn = {**column}
+        if args.get("type"):
+            definition["type"] = args["type"]
+        if args.get("description"):
+            definition["description"] = str(args["description"])
+        if not renaming and definition == column:
+            return _error("Nothing to change: give new_name, type or description")
+
+        if definition == column:
+            columns = rename_column(db, table_id, user_id, column, new_name)
+        else:
+            if renaming:
+                definition["name"] = new_name
+            columns = redefine_column(db, table_id, user_id, column["name"], definition)
+
+        return {
+            "content": [{"type": "text", "text": json.dumps({"columns": columns}, indent=2)}]
+        }
+
+    return set_column_tool
@@ -15,8 +15,99 @@ class Settings(BaseSettings):
     ANTHROPIC_API_KEY: str
     CLAUDE_MODEL: str = "claude-haiku-4-5"
 
+    # Model routing: simple documents use CLAUDE_MODEL, long/complex ones
+    # (or runs that fail to complete on CLAUDE_MODEL) use CLAUDE_MODEL_STRONG
+    CLAUDE_MODEL_STRONG: str = "claude-sonnet-4-5"
+    MODEL_ROUTING_ENABLED: bool = True
+
+    # Extraction agent write-behind: seconds between background flushes of
+    # in-progress fields for realtime UI (0 = only write on complete/run end)
+    EXTRACTION_FLUSH_INTERVAL_SECONDS: float = 2.0
+
+    # Corrections resume the extraction session until its context passes this
+    # many tokens, then start fresh from a compact snapshot of the extraction
+    CORRECTION_COMPACT_THRESHOLD_TOKENS: int = 20_000
+
+    # Speculative auto-mode extraction right after OCR (so /extract can return
+    # instantly). Daily run caps per subscription tier ("tier:limit,..."; tiers
+    # not listed get 0) and max concurrent speculative runs per process.
+    SPECULATIVE_EXTRACTION_ENABLED: bool = False
+    SPECULATIVE_EXTRACTION_DAILY_LIMITS: str = "free:5,starter:50,pro:500"
+    SPECULATIVE_EXTRACTION_CONCURRENCY: int = 2
+
+    # Document types (comma-separated: "receipt,invoice") whose auto extractions
+    # skip the agent when pattern-based pre-extraction finds every required field
+    PRE_EXTRACTION_SKIP_AGENT_TYPES: str = ""
+
+    # Layout templates (repeat senders): when True the agent verifies
+    # template-replayed fields (a short fast-model run). False saves them
+    # directly, unverified - a wrong anchor match then saves wrong values
+    TEMPLATE_VERIFY_WITH_AGENT: bool = True
+
+    # Client-side provider limits (0 = unlimited). Concurrency adapts below
+    # the max when the provider returns 429s and recovers as calls succeed.
+    # Requests are API requests: an agent run is charged one per turn.
+    ANTHROPIC_REQUESTS_PER_MINUTE: int = 50
+    ANTHROPIC_TOKENS_PER_MINUTE: int = 0
+    ANTHROPIC_MAX_CONCURRENCY: int = 8
+
+    # Stack extraction: per-document row workers running at once per request
+    # (the Anthropic limiter still caps total concurrency across requests)
+    STACK_EXTRACTION_CONCURRENCY: int = 8
+
+    # A table left "processing" without a heartbeat for this long is treated
+    # as an abandoned extraction (e.g. server restart) and can be re-extracted
+    STACK_EXTRACTION_STALE_SECONDS: float = 600.0
+
+    # Documents up to this many OCR tokens get their stack row from one strict
+    # structured call with the text inlined; longer ones use an agent run
+    # that pages through the OCR (0 = always use the agent)
+    STACK_ROW_INLINE_MAX_TOKENS: int = 8000
+
+    # Offline batch extraction (backfills): "anthropic" uses the Message
+    # Batches API, "local" runs requests in-process; documents over the
+    # token limit are left for interactive extraction
+    STACK_BATCH_PROVIDER: str = "anthropic"
+    STACK_BATCH_POLL_SECONDS: float = 60.0
+    STACK_BATCH_INLINE_MAX_TOKENS: int = 100_000
+
+    # Sprites.dev (one VM per stack): "sprites" = Sprites.dev API, "local" =
+    # in-process fake. SPRITE_POOL_SIZE bootstrapped sprites are kept ready
+    # for new stacks (0 = provision on first open); sprites in use are pinged
+    # every SPRITE_KEEPALIVE_SECONDS (they sleep after 30s idle). Pool
+    # sprites still provisioning after SPRITE_BOOTSTRAP_TIMEOUT_SECONDS are
+    # replaced.
+    SPRITES_PROVIDER: str = "sprites"
+    SPRITES_API_URL: str = "https://api.sprites.dev"
+    SPRITES_TOKEN: str = ""
+    SPRITE_POOL_SIZE: int = 2
+    SPRITE_KEEPALIVE_SECONDS: float = 15.0
+    SPRITE_BOOTSTRAP_TIMEOUT_SECONDS: float = 600.0
+
     # Mistral API Configuration (for OCR)
     MISTRAL_API_KEY: str
+    MISTRAL_REQUESTS_PER_MINUTE: int = 60
+    MISTRAL_MAX_CONCURRENCY: int = 4
+
+    # OCR resilience: attempts per call (transient errors only), per-attempt
+    # timeout, hedge a second request past this latency percentile of recent
+    # calls (0 = no hedging), and the circuit breaker that defers OCR jobs
+    # (up to OCR_MAX_DEFERRALS times) while Mistral is failing
+    OCR_MAX_ATTEMPTS: int = 3
+    OCR_RETRY_BASE_SECONDS: float = 1.0
+    OCR_TIMEOUT_SECONDS: float = 120.0
+    OCR_HEDGE_PERCENTILE: float = 0.0
+    OCR_BREAKER_FAILURES: int = 5
+    OCR_BREAKER_RESET_SECONDS: float = 60.0
+    OCR_MAX_DEFERRALS: int = 5
+
+    # Image uploads are normalized before OCR (EXIF rotate, downscale to the
+    # target DPI for an A4 page, optional grayscale, JPEG without metadata)
+    # in a process pool. Originals stay in storage unchanged.
+    IMAGE_PREPROCESS_ENABLED: bool = True
+    IMAGE_OCR_TARGET_DPI: int = 200
+    IMAGE_OCR_GRAYSCALE: bool = True
+    IMAGE_PREPROCESS_WORKERS: int = 2
 
     # Clerk Configuration (for auth)
     CLERK_SECRET_KEY: str
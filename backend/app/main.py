@@ -1,18 +1,48 @@
 """FastAPI application entry point"""
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config import get_settings
+from .database import get_supabase_client
 from .models import HealthResponse
-from .routes import document, agent, test
+from .routes import document, agent, export, stack, test
+from .services.sprite_connections import close_channels
+from .services.sprite_pool import refill_pool
+
+logger = logging.getLogger(__name__)
 
 # Initialize settings
 settings = get_settings()
 
+
+async def _refill_sprite_pool() -> None:
+    try:
+        await refill_pool(get_supabase_client())
+    except Exception as e:
+        logger.error(f"Sprite pool refill failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Top up the sprite warm pool in the background on startup; close sprite connections on shutdown."""
+    refill = None
+    if settings.SPRITE_POOL_SIZE > 0 and (settings.SPRITES_TOKEN or settings.SPRITES_PROVIDER == "local"):
+        refill = asyncio.create_task(_refill_sprite_pool())
+    yield
+    if refill:
+        refill.cancel()
+    await close_channels()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
-    version=settings.APP_VERSION
+    version=settings.APP_VERSION,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -52,4 +82,6 @@ async def root():
 # Include routers - AI processing only (data operations go through Supabase directly)
 app.include_router(document.router, prefix="/api", tags=["document"])
 app.include_router(agent.router, prefix="/api/agent", tags=["agent"])
+app.include_router(stack.router, prefix="/api/stack", tags=["stack"])
+app.include_router(export.router, prefix="/api/export", tags=["export"])
 app.include_router(test.router, prefix="/api/test", tags=["test"])
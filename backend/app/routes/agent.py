@@ -3,7 +3,7 @@ Agent SDK routes - streaming extraction endpoints.
 
 Endpoints:
 - POST /api/agent/extract - Extract with streaming
-- POST /api/agent/correct - Correct extraction with session resume
+- POST /api/agent/correct - Correct extraction (session resume or compact snapshot)
 - GET /api/agent/health - Health check
 """
 
@@ -15,20 +15,87 @@ from typing import AsyncIterator
 from fastapi import APIRouter, Depends, Form, HTTPException
 from fastapi.responses import StreamingResponse
 
-from ..agents.extraction_agent import extract_with_agent, correct_with_session
+from ..agents.extraction_agent import (
+    EXTRACTION_PROMPT_VERSION,
+    claim_speculative_extraction,
+    correct_with_session,
+    extract_with_agent,
+    get_speculative_run,
+    mark_claimed,
+)
+from ..agents.shared import get_routing_signals, resume_model, route_extraction
 from ..auth import get_current_user
+from ..config import get_settings
 from ..database import get_supabase_client
-from ..utils.sse import sse_event
+from ..services.extraction_cache import (
+    build_cache_key,
+    get_cached_extraction,
+    get_ocr_content_hash,
+    store_cached_extraction,
+)
+from ..services.layout_templates import TEMPLATE_MODEL, learn_template, match_template
+from ..services.pre_extract import PRE_EXTRACT_MODEL, agent_skippable, get_pre_extraction, to_extraction
+from ..utils.sse import sse_event, sse_response
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def _deterministic_response(
+    document_id: str,
+    user_id: str,
+    mode: str,
+    fields: dict,
+    confidences: dict,
+    model: str,
+    text: str,
+    flags: dict,
+    template_id: str | None = None,
+) -> StreamingResponse:
+    """Save a completed extraction produced without an agent run and stream it."""
+    supabase = get_supabase_client()
+    extraction = supabase.table("extractions").insert({
+        "document_id": document_id,
+        "user_id": user_id,
+        "extracted_fields": fields,
+        "confidence_scores": confidences,
+        "mode": mode,
+        "custom_fields": None,
+        "model": model,
+        "processing_time_ms": 0,
+        "status": "completed",
+        "template_id": template_id,
+    }).execute()
+
+    supabase.table("documents").update({
+        "status": "completed"
+    }).eq("id", document_id).eq("user_id", user_id).execute()
+
+    extraction_id = extraction.data[0]["id"]
+
+    async def deterministic_stream() -> AsyncIterator[str]:
+        """Synthetic SSE events for an extraction saved without the agent."""
+        yield sse_event({"text": text})
+        yield sse_event({
+            "complete": True,
+            "extraction_id": extraction_id,
+            "session_id": None,
+            "model": model,
+            "cached": False,
+            "speculative": False,
+            **flags,
+            "processing_time_ms": 0,
+        })
+
+    return sse_response(deterministic_stream())
+
+
 @router.post("/extract")
 async def extract_with_streaming(
     document_id: str = Form(...),
     mode: str = Form("auto"),
     custom_fields: str | None = Form(None),
+    force: bool = Form(False),
     user_id: str = Depends(get_current_user),
 ):
     """
@@ -37,17 +104,39 @@ async def extract_with_streaming(
     Creates extraction record first, then runs agent.
     Agent writes directly to database via tools.
 
+    The model and turn budget are routed by document size and complexity
+    (pages, tokens, tables, field count, past correction rate). Runs on the
+    fast model escalate to the strong model if they end without completing.
+
+    Auto extractions of simple document types (PRE_EXTRACTION_SKIP_AGENT_TYPES)
+    whose required fields were all found by pattern-based pre-extraction are
+    saved directly without running the agent.
+
+    Auto extractions of documents matching a learned layout template (repeat
+    senders) replay the template's field anchors and the agent verifies
+    them in a short run (saved unverified if TEMPLATE_VERIFY_WITH_AGENT is off).
+
+    In auto mode, a speculative extraction started after OCR is reused:
+    the stream attaches to it if it is still running, or returns its result
+    if it has finished.
+
+    If an identical extraction (same OCR content, mode, fields, configured
+    model and prompt version) was completed before, its output is copied into a new
+    extraction record and returned without running the agent.
+
     Args:
         document_id: Document UUID (must have OCR cached)
         mode: "auto" or "custom"
         custom_fields: Comma-separated field names (required if mode=custom)
+        force: Bypass the extraction cache and always run the agent
         user_id: From Clerk JWT (injected via auth dependency)
 
     Returns:
         SSE stream with events:
         - {"text": "..."} - Claude's response
         - {"tool": "...", "input": {...}} - Tool activity
-        - {"complete": true, "extraction_id": "...", "session_id": "..."}
+        - {"complete": true, "extraction_id": "...", "session_id": "...", "cached": bool, "speculative": bool,
+           "pre_extracted": bool, "template": bool}
         - {"error": "..."}
     """
     if mode not in ["auto", "custom"]:
@@ -63,8 +152,8 @@ async def extract_with_streaming(
     if not doc.data:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    ocr = supabase.table("ocr_results").select("id").eq("document_id", document_id).single().execute()
-    if not ocr.data:
+    content_hash = await get_ocr_content_hash(document_id, user_id)
+    if not content_hash:
         raise HTTPException(status_code=400, detail="No cached OCR. Process document first.")
 
     # Parse custom fields - supports both JSON format and comma-separated
@@ -95,8 +184,132 @@ async def extract_with_streaming(
             # Fall back to comma-separated format for backwards compatibility
             fields_list = [f.strip() for f in custom_fields.split(",") if f.strip()]
 
-    # Create extraction record BEFORE starting agent
+    # Speculative auto extraction: attach to the in-flight run or adopt its result
+    if mode == "auto" and not force:
+        speculative_run = get_speculative_run(document_id, user_id)
+        if speculative_run:
+            mark_claimed(supabase, speculative_run.extraction_id)
+            logger.info(f"[{document_id}] Attaching to speculative extraction")
+
+            async def speculative_stream() -> AsyncIterator[str]:
+                """Replay and follow the speculative run's events."""
+                async for event in speculative_run.follow():
+                    if "complete" in event:
+                        event = {**event, "cached": False, "speculative": True}
+                    yield sse_event(event)
+
+            return sse_response(speculative_stream())
+
+        claimed = claim_speculative_extraction(supabase, document_id, user_id)
+        if claimed:
+            logger.info(f"[{document_id}] Returning speculative extraction {claimed['id']}")
+            session = supabase.table("documents").select("session_id").eq("id", document_id).single().execute()
+
+            async def claimed_stream() -> AsyncIterator[str]:
+                """Synthetic SSE events for a finished speculative extraction."""
+                yield sse_event({"text": "Extraction was already prepared when the document finished processing."})
+                yield sse_event({
+                    "complete": True,
+                    "extraction_id": claimed["id"],
+                    "session_id": (session.data or {}).get("session_id"),
+                    "model": claimed.get("model"),
+                    "cached": False,
+                    "speculative": True,
+                    "processing_time_ms": claimed.get("processing_time_ms"),
+                })
+
+            return sse_response(claimed_stream())
+
+    # Simple documents fully covered by pre-extraction skip the agent
+    skip_types = {t.strip() for t in get_settings().PRE_EXTRACTION_SKIP_AGENT_TYPES.split(",") if t.strip()}
+    if mode == "auto" and not force and skip_types:
+        pre_extracted = await get_pre_extraction(document_id, user_id)
+        if pre_extracted and agent_skippable(pre_extracted, skip_types):
+            fields, confidences = to_extraction(pre_extracted)
+            logger.info(
+                f"[{document_id}] Pre-extraction covers {pre_extracted['document_type']}, "
+                f"skipping agent ({len(fields)} fields)"
+            )
+            return _deterministic_response(
+                document_id, user_id, mode, fields, confidences, PRE_EXTRACT_MODEL,
+                text=f"Extracted {len(fields)} fields from this {pre_extracted['document_type']} "
+                     "by pattern matching. Ask for corrections if anything is missing.",
+                flags={"pre_extracted": True},
+            )
+
+    # Repeat-sender layouts: replay a learned template instead of a full run,
+    # optionally with the agent verifying the replayed fields
+    template = await match_template(document_id, user_id) if mode == "auto" and not force else None
+    if template and not get_settings().TEMPLATE_VERIFY_WITH_AGENT:
+        return _deterministic_response(
+            document_id, user_id, mode,
+            template["extracted_fields"], template["confidence_scores"], TEMPLATE_MODEL,
+            text="Extracted using the layout learned from this sender's earlier documents. "
+                 "Ask for corrections if anything is off.",
+            flags={"template": True},
+            template_id=template["template_id"],
+        )
+
+    # Route by document size/complexity
+    routing = route_extraction(
+        get_routing_signals(supabase, document_id, user_id, len(fields_list or []))
+    )
+    if template:
+        # Verifying template fields is a small job: fast model, few turns
+        routing = {
+            **routing,
+            "model": get_settings().CLAUDE_MODEL,
+            "max_turns": 4,
+            "escalation_model": None,
+            "reason": "template verification",
+        }
+    logger.info(f"[{document_id}] Routed extraction to {routing['model']} ({routing['reason']})")
+
+    # Keyed on the configured model, not the routed one: routing shifts with
+    # the user's correction rate and runs can escalate to another model
+    cache_key = build_cache_key(
+        content_hash, mode, fields_list, get_settings().CLAUDE_MODEL, EXTRACTION_PROMPT_VERSION
+    )
+
+    # Cache hit: materialize a completed extraction without running the agent
     start_time = time.time()
+    cached = None if force else await get_cached_extraction(user_id, cache_key)
+    if cached:
+        processing_time_ms = int((time.time() - start_time) * 1000)
+        extraction = supabase.table("extractions").insert({
+            "document_id": document_id,
+            "user_id": user_id,
+            "extracted_fields": cached["extracted_fields"],
+            "confidence_scores": cached["confidence_scores"],
+            "mode": mode,
+            "custom_fields": fields_list,
+            "model": cached["model"],
+            "processing_time_ms": processing_time_ms,
+            "status": "completed"
+        }).execute()
+
+        supabase.table("documents").update({
+            "status": "completed"
+        }).eq("id", document_id).eq("user_id", user_id).execute()
+
+        extraction_id = extraction.data[0]["id"]
+        logger.info(f"[{document_id}] Extraction cache hit ({len(cached['extracted_fields'])} fields)")
+
+        async def cached_stream() -> AsyncIterator[str]:
+            """Synthetic SSE events for a cached extraction."""
+            yield sse_event({"text": "Reused an earlier extraction of identical document content."})
+            yield sse_event({
+                "complete": True,
+                "extraction_id": extraction_id,
+                "session_id": None,
+                "cached": True,
+                "speculative": False,
+                "processing_time_ms": processing_time_ms,
+            })
+
+        return sse_response(cached_stream())
+
+    # Create extraction record BEFORE starting agent
     extraction = supabase.table("extractions").insert({
         "document_id": document_id,
         "user_id": user_id,
@@ -104,9 +317,10 @@ async def extract_with_streaming(
         "confidence_scores": {},
         "mode": mode,
         "custom_fields": fields_list,
-        "model": "claude-agent-sdk",
+        "model": routing["model"],  # Replaced with the model that ran on completion
         "processing_time_ms": 0,  # Will update on completion
-        "status": "in_progress"
+        "status": "in_progress",
+        "template_id": template["template_id"] if template else None,
     }).execute()
 
     extraction_id = extraction.data[0]["id"]
@@ -120,52 +334,69 @@ async def extract_with_streaming(
                 user_id=user_id,
                 db=supabase,
                 mode=mode,
-                custom_fields=fields_list
+                custom_fields=fields_list,
+                model=routing["model"],
+                max_turns=routing["max_turns"],
+                escalation_model=routing["escalation_model"],
+                prefill=(
+                    (template["extracted_fields"], template["confidence_scores"]) if template else None
+                ),
             ):
                 if "complete" in event:
-                    # Update processing time
+                    # Update processing time and the model that actually ran
                     processing_time_ms = int((time.time() - start_time) * 1000)
-                    supabase.table("extractions").update({
-                        "processing_time_ms": processing_time_ms
-                    }).eq("id", extraction_id).execute()
+                    completion_update: dict = {"processing_time_ms": processing_time_ms}
+                    if event.get("model"):
+                        completion_update["model"] = event["model"]
+                    supabase.table("extractions").update(
+                        completion_update
+                    ).eq("id", extraction_id).execute()
 
                     # Store session_id on document for future corrections
                     if event.get("session_id"):
                         supabase.table("documents").update({
-                            "session_id": event["session_id"]
+                            "session_id": event["session_id"],
+                            "session_context_tokens": event.get("context_tokens"),
                         }).eq("id", document_id).execute()
 
                     event["processing_time_ms"] = processing_time_ms
+                    event["cached"] = False
+                    event["speculative"] = False
 
                 yield sse_event(event)
 
+                # Cache and learn the layout after the client has its complete
+                # event (off the critical path)
+                if "complete" in event:
+                    await store_cached_extraction(user_id, cache_key, extraction_id)
+                    await learn_template(document_id, user_id, extraction_id)
+
         except Exception as e:
             logger.error(f"Extraction stream error: {e}")
             yield sse_event({"error": str(e)})
 
-    return StreamingResponse(
-        event_stream(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
-    )
+    return sse_response(event_stream())
 
 
 @router.post("/correct")
 async def correct_extraction(
     document_id: str = Form(...),
     instruction: str = Form(...),
+    compact: bool = Form(False),
     user_id: str = Depends(get_current_user),
 ):
     """
-    Correct extraction using session resume.
+    Correct extraction.
+
+    Resumes the extraction session while it is small. Once its context
+    passes CORRECTION_COMPACT_THRESHOLD_TOKENS, the correction starts a fresh
+    session from a compact snapshot (current fields, OCR excerpts, earlier
+    corrections), so latency stays flat however many corrections are made.
 
     Args:
         document_id: Document UUID
         instruction: Correction instruction
+        compact: Always start from a compact snapshot
         user_id: From Clerk JWT (injected via auth dependency)
 
     Returns:
@@ -174,17 +405,20 @@ async def correct_extraction(
     supabase = get_supabase_client()
 
     # Get document with session_id
-    doc = supabase.table("documents").select("session_id").eq("id", document_id).eq("user_id", user_id).single().execute()
+    doc = supabase.table("documents") \
+        .select("session_id, session_context_tokens") \
+        .eq("id", document_id) \
+        .eq("user_id", user_id) \
+        .single() \
+        .execute()
     if not doc.data:
         raise HTTPException(status_code=404, detail="Document not found")
 
     session_id = doc.data.get("session_id")
-    if not session_id:
-        raise HTTPException(status_code=400, detail="No session found. Extract first.")
 
     # Get latest extraction
     extraction = supabase.table("extractions") \
-        .select("id, mode, custom_fields") \
+        .select("id, mode, custom_fields, model, correction_notes") \
         .eq("document_id", document_id) \
         .order("created_at", desc=True) \
         .limit(1) \
@@ -205,23 +439,31 @@ async def correct_extraction(
                 document_id=document_id,
                 user_id=user_id,
                 instruction=instruction,
-                db=supabase
+                db=supabase,
+                # Pattern/template/legacy results have no usable model; use the default
+                model=resume_model(extraction.data.get("model")),
+                context_tokens=doc.data.get("session_context_tokens"),
+                notes=extraction.data.get("correction_notes") or [],
+                compact=compact,
             ):
+                # Next correction resumes whichever session this one ran in
+                if "complete" in event and event.get("session_id"):
+                    supabase.table("documents").update({
+                        "session_id": event["session_id"],
+                        "session_context_tokens": event.get("context_tokens"),
+                    }).eq("id", document_id).execute()
+
                 yield sse_event(event)
 
+                # Corrected values make better template anchors
+                if "complete" in event:
+                    await learn_template(document_id, user_id, extraction_id)
+
         except Exception as e:
             logger.error(f"Correction stream error: {e}")
             yield sse_event({"error": str(e)})
 
-    return StreamingResponse(
-        event_stream(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
-    )
+    return sse_response(event_stream())
 
 
 @router.get("/health")
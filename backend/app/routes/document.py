@@ -6,6 +6,7 @@ Extraction is handled separately via /api/agent/extract.
 Metadata generation via /api/document/metadata.
 """
 
+import asyncio
 import logging
 from typing import Any, AsyncIterator
 
@@ -13,9 +14,17 @@ from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Form,
 from fastapi.responses import StreamingResponse
 
 from ..agents.document_processor_agent import process_document_metadata
+from ..agents.extraction_agent import run_speculative_extraction
 from ..auth import get_current_user
-from ..services.storage import upload_document, create_signed_url
-from ..services.ocr import extract_text_ocr
+from ..config import get_settings
+from ..services.storage import upload_document, create_signed_url, download_document
+from ..services.extraction_cache import hash_ocr_text
+from ..services.image_preprocess import preprocess_for_ocr, should_preprocess
+from ..services.ocr import OCRUnavailableError, OCRResult, data_url, extract_text_ocr
+from ..services.ocr_normalize import normalize_pages
+from ..services.ocr_tables import parse_ocr_tables
+from ..services.pre_extract import pre_extract
+from ..services.tokens import count_tokens, estimate_tokens
 from ..services.usage import check_usage_limit, increment_usage
 from ..database import get_supabase_client
 from ..utils.sse import sse_event
@@ -24,16 +33,82 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+async def _inline_document_url(
+    document_id: str,
+    file_path: str,
+    mime_type: str | None,
+    content: bytes | None,
+) -> str | None:
+    """
+    Data URL for sending the document to OCR inline.
+
+    Uses the upload bytes when the job still holds them; images are fetched
+    only when they need normalizing. None means OCR fetches the original via
+    a signed URL (retries, legacy documents).
+    """
+    if not mime_type:
+        return None
+
+    preprocess = should_preprocess(mime_type)
+    if content is None and preprocess:
+        try:
+            content = await download_document(file_path)
+        except Exception as e:
+            logger.warning(f"[{document_id}] Image download for preprocessing failed: {e}")
+    if content is None:
+        return None
+
+    if preprocess and (normalized := await preprocess_for_ocr(content, mime_type)):
+        return data_url(normalized["content"], normalized["mime_type"])
+    return data_url(content, mime_type)
+
+
+async def _ocr_with_deferral(
+    document_id: str,
+    file_path: str,
+    mime_type: str | None,
+    content: bytes | None = None,
+) -> OCRResult:
+    """
+    Run OCR, waiting out provider outages instead of failing the document.
+
+    Bytes we already hold go inline (images normalized first; the original
+    stays in storage), skipping the signed URL and Mistral's fetch from storage.
+    While the OCR circuit is open the job sleeps until it resets (status stays
+    'processing'), up to OCR_MAX_DEFERRALS times.
+    """
+    inline_url = await _inline_document_url(document_id, file_path, mime_type, content)
+
+    max_deferrals = get_settings().OCR_MAX_DEFERRALS
+    for deferral in range(max_deferrals + 1):
+        try:
+            # Otherwise a fresh signed URL each try - a deferred job can outlive the old one
+            document_url = inline_url or await create_signed_url(file_path)
+            return await extract_text_ocr(document_url, mime_type)
+        except OCRUnavailableError as e:
+            if deferral == max_deferrals:
+                raise
+            logger.warning(
+                f"[{document_id}] OCR provider unavailable, deferring {e.retry_in:.0f}s "
+                f"({deferral + 1}/{max_deferrals})"
+            )
+            await asyncio.sleep(e.retry_in)
+    raise AssertionError("unreachable")
+
+
 async def _run_ocr_background(
     document_id: str,
     file_path: str,
     user_id: str,
+    mime_type: str | None = None,
+    content: bytes | None = None,
 ) -> None:
     """
     Run OCR processing in background.
 
-    On success: Updates status to 'ocr_complete' and awaits metadata generation.
-    On failure: Updates status to 'failed'.
+    On success: Updates status to 'ocr_complete' and awaits metadata generation
+    alongside speculative auto extraction (when enabled).
+    On failure: Updates status to 'failed' (provider outages are waited out first).
 
     Note: Background tasks cannot spawn other background tasks (no BackgroundTasks
     instance available). Instead, we directly await _run_metadata_background().
@@ -42,6 +117,8 @@ async def _run_ocr_background(
         document_id: Document UUID
         file_path: Path in Supabase Storage
         user_id: User who uploaded the document
+        mime_type: File type (images are normalized before OCR)
+        content: Upload bytes, when still in memory (sent to OCR inline)
     """
     supabase = get_supabase_client()
 
@@ -51,10 +128,22 @@ async def _run_ocr_background(
             "status": "processing"
         }).eq("id", document_id).execute()
 
-        # Get signed URL and run OCR
+        # Run OCR (upload bytes inline when held; provider outages are waited out)
         logger.info(f"[{document_id}] Background OCR starting")
-        signed_url = await create_signed_url(file_path)
-        ocr_result = await extract_text_ocr(signed_url)
+        ocr_result = await _ocr_with_deferral(document_id, file_path, mime_type, content)
+
+        # Normalize to the compact agent-facing form (raw_text stays as-is for display)
+        compact_pages = normalize_pages(ocr_result["page_texts"], ocr_result["page_tables"])
+        compact_text = "\n\n".join(filter(None, compact_pages))
+        # Estimated here (no network call before the OCR result is saved),
+        # measured by _refine_token_count once it is
+        compact_token_count = estimate_tokens(compact_text)
+
+        # Deterministic candidates (dates, totals, IDs, line items) for the agent
+        pre_extracted = pre_extract(compact_pages, ocr_result["page_tables"])
+
+        # Typed columnar tables (parsed once here; agents query them with query_tables)
+        parsed_tables = parse_ocr_tables(ocr_result["page_tables"])
 
         # Save OCR result
         supabase.table("ocr_results").upsert({
@@ -62,6 +151,12 @@ async def _run_ocr_background(
             "user_id": user_id,
             "raw_text": ocr_result["text"],
             "html_tables": ocr_result.get("html_tables"),
+            "parsed_tables": parsed_tables,
+            "page_texts": compact_pages,
+            "compact_text": compact_text,
+            "compact_token_count": compact_token_count,
+            "content_hash": hash_ocr_text(compact_text or ocr_result["text"]),
+            "pre_extracted": pre_extracted,
             "page_count": ocr_result.get("page_count", 1),
             "model": ocr_result.get("model", "mistral-ocr-latest"),
             "processing_time_ms": ocr_result.get("processing_time_ms", 0),
@@ -79,8 +174,14 @@ async def _run_ocr_background(
 
         logger.info(f"[{document_id}] Background OCR complete")
 
-        # Chain: directly await metadata generation (cannot use BackgroundTasks here)
-        await _run_metadata_background(document_id, user_id)
+        # Chain: directly await metadata generation (cannot use BackgroundTasks here).
+        # Speculative extraction runs alongside so /extract can return instantly,
+        # and the token count estimate is measured meanwhile.
+        await asyncio.gather(
+            _refine_token_count(document_id, compact_text, compact_token_count),
+            _run_metadata_background(document_id, user_id),
+            run_speculative_extraction(document_id, user_id, supabase),
+        )
 
     except Exception as e:
         logger.error(f"[{document_id}] Background OCR failed: {e}")
@@ -90,6 +191,22 @@ async def _run_ocr_background(
         }).eq("id", document_id).execute()
 
 
+async def _refine_token_count(document_id: str, compact_text: str, estimate: int) -> None:
+    """
+    Replace the saved compact_token_count estimate with a measured count.
+
+    Best effort: the estimate stays on any failure.
+    """
+    try:
+        measured = await count_tokens(compact_text)
+        if measured != estimate:
+            get_supabase_client().table("ocr_results").update({
+                "compact_token_count": measured
+            }).eq("document_id", document_id).execute()
+    except Exception as e:
+        logger.warning(f"[{document_id}] Token count refinement failed: {e}")
+
+
 async def _run_metadata_background(
     document_id: str,
     user_id: str,
@@ -182,6 +299,8 @@ async def upload_and_ocr(
             document_id,
             upload_result["file_path"],
             user_id,
+            upload_result["mime_type"],
+            upload_result["content"],
         )
 
         # Return immediately - frontend watches via Realtime
@@ -232,7 +351,7 @@ async def retry_ocr(
     supabase = get_supabase_client()
 
     # Verify document exists and user owns it
-    doc = supabase.table("documents").select("file_path, filename, status").eq("id", document_id).eq("user_id", user_id).single().execute()
+    doc = supabase.table("documents").select("file_path, filename, mime_type, status").eq("id", document_id).eq("user_id", user_id).single().execute()
     if not doc.data:
         raise HTTPException(status_code=404, detail="Document not found")
 
@@ -257,6 +376,7 @@ async def retry_ocr(
         document_id,
         doc.data["file_path"],
         user_id,
+        doc.data.get("mime_type"),
     )
 
     return {
@@ -0,0 +1,204 @@
+"""
+Export routes - streaming CSV / XLSX / NDJSON downloads.
+
+Endpoints:
+- GET /api/export/stack/{table_id} - A stack table's rows, columns in
+  stack_tables.columns order
+- GET /api/export/extractions - Latest completed extraction per document
+  (all of the user's documents, or the given document_ids)
+
+Rows are read with keyset pagination and encoded page by page, so large
+exports start immediately and use constant server memory. Supabase calls
+are blocking, so the page generators are plain iterators (Starlette runs
+them in its threadpool).
+"""
+
+import logging
+import re
+from datetime import date
+from typing import Any, Iterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from supabase import Client
+
+from ..agents.stack_agent import table_columns
+from ..auth import get_current_user
+from ..database import get_supabase_client
+from ..services.export import EXPORT_FORMATS, flatten_fields, stream_export
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Rows read (and encoded) per round trip
+EXPORT_PAGE_SIZE = 1000
+
+# Max document ids in one extractions export filter
+MAX_EXPORT_DOCUMENT_IDS = 200
+
+
+def _download(chunks: Iterator[bytes], format: str, name: str) -> StreamingResponse:
+    """Stream chunks as a file download named <name>_<date>.<ext>."""
+    safe_name = re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_") or "export"
+    filename = f"{safe_name}_{date.today().isoformat()}.{EXPORT_FORMATS[format]['extension']}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format]["media_type"],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def _check_format(format: str) -> None:
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(EXPORT_FORMATS)}")
+
+
+def _stack_pages(
+    db: Client,
+    table_id: str,
+    user_id: str,
+    names: list[str],
+    confidence: bool,
+) -> Iterator[list[dict[str, Any]]]:
+    """Pages of stack row records, keyset-paginated on row id."""
+    after: str | None = None
+    while True:
+        query = db.table("stack_table_rows") \
+            .select("id, document_id, row_data, confidence_scores, documents(filename)") \
+            .eq("table_id", table_id) \
+            .eq("user_id", user_id)
+        if after:
+            query = query.gt("id", after)
+        page = query.order("id").limit(EXPORT_PAGE_SIZE).execute().data or []
+
+        records = []
+        for row in page:
+            row_data = row.get("row_data") or {}
+            scores = row.get("confidence_scores") or {}
+            record: dict[str, Any] = {"filename": (row.get("documents") or {}).get("filename")}
+            for name in names:
+                record[name] = row_data.get(name)
+                if confidence:
+                    record[f"{name} confidence"] = scores.get(name)
+            record["document_id"] = row["document_id"]
+            records.append(record)
+        yield records
+
+        if len(page) < EXPORT_PAGE_SIZE:
+            return
+        after = page[-1]["id"]
+
+
+def _extraction_pages(
+    db: Client,
+    user_id: str,
+    document_ids: list[str] | None,
+    flatten: bool,
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    Pages of latest-extraction records, keyset-paginated on document_id.
+
+    Extractions are read newest first within each document, so the first
+    one seen per document is its latest; older ones are skipped.
+    """
+    after: str | None = None
+    while True:
+        query = db.table("extractions") \
+            .select("document_id, extracted_fields, created_at, documents(filename)") \
+            .eq("user_id", user_id) \
+            .eq("status", "completed")
+        if document_ids:
+            query = query.in_("document_id", document_ids)
+        if after:
+            query = query.gt("document_id", after)
+        page = query \
+            .order("document_id") \
+            .order("created_at", desc=True) \
+            .limit(EXPORT_PAGE_SIZE) \
+            .execute().data or []
+
+        records = []
+        for row in page:
+            if row["document_id"] == after:
+                continue  # Older extraction of the previous document
+            after = row["document_id"]
+            fields = row.get("extracted_fields") or {}
+            base = {"filename": (row.get("documents") or {}).get("filename"), "document_id": after}
+            records.append({**base, **flatten_fields(fields)} if flatten else {**base, "extracted_fields": fields})
+        yield records
+
+        if len(page) < EXPORT_PAGE_SIZE:
+            return
+
+
+@router.get("/stack/{table_id}")
+async def export_stack_table(
+    table_id: str,
+    format: str = Query("csv"),
+    confidence: bool = Query(False),
+    user_id: str = Depends(get_current_user),
+) -> StreamingResponse:
+    """
+    Download a stack table as CSV, XLSX or NDJSON.
+
+    Args:
+        table_id: stack_tables row to export
+        format: csv | xlsx | ndjson
+        confidence: Add a "<column> confidence" column after each column
+        user_id: From Clerk JWT (injected via auth dependency)
+
+    Returns:
+        Streamed file: filename, the table's columns in order, document_id
+    """
+    _check_format(format)
+    supabase = get_supabase_client()
+
+    table = supabase.table("stack_tables") \
+        .select("id, name, columns, custom_columns") \
+        .eq("id", table_id) \
+        .eq("user_id", user_id) \
+        .limit(1) \
+        .execute()
+    if not table.data:
+        raise HTTPException(status_code=404, detail="Table not found")
+
+    names = [column["name"] for column in table_columns(table.data[0])]
+    header = ["filename"]
+    for name in names:
+        header += [name, f"{name} confidence"] if confidence else [name]
+    header.append("document_id")
+
+    pages = _stack_pages(supabase, table_id, user_id, names, confidence)
+    chunks = stream_export(format, header, pages, sheet_name=table.data[0]["name"])
+    return _download(chunks, format, table.data[0]["name"])
+
+
+@router.get("/extractions")
+async def export_extractions(
+    format: str = Query("csv"),
+    document_ids: str | None = Query(None),
+    user_id: str = Depends(get_current_user),
+) -> StreamingResponse:
+    """
+    Download the latest completed extraction of each document.
+
+    CSV/XLSX flatten nested fields to dot-notation columns (taken from the
+    first page of documents; fields first seen later land in an "other"
+    JSON column). NDJSON keeps extracted_fields nested.
+
+    Args:
+        format: csv | xlsx | ndjson
+        document_ids: Comma-separated document ids (default: all documents)
+        user_id: From Clerk JWT (injected via auth dependency)
+    """
+    _check_format(format)
+    ids = [i.strip() for i in (document_ids or "").split(",") if i.strip()] or None
+    if ids and len(ids) > MAX_EXPORT_DOCUMENT_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_EXPORT_DOCUMENT_IDS} document_ids")
+
+    pages = _extraction_pages(get_supabase_client(), user_id, ids, flatten=format != "ndjson")
+    return _download(stream_export(format, None, pages, sheet_name="Extractions"), format, "extractions")
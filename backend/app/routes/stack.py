@@ -0,0 +1,250 @@
+"""
+Stack routes - streaming extraction across a stack's documents.
+
+Endpoints:
+- POST /api/stack/extract - Fill a stack table (one row per document, SSE progress;
+  incremental=true only processes new/changed documents and cells)
+- POST /api/stack/batch - Fill a stack table offline via a message batch
+  (returns once submitted; rows are written when the batch ends)
+- POST /api/stack/{stack_id}/warm - Called when a stack is opened: assigns
+  it a pooled sprite (first open) or wakes its sprite ahead of use
+- POST /api/stack/{stack_id}/mission - Send a mission to the stack's sprite
+  agent over its shared connection (SSE: the sprite's messages for it)
+"""
+
+import logging
+import time
+from typing import Any, AsyncIterator
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException
+
+from ..agents.stack_agent import (
+    ExtractionInProgressError,
+    batch_collection_running,
+    collect_stack_batch,
+    extract_stack,
+    extraction_in_progress,
+    submit_stack_batch,
+)
+from ..auth import get_current_user
+from ..database import get_supabase_client
+from ..services.sprite_connections import SpriteChannelError, get_channel
+from ..services.sprite_pool import claim_sprite, prewake_sprite, provision_stack_sprite, refill_pool
+from ..utils.sse import sse_event, sse_response
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post("/extract")
+async def extract_stack_with_streaming(
+    table_id: str = Form(...),
+    incremental: bool = Form(False),
+    user_id: str = Depends(get_current_user),
+):
+    """
+    Extract a row for every document in a stack table, with SSE progress.
+
+    Documents are processed in parallel (one short agent run each); each
+    row is written to stack_table_rows as soon as its document finishes.
+
+    Args:
+        table_id: stack_tables row to fill (must have columns defined)
+        incremental: Only extract documents added or re-OCR'd since their row
+                     was written, and cells of added/changed columns
+        user_id: From Clerk JWT (injected via auth dependency)
+
+    Returns:
+        SSE stream: plan, per-document progress, then a complete event
+    """
+    supabase = get_supabase_client()
+
+    table = supabase.table("stack_tables").select("id, status, updated_at, batch_job").eq("id", table_id).eq("user_id", user_id).limit(1).execute()
+    if not table.data:
+        raise HTTPException(status_code=404, detail="Table not found")
+    # Early 409; extract_stack claims the table atomically, so a request
+    # that races past this check gets an error event, not a second run
+    if extraction_in_progress(table.data[0]):
+        raise HTTPException(status_code=409, detail="Table extraction already in progress")
+
+    start_time = time.time()
+
+    async def event_stream() -> AsyncIterator[str]:
+        """Generate SSE events from stack extraction."""
+        try:
+            async for event in extract_stack(table_id, user_id, supabase, incremental=incremental):
+                if "complete" in event:
+                    event["processing_time_ms"] = int((time.time() - start_time) * 1000)
+                yield sse_event(event)
+
+        except Exception as e:
+            logger.error(f"Stack extraction stream error: {e}")
+            yield sse_event({"error": str(e)})
+
+    return sse_response(event_stream())
+
+
+async def _collect_batch_background(table_id: str, user_id: str) -> None:
+    """Wait for a table's batch and write its rows (errors are logged)."""
+    try:
+        result = await collect_stack_batch(table_id, user_id, get_supabase_client())
+        if result is None:
+            logger.info(f"Batch for table {table_id} is already being collected")
+        else:
+            logger.info(f"Batch collected for table {table_id}: {result['completed']} rows")
+    except Exception as e:
+        logger.error(f"Batch collection failed for table {table_id}: {e}")
+
+
+@router.post("/batch")
+async def extract_stack_batch(
+    background_tasks: BackgroundTasks,
+    table_id: str = Form(...),
+    incremental: bool = Form(False),
+    user_id: str = Depends(get_current_user),
+) -> dict[str, Any]:
+    """
+    Fill a stack table offline: submit one request per document as message
+    batches, then write the rows in the background as they end.
+
+    For large backfills - cheaper than interactive extraction and doesn't
+    compete with it for rate limits. Calling again while a batch is pending
+    resumes collecting it (e.g. after a restart) instead of resubmitting;
+    a job that is still being collected is left to its collector.
+
+    Args:
+        table_id: stack_tables row to fill
+        incremental: Only extract new/changed documents and cells
+        user_id: From Clerk JWT (injected via auth dependency)
+
+    Returns:
+        {"batch_ids", "total", "skipped", "too_long", "unchanged", "removed"},
+        or {"batch_ids", "resumed": True} for a pending batch
+    """
+    supabase = get_supabase_client()
+
+    table = supabase.table("stack_tables").select("id, status, updated_at, batch_job").eq("id", table_id).eq("user_id", user_id).limit(1).execute()
+    if not table.data:
+        raise HTTPException(status_code=404, detail="Table not found")
+
+    if job := table.data[0].get("batch_job"):
+        if not batch_collection_running(table_id):
+            background_tasks.add_task(_collect_batch_background, table_id, user_id)
+        return {"batch_ids": job["batches"], "resumed": True}
+    if extraction_in_progress(table.data[0]):
+        raise HTTPException(status_code=409, detail="Table extraction already in progress")
+
+    try:
+        result = await submit_stack_batch(table_id, user_id, supabase, incremental=incremental)
+    except ExtractionInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if result["batch_ids"]:
+        background_tasks.add_task(_collect_batch_background, table_id, user_id)
+    return result
+
+
+async def _provision_sprite_background(stack_id: str, user_id: str) -> None:
+    """Cold-provision a stack's sprite (pool was empty), then refill the pool."""
+    try:
+        await provision_stack_sprite(get_supabase_client(), stack_id, user_id)
+    except Exception as e:
+        logger.error(f"Sprite provisioning failed for stack {stack_id}: {e}")
+    await _refill_pool_background()
+
+
+async def _refill_pool_background() -> None:
+    try:
+        await refill_pool(get_supabase_client())
+    except Exception as e:
+        logger.error(f"Sprite pool refill failed: {e}")
+
+
+@router.post("/{stack_id}/warm")
+async def warm_stack_sprite(
+    stack_id: str,
+    background_tasks: BackgroundTasks,
+    user_id: str = Depends(get_current_user),
+) -> dict[str, Any]:
+    """
+    Get a stack's sprite ready before the user's first agent interaction.
+
+    The frontend calls this when a stack is opened. A stack without a
+    sprite is given a bootstrapped one from the warm pool (the pool is
+    refilled in the background); one with a sprite has it woken now, so
+    the 1-12s cold wake overlaps with the user reading the page.
+
+    Args:
+        stack_id: stacks row being opened
+        user_id: From Clerk JWT (injected via auth dependency)
+
+    Returns:
+        {"sprite_name", "sprite_status"}; sprite_status is "provisioning"
+        while a sprite is created because the pool was empty (calling
+        again while it provisions is safe - it joins the same provision)
+    """
+    supabase = get_supabase_client()
+
+    stack = supabase.table("stacks").select("id, sprite_name, sprite_status").eq("id", stack_id).eq("user_id", user_id).limit(1).execute()
+    if not stack.data:
+        raise HTTPException(status_code=404, detail="Stack not found")
+
+    sprite_name = stack.data[0].get("sprite_name")
+    sprite_status = stack.data[0].get("sprite_status")
+    if sprite_status == "suspended":
+        return {"sprite_name": sprite_name, "sprite_status": sprite_status}
+    if sprite_name:
+        await prewake_sprite(sprite_name)
+        return {"sprite_name": sprite_name, "sprite_status": sprite_status}
+    if sprite_name := await claim_sprite(supabase, stack_id, user_id):
+        background_tasks.add_task(_refill_pool_background)
+        return {"sprite_name": sprite_name, "sprite_status": "active"}
+
+    background_tasks.add_task(_provision_sprite_background, stack_id, user_id)
+    return {"sprite_name": None, "sprite_status": "provisioning"}
+
+
+@router.post("/{stack_id}/mission")
+async def send_stack_mission(
+    stack_id: str,
+    text: str = Form(...),
+    user_id: str = Depends(get_current_user),
+):
+    """
+    Send a mission to a stack's sprite agent, streaming its responses.
+
+    All missions for a sprite share one persistent connection (see
+    services/sprite_connections.py); if the sprite sleeps mid-mission it is
+    woken and the mission replayed, so the stream just continues.
+
+    Args:
+        stack_id: stacks row whose sprite runs the mission
+        text: The user's message
+        user_id: From Clerk JWT (injected via auth dependency)
+
+    Returns:
+        SSE stream of sprite protocol messages (agent_event, canvas_update,
+        status) for this mission, ending with agent_event complete or error
+    """
+    supabase = get_supabase_client()
+
+    stack = supabase.table("stacks").select("id, sprite_name, sprite_status").eq("id", stack_id).eq("user_id", user_id).limit(1).execute()
+    if not stack.data:
+        raise HTTPException(status_code=404, detail="Stack not found")
+    sprite_name = stack.data[0].get("sprite_name")
+    if not sprite_name or stack.data[0].get("sprite_status") != "active":
+        raise HTTPException(status_code=409, detail="Stack sprite is not ready")
+
+    channel = get_channel(sprite_name)
+
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            async for message in channel.request("mission", {"text": text}):
+                yield sse_event(message)
+        except SpriteChannelError as e:
+            logger.error(f"Mission failed for stack {stack_id}: {e}")
+            yield sse_event({"error": "Stack sprite is unreachable"})
+
+    return sse_response(event_stream())
@@ -0,0 +1,305 @@
+"""
+Streaming CSV / XLSX / NDJSON export.
+
+Writers take pages of records (dicts) and yield encoded bytes page by
+page, so an export starts downloading immediately and server memory stays
+constant however many rows there are. XLSX is written with the standard
+library: the workbook parts are small and fixed, and the sheet is a
+deflate stream inside a zip written to a non-seekable sink.
+
+Usage:
+    chunks = stream_export("csv", ["vendor", "total"], pages)
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS["csv"]["media_type"])
+"""
+
+import csv
+import io
+import json
+import re
+import zipfile
+from typing import Any, Iterable, Iterator, TypedDict
+from xml.sax.saxutils import escape
+
+
+class ExportFormat(TypedDict):
+    media_type: str
+    extension: str
+
+
+EXPORT_FORMATS: dict[str, ExportFormat] = {
+    "csv": {"media_type": "text/csv; charset=utf-8", "extension": "csv"},
+    "xlsx": {
+        "media_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "extension": "xlsx",
+    },
+    "ndjson": {"media_type": "application/x-ndjson", "extension": "ndjson"},
+}
+
+# Column for record keys outside the header (tabular formats), as JSON
+OTHER_COLUMN = "other"
+
+# Excel's cell length limit
+XLSX_MAX_CELL_CHARS = 32767
+
+# Characters that start a formula when a CSV is opened in a spreadsheet
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Control characters not allowed in XML 1.0
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def flatten_fields(fields: dict[str, Any], prefix: str = "") -> dict[str, Any]:
+    """
+    Flatten nested extraction fields to dot-notation keys, matching the
+    frontend's single-document CSV export (arrays joined with '; ').
+    """
+    flat: dict[str, Any] = {}
+    for key, value in fields.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten_fields(value, name))
+        elif isinstance(value, list):
+            flat[name] = "; ".join(
+                json.dumps(item) if isinstance(item, (dict, list)) else str(item) for item in value
+            )
+        else:
+            flat[name] = value
+    return flat
+
+
+def _cell(value: Any) -> Any:
+    """Scalar for a tabular cell (nested values as JSON, None stays None)."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _tabular(header: list[str], record: dict[str, Any]) -> list[Any]:
+    """Record values in header order; unknown keys go to the OTHER_COLUMN."""
+    values = [_cell(record.get(name)) for name in header]
+    extra = {key: value for key, value in record.items() if key not in header}
+    if OTHER_COLUMN in header:
+        values[header.index(OTHER_COLUMN)] = json.dumps(extra, default=str) if extra else None
+    return values
+
+
+def _resolve_header(
+    header: list[str] | None,
+    pages: Iterable[list[dict[str, Any]]],
+) -> tuple[list[str], Iterator[list[dict[str, Any]]]]:
+    """
+    The export's columns. Without a fixed header, columns are the keys of
+    the first page (first-seen order) plus an OTHER_COLUMN for later keys.
+    """
+    pages = iter(pages)
+    if header is not None:
+        return header, pages
+
+    first = next(pages, [])
+    columns: list[str] = []
+    for record in first:
+        columns.extend(key for key in record if key not in columns)
+    columns.append(OTHER_COLUMN)
+
+    def chained() -> Iterator[list[dict[str, Any]]]:
+        yield first
+        yield from pages
+
+    return columns, chained()
+
+
+# ----------------------------------------------------------------------
+# CSV / NDJSON
+# ----------------------------------------------------------------------
+
+def _csv_value(value: Any) -> Any:
+    """Neutralize spreadsheet formulas in text cells (OCR text is untrusted)."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return "" if value is None else value
+
+
+def write_csv(header: list[str], pages: Iterable[list[dict[str, Any]]]) -> Iterator[bytes]:
+    """CSV with a UTF-8 BOM (so Excel detects the encoding), one chunk per page."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    for page in pages:
+        for record in page:
+            writer.writerow([_csv_value(value) for value in _tabular(header, record)])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_ndjson(pages: Iterable[list[dict[str, Any]]]) -> Iterator[bytes]:
+    """One JSON object per line, one chunk per page."""
+    for page in pages:
+        if page:
+            yield "".join(json.dumps(record, default=str) + "\n" for record in page).encode("utf-8")
+
+
+# ----------------------------------------------------------------------
+# XLSX
+# ----------------------------------------------------------------------
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>"""
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+# Style 0 = default, style 1 = bold (header row)
+_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/><xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>
+</styleSheet>"""
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/></sheetView></sheetViews>'
+    "<sheetData>"
+)
+_SHEET_END = "</sheetData></worksheet>"
+
+
+class _Sink:
+    """Non-seekable write target that hands written bytes back out."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def column_letter(index: int) -> str:
+    """0-based column index -> spreadsheet letters (0 -> A, 26 -> AA)."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(ref: str, value: Any, style: int = 0) -> str:
+    style_attr = f' s="{style}"' if style else ""
+    if value is None or value == "":
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{style_attr}><v>{value}</v></c>'
+    text = escape(_XML_ILLEGAL.sub("", str(value))[:XLSX_MAX_CELL_CHARS])
+    return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number: int, values: list[Any], style: int = 0) -> str:
+    cells = "".join(
+        _xlsx_cell(f"{column_letter(i)}{number}", value, style) for i, value in enumerate(values)
+    )
+    return f'<row r="{number}">{cells}</row>'
+
+
+def write_xlsx(
+    header: list[str],
+    pages: Iterable[list[dict[str, Any]]],
+    sheet_name: str = "Export",
+) -> Iterator[bytes]:
+    """Single-sheet XLSX (bold, frozen header row), one chunk per page."""
+    sink = _Sink()
+    name = escape(_XML_ILLEGAL.sub("", re.sub(r"[\[\]:*?/\\]", " ", sheet_name))[:31] or "Export")
+
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK.format(name=name))
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        archive.writestr("xl/styles.xml", _STYLES)
+
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write((_SHEET_START + _xlsx_row(1, header, style=1)).encode("utf-8"))
+            number = 1
+            for page in pages:
+                rows = []
+                for record in page:
+                    number += 1
+                    rows.append(_xlsx_row(number, _tabular(header, record)))
+                sheet.write("".join(rows).encode("utf-8"))
+                yield sink.drain()
+            sheet.write(_SHEET_END.encode("utf-8"))
+
+    yield sink.drain()
+
+
+def stream_export(
+    format: str,
+    header: list[str] | None,
+    pages: Iterable[list[dict[str, Any]]],
+    sheet_name: str = "Export",
+) -> Iterator[bytes]:
+    """
+    Encode pages of records as CSV, XLSX or NDJSON.
+
+    Tabular formats use header as the column order (see _resolve_header
+    when None); NDJSON writes each record as-is.
+
+    Raises:
+        ValueError: If the format isn't supported
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {format}")
+    if format == "ndjson":
+        return write_ndjson(pages)
+    return _write_tabular(format, header, pages, sheet_name)
+
+
+def _write_tabular(
+    format: str,
+    header: list[str] | None,
+    pages: Iterable[list[dict[str, Any]]],
+    sheet_name: str,
+) -> Iterator[bytes]:
+    # A generator, so the first page isn't read until streaming starts
+    columns, pages = _resolve_header(header, pages)
+    if format == "csv":
+        yield from write_csv(columns, pages)
+    else:
+        yield from write_xlsx(columns, pages, sheet_name)
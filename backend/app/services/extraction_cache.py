@@ -0,0 +1,169 @@
+"""
+Extraction result cache.
+
+Completed extraction outputs are cached per user under a deterministic key:
+OCR content hash + normalized field spec + configured model + prompt
+version (not the per-run routed model, which varies). A repeat
+extraction (or a duplicate document with identical OCR) reuses the cached
+output instead of starting a new agent run.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, TypedDict
+
+from ..database import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+class CachedExtraction(TypedDict):
+    """Cached extraction output."""
+    extracted_fields: dict[str, Any]
+    confidence_scores: dict[str, Any]
+    model: str
+
+
+def hash_ocr_text(text: str) -> str:
+    """SHA-256 of the agent-facing OCR text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_field_spec(
+    mode: str,
+    custom_fields: list[dict] | list[str] | None,
+) -> list[list[str]] | None:
+    """
+    Canonical form of the requested fields.
+
+    Field order, casing and surrounding whitespace don't change what the
+    agent extracts, so they don't change the cache key.
+    """
+    if mode == "auto" or not custom_fields:
+        return None
+
+    spec: list[list[str]] = []
+    for field in custom_fields:
+        if isinstance(field, dict):
+            name = str(field.get("name", ""))
+            description = str(field.get("description") or "")
+        else:
+            name, description = str(field), ""
+        spec.append([name.strip().lower(), " ".join(description.split())])
+    return sorted(spec)
+
+
+def build_cache_key(
+    content_hash: str,
+    mode: str,
+    custom_fields: list[dict] | list[str] | None,
+    model: str,
+    prompt_version: str,
+) -> str:
+    """Deterministic cache key for an extraction request."""
+    payload = json.dumps(
+        {
+            "content": content_hash,
+            "mode": mode,
+            "fields": normalize_field_spec(mode, custom_fields),
+            "model": model,
+            "prompt": prompt_version,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def get_ocr_content_hash(document_id: str, user_id: str) -> str | None:
+    """
+    Get the OCR content hash for a document.
+
+    Rows created before content_hash existed are hashed on the fly and
+    backfilled so the next lookup is a single narrow read.
+    """
+    db = get_supabase_client()
+    result = db.table("ocr_results") \
+        .select("content_hash") \
+        .eq("document_id", document_id) \
+        .eq("user_id", user_id) \
+        .single() \
+        .execute()
+
+    if not result.data:
+        return None
+    if result.data.get("content_hash"):
+        return result.data["content_hash"]
+
+    text_result = db.table("ocr_results") \
+        .select("raw_text, compact_text") \
+        .eq("document_id", document_id) \
+        .eq("user_id", user_id) \
+        .single() \
+        .execute()
+
+    content_hash = hash_ocr_text(text_result.data.get("compact_text") or text_result.data["raw_text"])
+    db.table("ocr_results").update({
+        "content_hash": content_hash
+    }).eq("document_id", document_id).eq("user_id", user_id).execute()
+    return content_hash
+
+
+async def get_cached_extraction(user_id: str, cache_key: str) -> CachedExtraction | None:
+    """Look up a cached extraction output (None on miss or lookup error)."""
+    try:
+        db = get_supabase_client()
+        result = db.table("extraction_cache") \
+            .select("extracted_fields, confidence_scores, model") \
+            .eq("user_id", user_id) \
+            .eq("cache_key", cache_key) \
+            .limit(1) \
+            .execute()
+
+        if not result.data:
+            return None
+
+        row = result.data[0]
+        return {
+            "extracted_fields": row["extracted_fields"],
+            "confidence_scores": row.get("confidence_scores") or {},
+            "model": row["model"],
+        }
+
+    except Exception as e:
+        # Cache is an optimization - never block an extraction on it
+        logger.warning(f"Extraction cache lookup failed: {e}")
+        return None
+
+
+async def store_cached_extraction(
+    user_id: str,
+    cache_key: str,
+    extraction_id: str,
+) -> None:
+    """Cache the output of a completed extraction (best effort)."""
+    try:
+        db = get_supabase_client()
+        extraction = db.table("extractions") \
+            .select("extracted_fields, confidence_scores, model, status") \
+            .eq("id", extraction_id) \
+            .single() \
+            .execute()
+
+        if not extraction.data or extraction.data.get("status") != "completed":
+            return
+        if not extraction.data.get("extracted_fields"):
+            return
+
+        db.table("extraction_cache").upsert({
+            "user_id": user_id,
+            "cache_key": cache_key,
+            "extracted_fields": extraction.data["extracted_fields"],
+            "confidence_scores": extraction.data.get("confidence_scores") or {},
+            "model": extraction.data["model"],
+            "source_extraction_id": extraction_id,
+        }, on_conflict="user_id,cache_key").execute()
+
+    except Exception as e:
+        logger.warning(f"Failed to cache extraction {extraction_id}: {e}")
@@ -0,0 +1,128 @@
+"""
+HTML table parsing for OCR 3 table output.
+
+Mistral OCR returns tables as HTML strings. These helpers turn them into
+plain cell grids without pulling in an HTML library (typed columnar
+tables are built on top of them in ocr_tables).
+"""
+
+from html.parser import HTMLParser
+
+
+class _TableParser(HTMLParser):
+    """
+    Collect rows of (text, colspan, rowspan) cells from a <table>, and
+    whether each row is a header row (inside <thead>, or all <th> cells).
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.rows: list[list[tuple[str, int, int]]] = []
+        self.header_rows: list[bool] = []
+        self._row: list[tuple[str, int, int]] | None = None
+        self._cell: list[str] | None = None
+        self._span = (1, 1)
+        self._in_thead = False
+        self._all_th = True
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag == "thead":
+            self._in_thead = True
+        elif tag == "tr":
+            self._row = []
+            self._all_th = True
+        elif tag in ("td", "th"):
+            if self._row is None:
+                self._row = []
+                self._all_th = True
+            if tag == "td":
+                self._all_th = False
+            attr_map = dict(attrs)
+            self._span = (_parse_span(attr_map.get("colspan")), _parse_span(attr_map.get("rowspan")))
+            self._cell = []
+        elif tag == "br" and self._cell is not None:
+            self._cell.append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "thead":
+            self._in_thead = False
+        elif tag in ("td", "th") and self._cell is not None and self._row is not None:
+            text = " ".join("".join(self._cell).split())
+            self._row.append((text, *self._span))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            self.rows.append(self._row)
+            self.header_rows.append(self._in_thead or (self._all_th and bool(self._row)))
+            self._row = None
+
+    def handle_data(self, data: str) -> None:
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def _parse_span(value: str | None) -> int:
+    try:
+        return max(1, int(value or 1))
+    except ValueError:
+        return 1
+
+
+def parse_html_table(html: str) -> list[list[str]]:
+    """
+    Parse an HTML table into a rectangular grid of cell strings.
+
+    Merged cells are expanded: a cell with colspan/rowspan is repeated into
+    every grid position it covers, so each row has the same number of cells.
+    """
+    return parse_html_grid(html)[0]
+
+
+def parse_html_grid(html: str) -> tuple[list[list[str]], int]:
+    """
+    Parse an HTML table into (grid, header_rows).
+
+    The grid is as for parse_html_table; header_rows counts the leading
+    rows marked up as headers (<thead>, or rows of only <th> cells).
+    """
+    parser = _TableParser()
+    parser.feed(html)
+    parser.close()
+
+    grid: list[list[str]] = []
+    pending: dict[tuple[int, int], str] = {}  # (row, col) filled by rowspans above
+
+    for r, row in enumerate(parser.rows):
+        out: list[str] = []
+        col = 0
+        cells = iter(row)
+        while True:
+            if (r, col) in pending:
+                out.append(pending.pop((r, col)))
+                col += 1
+                continue
+            cell = next(cells, None)
+            if cell is None:
+                break
+            text, colspan, rowspan = cell
+            for c in range(col, col + colspan):
+                out.append(text)
+                for extra in range(1, rowspan):
+                    pending[(r + extra, c)] = text
+            col += colspan
+        # Pick up rowspan cells trailing past the last explicit cell
+        while (r, col) in pending:
+            out.append(pending.pop((r, col)))
+            col += 1
+        grid.append(out)
+
+    header_rows = 0
+    while header_rows < len(grid) and parser.header_rows[header_rows]:
+        header_rows += 1
+
+    width = max((len(row) for row in grid), default=0)
+    return [row + [""] * (width - len(row)) for row in grid], header_rows
+
+
+def table_to_pipe_grid(html: str) -> str:
+    """Render an HTML table as compact 'a | b | c' lines."""
+    return "\n".join(" | ".join(row) for row in parse_html_table(html) if any(row))
@@ -0,0 +1,131 @@
+"""
+Image normalization before OCR.
+
+Phone photos arrive at full camera resolution, which inflates OCR upload
+and processing time without improving accuracy. Before OCR, images are:
+- rotated upright from their EXIF orientation
+- downscaled so the long edge matches IMAGE_OCR_TARGET_DPI on an A4 page
+- optionally converted to grayscale
+- re-encoded as JPEG without metadata
+
+The original upload stays untouched in storage; only the OCR request uses
+the normalized bytes. Pillow work is CPU-bound, so it runs in a process
+pool rather than on the event loop.
+"""
+
+import asyncio
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import TypedDict
+
+from PIL import Image, ImageOps
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Image types normalized before OCR (PDFs pass through)
+PREPROCESS_MIME_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+# Long edge of an A4 page in inches (portrait or landscape)
+PAGE_LONG_EDGE_INCHES = 11.7
+
+JPEG_QUALITY = 85
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+# Lazy pool initialization
+_pool: ProcessPoolExecutor | None = None
+
+
+class PreprocessedImage(TypedDict):
+    """Normalized image ready for OCR."""
+    content: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_size_bytes: int
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Get or create the preprocessing process pool (lazy initialization)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=get_settings().IMAGE_PREPROCESS_WORKERS)
+    return _pool
+
+
+def normalize_image(content: bytes, max_long_edge: int, grayscale: bool) -> PreprocessedImage | None:
+    """
+    Rotate, downscale, optionally grayscale and re-encode an image.
+
+    Runs in a worker process. Returns None when normalizing wouldn't help
+    (already upright, small enough, and re-encoding doesn't shrink it).
+    """
+    with Image.open(io.BytesIO(content)) as source:
+        rotated = source.getexif().get(EXIF_ORIENTATION_TAG, 1) != 1
+        image = ImageOps.exif_transpose(source)
+
+        if max(image.size) > max_long_edge:
+            image.thumbnail((max_long_edge, max_long_edge), Image.Resampling.LANCZOS)
+        resized = max(image.size) < max(source.size)
+
+        if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+            # Flatten transparency onto white (JPEG has no alpha)
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, "white")
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        image = image.convert("L" if grayscale else "RGB")
+
+        out = io.BytesIO()
+        # No exif/icc passed through - metadata is stripped
+        image.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+
+    normalized = out.getvalue()
+    if not rotated and not resized and len(normalized) >= len(content):
+        return None
+
+    return {
+        "content": normalized,
+        "mime_type": "image/jpeg",
+        "width": image.width,
+        "height": image.height,
+        "original_size_bytes": len(content),
+    }
+
+
+def should_preprocess(mime_type: str | None) -> bool:
+    """Whether uploads of this type are normalized before OCR."""
+    return get_settings().IMAGE_PREPROCESS_ENABLED and mime_type in PREPROCESS_MIME_TYPES
+
+
+async def preprocess_for_ocr(content: bytes, mime_type: str) -> PreprocessedImage | None:
+    """
+    Normalize an uploaded image for OCR in the process pool.
+
+    Best effort - returns None (send the original) for non-images, when
+    disabled, when normalizing doesn't help, or on any error.
+    """
+    if not should_preprocess(mime_type):
+        return None
+
+    settings = get_settings()
+    try:
+        max_long_edge = round(PAGE_LONG_EDGE_INCHES * settings.IMAGE_OCR_TARGET_DPI)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            _get_pool(),
+            partial(normalize_image, content, max_long_edge, settings.IMAGE_OCR_GRAYSCALE),
+        )
+    except Exception as e:
+        logger.warning(f"Image preprocessing failed, using original: {e}")
+        return None
+
+    if result:
+        logger.info(
+            f"Image normalized for OCR: {result['original_size_bytes']} -> "
+            f"{len(result['content'])} bytes ({result['width']}x{result['height']})"
+        )
+    return result
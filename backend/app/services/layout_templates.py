@@ -0,0 +1,456 @@
+"""
+Layout-fingerprint templates for repeat senders.
+
+Documents from the same sender share a layout: the same headings, label
+phrases and table headers. A template stores that layout fingerprint plus
+field anchors learned from a completed (or corrected) extraction - where
+each value sat relative to a label. A new document whose fingerprint
+matches is extracted by replaying the anchors, without an agent run.
+
+Fingerprint features (digits masked so dates/numbers don't matter):
+- "h:" headings, "a:" label phrases ("Invoice No:"), "t:" table headers
+
+Anchors:
+- same_line: value follows the label on the same line
+- next_line: value is the first line after a label line
+- table: list-of-objects field mapped to columns of a table with the same header
+"""
+
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, TypedDict
+
+from ..database import get_supabase_client
+from .html_tables import parse_html_table
+from .ocr_pages import split_legacy_pages
+from .pre_extract import find_amounts, find_dates, header_key
+
+logger = logging.getLogger(__name__)
+
+# Jaccard similarity of fingerprints for a document to use a template
+MATCH_THRESHOLD = 0.75
+
+# Share of anchors that must resolve for a deterministic result
+MIN_COVERAGE = 0.9
+
+# Templates need at least this many anchors to be worth storing
+MIN_ANCHORS = 3
+
+# Only the first pages carry the sender's layout
+FINGERPRINT_PAGES = 3
+
+# Most recent templates compared per match
+MAX_TEMPLATES_SCANNED = 200
+
+# extractions.model for results replayed from a template
+TEMPLATE_MODEL = "template"
+
+_HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$")
+_LABEL_RE = re.compile(r"^([A-Za-z][A-Za-z .#/&()'-]{1,40}?)\s*[:#]")
+_ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+class Anchor(TypedDict, total=False):
+    """Where one field's value sits relative to the layout."""
+    path: list[str]
+    kind: str  # "text", "amount", "date" or "table"
+    position: str  # "same_line" or "next_line" (non-table)
+    label: str  # Normalized label text (non-table)
+    page: int  # 1-based page the value was learned on
+    words: int  # Words in the learned text value
+    header: list[str]  # Table header keys (table)
+    columns: dict[str, int]  # Field key → column index (table)
+    numeric: list[str]  # Keys whose values are numbers (table)
+
+
+class TemplateResult(TypedDict):
+    """Fields replayed from a template."""
+    template_id: str
+    extracted_fields: dict[str, Any]
+    confidence_scores: dict[str, Any]
+    coverage: float
+
+
+# ----------------------------------------------------------------------
+# Fingerprints
+# ----------------------------------------------------------------------
+
+def _mask(text: str) -> str:
+    """Lowercase, mask digits, collapse whitespace."""
+    return " ".join(re.sub(r"\d", "#", text.lower()).split())[:60]
+
+
+def layout_features(page_texts: list[str], html_tables: list[str] | None) -> list[str]:
+    """Sorted fingerprint features for a document's layout."""
+    features: set[str] = set()
+    for text in page_texts[:FINGERPRINT_PAGES]:
+        for line in text.splitlines():
+            if heading := _HEADING_RE.match(line):
+                features.add("h:" + _mask(heading.group(1)))
+            elif label := _LABEL_RE.match(line.strip()):
+                features.add("a:" + _mask(label.group(1)))
+
+    for html in html_tables or []:
+        grid = parse_html_table(html)
+        if grid:
+            features.add("t:" + "|".join(header_key(cell) for cell in grid[0]))
+    return sorted(features)
+
+
+def similarity(a: list[str], b: list[str]) -> float:
+    """Jaccard similarity of two feature lists."""
+    set_a, set_b = set(a), set(b)
+    if not set_a or not set_b:
+        return 0.0
+    return len(set_a & set_b) / len(set_a | set_b)
+
+
+# ----------------------------------------------------------------------
+# Learning
+# ----------------------------------------------------------------------
+
+def _leaves(fields: dict[str, Any], prefix: list[str] | None = None):
+    """Yield (path, value) for scalar leaves and lists of objects."""
+    for key, value in fields.items():
+        path = [*(prefix or []), key]
+        if isinstance(value, dict):
+            yield from _leaves(value, path)
+        elif isinstance(value, list):
+            if value and all(isinstance(item, dict) for item in value):
+                yield path, value
+        elif value not in (None, ""):
+            yield path, value
+
+
+def _kind(value: Any) -> str:
+    if isinstance(value, bool):
+        return "text"
+    if isinstance(value, (int, float)):
+        return "amount"
+    if isinstance(value, str) and _ISO_DATE_RE.match(value):
+        return "date"
+    return "text"
+
+
+def _find_value(line: str, value: Any, kind: str) -> tuple[int, int] | None:
+    """Character span of value in line, or None."""
+    if kind == "amount":
+        for amount, start, end in find_amounts(line):
+            if abs(amount - float(value)) < 0.005:
+                return start, end
+        match = re.search(rf"(?<![\d.]){re.escape(str(value))}(?![\d])", line)
+        return match.span() if match else None
+    if kind == "date":
+        for iso_date, start, end, _ in find_dates(line):
+            if iso_date == value:
+                return start, end
+        return None
+    index = line.lower().find(str(value).lower())
+    return (index, index + len(str(value))) if index >= 0 and len(str(value)) >= 2 else None
+
+
+def _label_before(line: str, start: int) -> str | None:
+    label = line[:start].strip(" \t:#-|*$€£¥")
+    return _mask(label) if re.search(r"[a-zA-Z]", label) and len(label) <= 60 else None
+
+
+def _learn_scalar(path: list[str], value: Any, page_texts: list[str]) -> Anchor | None:
+    kind = _kind(value)
+    for page_index, text in enumerate(page_texts):
+        lines = text.splitlines()
+        for line_index, line in enumerate(lines):
+            span = _find_value(line, value, kind)
+            if span is None:
+                continue
+            anchor: Anchor = {
+                "path": path,
+                "kind": kind,
+                "page": page_index + 1,
+                "words": len(str(value).split()),
+            }
+            if label := _label_before(line, span[0]):
+                return {**anchor, "position": "same_line", "label": label}
+            # Value alone on its line: anchor to the previous non-empty line
+            previous = next((lines[i].strip() for i in range(line_index - 1, -1, -1) if lines[i].strip()), "")
+            if previous and len(previous) <= 60 and re.search(r"[a-zA-Z]", previous):
+                return {**anchor, "position": "next_line", "label": _mask(previous.strip(" :#-|*"))}
+    return None
+
+
+def _cells_match(value: Any, cell: str) -> bool:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        amounts = find_amounts(cell) or [
+            (float(n), 0, 0) for n in re.findall(r"-?\d+(?:\.\d+)?", cell.replace(",", ""))
+        ]
+        return any(abs(a - float(value)) < 0.005 for a, _, _ in amounts)
+    return str(value).strip().lower() == cell.strip().lower()
+
+
+def _learn_table(path: list[str], rows: list[dict], html_tables: list[str]) -> Anchor | None:
+    keys = [key for key in rows[0] if all(key in row for row in rows)]
+    for html in html_tables:
+        grid = parse_html_table(html)
+        body = [row for row in grid[1:] if any(row)]
+        if len(body) < len(rows):
+            continue
+        columns: dict[str, int] = {}
+        for key in keys:
+            for col in range(len(grid[0])):
+                matches = sum(_cells_match(row[key], body[i][col]) for i, row in enumerate(rows))
+                if matches >= 0.8 * len(rows):
+                    columns[key] = col
+                    break
+        if columns and len(columns) >= 0.5 * len(keys):
+            return {
+                "path": path,
+                "kind": "table",
+                "header": [header_key(cell) for cell in grid[0]],
+                "columns": columns,
+                "numeric": [
+                    key for key in columns
+                    if isinstance(rows[0][key], (int, float)) and not isinstance(rows[0][key], bool)
+                ],
+            }
+    return None
+
+
+def learn_anchors(
+    fields: dict[str, Any],
+    page_texts: list[str],
+    html_tables: list[str] | None,
+) -> list[Anchor]:
+    """Anchors for every field whose value can be located in the OCR."""
+    anchors: list[Anchor] = []
+    for path, value in _leaves(fields):
+        if isinstance(value, list):
+            anchor = _learn_table(path, value, html_tables or [])
+        else:
+            anchor = _learn_scalar(path, value, page_texts)
+        if anchor:
+            anchors.append(anchor)
+    return anchors
+
+
+# ----------------------------------------------------------------------
+# Replay
+# ----------------------------------------------------------------------
+
+def _read_value(text: str, anchor: Anchor) -> tuple[Any, float] | None:
+    """Parse the anchor's value from the text that follows its label."""
+    text = text.strip(" \t:#-|*")
+    if not text:
+        return None
+    if anchor["kind"] == "amount":
+        amounts = find_amounts(text)
+        if amounts:
+            return amounts[0][0], 0.9
+        match = re.match(r"-?\d+(?:\.\d+)?", text.replace(",", ""))
+        return (float(match.group(0)), 0.85) if match else None
+    if anchor["kind"] == "date":
+        dates = find_dates(text)
+        return (dates[0][0], min(dates[0][3], 0.9)) if dates else None
+    words = text.split()[:anchor.get("words", 1)]
+    return " ".join(words), 0.85
+
+
+def _replay_scalar(anchor: Anchor, page_texts: list[str]) -> tuple[Any, float] | None:
+    # Learned page first, then the rest
+    order = sorted(range(len(page_texts)), key=lambda i: i + 1 != anchor.get("page"))
+    for page_index in order:
+        lines = page_texts[page_index].splitlines()
+        for line_index, line in enumerate(lines):
+            if anchor["position"] == "same_line":
+                # Masking keeps character positions, so the label's index in
+                # the masked line is its index in the whitespace-normalized line
+                normalized = " ".join(line.split())
+                index = re.sub(r"\d", "#", normalized.lower()).find(anchor["label"])
+                if index < 0:
+                    continue
+                if value := _read_value(normalized[index + len(anchor["label"]):], anchor):
+                    return value
+            elif _mask(line).strip(" :#-|*") == anchor["label"]:
+                following = next((l for l in lines[line_index + 1:] if l.strip()), "")
+                if value := _read_value(following, anchor):
+                    return value
+    return None
+
+
+def _parse_number(cell: str) -> int | float | None:
+    text = re.sub(r"[^\d.\-]", "", cell)
+    try:
+        return float(text) if "." in text else int(text)
+    except ValueError:
+        return None
+
+
+def _replay_table(anchor: Anchor, html_tables: list[str]) -> list[dict[str, Any]] | None:
+    for html in html_tables:
+        grid = parse_html_table(html)
+        if not grid or [header_key(cell) for cell in grid[0]] != anchor["header"]:
+            continue
+        rows = []
+        for cells in grid[1:]:
+            row: dict[str, Any] = {}
+            for key, col in anchor["columns"].items():
+                cell = cells[col] if col < len(cells) else ""
+                if key in anchor.get("numeric", []):
+                    row[key] = _parse_number(cell)
+                else:
+                    row[key] = cell
+            if any(value not in (None, "") for value in row.values()):
+                rows.append(row)
+        return rows
+    return None
+
+
+def _set_nested(root: dict[str, Any], path: list[str], value: Any) -> None:
+    for key in path[:-1]:
+        root = root.setdefault(key, {})
+    root[path[-1]] = value
+
+
+def apply_template(
+    template_id: str,
+    anchors: list[Anchor],
+    page_texts: list[str],
+    html_tables: list[str] | None,
+) -> TemplateResult:
+    """Replay a template's anchors on a document."""
+    fields: dict[str, Any] = {}
+    confidences: dict[str, Any] = {}
+    found = 0
+    for anchor in anchors:
+        if anchor["kind"] == "table":
+            rows = _replay_table(anchor, html_tables or [])
+            if rows is None:
+                continue
+            _set_nested(fields, anchor["path"], rows)
+            _set_nested(confidences, anchor["path"], 0.85)
+        else:
+            result = _replay_scalar(anchor, page_texts)
+            if result is None:
+                continue
+            _set_nested(fields, anchor["path"], result[0])
+            _set_nested(confidences, anchor["path"], result[1])
+        found += 1
+
+    return {
+        "template_id": template_id,
+        "extracted_fields": fields,
+        "confidence_scores": confidences,
+        "coverage": found / len(anchors) if anchors else 0.0,
+    }
+
+
+# ----------------------------------------------------------------------
+# Persistence
+# ----------------------------------------------------------------------
+
+def _load_ocr(db, document_id: str, user_id: str) -> tuple[list[str], list[str]] | None:
+    result = db.table("ocr_results") \
+        .select("raw_text, compact_text, page_texts, html_tables") \
+        .eq("document_id", document_id) \
+        .eq("user_id", user_id) \
+        .limit(1) \
+        .execute()
+    if not result.data:
+        return None
+    row = result.data[0]
+    page_texts = row.get("page_texts") or split_legacy_pages(row.get("compact_text") or row["raw_text"])
+    return page_texts, row.get("html_tables") or []
+
+
+def _best_template(db, user_id: str, features: list[str]) -> tuple[dict, float] | None:
+    templates = db.table("layout_templates") \
+        .select("id, features, anchors, match_count") \
+        .eq("user_id", user_id) \
+        .order("updated_at", desc=True) \
+        .limit(MAX_TEMPLATES_SCANNED) \
+        .execute()
+    scored = [(t, similarity(features, t["features"])) for t in templates.data or []]
+    best = max(scored, key=lambda pair: pair[1], default=None)
+    return best if best and best[1] >= MATCH_THRESHOLD else None
+
+
+async def match_template(document_id: str, user_id: str) -> TemplateResult | None:
+    """
+    Replay the best-matching template on a document.
+
+    Returns None when no template matches or too few anchors resolve.
+    """
+    try:
+        db = get_supabase_client()
+        ocr = _load_ocr(db, document_id, user_id)
+        if not ocr:
+            return None
+        page_texts, html_tables = ocr
+        best = _best_template(db, user_id, layout_features(page_texts, html_tables))
+        if not best:
+            return None
+
+        template, score = best
+        result = apply_template(template["id"], template["anchors"], page_texts, html_tables)
+        logger.info(
+            f"[{document_id}] Template {template['id']} similarity {score:.2f}, "
+            f"coverage {result['coverage']:.0%}"
+        )
+        if result["coverage"] < MIN_COVERAGE:
+            return None
+
+        db.table("layout_templates").update({
+            "match_count": (template.get("match_count") or 0) + 1
+        }).eq("id", template["id"]).execute()
+        return result
+
+    except Exception as e:
+        # Templates are an optimization - fall back to the agent
+        logger.warning(f"[{document_id}] Template match failed: {e}")
+        return None
+
+
+async def learn_template(document_id: str, user_id: str, extraction_id: str) -> None:
+    """
+    Learn (or refresh) a template from a completed or corrected extraction.
+
+    Best effort: never raises.
+    """
+    try:
+        db = get_supabase_client()
+        extraction = db.table("extractions") \
+            .select("extracted_fields, status") \
+            .eq("id", extraction_id) \
+            .eq("user_id", user_id) \
+            .single() \
+            .execute()
+        if not extraction.data or extraction.data.get("status") != "completed":
+            return
+
+        ocr = _load_ocr(db, document_id, user_id)
+        if not ocr:
+            return
+        page_texts, html_tables = ocr
+
+        features = layout_features(page_texts, html_tables)
+        anchors = learn_anchors(extraction.data.get("extracted_fields") or {}, page_texts, html_tables)
+        if len(anchors) < MIN_ANCHORS or not features:
+            return
+
+        # Latest extraction wins: corrections refresh the anchors
+        best = _best_template(db, user_id, features)
+        row = {
+            "user_id": user_id,
+            "features": features,
+            "anchors": anchors,
+            "source_document_id": document_id,
+            "source_extraction_id": extraction_id,
+        }
+        if best:
+            row["updated_at"] = datetime.now(timezone.utc).isoformat()
+            db.table("layout_templates").update(row).eq("id", best[0]["id"]).execute()
+        else:
+            db.table("layout_templates").insert(row).execute()
+        logger.info(f"[{document_id}] Learned layout template ({len(anchors)} anchors)")
+
+    except Exception as e:
+        logger.warning(f"[{document_id}] Template learning failed: {e}")
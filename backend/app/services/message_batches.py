@@ -0,0 +1,212 @@
+"""
+Message batch providers for offline (non-interactive) model calls.
+
+A batch provider takes many Messages API requests at once and returns
+their results later. Anthropic's Message Batches API processes them
+asynchronously at batch pricing and outside the interactive rate limits;
+the local provider runs them in-process (tests and development).
+
+Usage:
+    provider = get_batch_provider()
+    batch_id = await provider.submit([{"custom_id": "doc-1", "params": {...}}])
+    while not await provider.ended(batch_id):
+        await asyncio.sleep(poll_seconds)
+    async for result in provider.results(batch_id):
+        ...  # result["message"] or result["error"]
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Protocol, TypedDict
+
+from anthropic import AsyncAnthropic, NotFoundError
+
+from ..config import get_settings
+from .rate_limit import get_limiter, usage_tokens
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Per-batch limits of the Message Batches API are 100,000 requests and
+# 256 MB; bytes are capped below that to leave room for request framing
+MAX_BATCH_REQUESTS = 100_000
+MAX_BATCH_BYTES = 200 * 1024 * 1024
+
+# Lazy client initialization
+_client: AsyncAnthropic | None = None
+
+
+def _get_client() -> AsyncAnthropic:
+    """Get or create Anthropic client (lazy initialization)."""
+    global _client
+    if _client is None:
+        settings = get_settings()
+        _client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+    return _client
+
+
+class BatchNotFoundError(LookupError):
+    """The provider has no batch with this id (expired, or a lost local batch)."""
+
+
+class BatchRequest(TypedDict):
+    """One request in a batch (custom_id identifies its result)."""
+    custom_id: str
+    params: dict[str, Any]
+
+
+class BatchResult(TypedDict):
+    """Outcome of one request: a Message on success, else an error."""
+    custom_id: str
+    message: Any | None
+    error: str | None
+
+
+class BatchProvider(Protocol):
+    """Submits a batch, reports when it has ended, and streams its results."""
+
+    name: str
+
+    async def submit(self, requests: list[BatchRequest]) -> str: ...
+
+    async def ended(self, batch_id: str) -> bool: ...
+
+    def results(self, batch_id: str) -> AsyncIterator[BatchResult]: ...
+
+
+class AnthropicBatchProvider:
+    """Anthropic Message Batches API."""
+
+    name = "anthropic"
+
+    async def submit(self, requests: list[BatchRequest]) -> str:
+        batch = await _get_client().messages.batches.create(requests=requests)  # type: ignore[arg-type]
+        logger.info(f"Submitted message batch {batch.id} ({len(requests)} requests)")
+        return batch.id
+
+    async def ended(self, batch_id: str) -> bool:
+        try:
+            batch = await _get_client().messages.batches.retrieve(batch_id)
+        except NotFoundError as e:
+            raise BatchNotFoundError(batch_id) from e
+        return batch.processing_status == "ended"
+
+    async def results(self, batch_id: str) -> AsyncIterator[BatchResult]:
+        async for entry in await _get_client().messages.batches.results(batch_id):
+            result = entry.result
+            if result.type == "succeeded":
+                yield {"custom_id": entry.custom_id, "message": result.message, "error": None}
+            elif result.type == "errored":
+                yield {"custom_id": entry.custom_id, "message": None, "error": str(result.error.error.message)}
+            else:  # canceled / expired
+                yield {"custom_id": entry.custom_id, "message": None, "error": f"Request {result.type}"}
+
+
+class LocalBatchProvider:
+    """
+    In-process stand-in: runs each request through respond() when results
+    are read. Without respond, requests go to the interactive Messages API
+    (under the shared limiter), so batch mode works without the Batches API.
+    """
+
+    name = "local"
+
+    def __init__(self, respond: Callable[[dict[str, Any]], Awaitable[Any] | Any] | None = None):
+        self.respond = respond or self._create
+        self.batches: dict[str, list[BatchRequest]] = {}
+
+    @staticmethod
+    async def _create(params: dict[str, Any]) -> Any:
+        prompt = str(params["messages"][0]["content"])
+        async with get_limiter("anthropic").slot(
+            tokens=estimate_tokens(prompt) + params["max_tokens"]
+        ) as slot:
+            response = await _get_client().messages.create(**params)
+            slot.settle(usage_tokens(response.usage.model_dump(exclude_none=True)))
+        return response
+
+    async def submit(self, requests: list[BatchRequest]) -> str:
+        batch_id = f"local_{uuid.uuid4().hex}"
+        self.batches[batch_id] = list(requests)
+        return batch_id
+
+    async def ended(self, batch_id: str) -> bool:
+        if batch_id not in self.batches:
+            # Local batches live in memory and don't survive restarts
+            raise BatchNotFoundError(batch_id)
+        return True
+
+    async def results(self, batch_id: str) -> AsyncIterator[BatchResult]:
+        if batch_id not in self.batches:
+            raise BatchNotFoundError(batch_id)
+        for request in self.batches[batch_id]:
+            try:
+                message = self.respond(request["params"])
+                if inspect.isawaitable(message):
+                    message = await message
+                yield {"custom_id": request["custom_id"], "message": message, "error": None}
+            except Exception as e:
+                yield {"custom_id": request["custom_id"], "message": None, "error": str(e)}
+        self.batches.pop(batch_id, None)
+
+
+# Lazy shared provider (local batches live in its memory)
+_provider: BatchProvider | None = None
+
+
+def get_batch_provider() -> BatchProvider:
+    """Get or create the provider named by Settings.STACK_BATCH_PROVIDER."""
+    global _provider
+    if _provider is None:
+        name = get_settings().STACK_BATCH_PROVIDER
+        if name == "anthropic":
+            _provider = AnthropicBatchProvider()
+        elif name == "local":
+            _provider = LocalBatchProvider()
+        else:
+            raise ValueError(f"Unknown batch provider: {name}")
+    return _provider
+
+
+def split_batches(
+    requests: list[BatchRequest],
+    max_requests: int = MAX_BATCH_REQUESTS,
+    max_bytes: int = MAX_BATCH_BYTES,
+) -> list[list[BatchRequest]]:
+    """
+    Split requests into batches within the provider's per-batch limits
+    (request count and serialized size), keeping their order.
+    """
+    batches: list[list[BatchRequest]] = []
+    current: list[BatchRequest] = []
+    size = 0
+    for request in requests:
+        request_bytes = len(json.dumps(request, ensure_ascii=False).encode())
+        if current and (len(current) >= max_requests or size + request_bytes > max_bytes):
+            batches.append(current)
+            current, size = [], 0
+        current.append(request)
+        size += request_bytes
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def wait_for_batch(
+    provider: BatchProvider,
+    batch_id: str,
+    poll_seconds: float,
+    on_poll: Callable[[], None] | None = None,
+) -> None:
+    """
+    Poll until the batch has ended (results are then available).
+
+    on_poll runs after every wait (e.g. to renew a collection lease).
+    """
+    while not await provider.ended(batch_id):
+        await asyncio.sleep(poll_seconds)
+        if on_poll:
+            on_poll()
@@ -2,21 +2,48 @@
 Mistral OCR service for extracting text from documents.
 
 Uses Mistral's OCR API to process document images and PDFs.
+
+Calls are resilient to provider trouble:
+- transient failures (timeouts, 5xx, 429) retry with jittered backoff
+- an optional hedged second request when one runs past a latency percentile
+- a circuit breaker fails fast (OCRUnavailableError) while Mistral is down
 """
 
+import asyncio
+import base64
 import logging
 import time
-from asyncio import to_thread
 from typing import Any, TypedDict
 
 from mistralai import Mistral
 
 from ..config import get_settings
+from .rate_limit import get_limiter, rate_limit_retry_after
+from .resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    backoff_delay,
+    hedged,
+    is_transient,
+)
 
 logger = logging.getLogger(__name__)
 
 # Lazy client initialization
 _client: Mistral | None = None
+_breaker: CircuitBreaker | None = None
+
+# Recent successful call latencies (seconds), for the hedge threshold
+_latency = LatencyTracker()
+
+
+class OCRUnavailableError(ValueError):
+    """OCR provider is down (circuit open) - defer the job and retry later."""
+
+    def __init__(self, message: str, retry_in: float):
+        super().__init__(message)
+        self.retry_in = retry_in
 
 
 def _get_client() -> Mistral:
@@ -28,6 +55,93 @@ def _get_client() -> Mistral:
     return _client
 
 
+def _get_breaker() -> CircuitBreaker:
+    """Get or create the Mistral circuit breaker."""
+    global _breaker
+    if _breaker is None:
+        settings = get_settings()
+        _breaker = CircuitBreaker(
+            "mistral-ocr",
+            failure_threshold=settings.OCR_BREAKER_FAILURES,
+            reset_seconds=settings.OCR_BREAKER_RESET_SECONDS,
+        )
+    return _breaker
+
+
+def data_url(content: bytes, mime_type: str) -> str:
+    """Inline file bytes as a base64 data URL (accepted for document_url and image_url)."""
+    return f"data:{mime_type};base64,{base64.b64encode(content).decode('ascii')}"
+
+
+def _document_chunk(document_url: str, mime_type: str | None) -> dict[str, str]:
+    """OCR input chunk: images go as image_url, everything else as document_url."""
+    if mime_type and mime_type.startswith("image/"):
+        return {"type": "image_url", "image_url": document_url}
+    return {"type": "document_url", "document_url": document_url}
+
+
+async def _process_document(document: dict[str, str]) -> Any:
+    """
+    Call Mistral OCR with retries, hedging and the circuit breaker.
+
+    Raises:
+        OCRUnavailableError: Circuit is open (provider down)
+        Exception: Permanent error, or transient error after the last attempt
+    """
+    settings = get_settings()
+    client = _get_client()
+    breaker = _get_breaker()
+    limiter = get_limiter("mistral")
+
+    async def attempt() -> Any:
+        async with limiter.slot():
+            start = time.monotonic()
+            response = await asyncio.wait_for(
+                client.ocr.process_async(
+                    model="mistral-ocr-latest",
+                    document=document,
+                    table_format="html",
+                    include_image_base64=False,
+                ),
+                timeout=settings.OCR_TIMEOUT_SECONDS,
+            )
+            _latency.record(time.monotonic() - start)
+            return response
+
+    hedge_after = (
+        _latency.percentile(settings.OCR_HEDGE_PERCENTILE)
+        if settings.OCR_HEDGE_PERCENTILE else None
+    )
+
+    for attempt_number in range(1, settings.OCR_MAX_ATTEMPTS + 1):
+        try:
+            breaker.check()
+        except CircuitOpenError as e:
+            raise OCRUnavailableError(str(e), e.retry_in) from e
+
+        try:
+            response = await hedged(attempt, hedge_after)
+        except Exception as e:
+            if not is_transient(e):
+                breaker.release_probe()  # Bad document, not a provider outage
+                raise
+            if rate_limit_retry_after(e) is None:
+                breaker.record_failure()
+            else:
+                breaker.release_probe()  # Throttled, but up (limiter handles pacing)
+            if attempt_number == settings.OCR_MAX_ATTEMPTS:
+                raise
+            delay = backoff_delay(attempt_number - 1, base=settings.OCR_RETRY_BASE_SECONDS)
+            logger.warning(
+                f"OCR attempt {attempt_number}/{settings.OCR_MAX_ATTEMPTS} failed "
+                f"({type(e).__name__}: {e}), retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return response
+
+
 class OCRResult(TypedDict):
     """Result from OCR text extraction."""
     text: str
@@ -40,6 +154,8 @@ class OCRResult(TypedDict):
     layout_data: dict[str, Any] | None
     document_annotation: str | None
     html_tables: list[str] | None  # HTML tables from OCR 3
+    page_texts: list[str]  # Per-page text (with image annotations) for windowed reads
+    page_tables: list[dict[str, str]]  # Per-page table id → HTML, for normalization
 
 
 def _extract_page_text(page: Any) -> str:
@@ -116,35 +232,37 @@ def _extract_html_tables(pages: list[Any]) -> list[str] | None:
     return tables if tables else None
 
 
-async def extract_text_ocr(document_url: str) -> OCRResult:
+def _extract_page_tables(page: Any) -> dict[str, str]:
+    """Map table ids to HTML content for a single page."""
+    return {
+        table.id: table.content
+        for table in getattr(page, 'tables', None) or []
+        if getattr(table, 'id', None) and getattr(table, 'content', None)
+    }
+
+
+async def extract_text_ocr(document_url: str, mime_type: str | None = None) -> OCRResult:
     """
     Extract text from document using Mistral OCR.
 
     Args:
-        document_url: Signed URL to document file (from Supabase Storage)
+        document_url: Signed URL to document file (from Supabase Storage),
+            or a data URL of the file bytes (see data_url)
+        mime_type: File type, so images are sent as image_url chunks
 
     Returns:
         OCRResult with extracted text, metadata, and optional layout data
 
     Raises:
+        OCRUnavailableError: If the provider is down (circuit open)
         ValueError: If OCR processing fails or returns no text
     """
     start_time = time.time()
 
     try:
-        client = _get_client()
         logger.info("Starting Mistral OCR processing")
 
-        # Call Mistral OCR API (sync client, run in thread)
-        def _call_ocr():
-            return client.ocr.process(
-                model="mistral-ocr-latest",
-                document={"type": "document_url", "document_url": document_url},
-                table_format="html",
-                include_image_base64=False
-            )
-
-        response = await to_thread(_call_ocr)
+        response = await _process_document(_document_chunk(document_url, mime_type))
         processing_time_ms = int((time.time() - start_time) * 1000)
 
         # Validate response
@@ -153,7 +271,8 @@ async def extract_text_ocr(document_url: str) -> OCRResult:
 
         # Extract text, image annotations, and layout from all pages
         page_texts = [_extract_page_text(page) for page in response.pages]
-        image_annotations = [ann for page in response.pages for ann in _extract_image_annotations(page)]
+        page_annotations = [_extract_image_annotations(page) for page in response.pages]
+        image_annotations = [ann for annotations in page_annotations for ann in annotations]
         layout_pages = [layout for page in response.pages if (layout := _extract_page_layout(page))]
 
         # Combine page text with image annotations
@@ -182,8 +301,16 @@ async def extract_text_ocr(document_url: str) -> OCRResult:
             "layout_data": {"pages": layout_pages} if layout_pages else None,
             "document_annotation": getattr(response, 'document_annotation', None),
             "html_tables": _extract_html_tables(response.pages),
+            "page_texts": [
+                "\n\n".join(filter(None, [text, *annotations]))
+                for text, annotations in zip(page_texts, page_annotations)
+            ],
+            "page_tables": [_extract_page_tables(page) for page in response.pages],
         }
 
+    except OCRUnavailableError:
+        raise
+
     except Exception as e:
         processing_time_ms = int((time.time() - start_time) * 1000)
         error_msg = f"OCR processing failed: {e}"
@@ -0,0 +1,131 @@
+"""
+OCR text normalization for agent consumption.
+
+Turns Mistral's verbose per-page markdown into a compact agent-facing form:
+- HTML tables (inline or referenced via [tbl-N.html]) become pipe grids
+- Image references are dropped, image annotations shortened
+- Whitespace is collapsed
+- Headers/footers repeated across pages are removed
+
+raw_text is left untouched for display; the compact form is what agents read.
+"""
+
+import re
+from collections import Counter
+
+from .html_tables import table_to_pipe_grid
+
+# Lines at the top/bottom of each page considered for header/footer removal
+EDGE_LINES = 2
+
+# Minimum pages before repeated-edge detection kicks in
+MIN_PAGES_FOR_EDGE_DETECTION = 3
+
+# Fraction of pages a line must appear on to count as a header/footer
+EDGE_REPEAT_RATIO = 0.6
+
+_HTML_TABLE_RE = re.compile(r"<table\b.*?</table>", re.IGNORECASE | re.DOTALL)
+_TABLE_REF_RE = re.compile(r"\[([^\]]+?)\]\(\1\)")  # [tbl-0.html](tbl-0.html)
+_IMAGE_REF_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")  # ![img-0.jpeg](img-0.jpeg)
+_MD_TABLE_RULE_RE = re.compile(r"^\|?(\s*:?-{3,}:?\s*\|)+\s*(:?-{3,}:?)?\s*$")
+_INLINE_SPACES_RE = re.compile(r"(?<=\S)[ \t]{2,}")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def _replace_tables(text: str, tables: dict[str, str]) -> str:
+    """Swap table references and inline HTML tables for pipe grids."""
+
+    def _ref(match: re.Match[str]) -> str:
+        name = match.group(1)
+        html = tables.get(name) or tables.get(name.removesuffix(".html"))
+        return table_to_pipe_grid(html) if html else match.group(0)
+
+    text = _TABLE_REF_RE.sub(_ref, text)
+    return _HTML_TABLE_RE.sub(lambda m: table_to_pipe_grid(m.group(0)), text)
+
+
+def _collapse_whitespace(text: str) -> str:
+    """Trim lines, collapse inner runs of spaces and drop markdown table rules."""
+    lines = [
+        _INLINE_SPACES_RE.sub(" ", line.rstrip())
+        for line in text.splitlines()
+        if not _MD_TABLE_RULE_RE.match(line.strip())
+    ]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _edge_key(line: str, depth: int) -> str:
+    """
+    Normalize a line for header/footer matching.
+
+    The outermost line ignores digits (page numbers vary); inner lines must
+    match exactly so numbered body text is never mistaken for a header.
+    """
+    key = " ".join(line.lower().split())
+    return _DIGITS_RE.sub("#", key) if depth == 0 else key
+
+
+def _edge_keys(lines: list[str]) -> tuple[list[tuple[int, str]], list[tuple[int, str]]]:
+    """(index, key) pairs for the top and bottom EDGE_LINES, outermost first."""
+    content = [i for i, line in enumerate(lines) if line.strip()]
+    top = [(i, _edge_key(lines[i], depth)) for depth, i in enumerate(content[:EDGE_LINES])]
+    bottom = [(i, _edge_key(lines[i], depth)) for depth, i in enumerate(reversed(content[-EDGE_LINES:]))]
+    return top, bottom
+
+
+def _strip_repeated_edges(pages: list[str]) -> list[str]:
+    """Remove header/footer lines that repeat across most pages."""
+    if len(pages) < MIN_PAGES_FOR_EDGE_DETECTION:
+        return pages
+
+    page_lines = [page.splitlines() for page in pages]
+    page_edges = [_edge_keys(lines) for lines in page_lines]
+    counts: Counter[str] = Counter()
+    for top, bottom in page_edges:
+        counts.update({key for _, key in top + bottom})
+
+    threshold = max(2, int(len(pages) * EDGE_REPEAT_RATIO + 0.5))
+    repeated = {key for key, count in counts.items() if count >= threshold}
+    if not repeated:
+        return pages
+
+    result = []
+    for lines, (top, bottom) in zip(page_lines, page_edges):
+        drop: set[int] = set()
+        # Peel from the outside in: an inner line only goes if the outer one did
+        for edge in (top, bottom):
+            for i, key in edge:
+                if key not in repeated:
+                    break
+                drop.add(i)
+        result.append("\n".join(line for i, line in enumerate(lines) if i not in drop).strip())
+    return result
+
+
+def normalize_page(text: str, tables: dict[str, str] | None = None) -> str:
+    """Compact a single page of OCR markdown."""
+    text = _replace_tables(text, tables or {})
+    text = _IMAGE_REF_RE.sub("", text)
+    text = text.replace("[Image content: ", "[Image: ")
+    return _collapse_whitespace(text)
+
+
+def normalize_pages(
+    page_texts: list[str],
+    page_tables: list[dict[str, str]] | None = None,
+) -> list[str]:
+    """
+    Compact every page, then strip headers/footers repeated across pages.
+
+    Args:
+        page_texts: Per-page OCR markdown
+        page_tables: Per-page mapping of table id → HTML (from OCR 3)
+
+    Returns:
+        Compact per-page text, same length as page_texts
+    """
+    tables = list(page_tables or [])
+    tables += [{}] * (len(page_texts) - len(tables))
+    pages = [normalize_page(text, page_map) for text, page_map in zip(page_texts, tables)]
+    return _strip_repeated_edges(pages)
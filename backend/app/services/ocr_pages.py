@@ -0,0 +1,107 @@
+"""
+Page-level helpers for reading OCR text in windows.
+
+Long documents are too large to hand to an agent in one tool result.
+These helpers slice the per-page text stored in ocr_results.page_texts
+into page ranges, outlines and keyword snippets.
+"""
+
+import re
+
+# Documents at or below this size are returned whole by read_ocr
+FULL_TEXT_CHAR_LIMIT = 40_000
+
+# Maximum pages returned by a single page-range read
+MAX_PAGES_PER_READ = 10
+
+# Characters of context either side of a keyword match
+SNIPPET_CONTEXT_CHARS = 200
+MAX_SNIPPETS = 20
+
+_HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$")
+
+
+def split_legacy_pages(raw_text: str) -> list[str]:
+    """Fallback for OCR rows saved before page_texts existed: one page."""
+    return [raw_text] if raw_text else []
+
+
+def parse_page_range(spec: str, page_count: int) -> list[int]:
+    """
+    Parse a 1-based page range spec into sorted 0-based page indexes.
+
+    Examples:
+        "3" → [2]
+        "1-3" → [0, 1, 2]
+        "1-2, 7" → [0, 1, 6]
+
+    Raises:
+        ValueError: If the spec is malformed or out of range
+    """
+    indexes: set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start, end = int(start_str), int(end_str)
+        else:
+            start = end = int(part)
+        if start < 1 or end < start or end > page_count:
+            raise ValueError(f"Page range '{part}' is outside 1-{page_count}")
+        indexes.update(range(start - 1, end))
+
+    if not indexes:
+        raise ValueError("Page range is empty")
+    return sorted(indexes)
+
+
+def format_pages(page_texts: list[str], indexes: list[int]) -> str:
+    """Join selected pages with page markers the agent can cite."""
+    return "\n\n".join(
+        f"--- Page {i + 1} of {len(page_texts)} ---\n{page_texts[i]}"
+        for i in indexes
+    )
+
+
+def build_outline(page_texts: list[str]) -> str:
+    """
+    Build a table-of-contents view: headings per page, or the first line
+    of the page when it has no markdown headings.
+    """
+    lines = [f"Document outline ({len(page_texts)} pages):"]
+    for i, text in enumerate(page_texts):
+        headings = [
+            m.group(1) for line in text.splitlines()
+            if (m := _HEADING_RE.match(line))
+        ]
+        if headings:
+            summary = " | ".join(headings[:5])
+        else:
+            first_line = next((line.strip() for line in text.splitlines() if line.strip()), "")
+            summary = first_line[:120] or "(empty page)"
+        lines.append(f"- Page {i + 1} ({len(text)} chars): {summary}")
+    return "\n".join(lines)
+
+
+def find_snippets(page_texts: list[str], query: str) -> str:
+    """
+    Find case-insensitive keyword matches and return them with surrounding
+    context and page numbers.
+    """
+    pattern = re.compile(re.escape(query.strip()), re.IGNORECASE)
+    snippets: list[str] = []
+    for i, text in enumerate(page_texts):
+        for match in pattern.finditer(text):
+            start = max(0, match.start() - SNIPPET_CONTEXT_CHARS)
+            end = min(len(text), match.end() + SNIPPET_CONTEXT_CHARS)
+            snippets.append(f"[Page {i + 1}] ...{text[start:end].strip()}...")
+            if len(snippets) >= MAX_SNIPPETS:
+                break
+        if len(snippets) >= MAX_SNIPPETS:
+            break
+
+    if not snippets:
+        return f"No matches for '{query}'"
+    return f"{len(snippets)} matches for '{query}':\n\n" + "\n\n".join(snippets)
@@ -0,0 +1,336 @@
+"""
+Typed tables parsed from OCR HTML tables.
+
+OCR 3 returns tables as HTML strings. At ingest each one is parsed once
+into a columnar table - header rows detected, merged cells expanded, and
+every column typed as number, date or text with its cells coerced - and
+stored in ocr_results.parsed_tables. Agents then query line items as data
+(see the shared query_tables tool) instead of re-reading HTML.
+
+Typing is strict: a column is a number (or date) column only if every
+non-empty cell coerces, so no cell text is ever lost to coercion.
+"""
+
+import re
+from typing import Any, TypedDict
+
+from .html_tables import parse_html_grid
+from .pre_extract import find_dates, header_key
+
+# Rows kept per table (longer tables are truncated and flagged)
+MAX_TABLE_ROWS = 2000
+
+_CURRENCY_AFFIX_RE = re.compile(
+    r"^(?:[$€£¥]|(?:AUD|USD|EUR|GBP|NZD|CAD|SGD|JPY|CHF)\b)\s*"
+    r"|\s*(?:[$€£¥%]|\b(?:AUD|USD|EUR|GBP|NZD|CAD|SGD|JPY|CHF))$",
+    re.I,
+)
+# 1,234.56 / 1 234.56 / 1234.56 / .5 (no leading zeros: keeps IDs like 00123 as text)
+_NUMBER_RE = re.compile(r"(?:[1-9]\d{0,2}(?:([, ])\d{3})(?:\1\d{3})*|[1-9]\d*|0)(?:\.\d+)?|\.\d+")
+# 1.234,56 (decimal comma)
+_DECIMAL_COMMA_RE = re.compile(r"[1-9]\d{0,2}(?:\.\d{3})+,\d+|\d+,\d{1,2}")
+
+
+class TableColumn(TypedDict):
+    """One column of a parsed table."""
+    name: str  # Header text (multi-row headers joined with " / ")
+    key: str  # snake_case name, unique within the table
+    type: str  # "number" | "date" | "text"
+    values: list[Any]  # One per row: float/int, ISO date or text; None when empty
+
+
+class ParsedTable(TypedDict):
+    """A parsed OCR table stored in ocr_results.parsed_tables."""
+    id: str  # OCR table id, e.g. "tbl-0"
+    page: int | None  # 1-based (None for tables re-parsed from legacy html_tables)
+    columns: list[TableColumn]
+    row_count: int
+    truncated: bool  # Rows beyond MAX_TABLE_ROWS were dropped
+
+
+# ----------------------------------------------------------------------
+# Cell coercion
+# ----------------------------------------------------------------------
+
+def coerce_number(text: str) -> int | float | None:
+    """
+    Parse a numeric cell: currency symbols/codes, thousands separators,
+    decimal commas, percentages and (parenthesised) or trailing-minus
+    negatives. Returns None if the cell isn't a number.
+    """
+    value = text.strip()
+    negative = False
+    if value.startswith("(") and value.endswith(")"):
+        negative, value = True, value[1:-1].strip()
+    if value[:1] in ("-", "−", "+"):
+        negative, value = value[0] != "+", value[1:].strip()
+    elif value.endswith("-"):
+        negative, value = True, value[:-1].strip()
+    value = _CURRENCY_AFFIX_RE.sub("", value, count=1)
+    value = _CURRENCY_AFFIX_RE.sub("", value, count=1)  # e.g. "$12.00 AUD"
+    if value[:1] in ("-", "−") and not negative:
+        negative, value = True, value[1:].strip()  # e.g. "$-12.00"
+
+    if _NUMBER_RE.fullmatch(value):
+        value = value.replace(",", "").replace(" ", "")
+    elif _DECIMAL_COMMA_RE.fullmatch(value):
+        value = value.replace(".", "").replace(",", ".")
+    else:
+        return None
+
+    number = float(value)
+    if negative:
+        number = -number
+    return int(number) if "." not in value and abs(number) < 2 ** 53 else number
+
+
+def coerce_date(text: str) -> str | None:
+    """Parse a cell holding exactly one date to YYYY-MM-DD, else None."""
+    value = text.strip()
+    dates = find_dates(value)
+    if len(dates) == 1 and dates[0][1] == 0 and dates[0][2] == len(value):
+        return dates[0][0]
+    return None
+
+
+def _column_type(cells: list[str]) -> tuple[str, list[Any]]:
+    """Infer a column's type from its non-empty cells and coerce them."""
+    filled = [cell for cell in cells if cell.strip()]
+    for kind, coerce in (("number", coerce_number), ("date", coerce_date)):
+        if filled and all(coerce(cell) is not None for cell in filled):
+            return kind, [coerce(cell) if cell.strip() else None for cell in cells]
+    return "text", [cell.strip() or None for cell in cells]
+
+
+# ----------------------------------------------------------------------
+# Tables
+# ----------------------------------------------------------------------
+
+def _detect_header_rows(grid: list[list[str]], marked: int) -> int:
+    """
+    Number of leading header rows. Marked-up headers (<thead>/<th>) win;
+    otherwise the first row is a header if it is mostly filled and holds
+    no numbers or dates (OCR often emits plain <td> headers).
+    """
+    if 0 < marked < len(grid):
+        return marked
+    if len(grid) < 2:
+        return 0
+    first = [cell for cell in grid[0] if cell.strip()]
+    if len(first) * 2 < len(grid[0]):
+        return 0
+    if any(coerce_number(cell) is not None or coerce_date(cell) is not None for cell in first):
+        return 0
+    return 1
+
+
+def _header_names(rows: list[list[str]], width: int) -> list[str]:
+    """Column names from header rows; merged header cells repeat, so drop repeats."""
+    names = []
+    for col in range(width):
+        parts: list[str] = []
+        for row in rows:
+            cell = row[col].strip()
+            if cell and (not parts or parts[-1] != cell):
+                parts.append(cell)
+        names.append(" / ".join(parts))
+    return names
+
+
+def _unique_keys(names: list[str]) -> list[str]:
+    keys: list[str] = []
+    for i, name in enumerate(names):
+        key = header_key(name) or f"column_{i + 1}"
+        base, n = key, 2
+        while key in keys:
+            key, n = f"{base}_{n}", n + 1
+        keys.append(key)
+    return keys
+
+
+def parse_table(html: str, table_id: str, page: int | None = None) -> ParsedTable | None:
+    """Parse one HTML table into a typed columnar table (None if it has no cells)."""
+    grid, marked = parse_html_grid(html)
+    grid = [row for row in grid if any(cell.strip() for cell in row)]
+    if not grid or not grid[0]:
+        return None
+
+    width = len(grid[0])
+    header_count = _detect_header_rows(grid, marked)
+    names = _header_names(grid[:header_count], width)
+    body = grid[header_count:]
+    truncated = len(body) > MAX_TABLE_ROWS
+    body = body[:MAX_TABLE_ROWS]
+
+    columns: list[TableColumn] = []
+    for col, (name, key) in enumerate(zip(names, _unique_keys(names))):
+        kind, values = _column_type([row[col] for row in body])
+        columns.append({"name": name or key, "key": key, "type": kind, "values": values})
+
+    return {
+        "id": table_id,
+        "page": page,
+        "columns": columns,
+        "row_count": len(body),
+        "truncated": truncated,
+    }
+
+
+def parse_ocr_tables(page_tables: list[dict[str, str]] | None) -> list[ParsedTable] | None:
+    """
+    Parse every OCR table, in page order.
+
+    Args:
+        page_tables: Per-page mapping of table id → HTML (OCRResult.page_tables)
+
+    Returns:
+        Parsed tables, or None if the document has none (matches html_tables)
+    """
+    tables = [
+        parsed
+        for page_index, page_map in enumerate(page_tables or [])
+        for table_id, html in page_map.items()
+        if (parsed := parse_table(html, table_id, page_index + 1)) is not None
+    ]
+    return tables or None
+
+
+def parse_legacy_tables(html_tables: list[str] | None) -> list[ParsedTable]:
+    """Parse ocr_results.html_tables of documents OCR'd before parsed_tables existed."""
+    return [
+        parsed
+        for i, html in enumerate(html_tables or [])
+        if (parsed := parse_table(html, f"tbl-{i}")) is not None
+    ]
+
+
+def table_rows(table: ParsedTable) -> list[dict[str, Any]]:
+    """A parsed table's rows as {column key: value} dicts."""
+    keys = [column["key"] for column in table["columns"]]
+    return [dict(zip(keys, values)) for values in zip(*(column["values"] for column in table["columns"]))]
+
+
+# ----------------------------------------------------------------------
+# Querying
+# ----------------------------------------------------------------------
+
+FILTER_OPS = ("eq", "ne", "contains", "gt", "gte", "lt", "lte", "empty", "not_empty")
+
+
+def _filter_value(column: TableColumn, op: str, value: Any) -> Any:
+    """Coerce a filter value to the column's type (text compares case-insensitively)."""
+    if op in ("empty", "not_empty"):
+        return None
+    if op == "contains" or column["type"] == "text":
+        return str(value).strip().casefold()
+    if column["type"] == "number":
+        number = value if isinstance(value, (int, float)) else coerce_number(str(value))
+        if number is None:
+            raise ValueError(f"'{column['key']}' is a number column; {value!r} is not a number")
+        return number
+    iso = coerce_date(str(value))
+    if iso is None:
+        raise ValueError(f"'{column['key']}' is a date column; {value!r} is not a date")
+    return iso
+
+
+def _matches(cell: Any, op: str, value: Any) -> bool:
+    if op == "empty":
+        return cell is None
+    if op == "not_empty":
+        return cell is not None
+    if cell is None:
+        return op == "ne"
+    if isinstance(value, str):
+        cell = str(cell).casefold()
+    if op == "contains":
+        return value in cell
+    if op == "eq":
+        return cell == value
+    if op == "ne":
+        return cell != value
+    if op == "gt":
+        return cell > value
+    if op == "gte":
+        return cell >= value
+    if op == "lt":
+        return cell < value
+    return cell <= value
+
+
+def query_table(
+    table: ParsedTable,
+    columns: list[str] | None = None,
+    where: list[dict[str, Any]] | None = None,
+    offset: int = 0,
+    limit: int = 100,
+    sum_columns: list[str] | None = None,
+) -> dict[str, Any]:
+    """
+    Filter, project and page a parsed table's rows.
+
+    Args:
+        table: Parsed table
+        columns: Column keys to return (default: all)
+        where: Filters [{"column": key, "op": FILTER_OPS, "value": ...}], all must match
+        offset: Matching rows to skip
+        limit: Max rows to return
+        sum_columns: Number columns to total over all matching rows
+
+    Returns:
+        {"rows": [...], "matched": n, "offset": offset} plus "sums" when requested
+
+    Raises:
+        ValueError: Unknown column or op, or a filter value the column can't hold
+    """
+    by_key = {column["key"]: column for column in table["columns"]}
+    for key in [*(columns or []), *(sum_columns or []), *(f.get("column") for f in where or [])]:
+        if key not in by_key:
+            raise ValueError(f"Unknown column {key!r}. Columns are: {list(by_key)}")
+
+    filters = []
+    for f in where or []:
+        op = f.get("op") or "eq"
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unknown op {op!r}. Ops are: {list(FILTER_OPS)}")
+        column = by_key[f["column"]]
+        if op in ("gt", "gte", "lt", "lte") and column["type"] == "text":
+            raise ValueError(f"'{column['key']}' is a text column; use eq, ne or contains")
+        filters.append((f["column"], op, _filter_value(column, op, f.get("value"))))
+    for key in sum_columns or []:
+        if by_key[key]["type"] != "number":
+            raise ValueError(f"Can only sum number columns; '{key}' is {by_key[key]['type']}")
+
+    matched = [
+        row for row in table_rows(table)
+        if all(_matches(row[key], op, value) for key, op, value in filters)
+    ]
+    result: dict[str, Any] = {
+        "rows": [
+            {key: row[key] for key in columns} if columns else row
+            for row in matched[offset:offset + limit]
+        ],
+        "matched": len(matched),
+        "offset": offset,
+    }
+    if sum_columns:
+        result["sums"] = {
+            key: round(sum(row[key] for row in matched if row[key] is not None), 6)
+            for key in sum_columns
+        }
+    return result
+
+
+def describe_table(table: ParsedTable, index: int, sample_rows: int = 3) -> dict[str, Any]:
+    """Summary of a table for listings: position, columns with types and a few rows."""
+    return {
+        "table": index,
+        "page": table["page"],
+        "rows": table["row_count"],
+        "truncated": table["truncated"],
+        "columns": [
+            {"key": column["key"], "name": column["name"], "type": column["type"]}
+            for column in table["columns"]
+        ],
+        "sample": table_rows(table)[:sample_rows],
+    }
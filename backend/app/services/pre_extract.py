@@ -0,0 +1,389 @@
+"""
+Deterministic pre-extraction of common fields from OCR text.
+
+Runs at OCR time with regexes and table parsing - no model calls.
+Finds candidate dates, totals/subtotals/tax, currency, invoice numbers,
+ABN and VAT IDs, emails, and line items from OCR tables. Each candidate
+carries its page, character offset in that page's compact text and a
+confidence.
+
+The extraction agent receives the best candidates as hints. For simple
+document types with every required field found confidently, the agent
+can be skipped altogether (see Settings.PRE_EXTRACTION_SKIP_AGENT_TYPES).
+"""
+
+import re
+from datetime import date
+from typing import Any, TypedDict
+
+from ..database import get_supabase_client
+from .html_tables import parse_html_table
+
+# Minimum confidence for a candidate to count toward skipping the agent
+SKIP_AGENT_MIN_CONFIDENCE = 0.9
+
+# Fields that must all be present (and confident) to skip the agent
+REQUIRED_FIELDS: dict[str, tuple[str, ...]] = {
+    "receipt": ("date", "total"),
+    "invoice": ("invoice_number", "date", "total"),
+}
+
+MAX_LINE_ITEMS = 200
+
+# extractions.model for results saved without an agent run
+PRE_EXTRACT_MODEL = "pre-extract"
+
+
+class Candidate(TypedDict):
+    """One pre-extracted field value."""
+    field: str
+    value: Any
+    text: str  # Matched source text
+    page: int  # 1-based
+    offset: int  # Character offset in the page's compact text
+    confidence: float
+
+
+class PreExtraction(TypedDict):
+    """Pre-extraction result stored in ocr_results.pre_extracted."""
+    document_type: str | None
+    candidates: list[Candidate]
+    line_items: list[dict[str, str]]
+    line_items_page: int | None
+
+
+# ----------------------------------------------------------------------
+# Patterns
+# ----------------------------------------------------------------------
+
+_MONTHS = {
+    m: i + 1 for i, m in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+    )
+}
+_MONTH_RE = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+
+_DATE_PATTERNS = [
+    ("iso", re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")),
+    ("numeric", re.compile(r"\b(\d{1,2})[/.](\d{1,2})[/.](\d{4}|\d{2})\b")),
+    ("day_month", re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+{_MONTH_RE},?\s+(\d{{4}})\b", re.I)),
+    ("month_day", re.compile(rf"\b{_MONTH_RE}\s+(\d{{1,2}})(?:st|nd|rd|th)?,?\s+(\d{{4}})\b", re.I)),
+]
+
+_CURRENCY_SYMBOLS = {"$": None, "€": "EUR", "£": "GBP", "¥": "JPY"}
+_CURRENCY_CODES = ("AUD", "USD", "EUR", "GBP", "NZD", "CAD", "SGD", "JPY", "CHF")
+_AMOUNT_RE = re.compile(
+    r"(?P<cur>[$€£¥]|\b(?:" + "|".join(_CURRENCY_CODES) + r")\b)?\s?"
+    r"(?P<num>-?\d{1,3}(?:,\d{3})+(?:\.\d{2})?|-?\d+\.\d{2})\b"
+)
+
+# Label → (field, confidence); first match wins, so specific labels go first
+_AMOUNT_LABELS = [
+    (re.compile(r"\b(amount|balance|total)\s+(due|payable)\b", re.I), "total", 0.95),
+    (re.compile(r"\bsub[\s-]?total\b", re.I), "subtotal", 0.9),
+    (re.compile(r"\btotal\s+(gst|vat|tax)\b", re.I), "tax", 0.85),
+    (re.compile(r"\btotal\b", re.I), "total", 0.9),  # Incl. "Total (incl. GST)"
+    (re.compile(r"\b(gst|vat|tax)\b", re.I), "tax", 0.85),
+]
+
+_DATE_LABELS = [
+    (re.compile(r"\bdue\s+date\b|\bdue\b", re.I), "due_date"),
+    (re.compile(r"\b(invoice|issue|receipt|transaction)?\s*date\b", re.I), "date"),
+]
+
+_INVOICE_NO_RE = re.compile(
+    r"\b(?:tax\s+)?invoice\s*(?:no\.?|number|num|#)?\s*[:#]?\s*(?P<value>[A-Z0-9][A-Z0-9\-/]{2,})",
+    re.I,
+)
+_ABN_RE = re.compile(r"\bA\.?B\.?N\.?[:\s]*(?P<value>(?:\d\s?){10}\d)\b")
+_VAT_RE = re.compile(
+    r"\b(?:VAT|VAT\s+(?:Reg(?:istration)?\.?\s+)?(?:No\.?|Number|ID))[:\s#]*(?P<value>[A-Z]{2}\s?[0-9A-Z]{8,12})\b"
+)
+_EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+
+_LINE_ITEM_DESC = ("description", "item", "product", "service", "details")
+_LINE_ITEM_AMOUNT = ("amount", "total", "price", "cost", "line total")
+
+
+# ----------------------------------------------------------------------
+# Value parsing
+# ----------------------------------------------------------------------
+
+def _parse_amount(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def _safe_date(year: int, month: int, day: int) -> date | None:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _parse_date(kind: str, groups: tuple[str, ...]) -> tuple[date | None, float]:
+    """Parse date groups; returns (date, confidence). Ambiguous numeric dates score lower."""
+    if kind == "iso":
+        return _safe_date(int(groups[0]), int(groups[1]), int(groups[2])), 0.95
+    if kind == "day_month":
+        return _safe_date(int(groups[2]), _MONTHS[groups[1][:3].lower()], int(groups[0])), 0.95
+    if kind == "month_day":
+        return _safe_date(int(groups[2]), _MONTHS[groups[0][:3].lower()], int(groups[1])), 0.95
+
+    first, second, year = int(groups[0]), int(groups[1]), int(groups[2])
+    if year < 100:
+        year += 2000
+    if first > 12:
+        return _safe_date(year, second, first), 0.9  # Unambiguous day-first
+    if second > 12:
+        return _safe_date(year, first, second), 0.9  # Unambiguous month-first
+    return _safe_date(year, second, first), 0.7  # Ambiguous: assume day-first
+
+
+def is_valid_abn(digits: str) -> bool:
+    """Australian Business Number checksum."""
+    if len(digits) != 11 or not digits.isdigit():
+        return False
+    weights = (10, 1, 3, 5, 7, 9, 11, 13, 15, 17, 19)
+    values = [int(d) for d in digits]
+    values[0] -= 1
+    return sum(w * v for w, v in zip(weights, values)) % 89 == 0
+
+
+def find_dates(text: str) -> list[tuple[str, int, int, float]]:
+    """All parseable dates in text as (iso_date, start, end, confidence)."""
+    found = []
+    for kind, pattern in _DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            parsed, confidence = _parse_date(kind, match.groups())
+            if parsed is not None:
+                found.append((parsed.isoformat(), match.start(), match.end(), confidence))
+    return sorted(found, key=lambda d: d[1])
+
+
+def _is_date(text: str) -> bool:
+    """True if the whole of text parses as a date."""
+    return any(start == 0 and end == len(text) for _, start, end, _ in find_dates(text))
+
+
+def find_amounts(text: str) -> list[tuple[float, int, int]]:
+    """All money-like amounts in text as (value, start, end)."""
+    return [
+        (_parse_amount(match.group("num")), match.start("num"), match.end("num"))
+        for match in _AMOUNT_RE.finditer(text)
+    ]
+
+
+# ----------------------------------------------------------------------
+# Extractors
+# ----------------------------------------------------------------------
+
+def _candidate(field: str, value: Any, text: str, page: int, offset: int, confidence: float) -> Candidate:
+    return {
+        "field": field,
+        "value": value,
+        "text": text,
+        "page": page,
+        "offset": offset,
+        "confidence": confidence,
+    }
+
+
+def _extract_line(line: str, page: int, offset: int) -> list[Candidate]:
+    """Candidates from a single line of text."""
+    found: list[Candidate] = []
+
+    # Labelled amounts: the last amount on the line is the value
+    for label_re, field, confidence in _AMOUNT_LABELS:
+        if label_re.search(line):
+            amounts = list(_AMOUNT_RE.finditer(line))
+            if amounts:
+                match = amounts[-1]
+                found.append(_candidate(
+                    field, _parse_amount(match.group("num")), match.group(0).strip(),
+                    page, offset + match.start(), confidence,
+                ))
+                if cur := match.group("cur"):
+                    code = _CURRENCY_SYMBOLS.get(cur, cur.upper())
+                    if code:
+                        found.append(_candidate("currency", code, cur, page, offset + match.start(), 0.9))
+            break
+
+    # Dates: labelled dates take the label's field, others are plain "date" at lower confidence
+    label_field = next((field for label_re, field in _DATE_LABELS if label_re.search(line)), None)
+    for iso_date, start, end, confidence in find_dates(line):
+        found.append(_candidate(
+            label_field or "date", iso_date, line[start:end],
+            page, offset + start, confidence if label_field else confidence - 0.3,
+        ))
+
+    for match in _INVOICE_NO_RE.finditer(line):
+        value = match.group("value")
+        # "Invoice 12/03/2024" is the invoice date, not its number
+        if any(c.isdigit() for c in value) and not _is_date(value):
+            found.append(_candidate(
+                "invoice_number", value, match.group(0), page, offset + match.start("value"), 0.9,
+            ))
+            break
+
+    if match := _ABN_RE.search(line):
+        digits = re.sub(r"\s", "", match.group("value"))
+        found.append(_candidate(
+            "abn", digits, match.group(0), page, offset + match.start("value"),
+            0.99 if is_valid_abn(digits) else 0.5,
+        ))
+
+    if match := _VAT_RE.search(line):
+        found.append(_candidate(
+            "vat_id", match.group("value").replace(" ", ""), match.group(0),
+            page, offset + match.start("value"), 0.9,
+        ))
+
+    for match in _EMAIL_RE.finditer(line):
+        found.append(_candidate("email", match.group(0), match.group(0), page, offset + match.start(), 0.95))
+
+    return found
+
+
+def _detect_document_type(page_texts: list[str]) -> str | None:
+    head = "\n".join(page_texts[:2]).lower()
+    if "invoice" in head:
+        return "invoice"
+    if "receipt" in head:
+        return "receipt"
+    return None
+
+
+def header_key(cell: str) -> str:
+    """Normalize a table header cell to a snake_case key."""
+    return re.sub(r"[^a-z0-9]+", "_", cell.strip().lower()).strip("_")
+
+
+def extract_line_items(page_tables: list[dict[str, str]]) -> tuple[list[dict[str, str]], int | None]:
+    """
+    Rows of the first table whose header looks like a line-item table
+    (has a description column and an amount column). Returns (rows, page).
+    """
+    for page_index, tables in enumerate(page_tables):
+        for html in tables.values():
+            grid = parse_html_table(html)
+            if len(grid) < 2:
+                continue
+            header = [header_key(cell) for cell in grid[0]]
+            if not any(any(word in key for word in _LINE_ITEM_DESC) for key in header):
+                continue
+            if not any(any(word.replace(" ", "_") in key for word in _LINE_ITEM_AMOUNT) for key in header):
+                continue
+
+            rows = []
+            for row in grid[1:MAX_LINE_ITEMS + 1]:
+                if not any(row):
+                    continue
+                # Stop at the totals block that often ends the table
+                if any(label_re.search(" ".join(row)) for label_re, _, _ in _AMOUNT_LABELS) and not row[0].strip():
+                    break
+                rows.append({key or f"column_{i}": cell for i, (key, cell) in enumerate(zip(header, row))})
+            if rows:
+                return rows, page_index + 1
+    return [], None
+
+
+def pre_extract(page_texts: list[str], page_tables: list[dict[str, str]] | None = None) -> PreExtraction:
+    """Run all deterministic extractors over compact page texts and tables."""
+    candidates: list[Candidate] = []
+    for page_index, text in enumerate(page_texts):
+        offset = 0
+        for line in text.split("\n"):
+            candidates.extend(_extract_line(line, page_index + 1, offset))
+            offset += len(line) + 1
+
+    line_items, line_items_page = extract_line_items(page_tables or [])
+    return {
+        "document_type": _detect_document_type(page_texts),
+        "candidates": candidates,
+        "line_items": line_items,
+        "line_items_page": line_items_page,
+    }
+
+
+# ----------------------------------------------------------------------
+# Consumers
+# ----------------------------------------------------------------------
+
+def best_candidates(result: PreExtraction) -> dict[str, Candidate]:
+    """
+    Highest-confidence candidate per field. Ties go to the later match for
+    totals (summary blocks sit at the end) and the earlier match otherwise.
+    """
+    best: dict[str, Candidate] = {}
+    for candidate in result["candidates"]:
+        current = best.get(candidate["field"])
+        prefer_later = candidate["field"] in ("total", "subtotal", "tax")
+        if (
+            current is None
+            or candidate["confidence"] > current["confidence"]
+            or (prefer_later and candidate["confidence"] == current["confidence"])
+        ):
+            best[candidate["field"]] = candidate
+    return best
+
+
+def format_hints(result: PreExtraction) -> str:
+    """Candidates as a short prompt section for the extraction agent."""
+    best = best_candidates(result)
+    if not best and not result["line_items"]:
+        return ""
+
+    lines = ["Pre-extracted candidates (found by pattern matching - verify before using):"]
+    if result["document_type"]:
+        lines.append(f"- document type: {result['document_type']}")
+    for field, candidate in sorted(best.items()):
+        lines.append(
+            f"- {field}: {candidate['value']} "
+            f"(page {candidate['page']}, \"{candidate['text']}\", confidence {candidate['confidence']:.2f})"
+        )
+    if result["line_items"]:
+        lines.append(
+            f"- line_items: table with {len(result['line_items'])} rows on page "
+            f"{result['line_items_page']} (columns: {', '.join(result['line_items'][0])})"
+        )
+    return "\n".join(lines)
+
+
+def agent_skippable(result: PreExtraction, allowed_types: set[str]) -> bool:
+    """True if the document type is allowed and every required field was found confidently."""
+    document_type = result["document_type"]
+    if document_type not in allowed_types or document_type not in REQUIRED_FIELDS:
+        return False
+    best = best_candidates(result)
+    return all(
+        field in best and best[field]["confidence"] >= SKIP_AGENT_MIN_CONFIDENCE
+        for field in REQUIRED_FIELDS[document_type]
+    )
+
+
+def to_extraction(result: PreExtraction) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Build (extracted_fields, confidence_scores) from the best candidates."""
+    fields: dict[str, Any] = {}
+    confidences: dict[str, Any] = {}
+    if result["document_type"]:
+        fields["document_type"] = result["document_type"]
+        confidences["document_type"] = 0.9
+    for field, candidate in best_candidates(result).items():
+        fields[field] = candidate["value"]
+        confidences[field] = candidate["confidence"]
+    if result["line_items"]:
+        fields["line_items"] = result["line_items"]
+        confidences["line_items"] = 0.85
+    return fields, confidences
+
+
+async def get_pre_extraction(document_id: str, user_id: str) -> PreExtraction | None:
+    """Load the stored pre-extraction for a document (None for older OCR rows)."""
+    db = get_supabase_client()
+    result = db.table("ocr_results") \
+        .select("pre_extracted") \
+        .eq("document_id", document_id) \
+        .eq("user_id", user_id) \
+        .limit(1) \
+        .execute()
+    return result.data[0].get("pre_extracted") if result.data else None
@@ -0,0 +1,336 @@
+"""
+Client-side rate limiting for model providers (Anthropic, Mistral).
+
+One limiter per provider, shared by every call in the process:
+- token buckets on requests per minute and tokens per minute
+- AIMD concurrency: +1/limit per success, halved on a 429
+- retry-after honored: a 429 pauses all admissions until it expires
+- background calls (speculative work) yield to interactive ones: they wait
+  while any interactive call is waiting, and hold at most
+  BACKGROUND_CONCURRENCY_SHARE of the concurrency limit
+
+Usage:
+    limiter = get_limiter("mistral")
+    response = await limiter.call(lambda: client.ocr.process_async(...))
+
+    async with get_limiter("anthropic").slot(tokens=estimate) as slot:
+        ...  # agent run
+        slot.settle(actual_tokens, requests=turns)  # An agent run is one request per turn
+"""
+
+import asyncio
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
+import anthropic
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Pause after a 429 that carries no retry-after header
+DEFAULT_RETRY_AFTER_SECONDS = 2.0
+
+# Concurrent 429s within this window count as one congestion signal
+DECREASE_WINDOW_SECONDS = 1.0
+
+# Tokens charged up front for one agent run (settled to actual usage after)
+AGENT_RUN_TOKEN_ESTIMATE = 20_000
+
+# How often a waiter re-checks when blocked on concurrency
+CONCURRENCY_POLL_SECONDS = 1.0
+
+# Share of the concurrency limit background calls may hold (the rest is kept
+# free for interactive calls; a limit cut below 2 admits no background calls)
+BACKGROUND_CONCURRENCY_SHARE = 0.5
+
+# Rate-limit wording (Anthropic error types included) for errors that carry
+# no status code, matched as whole words
+RATE_LIMIT_TEXT = re.compile(r"\b(rate[ _]limit(ed|_error)?|overloaded(_error)?)\b", re.IGNORECASE)
+
+
+def rate_limit_retry_after(error: BaseException) -> float | None:
+    """
+    Classify an exception as a provider rate limit.
+
+    Classified by status code (429, or Anthropic's 529 overloaded) - both
+    the Anthropic and Mistral SDK errors carry one - or by type
+    (anthropic.RateLimitError). Only errors without a status code fall
+    back to their text, so e.g. a 400 naming a document "429" is not a
+    rate limit.
+
+    Returns seconds to wait (0.0 if the provider gave no hint), or None if
+    the error is not a rate limit / overload.
+    """
+    response = getattr(error, "response", None) or getattr(error, "raw_response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+
+    if isinstance(error, anthropic.RateLimitError):
+        limited = True
+    elif isinstance(status, int):
+        limited = status in (429, 529)
+    else:
+        limited = RATE_LIMIT_TEXT.search(str(error)) is not None
+    if not limited:
+        return None
+
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after", 0) or 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _Bucket:
+    """Token bucket refilled continuously at capacity per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until amount is available (amount is capped at capacity)."""
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+
+class ProviderLimiter:
+    """Admission control for one provider's API."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+    ):
+        """
+        Args:
+            name: Provider name (for logs)
+            requests_per_minute: Request budget (0 = unlimited)
+            tokens_per_minute: Token budget (0 = unlimited)
+            max_concurrency: Ceiling for the adaptive concurrency limit
+            min_concurrency: Floor the limit never drops below
+        """
+        self.name = name
+        self.requests = _Bucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = _Bucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.background_in_flight = 0
+        self._interactive_waiting = 0
+        self.blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    def _admission_delay(self, tokens: float, now: float, background: bool = False) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= max(self.min_concurrency, int(self.limit)):
+            return CONCURRENCY_POLL_SECONDS  # Woken early by release()
+        if background and (
+            self._interactive_waiting
+            or self.background_in_flight >= int(self.limit * BACKGROUND_CONCURRENCY_SHARE)
+        ):
+            return CONCURRENCY_POLL_SECONDS  # Woken early by release() / admissions
+        delay = 0.0
+        if self.requests:
+            self.requests.refill(now)
+            delay = max(delay, self.requests.delay(1))
+        if self.tokens and tokens:
+            self.tokens.refill(now)
+            delay = max(delay, self.tokens.delay(tokens))
+        return delay
+
+    async def acquire(self, tokens: float = 0, background: bool = False) -> None:
+        """
+        Wait for a request slot and token budget.
+
+        Background calls are only admitted while no interactive call is
+        waiting, within their share of the concurrency limit.
+        """
+        async with self._cond:
+            if not background:
+                self._interactive_waiting += 1
+            try:
+                while (delay := self._admission_delay(tokens, time.monotonic(), background)) > 0:
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                if not background:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()  # Background waiters may go now
+            self.in_flight += 1
+            if background:
+                self.background_in_flight += 1
+            if self.requests:
+                self.requests.level -= 1
+            if self.tokens:
+                self.tokens.level -= tokens
+
+    async def release(self, background: bool = False) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            if background:
+                self.background_in_flight -= 1
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Feedback
+    # ------------------------------------------------------------------
+
+    def record_success(self) -> None:
+        """Additive increase: about +1 concurrency per window of successes."""
+        self.limit = min(float(self.max_concurrency), self.limit + 1.0 / max(self.limit, 1.0))
+
+    def record_rate_limit(self, retry_after: float | None = None) -> None:
+        """Multiplicative decrease, and pause admissions for retry-after."""
+        now = time.monotonic()
+        wait = retry_after or DEFAULT_RETRY_AFTER_SECONDS
+        self.blocked_until = max(self.blocked_until, now + wait)
+        if now - self._last_decrease >= DECREASE_WINDOW_SECONDS:
+            self.limit = max(float(self.min_concurrency), self.limit / 2)
+            self._last_decrease = now
+            logger.warning(
+                f"{self.name} rate limited: concurrency limit {self.limit:.1f}, pausing {wait:.1f}s"
+            )
+
+    def settle_tokens(self, estimated: float, actual: float) -> None:
+        """Correct the token bucket once a call's real usage is known."""
+        if self.tokens:
+            self.tokens.level -= actual - estimated
+
+    def settle_requests(self, charged: int, actual: int) -> None:
+        """Charge requests a call made beyond those charged at admission."""
+        if self.requests:
+            self.requests.level -= actual - charged
+
+    # ------------------------------------------------------------------
+    # Call helpers
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def slot(self, tokens: float = 0, background: bool = False) -> AsyncIterator["Slot"]:
+        """
+        Hold one admission for the duration of a call (background: see acquire()).
+
+        Exiting normally counts as a success unless slot.rate_limited() was
+        called; a rate-limit exception is recorded and re-raised.
+        """
+        await self.acquire(tokens, background)
+        slot = Slot(self, tokens)
+        try:
+            yield slot
+        except BaseException as e:
+            retry_after = rate_limit_retry_after(e)
+            if retry_after is not None:
+                self.record_rate_limit(retry_after)
+            raise
+        else:
+            if slot.limited:
+                self.record_rate_limit(slot.retry_after)
+            else:
+                self.record_success()
+        finally:
+            await self.release(background)
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        tokens: float = 0,
+        max_attempts: int = 3,
+    ) -> T:
+        """Run fn under the limiter, retrying rate-limited attempts after retry-after."""
+        for attempt in range(1, max_attempts + 1):
+            try:
+                async with self.slot(tokens):
+                    return await fn()
+            except Exception as e:
+                if rate_limit_retry_after(e) is None or attempt == max_attempts:
+                    raise
+                logger.info(f"{self.name} call rate limited (attempt {attempt}/{max_attempts}), retrying")
+        raise AssertionError("unreachable")
+
+
+class Slot:
+    """Handle for one admitted call."""
+
+    def __init__(self, limiter: ProviderLimiter, tokens: float):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.requests = 1
+        self.limited = False
+        self.retry_after: float | None = None
+
+    def rate_limited(self, retry_after: float | None = None) -> None:
+        """Report a rate limit the call absorbed (e.g. retried internally)."""
+        self.limited = True
+        self.retry_after = retry_after
+
+    def settle(self, actual_tokens: float, requests: int = 1) -> None:
+        """
+        Charge the real token usage instead of the estimate, and the real
+        number of API requests (admission charges one; agent runs make one
+        per turn).
+        """
+        self.limiter.settle_tokens(self.tokens, actual_tokens)
+        self.tokens = actual_tokens
+        self.limiter.settle_requests(self.requests, requests)
+        self.requests = requests
+
+
+# Lazy per-provider limiters
+_limiters: dict[str, ProviderLimiter] = {}
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """Get or create the shared limiter for "anthropic" or "mistral"."""
+    if provider not in _limiters:
+        settings = get_settings()
+        if provider == "anthropic":
+            _limiters[provider] = ProviderLimiter(
+                "anthropic",
+                requests_per_minute=settings.ANTHROPIC_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.ANTHROPIC_TOKENS_PER_MINUTE,
+                max_concurrency=settings.ANTHROPIC_MAX_CONCURRENCY,
+            )
+        elif provider == "mistral":
+            _limiters[provider] = ProviderLimiter(
+                "mistral",
+                requests_per_minute=settings.MISTRAL_REQUESTS_PER_MINUTE,
+                max_concurrency=settings.MISTRAL_MAX_CONCURRENCY,
+            )
+        else:
+            raise ValueError(f"Unknown provider: {provider}")
+    return _limiters[provider]
+
+
+def usage_tokens(usage: dict[str, Any] | None) -> int:
+    """Input + output tokens from an Anthropic usage dict (what counts toward TPM)."""
+    usage = usage or {}
+    return (
+        usage.get("input_tokens", 0)
+        + usage.get("cache_creation_input_tokens", 0)
+        + usage.get("output_tokens", 0)
+    )
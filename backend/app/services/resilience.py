@@ -0,0 +1,159 @@
+"""
+Resilience helpers for calls to external providers.
+
+- is_transient() - classify errors worth retrying (timeouts, 5xx, 429)
+- backoff_delay() - full-jitter exponential backoff
+- LatencyTracker - rolling latency percentiles (for hedging)
+- hedged() - start a second attempt when the first is slower than expected
+- CircuitBreaker - fail fast while a provider is down
+
+Usage:
+    breaker.check()                      # raises CircuitOpenError when open
+    result = await hedged(attempt, hedge_after_s)
+    breaker.record_success()
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+from .rate_limit import rate_limit_retry_after
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} unavailable (circuit open, retry in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for failures a retry can fix: timeouts, connection errors, 5xx, 408, 429."""
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException, httpx.TransportError)):
+        return True
+    if rate_limit_retry_after(error) is not None:
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and (status >= 500 or status == 408)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 20.0) -> float:
+    """Full-jitter backoff: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies."""
+
+    def __init__(self, window: int = 100, min_samples: int = 20):
+        self.samples: deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        """Latency at percentile p (0-1), or None until enough samples."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+async def hedged(fn: Callable[[], Awaitable[T]], hedge_after: float | None) -> T:
+    """
+    Run fn, starting a second copy if the first hasn't finished after
+    hedge_after seconds. Returns the first success and cancels the other.
+
+    A failure before the hedge starts is raised immediately (retries are the
+    caller's job); once both are running, the call fails only if both do.
+    """
+    if not hedge_after:
+        return await fn()
+
+    first = asyncio.ensure_future(fn())
+    done, _ = await asyncio.wait({first}, timeout=hedge_after)
+    if done:
+        return first.result()
+
+    logger.info(f"Hedging request after {hedge_after:.1f}s")
+    pending = {first, asyncio.ensure_future(fn())}
+    error: BaseException | None = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        assert error is not None
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive transient failures.
+    Open -> half-open after reset_seconds, letting one probe call through;
+    the probe's outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.retry_in() == 0 else "open"
+
+    def retry_in(self) -> float:
+        """Seconds until the circuit lets a probe through (0 if it would now)."""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may proceed."""
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            raise CircuitOpenError(self.name, self.retry_in() or self.reset_seconds)
+        if state == "half_open":
+            self._probing = True
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info(f"{self.name} circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probing:
+                logger.warning(f"{self.name} circuit open after {self.failures} failures")
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """End a half-open probe that was neither a success nor a provider failure."""
+        self._probing = False
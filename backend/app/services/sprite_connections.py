@@ -0,0 +1,261 @@
+"""
+Multiplexed persistent connections to stack sprites.
+
+Opening a connection to a sprite's server costs ~1s (TCP proxy + WebSocket
+handshake), and the connection dies whenever the sprite sleeps. Instead of
+one connection per agent request, each active sprite gets one long-lived
+SpriteChannel that many concurrent requests share:
+
+- Requests are protocol messages ({type, id, timestamp, payload}); the
+  sprite's responses carry request_id, so a reader task routes each one to
+  the request that's waiting for it
+- While requests are in flight the channel pings the sprite (keepalive)
+  so it can't auto-sleep mid-request
+- A dropped connection (sprite slept, network blip), or a channel idle for
+  longer than the auto-sleep timeout, is re-established on demand: the
+  sprite is woken, the connection reopened with backoff, and every request
+  without a final response is replayed with its original id (the server
+  can use it to deduplicate)
+
+Usage:
+    channel = get_channel(sprite_name)
+    async for message in channel.request("mission", {"text": "..."}):
+        ...  # agent_event / canvas_update / status messages for this request
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from ..config import get_settings
+from .resilience import backoff_delay
+from .sprite_pool import prewake_sprite
+from .sprites import SPRITE_AUTO_SLEEP_SECONDS, SpriteConnection, SpritesAPI, get_sprites_api
+
+logger = logging.getLogger(__name__)
+
+# Connection attempts per reconnect (sprite wake + proxy connect each)
+RECONNECT_ATTEMPTS = 5
+
+
+class SpriteChannelError(ConnectionError):
+    """The sprite couldn't be reached after RECONNECT_ATTEMPTS; pending requests fail."""
+
+
+def is_final(message: dict[str, Any]) -> bool:
+    """True for the message that ends a request (agent complete/error, system error)."""
+    payload = message.get("payload") or {}
+    if message.get("type") == "agent_event":
+        return payload.get("event_type") in ("complete", "error")
+    return message.get("type") == "system" and payload.get("event") == "error"
+
+
+@dataclass
+class _Pending:
+    """A request waiting for its final response."""
+    message: dict[str, Any]
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    sent_on: SpriteConnection | None = None  # Connection it was last sent (or replayed) on
+
+
+class SpriteChannel:
+    """One shared connection to a sprite's server, multiplexed by request id."""
+
+    def __init__(
+        self,
+        sprite: str,
+        api: SpritesAPI,
+        keepalive_seconds: float,
+        idle_seconds: float = SPRITE_AUTO_SLEEP_SECONDS,
+        reconnect_base_seconds: float = 0.5,
+    ):
+        self.sprite = sprite
+        self.api = api
+        self.keepalive_seconds = keepalive_seconds
+        self.idle_seconds = idle_seconds
+        self.reconnect_base_seconds = reconnect_base_seconds
+        self.pending: dict[str, _Pending] = {}
+        self.connection: SpriteConnection | None = None
+        self.last_activity = 0.0
+        self._lock = asyncio.Lock()  # One (re)connect at a time
+        self._reader: asyncio.Task | None = None
+        self._keepalive: asyncio.Task | None = None
+
+    async def request(self, type: str, payload: dict[str, Any]) -> AsyncIterator[dict[str, Any]]:
+        """
+        Send a message and yield the sprite's responses to it, ending with
+        the final one (see is_final).
+
+        Raises:
+            SpriteChannelError: The sprite stayed unreachable
+        """
+        message = {
+            "type": type,
+            "id": str(uuid.uuid4()),
+            "timestamp": int(time.time() * 1000),
+            "payload": payload,
+        }
+        pending = self.pending[message["id"]] = _Pending(message)
+        self._start_keepalive()
+        try:
+            await self._send(pending)
+            while True:
+                item = await pending.queue.get()
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                if is_final(item):
+                    return
+        finally:
+            self.pending.pop(message["id"], None)
+
+    async def _send(self, pending: _Pending) -> None:
+        connection = await self._ensure_connected()
+        if pending.sent_on is connection:
+            return  # Already sent by the (re)connect's replay
+        try:
+            await connection.send(json.dumps(pending.message))
+            pending.sent_on = connection
+            self.last_activity = time.monotonic()
+        except ConnectionError as e:
+            # The reader sees the same failure, reconnects and replays this request
+            logger.info(f"[{self.sprite}] Send failed ({e}); replaying after reconnect")
+            await self._reconnect(connection)
+
+    async def _ensure_connected(self) -> SpriteConnection:
+        connection = self.connection
+        in_flight = any(p.sent_on is connection for p in self.pending.values())
+        if connection is not None and not in_flight and time.monotonic() - self.last_activity > self.idle_seconds:
+            # Idle past the auto-sleep timeout: the sprite has most likely
+            # slept and taken the connection with it. Never while requests
+            # are in flight: keepalive holds the sprite awake, and a replay
+            # would run them twice
+            await self._reconnect(connection)
+            connection = self.connection
+        if connection is None:
+            await self._reconnect(None)
+            connection = self.connection
+        assert connection is not None
+        return connection
+
+    async def _reconnect(self, broken: SpriteConnection | None) -> None:
+        """
+        Replace `broken` (or open the first connection): wake the sprite,
+        connect with backoff, replay unfinished requests. A no-op if another
+        caller already replaced it.
+        """
+        async with self._lock:
+            if self.connection is not broken:
+                return
+            if broken is not None:
+                self.connection = None
+                await _close_quietly(broken)
+
+            for attempt in range(RECONNECT_ATTEMPTS):
+                await prewake_sprite(self.sprite, self.api)  # Any API call wakes it
+                try:
+                    connection = await self.api.connect(self.sprite)
+                    break
+                except Exception as e:
+                    logger.warning(f"[{self.sprite}] Connect attempt {attempt + 1} failed: {e}")
+                    await asyncio.sleep(backoff_delay(attempt, base=self.reconnect_base_seconds))
+            else:
+                error = SpriteChannelError(f"Sprite {self.sprite} unreachable")
+                for pending in list(self.pending.values()):
+                    pending.queue.put_nowait(error)
+                raise error
+
+            self.connection = connection
+            self.last_activity = time.monotonic()
+            self._reader = asyncio.create_task(self._read(connection))
+            if broken is not None:
+                logger.info(f"[{self.sprite}] Reconnected; replaying {len(self.pending)} requests")
+            for pending in list(self.pending.values()):
+                try:
+                    await connection.send(json.dumps(pending.message))
+                    pending.sent_on = connection
+                except ConnectionError:
+                    break  # Reader will reconnect and replay again
+
+    async def _read(self, connection: SpriteConnection) -> None:
+        """Route responses to their requests until the connection drops."""
+        try:
+            while True:
+                raw = await connection.recv()
+                self.last_activity = time.monotonic()
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    logger.warning(f"[{self.sprite}] Ignoring non-JSON message")
+                    continue
+                pending = self.pending.get(message.get("request_id") or "")
+                if pending is not None:
+                    pending.queue.put_nowait(message)
+                else:
+                    logger.debug(f"[{self.sprite}] Unrouted {message.get('type')} message")
+        except ConnectionError as e:
+            if self.connection is not connection:
+                return  # Already replaced
+            if not self.pending:
+                # Nothing waiting: reconnect lazily on the next request
+                logger.info(f"[{self.sprite}] Connection closed while idle ({e})")
+                self.connection = None
+                await _close_quietly(connection)
+                return
+            logger.info(f"[{self.sprite}] Connection lost with {len(self.pending)} pending ({e})")
+            try:
+                await self._reconnect(connection)
+            except SpriteChannelError:
+                pass  # Pending requests were failed
+
+    def _start_keepalive(self) -> None:
+        if self._keepalive is None or self._keepalive.done():
+            self._keepalive = asyncio.create_task(self._ping())
+
+    async def _ping(self) -> None:
+        """Keep the sprite awake while requests are in flight."""
+        while self.pending:
+            await asyncio.sleep(self.keepalive_seconds)
+            if self.pending and await prewake_sprite(self.sprite, self.api) is not None:
+                self.last_activity = time.monotonic()
+
+    async def close(self) -> None:
+        for task in (self._reader, self._keepalive):
+            if task is not None:
+                task.cancel()
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            await _close_quietly(connection)
+
+
+async def _close_quietly(connection: SpriteConnection) -> None:
+    try:
+        await connection.close()
+    except Exception:
+        pass
+
+
+# One channel per sprite, shared by every request in the process
+_channels: dict[str, SpriteChannel] = {}
+
+
+def get_channel(sprite: str, api: SpritesAPI | None = None) -> SpriteChannel:
+    """Get or create the shared channel for a sprite (connects on first request)."""
+    channel = _channels.get(sprite)
+    if channel is None:
+        channel = _channels[sprite] = SpriteChannel(
+            sprite, api or get_sprites_api(), get_settings().SPRITE_KEEPALIVE_SECONDS
+        )
+    return channel
+
+
+async def close_channels() -> None:
+    """Close every channel (shutdown)."""
+    channels = list(_channels.values())
+    _channels.clear()
+    for channel in channels:
+        await channel.close()
@@ -0,0 +1,214 @@
+"""
+Stack sprite lifecycle: warm pool, assignment and pre-wake.
+
+Bootstrapping a sprite takes 30-60s and a sleeping one takes 1-12s to
+wake, so neither should happen on a user's first agent interaction:
+
+- refill_pool() keeps Settings.SPRITE_POOL_SIZE bootstrapped sprites ready
+  (sprite_pool table); run at startup and after each claim
+- claim_sprite() gives a stack a pooled sprite and wakes it (fast path)
+- provision_stack_sprite() creates and bootstraps one when the pool is empty
+- prewake_sprite() wakes a stack's sprite when the user opens the stack
+
+Sprites in use are kept awake by their connection (see
+services/sprite_connections.py), which pings while requests are pending.
+
+Pool sprites get the slow environment setup (directories, venv, Python
+packages). No VERSION file is written, so the Bridge's lazy updater
+deploys the current source on first connection (see
+docs/ops/golden-checkpoint.md).
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from supabase import Client
+
+from ..config import get_settings
+from .sprites import SpriteNotFoundError, SpritesAPI, get_sprites_api
+
+logger = logging.getLogger(__name__)
+
+WORKSPACE_DIRS = ("documents", "ocr", "artifacts", "memory", "transcripts", "src")
+
+SPRITE_REQUIREMENTS = ("websockets", "aiosqlite", "anthropic", "claude-agent-sdk", "mistralai", "httpx")
+
+BOOTSTRAP_COMMANDS: tuple[list[str], ...] = (
+    ["mkdir", "-p", *(f"/workspace/{d}" for d in WORKSPACE_DIRS)],
+    ["sudo", "apt-get", "install", "-y", "python3-venv"],
+    ["python3", "-m", "venv", "/workspace/.venv"],
+)
+
+# One refill at a time per process
+_refill_lock = asyncio.Lock()
+
+# Stacks with a cold provision in flight (stack_id -> lock)
+_provision_locks: dict[str, asyncio.Lock] = {}
+
+
+class SpriteBootstrapError(RuntimeError):
+    """A bootstrap step exited non-zero."""
+
+
+async def bootstrap_sprite(api: SpritesAPI, sprite: str) -> None:
+    """Set up a new sprite's workspace, venv and Python packages."""
+    for cmd in BOOTSTRAP_COMMANDS:
+        if await api.run(sprite, cmd):
+            raise SpriteBootstrapError(f"{sprite}: {' '.join(cmd)} failed")
+    await api.write_file(sprite, "/workspace/requirements.txt", "\n".join(SPRITE_REQUIREMENTS) + "\n")
+    pip = ["/workspace/.venv/bin/pip", "install", "-r", "/workspace/requirements.txt"]
+    if await api.run(sprite, pip):
+        raise SpriteBootstrapError(f"{sprite}: pip install failed")
+
+
+async def _create_bootstrapped(api: SpritesAPI, sprite: str) -> None:
+    """Create and bootstrap a sprite; destroys it again if bootstrap fails."""
+    await api.create(sprite)
+    try:
+        await bootstrap_sprite(api, sprite)
+    except Exception:
+        await _destroy(api, sprite)
+        raise
+
+
+async def _destroy(api: SpritesAPI, sprite: str) -> None:
+    try:
+        await api.delete(sprite)
+    except SpriteNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to destroy sprite {sprite}: {e}")
+
+
+# ----------------------------------------------------------------------
+# Pool
+# ----------------------------------------------------------------------
+
+async def _provision_pool_sprite(db: Client, api: SpritesAPI, sprite: str) -> bool:
+    try:
+        await _create_bootstrapped(api, sprite)
+    except Exception as e:
+        logger.error(f"Pool sprite {sprite} failed to provision: {e}")
+        db.table("sprite_pool").delete().eq("name", sprite).execute()
+        return False
+
+    db.table("sprite_pool").update({
+        "status": "ready",
+        "ready_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("name", sprite).execute()
+    logger.info(f"Pool sprite {sprite} ready")
+    return True
+
+
+async def refill_pool(db: Client, api: SpritesAPI | None = None, size: int | None = None) -> int:
+    """
+    Provision sprites until the pool has `size` ready or provisioning.
+
+    Provisioning rows older than SPRITE_BOOTSTRAP_TIMEOUT_SECONDS (a process
+    died mid-bootstrap) are destroyed and replaced.
+
+    Returns:
+        Number of sprites that became ready
+    """
+    settings = get_settings()
+    api = api or get_sprites_api()
+    size = settings.SPRITE_POOL_SIZE if size is None else size
+
+    async with _refill_lock:
+        rows = db.table("sprite_pool").select("name, status, created_at").execute().data or []
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.SPRITE_BOOTSTRAP_TIMEOUT_SECONDS)
+        live = 0
+        for row in rows:
+            if row["status"] == "provisioning" and datetime.fromisoformat(row["created_at"]) < stale_before:
+                logger.warning(f"Pool sprite {row['name']} stuck provisioning; replacing it")
+                await _destroy(api, row["name"])
+                db.table("sprite_pool").delete().eq("name", row["name"]).execute()
+            else:
+                live += 1
+
+        missing = size - live
+        if missing <= 0:
+            return 0
+
+        names = [f"pool-{uuid.uuid4().hex[:12]}" for _ in range(missing)]
+        db.table("sprite_pool").insert([{"name": name, "status": "provisioning"} for name in names]).execute()
+        logger.info(f"Refilling sprite pool: provisioning {missing}")
+        results = await asyncio.gather(*(_provision_pool_sprite(db, api, name) for name in names))
+        return sum(results)
+
+
+async def prewake_sprite(sprite: str, api: SpritesAPI | None = None) -> str | None:
+    """
+    Wake a sprite ahead of use (any API call wakes it). Best effort.
+
+    Returns:
+        Status before the wake ("cold" means it was asleep), None on error
+    """
+    try:
+        return (await (api or get_sprites_api()).get(sprite))["status"]
+    except Exception as e:
+        logger.warning(f"Pre-wake failed for sprite {sprite}: {e}")
+        return None
+
+
+async def claim_sprite(db: Client, stack_id: str, user_id: str, api: SpritesAPI | None = None) -> str | None:
+    """
+    Assign a ready pool sprite to a stack that has none, and wake it.
+
+    Returns:
+        The stack's sprite name (existing or claimed), None if the pool is empty
+    """
+    result = db.rpc("claim_pool_sprite", {"p_stack_id": stack_id, "p_user_id": user_id}).execute()
+    sprite = result.data
+    if sprite:
+        # Pooled sprites have been asleep since bootstrap
+        await prewake_sprite(sprite, api)
+        logger.info(f"Stack {stack_id} assigned sprite {sprite}")
+    return sprite or None
+
+
+async def provision_stack_sprite(db: Client, stack_id: str, user_id: str, api: SpritesAPI | None = None) -> str | None:
+    """
+    Cold path: create and bootstrap a sprite for a stack (pool was empty).
+
+    Sets sprite_status provisioning → active, or failed (retried on the next
+    call). Concurrent calls for one stack share a single provision.
+
+    Returns:
+        The stack's sprite name, None if provisioning failed
+    """
+    api = api or get_sprites_api()
+    lock = _provision_locks.setdefault(stack_id, asyncio.Lock())
+    try:
+        async with lock:
+            return await _provision(db, stack_id, user_id, api)
+    finally:
+        _provision_locks.pop(stack_id, None)
+
+
+async def _provision(db: Client, stack_id: str, user_id: str, api: SpritesAPI) -> str | None:
+    # Claim again: the pool may have refilled, or another call finished first
+    if sprite := await claim_sprite(db, stack_id, user_id, api):
+        return sprite
+
+    db.table("stacks").update({"sprite_status": "provisioning"}) \
+        .eq("id", stack_id).eq("user_id", user_id).execute()
+    sprite = f"stack-{uuid.uuid4().hex[:12]}"
+    try:
+        await _create_bootstrapped(api, sprite)
+    except Exception as e:
+        logger.error(f"Sprite provisioning failed for stack {stack_id}: {e}")
+        db.table("stacks").update({"sprite_status": "failed"}) \
+            .eq("id", stack_id).eq("user_id", user_id).execute()
+        return None
+
+    updated = db.table("stacks").update({"sprite_name": sprite, "sprite_status": "active"}) \
+        .eq("id", stack_id).eq("user_id", user_id).is_("sprite_name", "null").execute()
+    if not updated.data:
+        # Assigned elsewhere meanwhile (another process)
+        await _destroy(api, sprite)
+        return await claim_sprite(db, stack_id, user_id, api)
+    logger.info(f"Stack {stack_id} provisioned sprite {sprite} (pool was empty)")
+    return sprite
@@ -0,0 +1,391 @@
+"""
+Sprites.dev API clients (per-stack VMs).
+
+A sprite API creates, inspects and destroys sprites, writes files, runs
+commands and opens connections to the sprite's WebSocket server. The
+Sprites.dev client talks to the real API (REST for sprites and files, the
+exec WebSocket for commands, the TCP proxy for server connections); the
+local client is an in-process fake with the same sleep/wake behaviour,
+for tests and development. See docs/ops/sprites-api-reference.md.
+
+Behaviour both model:
+- Any API call wakes a sleeping sprite (cold wake: 1-12s)
+- Sprites sleep after 30s without API calls or exec sessions
+- Server connections die when the sprite sleeps (recv/send raise
+  ConnectionError); the server process itself survives
+
+Usage:
+    api = get_sprites_api()
+    await api.create("stack-abc123")
+    exit_code = await api.run("stack-abc123", ["python3", "-m", "venv", "/workspace/.venv"])
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Callable, Protocol, TypedDict
+
+import httpx
+from websockets.asyncio.client import ClientConnection, connect
+from websockets.client import ClientProtocol
+from websockets.exceptions import ConnectionClosed
+from websockets.frames import Opcode
+from websockets.http11 import Response
+from websockets.uri import parse_uri
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Sprites sleep after this long without activity
+SPRITE_AUTO_SLEEP_SECONDS = 30.0
+
+# Port of the sprite's WebSocket server (/workspace/src/server.py)
+SPRITE_SERVER_PORT = 8765
+
+# Exec binary protocol: first byte of each message is the stream id
+_STREAM_STDOUT = 1
+_STREAM_STDERR = 2
+_STREAM_EXIT = 3
+
+
+class SpriteNotFoundError(LookupError):
+    """The API has no sprite with this name."""
+
+
+class SpriteInfo(TypedDict):
+    """A sprite's name and status ("cold" = asleep, "warm", "running")."""
+    name: str
+    status: str
+
+
+class SpriteConnection(Protocol):
+    """A WebSocket connection to a sprite's server (JSON text messages)."""
+
+    async def send(self, message: str) -> None: ...
+
+    async def recv(self) -> str: ...
+
+    async def close(self) -> None: ...
+
+
+class SpritesAPI(Protocol):
+    """Creates sprites, reports their status, writes files, runs commands and connects."""
+
+    name: str
+
+    async def create(self, sprite: str) -> SpriteInfo: ...
+
+    async def get(self, sprite: str) -> SpriteInfo: ...
+
+    async def delete(self, sprite: str) -> None: ...
+
+    async def write_file(self, sprite: str, path: str, content: str) -> None: ...
+
+    async def run(self, sprite: str, cmd: list[str]) -> int: ...
+
+    async def connect(self, sprite: str, port: int = SPRITE_SERVER_PORT) -> SpriteConnection: ...
+
+
+class _TunnelConnection:
+    """
+    WebSocket client to the sprite server, spoken over the TCP proxy.
+
+    The proxy relays raw TCP, so the WebSocket protocol to the sprite's
+    server runs on top of it (sans-I/O ClientProtocol fed from the tunnel).
+    """
+
+    def __init__(self, tunnel: ClientConnection, port: int):
+        self.tunnel = tunnel
+        self.protocol = ClientProtocol(parse_uri(f"ws://localhost:{port}/"))
+        self.events: list = []
+        self.fragments: list[bytes] = []
+
+    async def _flush(self) -> None:
+        for data in self.protocol.data_to_send():
+            if data:
+                await self.tunnel.send(data)
+
+    async def _read(self) -> None:
+        try:
+            data = await self.tunnel.recv()
+        except ConnectionClosed as e:
+            raise ConnectionError("Sprite proxy closed") from e
+        self.protocol.receive_data(data if isinstance(data, bytes) else data.encode())
+        self.events.extend(self.protocol.events_received())
+        await self._flush()  # Pongs, close replies
+
+    async def handshake(self) -> None:
+        self.protocol.send_request(self.protocol.connect())
+        await self._flush()
+        while True:
+            while self.events:
+                event = self.events.pop(0)
+                if isinstance(event, Response):
+                    if event.status_code != 101:
+                        raise ConnectionError(f"Sprite server refused WebSocket: {event.status_code}")
+                    return
+            await self._read()
+
+    async def send(self, message: str) -> None:
+        self.protocol.send_text(message.encode())
+        try:
+            await self._flush()
+        except ConnectionClosed as e:
+            raise ConnectionError("Sprite proxy closed") from e
+
+    async def recv(self) -> str:
+        while True:
+            while self.events:
+                frame = self.events.pop(0)
+                if frame.opcode == Opcode.CLOSE:
+                    raise ConnectionError("Sprite server closed the connection")
+                if frame.opcode in (Opcode.TEXT, Opcode.BINARY, Opcode.CONT):
+                    self.fragments.append(frame.data)
+                    if frame.fin:
+                        message, self.fragments = b"".join(self.fragments), []
+                        return message.decode()
+            await self._read()
+
+    async def close(self) -> None:
+        await self.tunnel.close()
+
+
+class HttpSpritesAPI:
+    """Sprites.dev REST API; commands run over the exec WebSocket, server connections over the TCP proxy."""
+
+    name = "sprites"
+
+    def __init__(self, base_url: str, token: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.client = httpx.AsyncClient(base_url=self.base_url, headers=self.headers, timeout=timeout)
+
+    async def _request(self, method: str, path: str, sprite: str, **kwargs) -> httpx.Response:
+        response = await self.client.request(method, path, **kwargs)
+        if response.status_code == 404:
+            raise SpriteNotFoundError(sprite)
+        response.raise_for_status()
+        return response
+
+    async def create(self, sprite: str) -> SpriteInfo:
+        response = await self._request("POST", "/v1/sprites", sprite, json={"name": sprite})
+        data = response.json()
+        return {"name": data["name"], "status": data.get("status", "warm")}
+
+    async def get(self, sprite: str) -> SpriteInfo:
+        data = (await self._request("GET", f"/v1/sprites/{sprite}", sprite)).json()
+        return {"name": data["name"], "status": data.get("status", "warm")}
+
+    async def delete(self, sprite: str) -> None:
+        await self._request("DELETE", f"/v1/sprites/{sprite}", sprite)
+
+    async def write_file(self, sprite: str, path: str, content: str) -> None:
+        await self._request(
+            "POST", f"/v1/sprites/{sprite}/fs/write", sprite,
+            params={"path": path}, content=content.encode(),
+        )
+
+    async def run(self, sprite: str, cmd: list[str]) -> int:
+        """Run a command to completion over the exec WebSocket; returns its exit code."""
+        params = httpx.QueryParams([("cmd", part) for part in cmd])
+        url = f"{self.base_url.replace('http', 'ws', 1)}/v1/sprites/{sprite}/exec?{params}"
+        output: list[bytes] = []
+        async with connect(url, additional_headers=self.headers) as ws:
+            async for message in ws:
+                if isinstance(message, str):
+                    event = json.loads(message)
+                    if event.get("type") == "exit":
+                        exit_code = int(event.get("exit_code", 0))
+                        break
+                elif message and message[0] == _STREAM_EXIT:
+                    exit_code = message[1] if len(message) > 1 else 0
+                    break
+                elif message and message[0] in (_STREAM_STDOUT, _STREAM_STDERR):
+                    output.append(message[1:])
+            else:
+                raise ConnectionError(f"Exec on {sprite} closed without an exit code")
+        if exit_code:
+            tail = b"".join(output)[-500:].decode(errors="replace")
+            logger.warning(f"[{sprite}] {' '.join(cmd)} exited {exit_code}: {tail}")
+        return exit_code
+
+    async def connect(self, sprite: str, port: int = SPRITE_SERVER_PORT) -> SpriteConnection:
+        """Open a WebSocket to the sprite's server through the TCP proxy."""
+        url = f"{self.base_url.replace('http', 'ws', 1)}/v1/sprites/{sprite}/proxy"
+        try:
+            tunnel = await connect(url, additional_headers=self.headers, max_size=None)
+            await tunnel.send(json.dumps({"host": "localhost", "port": port}))
+            status = json.loads(await tunnel.recv())
+        except (ConnectionClosed, OSError) as e:
+            raise ConnectionError(f"Sprite proxy to {sprite} failed: {e}") from e
+        if status.get("status") != "connected":
+            await tunnel.close()
+            raise ConnectionError(f"Sprite proxy to {sprite} refused: {status}")
+
+        connection = _TunnelConnection(tunnel, port)
+        try:
+            await connection.handshake()
+        except Exception:
+            await tunnel.close()
+            raise
+        return connection
+
+
+SpriteServer = Callable[[dict], AsyncIterator[dict]]
+
+
+async def _echo_server(message: dict) -> AsyncIterator[dict]:
+    """Default local server: answer every request with one complete event."""
+    yield {
+        "type": "agent_event",
+        "id": f"{message['id']}-reply",
+        "timestamp": int(time.time() * 1000),
+        "request_id": message["id"],
+        "payload": {"event_type": "complete", "content": json.dumps(message.get("payload"))},
+    }
+
+
+class _LocalConnection:
+    """In-memory server connection; dies (ConnectionError) when its sprite sleeps."""
+
+    def __init__(self, api: "LocalSpritesAPI", sprite: str):
+        self.api = api
+        self.sprite = sprite
+        self.inbox: asyncio.Queue[str | None] = asyncio.Queue()
+        self.closed = False
+        self.tasks: set[asyncio.Task] = set()
+
+    def kill(self) -> None:
+        self.closed = True
+        self.inbox.put_nowait(None)
+        for task in self.tasks:
+            task.cancel()
+
+    def _check(self) -> None:
+        state = self.api.sprites.get(self.sprite)
+        if state is not None and time.monotonic() - state["last_activity"] > self.api.sleep_after:
+            self.api.sleep(self.sprite)
+        if self.closed or state is None:
+            raise ConnectionError(f"Connection to {self.sprite} lost (sprite asleep)")
+        state["last_activity"] = time.monotonic()
+
+    async def _serve(self, message: dict) -> None:
+        async for response in self.api.server(message):
+            if self.closed:
+                return
+            self.inbox.put_nowait(json.dumps(response))
+
+    async def send(self, message: str) -> None:
+        self._check()
+        task = asyncio.create_task(self._serve(json.loads(message)))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def recv(self) -> str:
+        message = await self.inbox.get()
+        if message is None:
+            raise ConnectionError(f"Connection to {self.sprite} lost (sprite asleep)")
+        self._check()
+        return message
+
+    async def close(self) -> None:
+        if not self.closed:
+            self.kill()
+            self.api.connections.remove(self)
+
+
+class LocalSpritesAPI:
+    """
+    In-process fake: sprites are dicts that sleep after sleep_after seconds
+    of inactivity and take wake_seconds to wake on the next call. Commands
+    succeed (exit 0) unless listed in fail_commands. Server connections
+    answer each message with server(message)'s responses and die when the
+    sprite sleeps.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        wake_seconds: float = 0.0,
+        sleep_after: float = SPRITE_AUTO_SLEEP_SECONDS,
+        fail_commands: set[str] | None = None,
+        server: SpriteServer | None = None,
+    ):
+        self.wake_seconds = wake_seconds
+        self.sleep_after = sleep_after
+        self.fail_commands = fail_commands or set()
+        self.server = server or _echo_server
+        self.sprites: dict[str, dict] = {}
+        self.cold_wakes: dict[str, int] = {}  # sprite -> wakes from sleep
+        self.connects: dict[str, int] = {}  # sprite -> server connections opened
+        self.connections: list[_LocalConnection] = []
+
+    async def _touch(self, sprite: str) -> dict:
+        if sprite not in self.sprites:
+            raise SpriteNotFoundError(sprite)
+        state = self.sprites[sprite]
+        if time.monotonic() - state["last_activity"] > self.sleep_after:
+            state["status"] = "cold"
+        if state["status"] == "cold":
+            self.cold_wakes[sprite] = self.cold_wakes.get(sprite, 0) + 1
+            await asyncio.sleep(self.wake_seconds)
+            state["status"] = "warm"
+        state["last_activity"] = time.monotonic()
+        return state
+
+    def sleep(self, sprite: str) -> None:
+        """Put a sprite to sleep now (as the 30s idle timeout would); its connections die."""
+        self.sprites[sprite]["status"] = "cold"
+        for connection in [c for c in self.connections if c.sprite == sprite]:
+            connection.kill()
+            self.connections.remove(connection)
+
+    async def create(self, sprite: str) -> SpriteInfo:
+        if sprite in self.sprites:
+            raise ValueError(f"Sprite {sprite} already exists")
+        self.sprites[sprite] = {"status": "warm", "files": {}, "commands": [], "last_activity": time.monotonic()}
+        return {"name": sprite, "status": "warm"}
+
+    async def get(self, sprite: str) -> SpriteInfo:
+        state = await self._touch(sprite)
+        return {"name": sprite, "status": state["status"]}
+
+    async def delete(self, sprite: str) -> None:
+        if self.sprites.pop(sprite, None) is None:
+            raise SpriteNotFoundError(sprite)
+
+    async def write_file(self, sprite: str, path: str, content: str) -> None:
+        (await self._touch(sprite))["files"][path] = content
+
+    async def run(self, sprite: str, cmd: list[str]) -> int:
+        state = await self._touch(sprite)
+        state["commands"].append(cmd)
+        return 1 if " ".join(cmd) in self.fail_commands else 0
+
+    async def connect(self, sprite: str, port: int = SPRITE_SERVER_PORT) -> SpriteConnection:
+        await self._touch(sprite)
+        self.connects[sprite] = self.connects.get(sprite, 0) + 1
+        connection = _LocalConnection(self, sprite)
+        self.connections.append(connection)
+        return connection
+
+
+# Lazy shared client
+_api: SpritesAPI | None = None
+
+
+def get_sprites_api() -> SpritesAPI:
+    """Get or create the client named by Settings.SPRITES_PROVIDER."""
+    global _api
+    if _api is None:
+        settings = get_settings()
+        if settings.SPRITES_PROVIDER == "sprites":
+            _api = HttpSpritesAPI(settings.SPRITES_API_URL, settings.SPRITES_TOKEN)
+        elif settings.SPRITES_PROVIDER == "local":
+            _api = LocalSpritesAPI()
+        else:
+            raise ValueError(f"Unknown sprites provider: {settings.SPRITES_PROVIDER}")
+    return _api
@@ -33,6 +33,7 @@ class UploadResult(TypedDict):
     filename: str
     file_size_bytes: int
     mime_type: str
+    content: bytes  # Uploaded bytes, so OCR can send them inline
 
 
 def _validate_file(file: UploadFile, content: bytes) -> str:
@@ -97,6 +98,7 @@ async def upload_document(user_id: str, file: UploadFile) -> UploadResult:
             "filename": file.filename,
             "file_size_bytes": len(content),
             "mime_type": mime_type,
+            "content": content,
         }
 
     except HTTPException:
@@ -0,0 +1,65 @@
+"""
+Token counting for agent-facing text.
+
+Uses Anthropic's count_tokens endpoint for a measured count and falls back
+to a character-based estimate when the API is unavailable.
+"""
+
+import logging
+
+from anthropic import AsyncAnthropic
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio for English prose and markdown
+CHARS_PER_TOKEN = 4
+
+# count_tokens is a refinement of the estimate; don't wait long for it
+COUNT_TIMEOUT_SECONDS = 10.0
+
+# Lazy client initialization
+_client: AsyncAnthropic | None = None
+
+
+def _get_client() -> AsyncAnthropic:
+    """Get or create Anthropic client (lazy initialization)."""
+    global _client
+    if _client is None:
+        settings = get_settings()
+        _client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+    return _client
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate token count from character length (no API call)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+async def count_tokens(text: str, model: str | None = None) -> int:
+    """
+    Measure the input token count of text for a Claude model.
+
+    Args:
+        text: Text as it will be sent to the agent
+        model: Model to count for (default: Settings.CLAUDE_MODEL)
+
+    Returns:
+        Measured token count, or an estimate if the API call fails
+    """
+    if not text:
+        return 0
+
+    try:
+        client = _get_client()
+        result = await client.messages.count_tokens(
+            model=model or get_settings().CLAUDE_MODEL,
+            messages=[{"role": "user", "content": text}],
+            timeout=COUNT_TIMEOUT_SECONDS,
+        )
+        return result.input_tokens
+
+    except Exception as e:
+        logger.warning(f"Token count failed, using estimate: {e}")
+        return estimate_tokens(text)
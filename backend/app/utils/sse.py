@@ -1,9 +1,24 @@
 """Shared SSE utilities."""
 
 import json
-from typing import Any
+from typing import Any, AsyncIterator
+
+from fastapi.responses import StreamingResponse
 
 
 def sse_event(data: dict[str, Any]) -> str:
     """Format data as SSE event."""
     return f"data: {json.dumps(data)}\n\n"
+
+
+def sse_response(stream: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an SSE event stream (no caching or proxy buffering)."""
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        }
+    )
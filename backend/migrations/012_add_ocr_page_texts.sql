@@ -0,0 +1,8 @@
+-- Migration 012: Add per-page OCR text for windowed agent reads
+-- read_ocr returns page ranges, outlines and keyword snippets from this
+-- column instead of sending the full raw_text on long documents.
+
+ALTER TABLE ocr_results
+ADD COLUMN page_texts JSONB;
+
+COMMENT ON COLUMN ocr_results.page_texts IS 'Array of per-page markdown text (with image annotations). NULL for rows created before migration 012.';
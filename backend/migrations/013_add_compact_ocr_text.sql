@@ -0,0 +1,11 @@
+-- Migration 013: Add compact agent-facing OCR text
+-- Normalized text (HTML tables as pipe grids, collapsed whitespace, repeated
+-- headers/footers removed) is what agents read. raw_text is kept for display.
+
+ALTER TABLE ocr_results
+ADD COLUMN compact_text TEXT,
+ADD COLUMN compact_token_count INTEGER;
+
+COMMENT ON COLUMN ocr_results.compact_text IS 'Normalized OCR text sent to agents. NULL for rows created before migration 013 (agents fall back to raw_text).';
+COMMENT ON COLUMN ocr_results.compact_token_count IS 'Measured input token count of compact_text (Anthropic count_tokens, estimated on API failure).';
+COMMENT ON COLUMN ocr_results.page_texts IS 'Array of per-page compact text (same normalization as compact_text). NULL for rows created before migration 012.';
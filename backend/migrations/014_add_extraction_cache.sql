@@ -0,0 +1,45 @@
+-- Migration 014: Extraction result cache
+-- Caches completed extraction outputs keyed by OCR content hash, normalized
+-- field spec, model and prompt version so repeat extractions skip the agent.
+
+-- ============================================================================
+-- 1. OCR content hash
+-- ============================================================================
+
+ALTER TABLE ocr_results
+ADD COLUMN content_hash TEXT;
+
+COMMENT ON COLUMN ocr_results.content_hash IS 'SHA-256 of the agent-facing OCR text (compact_text, or raw_text for legacy rows). Backfilled lazily on first extract.';
+
+-- ============================================================================
+-- 2. Extraction cache table
+-- ============================================================================
+
+CREATE TABLE extraction_cache (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id TEXT NOT NULL DEFAULT auth.jwt()->>'sub',
+
+    -- SHA-256 of {content_hash, mode, normalized fields, model, prompt version}
+    cache_key TEXT NOT NULL,
+
+    -- Cached output
+    extracted_fields JSONB NOT NULL,
+    confidence_scores JSONB,
+    model VARCHAR(50) NOT NULL,
+
+    -- Traceability
+    source_extraction_id UUID REFERENCES extractions(id) ON DELETE SET NULL,
+
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+
+    -- Cache is per user (no cross-tenant reuse)
+    UNIQUE(user_id, cache_key)
+);
+
+ALTER TABLE extraction_cache ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "extraction_cache_clerk_isolation" ON extraction_cache
+FOR ALL TO authenticated
+USING ((SELECT auth.jwt()->>'sub') = user_id);
+
+COMMENT ON TABLE extraction_cache IS 'Completed extraction outputs reused by /api/agent/extract for identical requests. Bypass with force=true.';
@@ -0,0 +1,28 @@
+-- Migration 016: Commit extraction RPC
+-- The extraction agent buffers tool writes in memory during a run. On
+-- `complete` it commits the final fields plus extraction and document
+-- status in one call (functions run in a single transaction).
+
+CREATE OR REPLACE FUNCTION commit_extraction(
+    p_extraction_id UUID,
+    p_document_id UUID,
+    p_user_id TEXT,
+    p_fields JSONB,
+    p_scores JSONB
+) RETURNS VOID AS $$
+BEGIN
+    UPDATE extractions
+    SET
+        extracted_fields = p_fields,
+        confidence_scores = COALESCE(p_scores, '{}'::jsonb),
+        status = 'completed',
+        updated_at = NOW()
+    WHERE id = p_extraction_id AND user_id = p_user_id;
+
+    UPDATE documents
+    SET status = 'completed'
+    WHERE id = p_document_id AND user_id = p_user_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+GRANT EXECUTE ON FUNCTION commit_extraction TO authenticated;
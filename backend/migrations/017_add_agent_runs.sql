@@ -0,0 +1,55 @@
+-- Migration 017: Per-run agent telemetry
+-- One row per agent run (extraction, correction, metadata) with tokens,
+-- cost, turns, model id and per-tool call counts/latencies.
+
+CREATE TABLE agent_runs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id TEXT NOT NULL DEFAULT auth.jwt()->>'sub',
+    document_id UUID REFERENCES documents(id) ON DELETE SET NULL,
+    extraction_id UUID REFERENCES extractions(id) ON DELETE SET NULL,
+
+    -- Run info
+    agent VARCHAR(20) NOT NULL,              -- extraction, correction, metadata
+    status VARCHAR(20) NOT NULL,             -- completed, incomplete, failed
+    model VARCHAR(100),                      -- Model id that served the run
+    session_id VARCHAR(50),
+
+    -- Usage
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_creation_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd NUMERIC(10, 6),
+    num_turns INTEGER,
+
+    -- Latency
+    duration_ms INTEGER NOT NULL,            -- Wall clock for the whole run
+    duration_api_ms INTEGER,                 -- Time spent in model API calls
+
+    -- Per-tool stats: {"read_ocr": {"count": 2, "errors": 0, "total_ms": 84.1, "max_ms": 51.3}}
+    tool_calls JSONB NOT NULL DEFAULT '{}'::jsonb,
+
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_agent_runs_user ON agent_runs(user_id, created_at DESC);
+CREATE INDEX idx_agent_runs_document ON agent_runs(document_id) WHERE document_id IS NOT NULL;
+CREATE INDEX idx_agent_runs_extraction ON agent_runs(extraction_id) WHERE extraction_id IS NOT NULL;
+CREATE INDEX idx_agent_runs_agent_model ON agent_runs(agent, model, created_at DESC);
+
+ALTER TABLE agent_runs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "agent_runs_clerk_isolation" ON agent_runs
+FOR ALL TO authenticated
+USING ((SELECT auth.jwt()->>'sub') = user_id);
+
+COMMENT ON TABLE agent_runs IS 'Telemetry for every agent run: tokens, cost, turns, tool latency and model id.';
+
+-- Example: cost and latency by document type (mime) and model
+-- SELECT d.mime_type, r.model, COUNT(*), AVG(r.duration_ms), AVG(r.cost_usd), AVG(r.num_turns)
+-- FROM agent_runs r JOIN documents d ON d.id = r.document_id
+-- WHERE r.agent = 'extraction'
+-- GROUP BY 1, 2 ORDER BY 5 DESC;
+
+-- extractions.model previously defaulted to 'claude-agent-sdk'; allow full model ids
+ALTER TABLE extractions ALTER COLUMN model TYPE VARCHAR(100);
@@ -0,0 +1,15 @@
+-- Migration 018: Compacted correction sessions
+-- Corrections resume the stored SDK session only while it is small; past a
+-- token threshold they start a fresh session from a compact snapshot.
+-- documents.session_context_tokens tracks the stored session's size and
+-- extractions.correction_notes keeps a bounded summary of earlier corrections.
+
+ALTER TABLE documents
+ADD COLUMN IF NOT EXISTS session_context_tokens INTEGER;
+
+COMMENT ON COLUMN documents.session_context_tokens IS 'Prompt tokens of the stored session at its last turn (compaction trigger)';
+
+ALTER TABLE extractions
+ADD COLUMN IF NOT EXISTS correction_notes JSONB NOT NULL DEFAULT '[]'::jsonb;
+
+COMMENT ON COLUMN extractions.correction_notes IS 'Recent corrections [{instruction, summary, at}] carried into compact correction sessions';
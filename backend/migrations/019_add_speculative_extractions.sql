@@ -0,0 +1,18 @@
+-- Migration 019: Speculative auto extraction
+-- An auto-mode extraction can start right after OCR, before the user asks.
+-- /api/agent/extract adopts it (claimed_at) instead of running the agent again.
+
+ALTER TABLE extractions
+ADD COLUMN IF NOT EXISTS speculative BOOLEAN NOT NULL DEFAULT false,
+ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ;
+
+COMMENT ON COLUMN extractions.speculative IS 'Started automatically after OCR rather than by the user';
+COMMENT ON COLUMN extractions.claimed_at IS 'When /api/agent/extract adopted this speculative extraction';
+
+-- Unclaimed speculative results per document (claim lookup)
+CREATE INDEX IF NOT EXISTS idx_extractions_speculative_unclaimed
+ON extractions(document_id) WHERE speculative AND claimed_at IS NULL;
+
+-- Per-user daily cap on speculative runs
+CREATE INDEX IF NOT EXISTS idx_extractions_speculative_user
+ON extractions(user_id, created_at DESC) WHERE speculative;
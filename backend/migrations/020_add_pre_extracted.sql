@@ -0,0 +1,9 @@
+-- Migration 020: Deterministic pre-extraction
+-- Pattern/table-based candidate fields found at OCR time (dates, totals,
+-- invoice numbers, ABN/VAT IDs, emails, line items) with page, offset and
+-- confidence. Used as agent hints, or to skip the agent for simple documents.
+
+ALTER TABLE ocr_results
+ADD COLUMN IF NOT EXISTS pre_extracted JSONB;
+
+COMMENT ON COLUMN ocr_results.pre_extracted IS 'Pre-extraction {document_type, candidates[{field, value, text, page, offset, confidence}], line_items, line_items_page}';
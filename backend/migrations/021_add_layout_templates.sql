@@ -0,0 +1,47 @@
+-- Migration 021: Layout-fingerprint templates
+-- Learned per-user layouts for repeat senders. A template holds the layout
+-- fingerprint (masked headings, label phrases, table headers) and field
+-- anchors learned from a completed or corrected extraction. Matching
+-- documents are extracted by replaying the anchors instead of an agent run.
+
+-- ============================================================================
+-- 1. Templates
+-- ============================================================================
+
+CREATE TABLE layout_templates (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id TEXT NOT NULL DEFAULT auth.jwt()->>'sub',
+
+    -- Fingerprint: sorted features like 'h:acme supplies', 'a:invoice no', 't:description|qty|amount'
+    features TEXT[] NOT NULL,
+
+    -- Field anchors: [{path, kind, position, label, page, words} | {path, kind: 'table', header, columns, numeric}]
+    anchors JSONB NOT NULL,
+
+    -- Traceability
+    source_document_id UUID REFERENCES documents(id) ON DELETE SET NULL,
+    source_extraction_id UUID REFERENCES extractions(id) ON DELETE SET NULL,
+    match_count INTEGER NOT NULL DEFAULT 0,
+
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()     -- Set by the backend when anchors are relearned
+);
+
+CREATE INDEX idx_layout_templates_user ON layout_templates(user_id, updated_at DESC);
+
+ALTER TABLE layout_templates ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "layout_templates_clerk_isolation" ON layout_templates
+FOR ALL TO authenticated
+USING ((SELECT auth.jwt()->>'sub') = user_id);
+
+COMMENT ON TABLE layout_templates IS 'Learned layouts for repeat senders; /api/agent/extract replays matching templates instead of running the agent';
+
+-- ============================================================================
+-- 2. Provenance on extractions
+-- ============================================================================
+
+ALTER TABLE extractions
+ADD COLUMN IF NOT EXISTS template_id UUID REFERENCES layout_templates(id) ON DELETE SET NULL;
+
+COMMENT ON COLUMN extractions.template_id IS 'Layout template the extraction was replayed from (or verified against)';
@@ -0,0 +1,11 @@
+-- Migration 022: Versions for incremental stack table refresh
+-- Each row records the OCR text and column definitions it was extracted
+-- from, so a refresh re-runs only new documents, re-OCR'd documents and
+-- cells whose column definition changed.
+
+ALTER TABLE stack_table_rows
+ADD COLUMN IF NOT EXISTS ocr_content_hash TEXT,
+ADD COLUMN IF NOT EXISTS column_versions JSONB NOT NULL DEFAULT '{}'::jsonb;
+
+COMMENT ON COLUMN stack_table_rows.ocr_content_hash IS 'ocr_results.content_hash the row was extracted from; a mismatch means the document was re-OCRd.';
+COMMENT ON COLUMN stack_table_rows.column_versions IS 'Column name -> hash of the column definition each cell was extracted with.';
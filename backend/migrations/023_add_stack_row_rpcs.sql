@@ -0,0 +1,230 @@
+-- Migration 023: Set-based RPCs for stack table rows and columns
+-- Writing rows one PostgREST call at a time, and updating a column key
+-- row by row, costs one round trip per row. These functions do it in
+-- one statement per call:
+-- - upsert_stack_rows: insert/replace (or merge into) many rows at once
+-- - add/rename/delete_stack_column: change stack_tables.columns and the
+--   matching key in every row's row_data/confidence_scores/column_versions
+
+-- Function: Bulk upsert rows (one per document) into a stack table
+--   p_rows: [{"document_id": ..., "row_data": {...}, "confidence_scores": {...},
+--             "ocr_content_hash": ..., "column_versions": {...}}, ...]
+--   p_merge: merge the given cells into existing rows instead of replacing them
+-- Rows for tables or documents the user doesn't own are ignored.
+CREATE OR REPLACE FUNCTION upsert_stack_rows(
+    p_table_id UUID,
+    p_user_id TEXT,
+    p_rows JSONB,
+    p_merge BOOLEAN DEFAULT FALSE
+) RETURNS TABLE(document_id UUID, id UUID) AS $$
+    INSERT INTO stack_table_rows AS r (
+        table_id, document_id, user_id, row_data, confidence_scores,
+        ocr_content_hash, column_versions, updated_at
+    )
+    SELECT
+        p_table_id,
+        x.document_id,
+        p_user_id,
+        COALESCE(x.row_data, '{}'::jsonb),
+        COALESCE(x.confidence_scores, '{}'::jsonb),
+        x.ocr_content_hash,
+        COALESCE(x.column_versions, '{}'::jsonb),
+        NOW()
+    FROM jsonb_to_recordset(p_rows) AS x(
+        document_id UUID,
+        row_data JSONB,
+        confidence_scores JSONB,
+        ocr_content_hash TEXT,
+        column_versions JSONB
+    )
+    JOIN documents d ON d.id = x.document_id AND d.user_id = p_user_id
+    WHERE EXISTS (
+        SELECT 1 FROM stack_tables t WHERE t.id = p_table_id AND t.user_id = p_user_id
+    )
+    ON CONFLICT (table_id, document_id) DO UPDATE SET
+        row_data = CASE WHEN p_merge
+            THEN r.row_data || EXCLUDED.row_data
+            ELSE EXCLUDED.row_data END,
+        -- Merged cells replace their old scores (even when the new cell has none)
+        confidence_scores = CASE WHEN p_merge
+            THEN (COALESCE(r.confidence_scores, '{}'::jsonb)
+                  - ARRAY(SELECT jsonb_object_keys(EXCLUDED.row_data)))
+                 || EXCLUDED.confidence_scores
+            ELSE EXCLUDED.confidence_scores END,
+        column_versions = CASE WHEN p_merge
+            THEN r.column_versions || EXCLUDED.column_versions
+            ELSE EXCLUDED.column_versions END,
+        ocr_content_hash = EXCLUDED.ocr_content_hash,
+        updated_at = NOW()
+    RETURNING r.document_id, r.id;
+$$ LANGUAGE sql SECURITY DEFINER;
+
+GRANT EXECUTE ON FUNCTION upsert_stack_rows TO authenticated;
+
+
+-- Helper: Lock a user's stack table and return its columns
+-- Custom tables not yet extracted only have custom_columns, which seed
+-- the list. Returns NULL if the table isn't the user's.
+CREATE OR REPLACE FUNCTION lock_stack_table_columns(
+    p_table_id UUID,
+    p_user_id TEXT
+) RETURNS JSONB AS $$
+DECLARE
+    v_columns JSONB;
+    v_custom TEXT[];
+BEGIN
+    SELECT columns, custom_columns INTO v_columns, v_custom
+    FROM stack_tables
+    WHERE id = p_table_id AND user_id = p_user_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    IF v_columns IS NULL OR v_columns = '[]'::jsonb THEN
+        SELECT COALESCE(jsonb_agg(jsonb_build_object('name', n)), '[]'::jsonb)
+        INTO v_columns
+        FROM unnest(COALESCE(v_custom, '{}'::text[])) AS n;
+    END IF;
+
+    RETURN v_columns;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Internal to the column functions below
+REVOKE EXECUTE ON FUNCTION lock_stack_table_columns FROM PUBLIC;
+
+
+-- Function: Add a column definition; optionally set a default cell in every row
+-- Returns the table's new columns (NULL if the table isn't the user's).
+CREATE OR REPLACE FUNCTION add_stack_column(
+    p_table_id UUID,
+    p_user_id TEXT,
+    p_column JSONB,
+    p_default JSONB DEFAULT NULL
+) RETURNS JSONB AS $$
+DECLARE
+    v_columns JSONB := lock_stack_table_columns(p_table_id, p_user_id);
+    v_name TEXT := p_column->>'name';
+BEGIN
+    IF v_columns IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM jsonb_array_elements(v_columns) c
+        WHERE COALESCE(c->>'name', c #>> '{}') = v_name
+    ) THEN
+        RAISE EXCEPTION 'Column "%" already exists', v_name;
+    END IF;
+
+    v_columns := v_columns || jsonb_build_array(p_column);
+    UPDATE stack_tables SET columns = v_columns, updated_at = NOW() WHERE id = p_table_id;
+
+    IF p_default IS NOT NULL THEN
+        UPDATE stack_table_rows
+        SET row_data = row_data || jsonb_build_object(v_name, p_default), updated_at = NOW()
+        WHERE table_id = p_table_id;
+    END IF;
+
+    RETURN v_columns;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+GRANT EXECUTE ON FUNCTION add_stack_column TO authenticated;
+
+
+-- Function: Rename a column in the definition and in every row
+--   p_version: column_versions hash for the renamed column (keeps the old
+--              cell versions if NULL)
+CREATE OR REPLACE FUNCTION rename_stack_column(
+    p_table_id UUID,
+    p_user_id TEXT,
+    p_old TEXT,
+    p_new TEXT,
+    p_version TEXT DEFAULT NULL
+) RETURNS JSONB AS $$
+DECLARE
+    v_columns JSONB := lock_stack_table_columns(p_table_id, p_user_id);
+BEGIN
+    IF v_columns IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM jsonb_array_elements(v_columns) c
+        WHERE COALESCE(c->>'name', c #>> '{}') = p_new
+    ) THEN
+        RAISE EXCEPTION 'Column "%" already exists', p_new;
+    END IF;
+
+    SELECT COALESCE(jsonb_agg(
+        CASE
+            WHEN c->>'name' = p_old THEN jsonb_set(c, '{name}', to_jsonb(p_new))
+            WHEN c #>> '{}' = p_old THEN to_jsonb(p_new)  -- Legacy plain-name column
+            ELSE c
+        END ORDER BY i
+    ), '[]'::jsonb)
+    INTO v_columns
+    FROM jsonb_array_elements(v_columns) WITH ORDINALITY AS t(c, i);
+
+    UPDATE stack_tables SET columns = v_columns, updated_at = NOW() WHERE id = p_table_id;
+
+    UPDATE stack_table_rows
+    SET
+        row_data = CASE WHEN row_data ? p_old
+            THEN (row_data - p_old) || jsonb_build_object(p_new, row_data->p_old)
+            ELSE row_data END,
+        confidence_scores = CASE WHEN confidence_scores ? p_old
+            THEN (confidence_scores - p_old) || jsonb_build_object(p_new, confidence_scores->p_old)
+            ELSE confidence_scores END,
+        column_versions = CASE WHEN column_versions ? p_old
+            THEN (column_versions - p_old)
+                 || jsonb_build_object(p_new, COALESCE(to_jsonb(p_version), column_versions->p_old))
+            ELSE column_versions END,
+        updated_at = NOW()
+    WHERE table_id = p_table_id
+      AND (row_data ? p_old OR confidence_scores ? p_old OR column_versions ? p_old);
+
+    RETURN v_columns;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+GRANT EXECUTE ON FUNCTION rename_stack_column TO authenticated;
+
+
+-- Function: Delete a column from the definition and from every row
+CREATE OR REPLACE FUNCTION delete_stack_column(
+    p_table_id UUID,
+    p_user_id TEXT,
+    p_name TEXT
+) RETURNS JSONB AS $$
+DECLARE
+    v_columns JSONB := lock_stack_table_columns(p_table_id, p_user_id);
+BEGIN
+    IF v_columns IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT COALESCE(jsonb_agg(c ORDER BY i), '[]'::jsonb)
+    INTO v_columns
+    FROM jsonb_array_elements(v_columns) WITH ORDINALITY AS t(c, i)
+    WHERE COALESCE(c->>'name', c #>> '{}') IS DISTINCT FROM p_name;
+
+    UPDATE stack_tables SET columns = v_columns, updated_at = NOW() WHERE id = p_table_id;
+
+    UPDATE stack_table_rows
+    SET
+        row_data = row_data - p_name,
+        confidence_scores = confidence_scores - p_name,
+        column_versions = column_versions - p_name,
+        updated_at = NOW()
+    WHERE table_id = p_table_id
+      AND (row_data ? p_name OR confidence_scores ? p_name OR column_versions ? p_name);
+
+    RETURN v_columns;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+GRANT EXECUTE ON FUNCTION delete_stack_column TO authenticated;
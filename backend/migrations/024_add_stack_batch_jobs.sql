@@ -0,0 +1,10 @@
+-- Migration 024: Offline batch extraction jobs for stack tables
+-- A batch extraction submits one request per document to the provider's
+-- message batch API (split over several batches when large) and writes the
+-- rows as each batch ends. The pending job is recorded on the table so
+-- collection can resume after a restart.
+
+ALTER TABLE stack_tables
+ADD COLUMN IF NOT EXISTS batch_job JSONB;
+
+COMMENT ON COLUMN stack_tables.batch_job IS 'Pending batch extraction: {"batches": [batch ids still to collect], "provider", "model", "columns", "documents": {document_id: {"ocr_content_hash", "batch", "columns"?}}, "submitted_at"}. NULL when no batch is pending.';
@@ -0,0 +1,96 @@
+-- Migration 025: Paginated reads and summary stats for stack tables
+-- The stack agent's read_rows tool reads large tables a page at a time:
+-- keyset pagination on id, column projection and cell filters run in the
+-- database, so a 10k-row table is never shipped whole. Per-column stats
+-- let the agent see where the gaps are before paging.
+
+-- Keyset pagination index (rows of one table in id order)
+CREATE INDEX IF NOT EXISTS idx_stack_table_rows_table_id_id ON stack_table_rows(table_id, id);
+
+-- Function: One page of a table's rows
+--   p_columns: project row_data/confidence_scores to these keys (NULL = all)
+--   p_after:   keyset cursor - id of the last row of the previous page
+--   p_empty:   only rows where any of these cells is missing, null or ''
+--   p_below:   only rows with a (projected) cell confidence below this
+CREATE OR REPLACE FUNCTION read_stack_rows(
+    p_table_id UUID,
+    p_user_id TEXT,
+    p_columns TEXT[] DEFAULT NULL,
+    p_after UUID DEFAULT NULL,
+    p_limit INTEGER DEFAULT 50,
+    p_empty TEXT[] DEFAULT NULL,
+    p_below FLOAT DEFAULT NULL,
+    p_document_ids UUID[] DEFAULT NULL
+) RETURNS TABLE(id UUID, document_id UUID, row_data JSONB, confidence_scores JSONB) AS $$
+    SELECT
+        r.id,
+        r.document_id,
+        CASE WHEN p_columns IS NULL THEN r.row_data ELSE (
+            SELECT COALESCE(jsonb_object_agg(k, r.row_data->k), '{}'::jsonb)
+            FROM unnest(p_columns) AS k
+        ) END,
+        CASE WHEN p_columns IS NULL THEN COALESCE(r.confidence_scores, '{}'::jsonb) ELSE (
+            SELECT COALESCE(jsonb_object_agg(k, r.confidence_scores->k), '{}'::jsonb)
+            FROM unnest(p_columns) AS k
+            WHERE r.confidence_scores ? k
+        ) END
+    FROM stack_table_rows r
+    WHERE r.table_id = p_table_id
+      AND r.user_id = p_user_id
+      AND (p_after IS NULL OR r.id > p_after)
+      AND (p_document_ids IS NULL OR r.document_id = ANY(p_document_ids))
+      AND (p_empty IS NULL OR EXISTS (
+          SELECT 1 FROM unnest(p_empty) AS k WHERE COALESCE(r.row_data->>k, '') = ''
+      ))
+      AND (p_below IS NULL OR EXISTS (
+          SELECT 1 FROM jsonb_each(COALESCE(r.confidence_scores, '{}'::jsonb)) AS s
+          WHERE (p_columns IS NULL OR s.key = ANY(p_columns))
+            AND jsonb_typeof(s.value) = 'number'
+            AND s.value::float < p_below
+      ))
+    ORDER BY r.id
+    LIMIT LEAST(GREATEST(p_limit, 1), 500);
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+GRANT EXECUTE ON FUNCTION read_stack_rows TO authenticated;
+
+
+-- Function: Per-column summary of a table's rows
+-- One row per requested column: filled/empty cell counts, cells below
+-- p_below confidence, mean confidence, distinct values, numeric range.
+CREATE OR REPLACE FUNCTION stack_table_stats(
+    p_table_id UUID,
+    p_user_id TEXT,
+    p_columns TEXT[],
+    p_below FLOAT DEFAULT 0.7
+) RETURNS TABLE(
+    column_name TEXT,
+    filled BIGINT,
+    empty BIGINT,
+    low_confidence BIGINT,
+    avg_confidence FLOAT,
+    distinct_values BIGINT,
+    min_number NUMERIC,
+    max_number NUMERIC
+) AS $$
+    SELECT
+        k,
+        COUNT(*) FILTER (WHERE COALESCE(r.row_data->>k, '') <> ''),
+        COUNT(*) FILTER (WHERE COALESCE(r.row_data->>k, '') = ''),
+        COUNT(*) FILTER (
+            WHERE jsonb_typeof(r.confidence_scores->k) = 'number'
+              AND (r.confidence_scores->k)::float < p_below
+        ),
+        AVG((r.confidence_scores->k)::float) FILTER (
+            WHERE jsonb_typeof(r.confidence_scores->k) = 'number'
+        ),
+        COUNT(DISTINCT r.row_data->>k),
+        MIN((r.row_data->k)::numeric) FILTER (WHERE jsonb_typeof(r.row_data->k) = 'number'),
+        MAX((r.row_data->k)::numeric) FILTER (WHERE jsonb_typeof(r.row_data->k) = 'number')
+    FROM stack_table_rows r
+    CROSS JOIN unnest(p_columns) AS k
+    WHERE r.table_id = p_table_id AND r.user_id = p_user_id
+    GROUP BY k;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+GRANT EXECUTE ON FUNCTION stack_table_stats TO authenticated;
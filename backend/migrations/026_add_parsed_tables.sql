@@ -0,0 +1,10 @@
+-- Migration 026: Typed tables parsed from OCR HTML tables
+-- Each OCR 3 HTML table is parsed once at ingest into a columnar table:
+-- header rows detected, merged cells expanded, columns typed as number,
+-- date or text with cells coerced. Agents query these (query_tables tool)
+-- instead of re-reading HTML for line items.
+
+ALTER TABLE ocr_results
+ADD COLUMN IF NOT EXISTS parsed_tables JSONB;
+
+COMMENT ON COLUMN ocr_results.parsed_tables IS 'Parsed tables [{id, page, columns[{name, key, type, values}], row_count, truncated}]';
@@ -0,0 +1,67 @@
+-- Migration 027: Warm pool of pre-provisioned stack sprites
+-- Bootstrapping a sprite takes 30-60s. The backend keeps a few bootstrapped
+-- sprites in sprite_pool and hands one to a stack when it is first opened,
+-- so users never wait on provisioning. Backend (service role) only.
+
+CREATE TABLE IF NOT EXISTS sprite_pool (
+    name TEXT PRIMARY KEY,                   -- Sprites.dev VM identifier
+    status TEXT NOT NULL DEFAULT 'provisioning',  -- 'provisioning', 'ready'
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    ready_at TIMESTAMPTZ                     -- When bootstrap finished
+);
+
+CREATE INDEX IF NOT EXISTS idx_sprite_pool_ready ON sprite_pool(status, ready_at);
+
+-- No policies: only the service role can read or write the pool
+ALTER TABLE sprite_pool ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE sprite_pool IS 'Bootstrapped sprites not yet assigned to a stack';
+
+
+-- Function: Assign the oldest ready pool sprite to a stack without one
+-- Returns the stack's sprite_name (its existing one if already assigned),
+-- or NULL if the stack isn't the user's or the pool has no ready sprite.
+CREATE OR REPLACE FUNCTION claim_pool_sprite(
+    p_stack_id UUID,
+    p_user_id TEXT
+) RETURNS TEXT AS $$
+DECLARE
+    v_current TEXT;
+    v_name TEXT;
+BEGIN
+    SELECT sprite_name INTO v_current
+    FROM stacks
+    WHERE id = p_stack_id AND user_id = p_user_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+    IF v_current IS NOT NULL THEN
+        RETURN v_current;
+    END IF;
+
+    DELETE FROM sprite_pool
+    WHERE name = (
+        SELECT name FROM sprite_pool
+        WHERE status = 'ready'
+        ORDER BY ready_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING name INTO v_name;
+
+    IF v_name IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE stacks
+    SET sprite_name = v_name, sprite_status = 'active', updated_at = NOW()
+    WHERE id = p_stack_id;
+
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Backend (service role) only
+REVOKE EXECUTE ON FUNCTION claim_pool_sprite FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,37 @@
+-- Migration 029: Speculative extractions don't complete the document until claimed
+-- A speculative run (migration 019) starts before the user asks for an
+-- extraction. Committing it must not mark the document completed, or the
+-- UI shows an unrequested extraction as done. The document is completed
+-- when /api/agent/extract claims the run (claim_speculative_extraction /
+-- mark_claimed), or here if it was claimed while still running.
+
+CREATE OR REPLACE FUNCTION commit_extraction(
+    p_extraction_id UUID,
+    p_document_id UUID,
+    p_user_id TEXT,
+    p_fields JSONB,
+    p_scores JSONB
+) RETURNS VOID AS $$
+DECLARE
+    v_unclaimed BOOLEAN;
+BEGIN
+    UPDATE extractions
+    SET
+        extracted_fields = p_fields,
+        confidence_scores = COALESCE(p_scores, '{}'::jsonb),
+        status = 'completed',
+        updated_at = NOW()
+    WHERE id = p_extraction_id AND user_id = p_user_id
+    RETURNING speculative AND claimed_at IS NULL INTO v_unclaimed;
+
+    IF COALESCE(v_unclaimed, false) THEN
+        RETURN;
+    END IF;
+
+    UPDATE documents
+    SET status = 'completed'
+    WHERE id = p_document_id AND user_id = p_user_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+GRANT EXECUTE ON FUNCTION commit_extraction TO authenticated;
@@ -0,0 +1,33 @@
+-- Migration 030: One collector per pending stack batch
+-- Collecting a batch (migration 024) can be resumed by calling /api/stack/batch
+-- again, including from another process. Two collectors of the same job would
+-- write every row and the run's telemetry twice, so collection is claimed
+-- with a lease: batch_collecting_at is set by the claim and renewed while the
+-- collector polls; a lease older than p_lease_seconds belongs to a collector
+-- that died and can be taken over.
+
+ALTER TABLE stack_tables
+ADD COLUMN IF NOT EXISTS batch_collecting_at TIMESTAMPTZ;
+
+COMMENT ON COLUMN stack_tables.batch_collecting_at IS 'Lease of the process collecting batch_job (renewed while it polls). NULL when nobody is collecting.';
+
+CREATE OR REPLACE FUNCTION claim_stack_batch_collection(
+    p_table_id UUID,
+    p_user_id TEXT,
+    p_lease_seconds INTEGER
+) RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE stack_tables
+    SET batch_collecting_at = NOW()
+    WHERE id = p_table_id
+      AND user_id = p_user_id
+      AND batch_job IS NOT NULL
+      AND (batch_collecting_at IS NULL
+           OR batch_collecting_at < NOW() - make_interval(secs => p_lease_seconds));
+
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Backend (service role) only
+REVOKE EXECUTE ON FUNCTION claim_stack_batch_collection FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,70 @@
+-- Migration 031: Change a stack column's definition in place
+-- Complements add/rename/delete_stack_column (migration 023) for the stack
+-- agent's set_column tool: replaces a column's type/description - and, in
+-- the same statement, optionally its name - under the table lock. Cells
+-- are kept (moved to the new name); their column_versions no longer match
+-- the new definition, so incremental refresh re-extracts the column.
+
+-- Function: Replace the definition of column p_name with p_column
+-- p_column may carry a new name. Returns the table's new columns (NULL if
+-- the table isn't the user's).
+CREATE OR REPLACE FUNCTION redefine_stack_column(
+    p_table_id UUID,
+    p_user_id TEXT,
+    p_name TEXT,
+    p_column JSONB
+) RETURNS JSONB AS $$
+DECLARE
+    v_columns JSONB := lock_stack_table_columns(p_table_id, p_user_id);
+    v_new TEXT := p_column->>'name';
+BEGIN
+    IF v_columns IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM jsonb_array_elements(v_columns) c
+        WHERE COALESCE(c->>'name', c #>> '{}') = p_name
+    ) THEN
+        RAISE EXCEPTION 'Column "%" does not exist', p_name;
+    END IF;
+
+    IF v_new IS DISTINCT FROM p_name AND EXISTS (
+        SELECT 1 FROM jsonb_array_elements(v_columns) c
+        WHERE COALESCE(c->>'name', c #>> '{}') = v_new
+    ) THEN
+        RAISE EXCEPTION 'Column "%" already exists', v_new;
+    END IF;
+
+    SELECT jsonb_agg(
+        CASE WHEN COALESCE(c->>'name', c #>> '{}') = p_name THEN p_column ELSE c END
+        ORDER BY i
+    )
+    INTO v_columns
+    FROM jsonb_array_elements(v_columns) WITH ORDINALITY AS t(c, i);
+
+    UPDATE stack_tables SET columns = v_columns, updated_at = NOW() WHERE id = p_table_id;
+
+    -- Renamed: move the cells, keeping their old versions
+    IF v_new IS DISTINCT FROM p_name THEN
+        UPDATE stack_table_rows
+        SET
+            row_data = CASE WHEN row_data ? p_name
+                THEN (row_data - p_name) || jsonb_build_object(v_new, row_data->p_name)
+                ELSE row_data END,
+            confidence_scores = CASE WHEN confidence_scores ? p_name
+                THEN (confidence_scores - p_name) || jsonb_build_object(v_new, confidence_scores->p_name)
+                ELSE confidence_scores END,
+            column_versions = CASE WHEN column_versions ? p_name
+                THEN (column_versions - p_name) || jsonb_build_object(v_new, column_versions->p_name)
+                ELSE column_versions END,
+            updated_at = NOW()
+        WHERE table_id = p_table_id
+          AND (row_data ? p_name OR confidence_scores ? p_name OR column_versions ? p_name);
+    END IF;
+
+    RETURN v_columns;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+GRANT EXECUTE ON FUNCTION redefine_stack_column TO authenticated;
@@ -0,0 +1,39 @@
+-- Migration 032: One extraction per stack table
+-- Interactive extraction and batch submission both mark a table 'processing'.
+-- Checking the status and then setting it lets two close requests both start
+-- a run, so the flip is a single claim: it only succeeds when no batch is
+-- pending and the table isn't processing, or its processing heartbeat
+-- (updated_at, refreshed while a run is live) is older than p_stale_seconds.
+-- Returns the status the table had before the claim, NULL when not claimed.
+
+CREATE OR REPLACE FUNCTION claim_stack_extraction(
+    p_table_id UUID,
+    p_user_id TEXT,
+    p_stale_seconds INTEGER
+) RETURNS TEXT AS $$
+DECLARE
+    v_status TEXT;
+BEGIN
+    SELECT status INTO v_status
+    FROM stack_tables
+    WHERE id = p_table_id
+      AND user_id = p_user_id
+      AND batch_job IS NULL
+      AND (status IS DISTINCT FROM 'processing'
+           OR updated_at < NOW() - make_interval(secs => p_stale_seconds))
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE stack_tables
+    SET status = 'processing', updated_at = NOW()
+    WHERE id = p_table_id;
+
+    RETURN COALESCE(v_status, 'pending');
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Backend (service role) only
+REVOKE EXECUTE ON FUNCTION claim_stack_extraction FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,79 @@
+"""
+Test: Agent runs under the shared limiter
+
+The limiter admission must be released as soon as the agent finishes,
+however slowly the caller consumes the messages, and the run must be
+charged one request per turn.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_agent_runner.py -v
+"""
+
+import asyncio
+
+import pytest
+
+from app.agents.shared import RunTelemetry, runner
+from app.services.rate_limit import ProviderLimiter
+
+
+class FakeClient:
+    """Agent session that replies with three messages."""
+
+    def __init__(self, options):
+        self.options = options
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def query(self, prompt):
+        self.prompt = prompt
+
+    async def receive_response(self):
+        for i in range(3):
+            yield f"message {i}"
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = ProviderLimiter("test", requests_per_minute=60)
+    monkeypatch.setattr(runner, "get_limiter", lambda provider: limiter)
+    monkeypatch.setattr(runner, "ClaudeSDKClient", FakeClient)
+    return limiter
+
+
+def test_slot_released_before_slow_consumer_finishes(limiter):
+    telemetry = RunTelemetry("extraction", "user")
+    telemetry.num_turns = 4
+
+    async def consume():
+        in_flight = []
+        async for message in runner.run_agent(None, "prompt", telemetry):
+            await asyncio.sleep(0.01)  # Slow SSE client
+            in_flight.append(limiter.in_flight)
+        return in_flight
+
+    in_flight = asyncio.run(consume())
+
+    assert in_flight[-1] == 0  # Released while messages were still being consumed
+    assert limiter.requests.level == pytest.approx(56, abs=0.5)  # One per turn
+
+
+def test_agent_errors_reach_the_caller(limiter, monkeypatch):
+    class FailingClient(FakeClient):
+        async def query(self, prompt):
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(runner, "ClaudeSDKClient", FailingClient)
+
+    async def consume():
+        async for _ in runner.run_agent(None, "prompt", RunTelemetry("extraction", "user")):
+            pass
+
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(consume())
+    assert limiter.in_flight == 0
@@ -0,0 +1,51 @@
+"""
+Test: Compact correction snapshots
+
+The snapshot prompt must stay bounded however long the document and
+however many corrections came before.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_correction_compaction.py -v
+"""
+
+from app.agents.extraction_agent.compaction import (
+    EXCERPT_CHAR_BUDGET,
+    MAX_CORRECTION_NOTES,
+    NOTE_SUMMARY_CHARS,
+    add_correction_note,
+    build_snapshot_prompt,
+    instruction_keywords,
+    select_ocr_excerpts,
+)
+
+
+def test_instruction_keywords_keep_quotes_numbers_and_distinctive_words():
+    keywords = instruction_keywords('Please change the vendor to "Acme Pty Ltd" and total to 1,250.00')
+    assert keywords == ["vendor", "Acme Pty Ltd", "total", "1,250.00"]
+
+
+def test_excerpts_find_keyword_pages_within_budget():
+    pages = ["Cover page"] + ["filler " * 500] * 50 + ["Invoice total: 1,250.00 AUD"]
+    excerpts = select_ocr_excerpts(pages, "total should be 1,250.00")
+    assert excerpts[0].startswith("[Page 52]")
+    assert sum(len(e) for e in excerpts) <= EXCERPT_CHAR_BUDGET
+
+
+def test_correction_notes_are_bounded():
+    notes = []
+    for i in range(MAX_CORRECTION_NOTES + 5):
+        notes = add_correction_note(notes, f"fix {i}", "changed " * 200)
+    assert len(notes) == MAX_CORRECTION_NOTES
+    assert notes[0]["instruction"] == "fix 5"
+    assert len(notes[-1]["summary"]) <= NOTE_SUMMARY_CHARS + 3
+
+
+def test_snapshot_prompt_contains_state_history_and_instruction():
+    snapshot = {"extracted_fields": {"total": 10}, "confidence_scores": {"total": 0.9}, "status": "completed"}
+    notes = add_correction_note([], "set currency", "Set currency to AUD.")
+    prompt = build_snapshot_prompt(snapshot, notes, ["[Page 1] ...total 10..."], "total is 12")
+    assert '"total":10' in prompt
+    assert "set currency" in prompt
+    assert "[Page 1]" in prompt
+    assert prompt.rstrip().endswith("summarize what you changed.")
@@ -0,0 +1,45 @@
+"""
+Test: Extraction write-behind buffer path semantics
+
+The buffer replaces per-call jsonb_set / #- RPCs, so its path handling must
+match Postgres: missing parents are not created, out-of-range array
+indexes append, and deletes of absent paths are no-ops.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_extraction_buffer.py -v
+"""
+
+from app.agents.extraction_agent.buffer import ExtractionBuffer, delete_path, set_path
+
+
+def test_set_path_matches_jsonb_set():
+    data = {"vendor": {"name": "Acme"}, "items": [{"price": 1}]}
+    assert set_path(data, ["vendor", "name"], "Acme Corp")
+    assert set_path(data, ["items", "0", "price"], 2)
+    assert set_path(data, ["items", "5"], {"price": 3})  # Appends
+    assert set_path(data, ["items", "-9"], {"price": 0})  # Prepends
+    assert not set_path(data, ["missing", "name"], "x")  # Parent must exist
+    assert data == {
+        "vendor": {"name": "Acme Corp"},
+        "items": [{"price": 0}, {"price": 2}, {"price": 3}],
+    }
+
+
+def test_delete_path_matches_jsonb_minus():
+    data = {"vendor": {"name": "Acme"}, "items": [1, 2, 3]}
+    assert delete_path(data, ["items", "1"])
+    assert delete_path(data, ["vendor", "name"])
+    assert not delete_path(data, ["vendor", "name"])
+    assert data == {"vendor": {}, "items": [1, 3]}
+
+
+def test_buffer_tracks_fields_and_confidences_without_db():
+    buffer = ExtractionBuffer("ext", "doc", "user", db=None)  # type: ignore[arg-type]
+    buffer.replace({"total": 10, "vendor": {"name": "Acme"}}, {"total": 0.9, "vendor": {"name": 0.8}})
+    assert buffer.set_field(["vendor", "name"], "Acme Corp", 0.95)
+    assert buffer.delete_field(["total"])
+    snapshot = buffer.snapshot()
+    assert snapshot["extracted_fields"] == {"vendor": {"name": "Acme Corp"}}
+    assert snapshot["confidence_scores"] == {"vendor": {"name": 0.95}}
+    assert buffer.dirty
@@ -0,0 +1,76 @@
+"""
+Test: Model routing policy
+
+Simple documents stay on the fast model with an escalation fallback;
+long or complex ones go straight to the strong model with more turns.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_routing.py -v
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents.shared import routing
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    fake = SimpleNamespace(
+        CLAUDE_MODEL="fast-model",
+        CLAUDE_MODEL_STRONG="strong-model",
+        MODEL_ROUTING_ENABLED=True,
+    )
+    monkeypatch.setattr(routing, "get_settings", lambda: fake)
+    return fake
+
+
+def signals(**overrides) -> routing.RoutingSignals:
+    base: routing.RoutingSignals = {
+        "page_count": 1,
+        "token_count": 800,
+        "table_count": 0,
+        "field_count": 0,
+        "correction_rate": 0.0,
+    }
+    base.update(overrides)  # type: ignore[typeddict-item]
+    return base
+
+
+def test_simple_document_uses_fast_model_with_escalation():
+    decision = routing.route_extraction(signals())
+    assert decision["model"] == "fast-model"
+    assert decision["escalation_model"] == "strong-model"
+    assert decision["max_turns"] == routing.BASE_MAX_TURNS
+
+
+def test_complex_document_uses_strong_model():
+    decision = routing.route_extraction(
+        signals(page_count=40, token_count=50_000, table_count=12)
+    )
+    assert decision["model"] == "strong-model"
+    assert decision["escalation_model"] is None
+    assert decision["max_turns"] > routing.BASE_MAX_TURNS
+
+
+def test_correction_rate_tips_medium_document():
+    medium = signals(page_count=5, table_count=8)
+    assert routing.route_extraction(medium)["model"] == "fast-model"
+    assert routing.route_extraction({**medium, "correction_rate": 0.5})["model"] == "strong-model"
+
+
+def test_routing_disabled(settings):
+    settings.MODEL_ROUTING_ENABLED = False
+    decision = routing.route_extraction(signals(page_count=40, token_count=50_000))
+    assert decision["model"] == "fast-model"
+    assert decision["escalation_model"] is None
+
+
+def test_resume_model_only_reuses_claude_model_ids():
+    assert routing.resume_model("claude-sonnet-4-5") == "claude-sonnet-4-5"
+    assert routing.resume_model("claude-agent-sdk") is None  # Legacy default
+    assert routing.resume_model("pre-extract") is None
+    assert routing.resume_model("template") is None
+    assert routing.resume_model(None) is None
@@ -0,0 +1,80 @@
+"""
+Test: set_fields batched updates
+
+set_fields must apply all of its updates and deletions or none of them,
+and reject the same bad paths as set_field / delete_field (missing parent
+on set, missing field on delete).
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_set_fields.py -v
+"""
+
+import asyncio
+
+from app.agents.extraction_agent.buffer import ExtractionBuffer
+from app.agents.extraction_agent.tools.set_fields import create_set_fields_tool
+
+
+def make_buffer() -> ExtractionBuffer:
+    buffer = ExtractionBuffer("ext", "doc", "user", db=None)  # type: ignore[arg-type]
+    buffer.replace(
+        {"total": 10, "vendor": {"name": "Acme"}, "items": [{"price": 1}]},
+        {"total": 0.9, "vendor": {"name": 0.8}, "items": [{"price": 0.7}]},
+    )
+    buffer.dirty = False
+    return buffer
+
+
+def call(buffer: ExtractionBuffer, **args) -> dict:
+    return asyncio.run(create_set_fields_tool(buffer).handler(args))
+
+
+def test_updates_and_deletions_apply_together():
+    buffer = make_buffer()
+
+    result = call(
+        buffer,
+        updates=[
+            {"path": "vendor.name", "value": "Acme Corp", "confidence": 0.95},
+            {"path": "items[0].price", "value": "2"},
+        ],
+        deletions=["total"],
+    )
+
+    assert not result.get("is_error")
+    assert buffer.fields == {"vendor": {"name": "Acme Corp"}, "items": [{"price": 2}]}
+    assert buffer.confidences == {"vendor": {"name": 0.95}, "items": [{"price": 0.8}]}
+    assert buffer.dirty
+
+
+def test_missing_parent_applies_nothing():
+    buffer = make_buffer()
+
+    result = call(
+        buffer,
+        updates=[{"path": "vendor.name", "value": "Acme Corp"}, {"path": "missing.name", "value": "x"}],
+    )
+
+    assert result["is_error"]
+    assert buffer.fields["vendor"]["name"] == "Acme"
+    assert not buffer.dirty
+
+
+def test_deleting_missing_field_is_an_error_like_delete_field():
+    buffer = make_buffer()
+
+    result = call(buffer, updates=[{"path": "total", "value": 12}], deletions=["tax"])
+
+    assert result["is_error"]
+    assert "No field at 'tax'" in result["content"][0]["text"]
+    assert buffer.fields["total"] == 10
+    assert not buffer.dirty
+
+
+def test_rejects_bad_confidence_and_empty_call():
+    buffer = make_buffer()
+
+    assert call(buffer, updates=[{"path": "total", "value": 1, "confidence": 2}])["is_error"]
+    assert call(buffer)["is_error"]
+    assert buffer.fields["total"] == 10
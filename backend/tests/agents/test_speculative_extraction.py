@@ -0,0 +1,112 @@
+"""
+Test: Speculative extraction event replay and tier limits
+
+A client attaching to an in-flight speculative run must see every event,
+including those published before it attached.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_speculative_extraction.py -v
+"""
+
+import asyncio
+
+from app.agents.extraction_agent.speculative import (
+    SpeculativeRun,
+    claim_speculative_extraction,
+    mark_claimed,
+    parse_tier_limits,
+)
+
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class Query:
+    """Minimal in-memory PostgREST update with eq/is_ filters."""
+
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+        self.filters = []
+        self.values = {}
+
+    def update(self, values):
+        self.values = values
+        return self
+
+    def eq(self, key, value):
+        self.filters.append(lambda row: row.get(key) == value)
+        return self
+
+    def is_(self, key, value):
+        self.filters.append(lambda row: row.get(key) is None)
+        return self
+
+    def execute(self):
+        matched = [row for row in self.rows if all(f(row) for f in self.filters)]
+        for row in matched:
+            row.update(self.values)
+        return Result(matched)
+
+
+class Db:
+    def __init__(self, extraction_status: str):
+        self.tables = {
+            "documents": [{"id": "doc", "user_id": "user", "status": "ocr_complete"}],
+            "extractions": [{
+                "id": "ext", "document_id": "doc", "user_id": "user",
+                "speculative": True, "status": extraction_status, "claimed_at": None,
+            }],
+        }
+
+    def table(self, name):
+        return Query(self.tables[name])
+
+
+def test_parse_tier_limits():
+    assert parse_tier_limits("free:5, pro:500,,broken") == {"free": 5, "pro": 500}
+
+
+def test_late_subscriber_sees_all_events():
+    async def scenario() -> list[list[dict]]:
+        run = SpeculativeRun("doc", "user", "ext")
+        await run.publish({"text": "one"})
+
+        async def collect() -> list[dict]:
+            return [event async for event in run.follow()]
+
+        early = asyncio.create_task(collect())
+        await asyncio.sleep(0)
+        await run.publish({"tool": "read_ocr", "input": {}})
+        await run.publish({"complete": True})
+        await run.finish()
+
+        late = await collect()  # Attaches after the run finished
+        return [await early, late]
+
+    early, late = asyncio.run(scenario())
+    expected = [{"text": "one"}, {"tool": "read_ocr", "input": {}}, {"complete": True}]
+    assert early == expected
+    assert late == expected
+
+
+def test_claiming_finished_run_completes_document():
+    db = Db("completed")  # Committed while unclaimed: document left as is
+
+    claimed = claim_speculative_extraction(db, "doc", "user")
+
+    assert claimed["id"] == "ext" and claimed["claimed_at"]
+    assert db.tables["documents"][0]["status"] == "completed"
+    assert claim_speculative_extraction(db, "doc", "user") is None  # Claimed once
+
+
+def test_attaching_to_running_run_leaves_completion_to_commit():
+    db = Db("in_progress")
+    mark_claimed(db, "ext")
+    assert db.tables["documents"][0]["status"] == "ocr_complete"
+
+    db = Db("completed")  # Commit landed just before the claim
+    mark_claimed(db, "ext")
+    assert db.tables["documents"][0]["status"] == "completed"
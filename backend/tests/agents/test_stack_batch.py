@@ -0,0 +1,214 @@
+"""
+Test: Offline stack batch extraction
+
+The local batch provider stands in for the Message Batches API: results
+come back per custom_id, failures are reported per request, and the row
+requests/parsing are the same ones interactive structured rows use.
+Submissions are split within per-batch limits, and a job has one
+collector at a time.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_stack_batch.py -v
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from anthropic.types import Message, ToolUseBlock, Usage
+
+from app.agents.shared import RunTelemetry
+from app.agents.stack_agent.batch import collect_stack_batch
+from app.agents.stack_agent.structured import parse_row, row_request, tool_input
+from app.services.message_batches import BatchNotFoundError, LocalBatchProvider, split_batches, wait_for_batch
+
+COLUMNS = [{"name": "vendor", "type": "text"}, {"name": "total", "type": "number"}]
+
+
+def save_row_message(row_data: dict, scores: dict) -> Message:
+    return Message(
+        id="msg_1",
+        type="message",
+        role="assistant",
+        model="claude-haiku-4-5",
+        content=[ToolUseBlock(
+            id="toolu_1", type="tool_use", name="save_row",
+            input={"row_data": row_data, "confidence_scores": scores},
+        )],
+        stop_reason="tool_use",
+        stop_sequence=None,
+        usage=Usage(input_tokens=100, output_tokens=20),
+    )
+
+
+def respond(params: dict) -> Message:
+    document = params["messages"][0]["content"]
+    if "unreadable" in document:
+        raise RuntimeError("request failed")
+    return save_row_message({"vendor": "Acme", "total": 12.5}, {"vendor": 0.9, "total": 0.8})
+
+
+async def run_batch(provider: LocalBatchProvider) -> list[dict]:
+    batch_id = await provider.submit([
+        {"custom_id": "doc-1", "params": row_request(COLUMNS, "Acme invoice, total 12.50", "claude-haiku-4-5")},
+        {"custom_id": "doc-2", "params": row_request(COLUMNS, "unreadable scan", "claude-haiku-4-5")},
+    ])
+    await wait_for_batch(provider, batch_id, poll_seconds=0)
+    return [result async for result in provider.results(batch_id)]
+
+
+def test_local_batch_returns_results_per_request():
+    results = asyncio.run(run_batch(LocalBatchProvider(respond)))
+    assert [r["custom_id"] for r in results] == ["doc-1", "doc-2"]
+    assert results[1] == {"custom_id": "doc-2", "message": None, "error": "request failed"}
+
+    message = results[0]["message"]
+    row_data, scores = parse_row(COLUMNS, tool_input(message.content, "save_row"))
+    assert row_data == {"vendor": "Acme", "total": 12.5}
+    assert scores == {"vendor": 0.9, "total": 0.8}
+
+
+def test_row_request_forces_save_row():
+    request = row_request(COLUMNS, "text", "claude-haiku-4-5")
+    assert request["tool_choice"] == {"type": "tool", "name": "save_row"}
+    assert request["tools"][0]["name"] == "save_row"
+
+
+def test_parse_row_rejects_unknown_columns():
+    with pytest.raises(ValueError):
+        parse_row(COLUMNS, {"row_data": {"vendor": "Acme", "tax": 1}, "confidence_scores": {}})
+
+
+def test_unknown_local_batch_is_not_found():
+    with pytest.raises(BatchNotFoundError):
+        asyncio.run(LocalBatchProvider(respond).ended("local_missing"))
+
+
+def test_telemetry_adds_up_batch_usage():
+    telemetry = RunTelemetry("stack_batch", "user")
+    for _ in range(3):
+        telemetry.observe_api_response(save_row_message({}, {}))
+    assert telemetry.usage["input_tokens"] == 300
+    assert telemetry.usage["output_tokens"] == 60
+    assert telemetry.num_turns == 3
+
+
+def test_split_batches_respects_count_and_size():
+    requests = [{"custom_id": f"doc-{i}", "params": {"text": "x" * 100}} for i in range(10)]
+    assert [len(b) for b in split_batches(requests, max_requests=4)] == [4, 4, 2]
+
+    one = len(str(requests[0]).encode())
+    batches = split_batches(requests, max_bytes=3 * one)
+    assert all(len(b) <= 3 for b in batches)
+    assert [r["custom_id"] for b in batches for r in b] == [r["custom_id"] for r in requests]
+
+
+class Query:
+    def __init__(self, db: "FakeDb"):
+        self.db = db
+        self.values: dict | None = None
+
+    def select(self, columns: str) -> "Query":
+        return self
+
+    def update(self, values: dict) -> "Query":
+        self.values = values
+        return self
+
+    def insert(self, values: dict) -> "Query":
+        self.db.runs.append(values)
+        return self
+
+    def eq(self, column: str, value) -> "Query":
+        return self
+
+    def limit(self, n: int) -> "Query":
+        return self
+
+    def execute(self):
+        if self.values is not None:
+            self.db.table_row.update(self.values)
+        return SimpleNamespace(data=[dict(self.db.table_row)])
+
+
+class Rpc:
+    def __init__(self, db: "FakeDb", name: str, params: dict):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self):
+        if self.name == "claim_stack_batch_collection":
+            claimed = self.db.table_row.get("batch_collecting_at") is None
+            self.db.table_row["batch_collecting_at"] = "now"
+            return SimpleNamespace(data=claimed)
+        self.db.upserts.extend(self.params["p_rows"])
+        return SimpleNamespace(data=[{"document_id": r["document_id"], "id": f"row-{r['document_id']}"}
+                                     for r in self.params["p_rows"]])
+
+
+class FakeDb:
+    def __init__(self, job: dict):
+        self.table_row: dict = {"batch_job": job, "batch_collecting_at": None, "status": "processing"}
+        self.upserts: list[dict] = []
+        self.runs: list[dict] = []
+
+    def table(self, name: str) -> Query:
+        return Query(self)
+
+    def rpc(self, name: str, params: dict) -> Rpc:
+        return Rpc(self, name, params)
+
+
+async def submit_job(provider: LocalBatchProvider) -> dict:
+    batch_ids = [
+        await provider.submit([{"custom_id": document_id, "params": row_request(COLUMNS, "Acme", "claude-haiku-4-5")}])
+        for document_id in ("doc-1", "doc-2")
+    ]
+    return {
+        "batches": batch_ids,
+        "provider": "local",
+        "model": "claude-haiku-4-5",
+        "columns": COLUMNS,
+        "documents": {
+            "doc-1": {"ocr_content_hash": "h1", "batch": batch_ids[0]},
+            "doc-2": {"ocr_content_hash": "h2", "batch": batch_ids[1]},
+        },
+    }
+
+
+async def slow_respond(params: dict) -> Message:
+    await asyncio.sleep(0.01)
+    return respond(params)
+
+
+def test_concurrent_collectors_write_rows_once():
+    provider = LocalBatchProvider(slow_respond)
+
+    async def run():
+        db = FakeDb(await submit_job(provider))
+        results = await asyncio.gather(
+            collect_stack_batch("table-1", "user-1", db, provider, poll_seconds=0.01),
+            collect_stack_batch("table-1", "user-1", db, provider, poll_seconds=0.01),
+        )
+        return db, results
+
+    db, results = asyncio.run(run())
+    assert results[1] is None
+    assert results[0]["completed"] == 2
+    assert sorted(row["document_id"] for row in db.upserts) == ["doc-1", "doc-2"]
+    assert len(db.runs) == 1
+    assert db.table_row["batch_job"] is None and db.table_row["batch_collecting_at"] is None
+    assert db.table_row["status"] == "completed"
+
+
+def test_leased_job_is_left_to_its_collector():
+    provider = LocalBatchProvider(respond)
+
+    async def run():
+        db = FakeDb(await submit_job(provider))
+        db.table_row["batch_collecting_at"] = "held by another process"
+        return db, await collect_stack_batch("table-1", "user-1", db, provider, poll_seconds=0.01)
+
+    db, result = asyncio.run(run())
+    assert result is None
+    assert db.upserts == [] and db.table_row["batch_job"] is not None
@@ -0,0 +1,116 @@
+"""
+Test: Stack column tools
+
+add_column, set_column and delete_column must validate against the
+table's current columns (and defaults against the column type) and change
+the schema through the column RPCs: one call per change, regardless of
+row count, so a change never half-applies.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_stack_column_tools.py -v
+"""
+
+import asyncio
+import json
+
+from app.agents.stack_agent.columns import column_version
+from app.agents.stack_agent.tools.add_column import create_add_column_tool
+from app.agents.stack_agent.tools.delete_column import create_delete_column_tool
+from app.agents.stack_agent.tools.set_column import create_set_column_tool
+
+VENDOR = {"name": "vendor", "type": "text"}
+TOTAL = {"name": "total", "type": "number"}
+TABLE = {"id": "table-1", "columns": [VENDOR, TOTAL]}
+
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class Query:
+    """Chainable stand-in for a PostgREST query returning fixed data."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return Result(self.data)
+
+
+class ColumnDb:
+    def __init__(self):
+        self.rpcs: list[tuple[str, dict]] = []
+
+    def table(self, name):
+        return Query([TABLE])
+
+    def rpc(self, name, params):
+        self.rpcs.append((name, params))
+        return Query([VENDOR, TOTAL])
+
+
+def call(create_tool, db, **args):
+    tool = create_tool("stack", "user", db)
+    return asyncio.run(tool.handler({"table_id": TABLE["id"], **args}))
+
+
+def test_add_column_sets_default_in_one_call():
+    db = ColumnDb()
+    result = call(create_add_column_tool, db, name="currency", type="text", default="EUR")
+
+    assert "is_error" not in result
+    assert db.rpcs == [("add_stack_column", {
+        "p_table_id": "table-1",
+        "p_user_id": "user",
+        "p_column": {"name": "currency", "type": "text"},
+        "p_default": "EUR",
+    })]
+    assert json.loads(result["content"][0]["text"])["columns"] == [VENDOR, TOTAL]
+
+
+def test_add_column_rejects_existing_names_bad_types_and_defaults():
+    db = ColumnDb()
+    assert call(create_add_column_tool, db, name="vendor")["is_error"]
+    assert call(create_add_column_tool, db, name="currency", type="money")["is_error"]
+    assert call(create_add_column_tool, db, name="tax", type="number", default="n/a")["is_error"]
+    assert db.rpcs == []
+
+
+def test_set_column_rename_and_redefine_is_one_call():
+    db = ColumnDb()
+    result = call(create_set_column_tool, db, name="total", new_name="amount", description="Invoice total")
+
+    assert "is_error" not in result
+    assert db.rpcs == [("redefine_stack_column", {
+        "p_table_id": "table-1",
+        "p_user_id": "user",
+        "p_name": "total",
+        "p_column": {**TOTAL, "name": "amount", "description": "Invoice total"},
+    })]
+
+
+def test_set_column_rename_only_keeps_cell_versions():
+    db = ColumnDb()
+    assert "is_error" not in call(create_set_column_tool, db, name="total", new_name="amount")
+    assert [name for name, _ in db.rpcs] == ["rename_stack_column"]
+    assert db.rpcs[0][1]["p_version"] == column_version({**TOTAL, "name": "amount"})
+
+
+def test_set_column_rejects_unknown_columns_and_no_ops():
+    db = ColumnDb()
+    assert call(create_set_column_tool, db, name="tax", type="number")["is_error"]
+    assert call(create_set_column_tool, db, name="total", new_name="vendor")["is_error"]
+    assert call(create_set_column_tool, db, name="total", type="number")["is_error"]
+    assert db.rpcs == []
+
+
+def test_delete_column():
+    db = ColumnDb()
+    assert call(create_delete_column_tool, db, name="tax")["is_error"]
+    assert "is_error" not in call(create_delete_column_tool, db, name="total")
+    assert db.rpcs == [("delete_stack_column", {"p_table_id": "table-1", "p_user_id": "user", "p_name": "total"})]
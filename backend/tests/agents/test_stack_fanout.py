@@ -0,0 +1,91 @@
+"""
+Test: Stack extraction fan-out
+
+Per-document workers must run in parallel up to the concurrency limit,
+stream progress as they finish, and not let one failure stop the rest.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_stack_fanout.py -v
+"""
+
+import asyncio
+import time
+
+from app.agents.stack_agent.columns import format_columns, table_columns
+from app.agents.stack_agent.fanout import fan_out
+
+
+def run_fan_out(document_ids, worker, concurrency):
+    async def collect():
+        return [event async for event in fan_out(document_ids, worker, concurrency)]
+    return asyncio.run(collect())
+
+
+def test_stack_takes_about_as_long_as_slowest_document():
+    running = peak = 0
+
+    async def worker(document_id: str) -> dict:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.1)
+        running -= 1
+        return {"row_id": f"row-{document_id}"}
+
+    start = time.monotonic()
+    events = run_fan_out([f"doc-{i}" for i in range(20)], worker, concurrency=20)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.5  # Serial would take 2s
+    assert peak == 20
+    completed = [e for e in events if e["status"] == "completed"]
+    assert len(completed) == 20
+    assert completed[0]["row_id"].startswith("row-doc-")
+
+
+def test_concurrency_is_bounded():
+    running = peak = 0
+
+    async def worker(document_id: str) -> dict:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {}
+
+    run_fan_out([f"doc-{i}" for i in range(10)], worker, concurrency=3)
+    assert peak == 3
+
+
+def test_failure_does_not_stop_other_documents():
+    async def worker(document_id: str) -> dict:
+        if document_id == "bad":
+            raise ValueError("Agent finished without saving a row")
+        await asyncio.sleep(0.01)
+        return {"row_id": document_id}
+
+    events = run_fan_out(["a", "bad", "b"], worker, concurrency=2)
+    finished = {e["document_id"]: e for e in events if e["status"] != "started"}
+    assert finished["bad"] == {"document_id": "bad", "status": "failed", "error": "Agent finished without saving a row"}
+    assert finished["a"]["status"] == finished["b"]["status"] == "completed"
+
+
+def test_progress_streams_in_completion_order():
+    async def worker(document_id: str) -> dict:
+        await asyncio.sleep({"slow": 0.1, "fast": 0.01}[document_id])
+        return {}
+
+    events = run_fan_out(["slow", "fast"], worker, concurrency=2)
+    done = [e["document_id"] for e in events if e["status"] == "completed"]
+    assert done == ["fast", "slow"]
+
+
+def test_table_columns_accepts_objects_names_and_custom_columns():
+    columns = table_columns({"columns": [{"name": "vendor", "type": "text"}, "total", {"name": ""}]})
+    assert columns == [{"name": "vendor", "type": "text"}, {"name": "total"}]
+    assert table_columns({"columns": None, "custom_columns": ["date", " amount "]}) == [
+        {"name": "date"}, {"name": "amount"},
+    ]
+    assert format_columns([{"name": "total", "type": "number", "description": "Incl. tax"}]) == "- total (number): Incl. tax"
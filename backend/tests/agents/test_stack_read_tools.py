@@ -0,0 +1,94 @@
+"""
+Test: Paginated stack read tools
+
+read_rows must page through the database (keyset cursor, capped limit,
+projection and filters passed to the RPC) rather than dump the table,
+and reject columns the table doesn't have.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_stack_read_tools.py -v
+"""
+
+import asyncio
+import json
+
+from app.agents.stack_agent.tools.read_rows import MAX_PAGE_SIZE, create_read_rows_tool
+
+TABLE = {"id": "11111111-1111-1111-1111-111111111111", "columns": [{"name": "vendor"}, {"name": "total"}]}
+
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class Query:
+    """Chainable stand-in for a PostgREST query returning fixed data."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return Result(self.data)
+
+
+class StackDb:
+    def __init__(self, rows):
+        self.rows = rows
+        self.rpcs: list[tuple[str, dict]] = []
+
+    def table(self, name):
+        return Query([TABLE])
+
+    def rpc(self, name, params):
+        self.rpcs.append((name, params))
+        return Query(self.rows[:params.get("p_limit", len(self.rows))])
+
+
+def read(db, **args):
+    tool = create_read_rows_tool("stack", "user", db)
+    return asyncio.run(tool.handler({"table_id": TABLE["id"], **args}))
+
+
+def row(i: int) -> dict:
+    return {"id": f"00000000-0000-0000-0000-{i:012d}", "document_id": f"doc-{i}",
+            "row_data": {"vendor": "Acme"}, "confidence_scores": {"vendor": 0.5}}
+
+
+def test_full_page_returns_cursor_and_passes_filters():
+    db = StackDb([row(i) for i in range(5)])
+    result = read(db, columns=["vendor"], limit=2, empty=["total"], low_confidence=0.6)
+
+    name, params = db.rpcs[0]
+    assert name == "read_stack_rows"
+    assert params["p_columns"] == ["vendor"]
+    assert params["p_empty"] == ["total"]
+    assert params["p_below"] == 0.6
+    page = json.loads(result["content"][0]["text"])
+    assert page["count"] == 2
+    assert page["next_cursor"] == row(1)["id"]
+
+
+def test_last_page_has_no_cursor_and_limit_is_capped():
+    db = StackDb([row(1)])
+    page = json.loads(read(db, limit=10_000)["content"][0]["text"])
+    assert db.rpcs[0][1]["p_limit"] == MAX_PAGE_SIZE
+    assert "next_cursor" not in page
+
+
+def test_unknown_columns_and_bad_cursor_are_errors():
+    db = StackDb([])
+    assert read(db, columns=["tax"])["is_error"]
+    assert read(db, after="not-a-cursor")["is_error"]
+    assert not db.rpcs
+
+
+def test_stats_uses_stats_rpc():
+    db = StackDb([])
+    read(db, stats=True)
+    assert db.rpcs[0][0] == "stack_table_stats"
+    assert db.rpcs[0][1]["p_columns"] == ["vendor", "total"]
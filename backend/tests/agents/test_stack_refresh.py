@@ -0,0 +1,58 @@
+"""
+Test: Incremental stack refresh planning
+
+Only new documents, re-OCR'd documents and cells of added or redefined
+columns may be re-extracted; rows of removed documents are dropped.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_stack_refresh.py -v
+"""
+
+from app.agents.stack_agent.columns import column_version
+from app.agents.stack_agent.refresh import plan_refresh
+
+VENDOR = {"name": "vendor", "type": "text"}
+TOTAL = {"name": "total", "type": "number"}
+COLUMNS = [VENDOR, TOTAL]
+
+
+def row(document_id: str, ocr_hash: str, columns=COLUMNS) -> dict:
+    return {
+        "document_id": document_id,
+        "ocr_content_hash": ocr_hash,
+        "column_versions": {c["name"]: column_version(c) for c in columns},
+    }
+
+
+def test_new_documents_only():
+    rows = [row(f"doc-{i}", f"h{i}") for i in range(1000)]
+    document_ids = [f"doc-{i}" for i in range(1005)]
+    hashes = {document_id: f"h{i}" for i, document_id in enumerate(document_ids)}
+
+    plan = plan_refresh(document_ids, hashes, rows, COLUMNS)
+    assert list(plan["todo"]) == [f"doc-{i}" for i in range(1000, 1005)]
+    assert len(plan["unchanged"]) == 1000
+    assert plan["partial"] == [] and plan["removed"] == []
+
+
+def test_reocr_redoes_the_whole_row():
+    plan = plan_refresh(["a"], {"a": "new-hash"}, [row("a", "old-hash")], COLUMNS)
+    assert plan["todo"] == {"a": COLUMNS}
+    assert plan["partial"] == []
+
+
+def test_added_and_changed_columns_redo_only_those_cells():
+    date = {"name": "date", "type": "date"}
+    total_incl_tax = {**TOTAL, "description": "Including tax"}
+    plan = plan_refresh(["a"], {"a": "h"}, [row("a", "h")], [VENDOR, total_incl_tax, date])
+    assert plan["todo"] == {"a": [total_incl_tax, date]}
+    assert plan["partial"] == ["a"]
+
+
+def test_removed_and_unocred_documents():
+    rows = [row("kept", "h"), row("gone", "h"), row("pending", "h")]
+    plan = plan_refresh(["kept", "pending"], {"kept": "h"}, rows, COLUMNS)
+    assert plan["removed"] == ["gone"]
+    assert plan["unchanged"] == ["kept"]
+    assert plan["todo"] == {}
@@ -0,0 +1,75 @@
+"""
+Test: Bulk stack row writes
+
+upsert_rows must send one upsert_stack_rows call per batch (not one per
+row), with cells limited to the table's columns and versioned. Rows are
+validated against the column types before they are written.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_stack_rows.py -v
+"""
+
+from app.agents.stack_agent import rows
+from app.agents.stack_agent.columns import column_version
+
+
+class RecordingDb:
+    """Records rpc calls and echoes back one row id per document."""
+
+    def __init__(self):
+        self.calls: list[tuple[str, dict]] = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        data = [{"document_id": row["document_id"], "id": f"row-{row['document_id']}"}
+                for row in params["p_rows"]]
+        return type("Query", (), {"execute": lambda _: type("Result", (), {"data": data})()})()
+
+
+COLUMNS = [{"name": "vendor", "type": "text"}, {"name": "total", "type": "number"}]
+
+
+def test_upsert_rows_batches_and_filters_cells(monkeypatch):
+    monkeypatch.setattr(rows, "UPSERT_BATCH_SIZE", 2)
+    db = RecordingDb()
+    batch = [
+        {"document_id": "a", "row_data": {"vendor": "Acme", "extra": 1}, "confidence_scores": {"vendor": 0.9, "extra": 1}},
+        {"document_id": "b", "row_data": {"total": 5}},
+        {"document_id": "c", "row_data": {}},
+        {"document_id": "a", "row_data": {"vendor": "Acme Corp"}},  # Last wins
+    ]
+    row_ids = rows.upsert_rows(db, "table", "user", COLUMNS, batch, merge=True)
+
+    assert row_ids == {"a": "row-a", "b": "row-b", "c": "row-c"}
+    assert [name for name, _ in db.calls] == ["upsert_stack_rows", "upsert_stack_rows"]
+    first = db.calls[0][1]
+    assert first["p_merge"] is True
+    assert first["p_rows"][0] == {
+        "document_id": "a",
+        "row_data": {"vendor": "Acme Corp", "total": None},
+        "confidence_scores": {},
+        "ocr_content_hash": None,
+        "column_versions": {c["name"]: column_version(c) for c in COLUMNS},
+    }
+
+
+def test_upsert_row_returns_its_id():
+    db = RecordingDb()
+    row_id = rows.upsert_row(db, "table", "doc", "user", COLUMNS, {"vendor": "Acme"}, {"vendor": 0.8})
+    assert row_id == "row-doc"
+    assert db.calls[0][1]["p_rows"][0]["confidence_scores"] == {"vendor": 0.8}
+
+
+def test_validate_row_checks_cell_types():
+    columns = COLUMNS + [{"name": "paid", "type": "boolean"}, {"name": "date", "type": "date"}, {"name": "notes"}]
+    valid = {"vendor": "Acme", "total": 12.5, "paid": False, "date": "2025-03-01", "notes": 7}
+    assert rows.validate_row(columns, valid, {"vendor": 0.9}) is None
+    assert rows.validate_row(columns, dict.fromkeys(valid), {}) is None
+
+    for name, value in [
+        ("vendor", 12), ("total", "12.50"), ("total", True),
+        ("paid", "yes"), ("date", "01/03/2025"), ("date", "2025-02-30"),
+    ]:
+        error = rows.validate_row(columns, {name: value}, {})
+        assert error and f"'{name}'" in error
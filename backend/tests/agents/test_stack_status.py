@@ -0,0 +1,180 @@
+"""
+Test: Stack table status around interactive extraction
+
+A run claims its table atomically (a second run of the same table gets
+an error, not a second fan-out), heartbeats on a timer while its rows are
+in flight, and when closed early (client disconnect, cancellation) must
+not leave the table locked in "processing". A "processing" table whose
+run stopped heartbeating no longer blocks re-extraction.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_stack_status.py -v
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.agents.stack_agent import agent
+
+COLUMNS = [{"name": "vendor", "type": "text"}]
+
+
+class Query:
+    def __init__(self, db: "FakeDb"):
+        self.db = db
+        self.values: dict | None = None
+
+    def update(self, values: dict) -> "Query":
+        self.values = values
+        return self
+
+    def eq(self, column: str, value) -> "Query":
+        return self
+
+    def execute(self):
+        if self.values is not None:
+            if "status" in self.values:
+                self.db.status = self.values["status"]
+                self.db.statuses.append(self.values["status"])
+            else:
+                self.db.heartbeats += 1
+        return SimpleNamespace(data=[])
+
+
+class Rpc:
+    def __init__(self, db: "FakeDb", name: str):
+        self.db, self.name = db, name
+
+    def execute(self):
+        assert self.name == "claim_stack_extraction"
+        if self.db.status == "processing":
+            return SimpleNamespace(data=None)
+        previous, self.db.status = self.db.status, "processing"
+        self.db.statuses.append("processing")
+        return SimpleNamespace(data=previous)
+
+
+class FakeDb:
+    def __init__(self, status: str = "pending"):
+        self.status = status
+        self.statuses: list[str] = []
+        self.heartbeats = 0
+
+    def table(self, name: str) -> Query:
+        return Query(self)
+
+    def rpc(self, name: str, params: dict) -> Rpc:
+        return Rpc(self, name)
+
+
+def patch_plan(monkeypatch, document_ids: list[str], stale_seconds: float = 600.0):
+    settings = SimpleNamespace(STACK_EXTRACTION_CONCURRENCY=2, STACK_EXTRACTION_STALE_SECONDS=stale_seconds)
+    monkeypatch.setattr(agent, "get_settings", lambda: settings)
+    monkeypatch.setattr(agent, "_load_table", lambda db, table_id, user_id: {
+        "id": table_id, "stack_id": "stack-1", "mode": "custom", "columns": COLUMNS,
+    })
+    monkeypatch.setattr(agent, "_stack_document_ids", lambda db, stack_id: document_ids)
+    monkeypatch.setattr(agent, "_ocr_hashes", lambda db, user_id, ids: {i: f"h-{i}" for i in ids})
+    monkeypatch.setattr(agent, "_plan", lambda *args: {
+        "todo": {i: COLUMNS for i in document_ids}, "partial": [], "unchanged": [], "removed": [],
+    })
+    monkeypatch.setattr(agent, "_inline_text", lambda db, user_id, document_id: "text")
+
+
+def test_closed_run_settles_the_table_status(monkeypatch):
+    patch_plan(monkeypatch, ["fast", "slow"])
+
+    async def row(table_id, document_id, *args, **kwargs):
+        if document_id == "slow":
+            await asyncio.sleep(60)
+        return {"row_id": document_id}
+
+    monkeypatch.setattr(agent, "extract_row_structured", row)
+    db = FakeDb()
+
+    async def run():
+        stream = agent.extract_stack("table-1", "user-1", db)
+        async for event in stream:
+            if event.get("status") == "completed":
+                break
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert db.statuses == ["processing", "completed"]
+
+
+def test_closed_run_without_rows_keeps_a_completed_table(monkeypatch):
+    patch_plan(monkeypatch, ["a"])
+    db = FakeDb(status="completed")
+
+    async def run():
+        stream = agent.extract_stack("table-1", "user-1", db)
+        assert "started" in await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert db.statuses == ["processing", "completed"]
+
+
+def test_concurrent_runs_fan_out_once(monkeypatch):
+    patch_plan(monkeypatch, ["a"])
+    calls: list[str] = []
+
+    async def row(table_id, document_id, *args, **kwargs):
+        calls.append(document_id)
+        await asyncio.sleep(0.01)
+        return {"row_id": document_id}
+
+    monkeypatch.setattr(agent, "extract_row_structured", row)
+    db = FakeDb()
+
+    async def run():
+        async def drain():
+            return [event async for event in agent.extract_stack("table-1", "user-1", db)]
+        return await asyncio.gather(drain(), drain())
+
+    first, second = asyncio.run(run())
+    assert calls == ["a"]
+    assert first[-1]["complete"]
+    assert second == [{"error": "Table extraction already in progress"}]
+    assert db.statuses == ["processing", "completed"]
+
+
+def test_heartbeat_runs_while_rows_are_in_flight(monkeypatch):
+    # 4 heartbeats per stale window: one every 10ms
+    patch_plan(monkeypatch, ["slow"], stale_seconds=0.04)
+
+    async def row(table_id, document_id, *args, **kwargs):
+        await asyncio.sleep(0.1)
+        return {"row_id": document_id}
+
+    monkeypatch.setattr(agent, "extract_row_structured", row)
+    db = FakeDb()
+
+    async def run():
+        events = [event async for event in agent.extract_stack("table-1", "user-1", db)]
+        heartbeats = db.heartbeats
+        await asyncio.sleep(0.05)
+        return events, heartbeats
+
+    events, heartbeats = asyncio.run(run())
+    assert events[-1]["complete"]
+    assert heartbeats >= 3
+    # Stopped with the run
+    assert db.heartbeats == heartbeats
+    assert db.statuses == ["processing", "completed"]
+
+
+def test_stale_processing_no_longer_blocks(monkeypatch):
+    monkeypatch.setattr(agent, "get_settings", lambda: SimpleNamespace(STACK_EXTRACTION_STALE_SECONDS=600.0))
+    now = datetime.now(timezone.utc)
+
+    live = {"status": "processing", "updated_at": (now - timedelta(seconds=30)).isoformat()}
+    stale = {"status": "processing", "updated_at": (now - timedelta(hours=1)).isoformat()}
+    assert agent.extraction_in_progress(live)
+    assert not agent.extraction_in_progress(stale)
+    assert not agent.extraction_in_progress({"status": "completed", "updated_at": now.isoformat()})
+    # A pending batch is collected, never treated as abandoned
+    assert agent.extraction_in_progress({**stale, "batch_job": {"id": "batch-1"}})
@@ -0,0 +1,48 @@
+"""
+Test: Two-phase stack extraction helpers
+
+The schema sample must cover each document type, and the row tool must
+pin every column with its type so row calls can't drift from the schema.
+
+Run:
+    cd backend
+    python -m pytest tests/agents/test_stack_structured.py -v
+"""
+
+from app.agents.stack_agent.structured import pick_schema_sample, row_tool
+
+
+def ocr_row(document_id: str, document_type: str | None, tokens: int) -> dict:
+    return {
+        "document_id": document_id,
+        "compact_token_count": tokens,
+        "pre_extracted": {"document_type": document_type},
+    }
+
+
+def test_schema_sample_covers_document_types_first():
+    rows = [
+        ocr_row("invoice-short", "invoice", 300),
+        ocr_row("invoice-long", "invoice", 900),
+        ocr_row("invoice-mid", "invoice", 600),
+        ocr_row("receipt", "receipt", 100),
+    ]
+    assert pick_schema_sample(rows, size=3) == ["invoice-long", "receipt", "invoice-mid"]
+
+
+def test_schema_sample_handles_small_stacks():
+    assert pick_schema_sample([ocr_row("only", None, 0)]) == ["only"]
+
+
+def test_row_tool_is_strict():
+    tool = row_tool([
+        {"name": "vendor", "type": "text", "description": "Supplier name"},
+        {"name": "total", "type": "number"},
+        {"name": "date", "type": "date"},
+    ])
+    row_data = tool["input_schema"]["properties"]["row_data"]
+    assert row_data["required"] == ["vendor", "total", "date"]
+    assert row_data["additionalProperties"] is False
+    assert row_data["properties"]["total"]["type"] == ["number", "null"]
+    assert row_data["properties"]["date"] == {"type": ["string", "null"], "description": "YYYY-MM-DD"}
+    assert row_data["properties"]["vendor"]["description"] == "Supplier name"
@@ -0,0 +1,31 @@
+"""
+Test: Extraction cache keys
+
+Verifies cache keys are deterministic and only change when the OCR content,
+field spec, model or prompt version change.
+
+Run:
+    cd backend
+    python -m pytest tests/services/test_extraction_cache.py -v
+"""
+
+from app.services.extraction_cache import build_cache_key
+
+
+def test_field_order_and_case_do_not_change_key():
+    a = build_cache_key("hash", "custom", [{"name": "Vendor"}, {"name": "total", "description": "Grand  total"}], "m", "1")
+    b = build_cache_key("hash", "custom", [{"name": "total", "description": "Grand total"}, {"name": " vendor "}], "m", "1")
+    assert a == b
+
+
+def test_string_and_object_fields_match():
+    assert build_cache_key("hash", "custom", ["vendor"], "m", "1") == \
+        build_cache_key("hash", "custom", [{"name": "vendor"}], "m", "1")
+
+
+def test_key_changes_with_inputs():
+    base = build_cache_key("hash", "auto", None, "m", "1")
+    assert base != build_cache_key("other", "auto", None, "m", "1")
+    assert base != build_cache_key("hash", "auto", None, "m2", "1")
+    assert base != build_cache_key("hash", "auto", None, "m", "2")
+    assert base != build_cache_key("hash", "custom", ["vendor"], "m", "1")
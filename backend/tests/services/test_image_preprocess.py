@@ -0,0 +1,56 @@
+"""
+Test: Image normalization before OCR
+
+Phone photos must come out upright, downscaled, grayscale and without
+metadata, and images that wouldn't shrink must be left alone.
+
+Run:
+    cd backend
+    python -m pytest tests/services/test_image_preprocess.py -v
+"""
+
+import io
+
+from PIL import Image
+
+from app.services.image_preprocess import EXIF_ORIENTATION_TAG, normalize_image
+
+
+def photo(width: int, height: int, orientation: int = 1, quality: int = 95) -> bytes:
+    image = Image.merge("RGB", [Image.effect_noise((width, height), 40)] * 3)
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION_TAG] = orientation
+    exif[0x010F] = "PhoneMaker"  # Make
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=quality, optimize=True, exif=exif)
+    return out.getvalue()
+
+
+def test_large_rotated_photo_is_normalized():
+    # Orientation 6 = rotate 90 degrees clockwise to display
+    original = photo(4000, 3000, orientation=6)
+    result = normalize_image(original, max_long_edge=2340, grayscale=True)
+
+    assert result is not None
+    assert (result["width"], result["height"]) == (1755, 2340)
+    assert len(result["content"]) < len(original)
+
+    with Image.open(io.BytesIO(result["content"])) as image:
+        assert image.mode == "L"
+        assert not image.getexif()
+
+
+def test_small_compressed_image_is_left_alone():
+    original = photo(800, 600, quality=50)
+    assert normalize_image(original, max_long_edge=2340, grayscale=False) is None
+
+
+def test_transparent_png_flattens_onto_white():
+    image = Image.new("RGBA", (3000, 100), (0, 0, 0, 0))
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+
+    result = normalize_image(out.getvalue(), max_long_edge=1000, grayscale=True)
+    assert result is not None
+    with Image.open(io.BytesIO(result["content"])) as normalized:
+        assert normalized.getpixel((10, 10)) > 250
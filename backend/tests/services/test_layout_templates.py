@@ -0,0 +1,79 @@
+"""
+Test: Layout-fingerprint templates
+
+Anchors learned from one invoice must replay on the sender's next invoice
+(different values, same layout), and unrelated layouts must not match.
+
+Run:
+    cd backend
+    python -m pytest tests/services/test_layout_templates.py -v
+"""
+
+from app.services.layout_templates import (
+    MATCH_THRESHOLD,
+    apply_template,
+    layout_features,
+    learn_anchors,
+    similarity,
+)
+
+
+def invoice(number: str, date: str, total: str, rows: list[tuple[str, int, str]]):
+    page = f"""# ACME SUPPLIES PTY LTD
+Tax Invoice
+Invoice No: {number}
+Date: {date}
+Bill To:
+Widget World
+Total Due: ${total}"""
+    table = (
+        "<table><tr><th>Description</th><th>Qty</th><th>Amount</th></tr>"
+        + "".join(f"<tr><td>{d}</td><td>{q}</td><td>{a}</td></tr>" for d, q, a in rows)
+        + "</table>"
+    )
+    return [page], [table]
+
+
+FIELDS = {
+    "invoice_number": "INV-1001",
+    "invoice_date": "2025-11-03",
+    "customer": {"name": "Widget World"},
+    "total": 1100.0,
+    "line_items": [
+        {"description": "Widgets", "quantity": 2, "amount": 500.0},
+        {"description": "Gadgets", "quantity": 1, "amount": 600.0},
+    ],
+}
+
+
+def test_learned_anchors_replay_on_next_invoice():
+    pages, tables = invoice("INV-1001", "03/11/2025", "1,100.00", [("Widgets", 2, "500.00"), ("Gadgets", 1, "600.00")])
+    anchors = learn_anchors(FIELDS, pages, tables)
+    assert len(anchors) == 5
+
+    next_pages, next_tables = invoice("INV-1002", "04/12/2025", "250.00", [("Bolts", 10, "250.00")])
+    assert similarity(layout_features(pages, tables), layout_features(next_pages, next_tables)) >= MATCH_THRESHOLD
+
+    result = apply_template("tpl", anchors, next_pages, next_tables)
+    assert result["coverage"] == 1.0
+    assert result["extracted_fields"] == {
+        "invoice_number": "INV-1002",
+        "invoice_date": "2025-12-04",
+        "customer": {"name": "Widget World"},
+        "total": 250.0,
+        "line_items": [{"description": "Bolts", "quantity": 10, "amount": 250.0}],
+    }
+
+
+def test_different_layout_does_not_match():
+    pages, tables = invoice("INV-1001", "03/11/2025", "1,100.00", [("Widgets", 2, "500.00")])
+    other = ["# Globex Corporation\nStatement of Account\nAccount: 889\nPeriod: March"]
+    assert similarity(layout_features(pages, tables), layout_features(other, [])) < MATCH_THRESHOLD
+
+
+def test_missing_anchors_lower_coverage():
+    pages, tables = invoice("INV-1001", "03/11/2025", "1,100.00", [("Widgets", 2, "500.00"), ("Gadgets", 1, "600.00")])
+    anchors = learn_anchors(FIELDS, pages, tables)
+    result = apply_template("tpl", anchors, ["Invoice No: INV-9"], [])
+    assert result["extracted_fields"] == {"invoice_number": "INV-9"}
+    assert result["coverage"] == 1 / len(anchors)
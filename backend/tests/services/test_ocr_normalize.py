@@ -0,0 +1,52 @@
+"""
+Test: OCR normalization for agent consumption
+
+Verifies HTML tables become pipe grids, whitespace collapses and repeated
+headers/footers are removed.
+
+Run:
+    cd backend
+    python -m pytest tests/services/test_ocr_normalize.py -v
+"""
+
+from app.services.html_tables import parse_html_table
+from app.services.ocr_normalize import normalize_page, normalize_pages
+
+TABLE_HTML = (
+    "<table><tr><th>Item</th><th>Qty</th><th>Price</th></tr>"
+    "<tr><td>Widget</td><td>2</td><td>10.00</td></tr>"
+    "<tr><td colspan=\"2\">Total</td><td>20.00</td></tr></table>"
+)
+
+
+def test_parse_html_table_expands_merged_cells():
+    grid = parse_html_table(
+        "<table><tr><td rowspan=\"2\">A</td><td>B</td></tr><tr><td>C</td></tr></table>"
+    )
+    assert grid == [["A", "B"], ["A", "C"]]
+    assert parse_html_table(TABLE_HTML)[2] == ["Total", "Total", "20.00"]
+
+
+def test_normalize_page_replaces_table_reference():
+    text = "# Invoice\n\n\n\n[tbl-0.html](tbl-0.html)\n\n![img-0.jpeg](img-0.jpeg)"
+    result = normalize_page(text, {"tbl-0.html": TABLE_HTML})
+    assert "Item | Qty | Price" in result
+    assert "Widget | 2 | 10.00" in result
+    assert "img-0" not in result
+    assert "\n\n\n" not in result
+
+
+def test_normalize_page_converts_inline_html_and_collapses_spaces():
+    result = normalize_page(f"Total    due:   $20\n{TABLE_HTML}\n| a | b |\n|---|---|")
+    assert "Total due: $20" in result
+    assert "<table>" not in result
+    assert "---" not in result
+
+
+def test_normalize_pages_strips_repeated_headers_and_footers():
+    pages = [
+        f"ACME CORP CONFIDENTIAL\nBody text {i}\nPage {i} of 4"
+        for i in range(1, 5)
+    ]
+    result = normalize_pages(pages)
+    assert result == [f"Body text {i}" for i in range(1, 5)]
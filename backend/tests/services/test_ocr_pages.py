@@ -0,0 +1,52 @@
+"""
+Test: Windowed OCR page helpers
+
+Verifies page range parsing, outlines and keyword snippets used by read_ocr.
+
+Run:
+    cd backend
+    python -m pytest tests/services/test_ocr_pages.py -v
+"""
+
+import pytest
+
+from app.services.ocr_pages import (
+    build_outline,
+    find_snippets,
+    format_pages,
+    parse_page_range,
+)
+
+PAGES = [
+    "# Invoice\nAcme Corp\nInvoice number: INV-001",
+    "## Line Items\n| Item | Price |\n| Widget | 10.00 |",
+    "Terms and conditions apply.\nTotal due: $10.00",
+]
+
+
+def test_parse_page_range():
+    assert parse_page_range("2", 3) == [1]
+    assert parse_page_range("1-2, 3", 3) == [0, 1, 2]
+    with pytest.raises(ValueError):
+        parse_page_range("2-5", 3)
+    with pytest.raises(ValueError):
+        parse_page_range("", 3)
+
+
+def test_format_pages_adds_markers():
+    text = format_pages(PAGES, [2])
+    assert text.startswith("--- Page 3 of 3 ---")
+    assert "Total due" in text
+
+
+def test_build_outline_uses_headings_or_first_line():
+    outline = build_outline(PAGES)
+    assert "Page 1" in outline and "Invoice" in outline
+    assert "Line Items" in outline
+    assert "Terms and conditions apply." in outline
+
+
+def test_find_snippets_reports_pages():
+    result = find_snippets(PAGES, "total")
+    assert "[Page 3]" in result
+    assert find_snippets(PAGES, "missing").startswith("No matches")
@@ -0,0 +1,138 @@
+"""
+Test: Typed tables parsed from OCR HTML
+
+Tables must come out with the right header rows, merged cells expanded,
+and columns typed (number/date/text) without losing any cell text; queries
+must filter, project and total rows by type.
+
+Run:
+    cd backend
+    python -m pytest tests/services/test_ocr_tables.py -v
+"""
+
+import pytest
+
+from app.services.ocr_tables import (
+    coerce_date,
+    coerce_number,
+    parse_legacy_tables,
+    parse_ocr_tables,
+    parse_table,
+    query_table,
+    table_rows,
+)
+
+LINE_ITEMS = (
+    "<table><thead>"
+    "<tr><th rowspan='2'>Description</th><th colspan='2'>Amount</th><th rowspan='2'>Date</th></tr>"
+    "<tr><th>Net</th><th>Tax</th></tr>"
+    "</thead>"
+    "<tr><td>Widgets</td><td>$1,000.00</td><td>100.00</td><td>03/11/2025</td></tr>"
+    "<tr><td rowspan='2'>Gadgets</td><td>50.00</td><td></td><td>4 Nov 2025</td></tr>"
+    "<tr><td>(20.00)</td><td>-2.00</td><td>2025-11-05</td></tr>"
+    "</table>"
+)
+
+
+def test_coerce_number_formats():
+    assert coerce_number("$1,234.56") == 1234.56
+    assert coerce_number("AUD 1,100.00") == 1100.0
+    assert coerce_number("(12.00)") == -12.0
+    assert coerce_number("12%") == 12
+    assert coerce_number("1.234,56") == 1234.56
+    assert coerce_number("7") == 7 and isinstance(coerce_number("7"), int)
+    # IDs, dates and words stay text
+    assert coerce_number("00123") is None
+    assert coerce_number("2025-11-03") is None
+    assert coerce_number("Total") is None
+
+
+def test_coerce_date_whole_cell_only():
+    assert coerce_date("4 Nov 2025") == "2025-11-04"
+    assert coerce_date("2025-11-05") == "2025-11-05"
+    assert coerce_date("Due 4 Nov 2025") is None
+
+
+def test_marked_up_multi_row_header_and_merged_cells():
+    table = parse_table(LINE_ITEMS, "tbl-0", page=2)
+
+    assert table["page"] == 2
+    assert table["row_count"] == 3
+    assert [(c["key"], c["name"], c["type"]) for c in table["columns"]] == [
+        ("description", "Description", "text"),
+        ("amount_net", "Amount / Net", "number"),
+        ("amount_tax", "Amount / Tax", "number"),
+        ("date", "Date", "date"),
+    ]
+    assert table_rows(table)[2] == {
+        "description": "Gadgets",  # rowspan expanded
+        "amount_net": -20.0,
+        "amount_tax": -2.0,
+        "date": "2025-11-05",
+    }
+    assert table["columns"][2]["values"][1] is None  # Empty cell
+
+
+def test_plain_td_header_detected():
+    table = parse_table(
+        "<table><tr><td>Item</td><td>Qty</td></tr><tr><td>A</td><td>2</td></tr></table>", "tbl-1"
+    )
+    assert [c["key"] for c in table["columns"]] == ["item", "qty"]
+    assert table_rows(table) == [{"item": "A", "qty": 2}]
+
+    # A first row of numbers is data, not a header
+    table = parse_table("<table><tr><td>1</td><td>2</td></tr><tr><td>3</td><td>4</td></tr></table>", "tbl-2")
+    assert [c["key"] for c in table["columns"]] == ["column_1", "column_2"]
+    assert table["row_count"] == 2
+
+
+def test_mixed_column_stays_text():
+    table = parse_table(
+        "<table><tr><th>Qty</th></tr><tr><td>2</td></tr><tr><td>Total</td></tr></table>", "tbl-3"
+    )
+    assert table["columns"][0]["type"] == "text"
+    assert table["columns"][0]["values"] == ["2", "Total"]
+
+
+def test_parse_ocr_tables_pages_and_legacy():
+    tables = parse_ocr_tables([{}, {"tbl-0": LINE_ITEMS}, {"tbl-1": "<table></table>"}])
+    assert [(t["id"], t["page"]) for t in tables] == [("tbl-0", 2)]
+    assert parse_ocr_tables([{}]) is None
+
+    legacy = parse_legacy_tables([LINE_ITEMS])
+    assert legacy[0]["id"] == "tbl-0" and legacy[0]["page"] is None
+
+
+def test_query_table_filters_projects_and_sums():
+    table = parse_table(LINE_ITEMS, "tbl-0")
+
+    page = query_table(
+        table,
+        columns=["description", "amount_net"],
+        where=[{"column": "date", "op": "gte", "value": "4 Nov 2025"}],
+        sum_columns=["amount_net"],
+    )
+    assert page["matched"] == 2
+    assert page["rows"] == [
+        {"description": "Gadgets", "amount_net": 50.0},
+        {"description": "Gadgets", "amount_net": -20.0},
+    ]
+    assert page["sums"] == {"amount_net": 30.0}
+
+    page = query_table(table, where=[{"column": "description", "op": "contains", "value": "widg"}])
+    assert page["matched"] == 1
+
+    page = query_table(table, where=[{"column": "amount_tax", "op": "empty"}], limit=1)
+    assert page["matched"] == 1 and page["rows"][0]["amount_net"] == 50.0
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"columns": ["missing"]},
+    {"where": [{"column": "amount_net", "op": "like", "value": 1}]},
+    {"where": [{"column": "amount_net", "op": "gt", "value": "lots"}]},
+    {"where": [{"column": "description", "op": "gt", "value": "a"}]},
+    {"sum_columns": ["description"]},
+])
+def test_query_table_rejects_bad_queries(kwargs):
+    with pytest.raises(ValueError):
+        query_table(parse_table(LINE_ITEMS, "tbl-0"), **kwargs)
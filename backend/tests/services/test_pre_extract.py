@@ -0,0 +1,93 @@
+"""
+Test: Deterministic pre-extraction
+
+Pattern and table extractors must find common invoice fields with the
+right labels and confidences, and only allow skipping the agent when
+every required field is unambiguous.
+
+Run:
+    cd backend
+    python -m pytest tests/services/test_pre_extract.py -v
+"""
+
+from app.services.pre_extract import (
+    agent_skippable,
+    best_candidates,
+    is_valid_abn,
+    pre_extract,
+    to_extraction,
+)
+
+INVOICE = """# TAX INVOICE
+Invoice No: INV-20431
+Invoice Date: 2025-11-03
+Due Date: 17 November 2025
+ABN: 51 824 753 556
+Email: accounts@acme.com.au
+Subtotal $1,000.00
+GST $100.00
+Total (incl. GST) $1,100.00
+Amount Due AUD 1,100.00"""
+
+LINE_ITEMS = {
+    "tbl-0": (
+        "<table><tr><th>Description</th><th>Qty</th><th>Amount</th></tr>"
+        "<tr><td>Widgets</td><td>2</td><td>500.00</td></tr>"
+        "<tr><td>Gadgets</td><td>1</td><td>500.00</td></tr>"
+        "<tr><td></td><td>Total</td><td>1,000.00</td></tr></table>"
+    )
+}
+
+
+def test_invoice_fields_and_line_items():
+    result = pre_extract([INVOICE], [LINE_ITEMS])
+    best = {field: c["value"] for field, c in best_candidates(result).items()}
+
+    assert result["document_type"] == "invoice"
+    assert best["invoice_number"] == "INV-20431"
+    assert best["date"] == "2025-11-03"
+    assert best["due_date"] == "2025-11-17"
+    assert best["abn"] == "51824753556"
+    assert best["email"] == "accounts@acme.com.au"
+    assert best["subtotal"] == 1000.0
+    assert best["tax"] == 100.0
+    assert best["total"] == 1100.0
+    assert best["currency"] == "AUD"
+    assert result["line_items"] == [
+        {"description": "Widgets", "qty": "2", "amount": "500.00"},
+        {"description": "Gadgets", "qty": "1", "amount": "500.00"},
+    ]
+
+
+def test_candidate_offsets_point_at_source_text():
+    result = pre_extract(["Header\nInvoice No: INV-20431"])
+    candidate = best_candidates(result)["invoice_number"]
+    assert candidate["page"] == 1
+    assert "Header\nInvoice No: INV-20431"[candidate["offset"]:].startswith("INV-20431")
+
+
+def test_dates_are_not_invoice_numbers():
+    for line in ("Invoice 12/03/2024", "Tax Invoice: 2024-03-12", "Invoice # 3/12/24"):
+        assert "invoice_number" not in best_candidates(pre_extract([line])), line
+
+    # A real number later on the line is still found
+    result = pre_extract(["Invoice 12/03/2024 Invoice No: 88412"])
+    assert best_candidates(result)["invoice_number"]["value"] == "88412"
+
+
+def test_skip_agent_requires_confident_required_fields():
+    result = pre_extract([INVOICE], [LINE_ITEMS])
+    assert agent_skippable(result, {"invoice"})
+    assert not agent_skippable(result, {"receipt"})
+
+    # Ambiguous day/month order is not confident enough
+    ambiguous = pre_extract([INVOICE.replace("2025-11-03", "03/11/2025")])
+    assert not agent_skippable(ambiguous, {"invoice"})
+
+    fields, confidences = to_extraction(result)
+    assert fields["total"] == 1100.0 and confidences["total"] >= 0.9
+
+
+def test_abn_checksum():
+    assert is_valid_abn("51824753556")
+    assert not is_valid_abn("51824753557")
@@ -0,0 +1,200 @@
+"""
+Test: Provider rate limiter
+
+AIMD concurrency must back off on 429s and recover on successes, retry-after
+must pause admissions, rate-limited calls must be retried, and background
+calls must yield to interactive ones.
+
+Run:
+    cd backend
+    python -m pytest tests/services/test_rate_limit.py -v
+"""
+
+import asyncio
+import time
+
+import anthropic
+import httpx
+import pytest
+from mistralai.models import SDKError
+
+from app.services.rate_limit import ProviderLimiter, rate_limit_retry_after
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, headers: dict[str, str] | None = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code: int, headers: dict[str, str] | None = None):
+        super().__init__(f"API error {status_code}")
+        self.response = FakeResponse(status_code, headers)
+
+
+def test_classifies_rate_limit_errors():
+    assert rate_limit_retry_after(FakeAPIError(429, {"retry-after": "3"})) == 3.0
+    assert rate_limit_retry_after(FakeAPIError(529)) == 0.0
+    assert rate_limit_retry_after(Exception("Rate limit exceeded")) == 0.0
+    assert rate_limit_retry_after(FakeAPIError(500)) is None
+    assert rate_limit_retry_after(ValueError("OCR returned no pages")) is None
+
+
+def test_classifies_sdk_errors_by_status_not_text():
+    request = httpx.Request("POST", "https://api.example.com")
+    limited = anthropic.RateLimitError(
+        "rate_limit_error", response=httpx.Response(429, headers={"retry-after": "5"}, request=request), body=None
+    )
+    assert rate_limit_retry_after(limited) == 5.0
+    assert rate_limit_retry_after(SDKError("OCR failed", httpx.Response(429, request=request))) == 0.0
+
+    # A 429 in the message is not a rate limit: only the status counts
+    assert rate_limit_retry_after(SDKError("Document doc-429 invalid", httpx.Response(400, request=request))) is None
+    bad_request = anthropic.BadRequestError(
+        "rate limit field 429 is invalid", response=httpx.Response(400, request=request), body=None
+    )
+    assert rate_limit_retry_after(bad_request) is None
+
+    # Without a status, only whole words match
+    assert rate_limit_retry_after(Exception("overloaded_error: Overloaded")) == 0.0
+    assert rate_limit_retry_after(Exception("Document 429 not found")) is None
+    assert rate_limit_retry_after(Exception("per_rate_limiter misconfigured")) is None
+
+
+def test_aimd_halves_on_rate_limit_and_recovers():
+    limiter = ProviderLimiter("test", max_concurrency=8)
+    limiter.record_rate_limit(0.01)
+    assert limiter.limit == 4
+
+    # A burst of 429s in the same window is one congestion signal
+    limiter.record_rate_limit(0.01)
+    assert limiter.limit == 4
+
+    for _ in range(40):
+        limiter.record_success()
+    assert limiter.limit == 8
+
+
+def test_concurrency_limit_caps_in_flight():
+    limiter = ProviderLimiter("test", max_concurrency=2)
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(work() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+def test_background_calls_hold_only_their_share():
+    limiter = ProviderLimiter("test", max_concurrency=4)
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        async with limiter.slot(background=True):
+            peak = max(peak, limiter.background_in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(work() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+    assert limiter.in_flight == limiter.background_in_flight == 0
+
+
+def test_interactive_calls_are_admitted_before_background():
+    limiter = ProviderLimiter("test", max_concurrency=2)
+    order: list[str] = []
+
+    async def work(name: str, background: bool, hold: float):
+        async with limiter.slot(background=background):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def run():
+        busy = [asyncio.create_task(work(f"busy-{i}", False, 0.05)) for i in range(2)]
+        await asyncio.sleep(0.01)
+        # Both queue while the limiter is full; the background call asked first
+        queued = [asyncio.create_task(work("background", True, 0)),
+                  asyncio.create_task(work("interactive", False, 0))]
+        await asyncio.gather(*busy, *queued)
+
+    asyncio.run(run())
+    assert order[2:] == ["interactive", "background"]
+
+
+def test_call_retries_after_retry_after():
+    limiter = ProviderLimiter("test", max_concurrency=4)
+    calls: list[float] = []
+
+    async def flaky():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise FakeAPIError(429, {"retry-after": "0.2"})
+        return "ok"
+
+    assert asyncio.run(limiter.call(flaky)) == "ok"
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.19
+    assert limiter.limit == 2 + 1 / 2  # halved, then one success
+
+
+def test_call_does_not_retry_other_errors():
+    limiter = ProviderLimiter("test")
+    calls = 0
+
+    async def broken():
+        nonlocal calls
+        calls += 1
+        raise ValueError("bad document")
+
+    with pytest.raises(ValueError):
+        asyncio.run(limiter.call(broken))
+    assert calls == 1
+
+
+def test_token_bucket_paces_requests():
+    # 600 rpm = one request per 0.1s once the burst capacity is spent
+    limiter = ProviderLimiter("test", requests_per_minute=600)
+    limiter.requests.level = 0
+
+    async def run():
+        start = time.monotonic()
+        for _ in range(2):
+            async with limiter.slot():
+                pass
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.19
+
+
+def test_settle_charges_actual_tokens():
+    limiter = ProviderLimiter("test", tokens_per_minute=60_000)
+
+    async def run():
+        async with limiter.slot(tokens=10_000) as slot:
+            slot.settle(25_000)
+
+    asyncio.run(run())
+    assert limiter.tokens.level == pytest.approx(35_000, abs=50)
+
+
+def test_settle_charges_every_request_of_a_multi_turn_run():
+    limiter = ProviderLimiter("test", requests_per_minute=60)
+
+    async def run():
+        async with limiter.slot() as slot:
+            slot.settle(0, requests=5)
+
+    asyncio.run(run())
+    assert limiter.requests.level == pytest.approx(55, abs=0.5)
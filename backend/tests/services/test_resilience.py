@@ -0,0 +1,123 @@
+"""
+Test: Provider resilience helpers
+
+Transient errors must be told apart from permanent ones, hedged calls must
+return the faster attempt, and the circuit breaker must open after repeated
+failures and close again after a successful probe.
+
+Run:
+    cd backend
+    python -m pytest tests/services/test_resilience.py -v
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    backoff_delay,
+    hedged,
+    is_transient,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"Status {status_code}")
+        self.status_code = status_code
+
+
+def test_transient_classification():
+    assert is_transient(asyncio.TimeoutError())
+    assert is_transient(httpx.ConnectError("refused"))
+    assert is_transient(StatusError(503))
+    assert is_transient(StatusError(429))
+    assert not is_transient(StatusError(400))
+    assert not is_transient(ValueError("OCR returned no pages"))
+
+
+def test_backoff_is_jittered_and_capped():
+    delays = [backoff_delay(10, base=1.0, cap=5.0) for _ in range(50)]
+    assert all(0 <= d <= 5.0 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_latency_percentile_needs_samples():
+    tracker = LatencyTracker(min_samples=10)
+    assert tracker.percentile(0.9) is None
+    for i in range(1, 11):
+        tracker.record(float(i))
+    assert tracker.percentile(0.9) == 10.0
+    assert tracker.percentile(0.5) == 6.0
+
+
+def test_hedge_returns_faster_attempt():
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(1.0 if calls == 1 else 0.01)
+        return calls
+
+    start = time.monotonic()
+    assert asyncio.run(hedged(call, hedge_after=0.05)) == 2
+    assert time.monotonic() - start < 0.5
+
+
+def test_hedge_not_started_for_fast_call():
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        return "ok"
+
+    assert asyncio.run(hedged(call, hedge_after=0.5)) == "ok"
+    assert calls == 1
+
+
+def test_hedge_survives_one_failure():
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(0.05)
+            raise StatusError(502)
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    assert asyncio.run(hedged(call, hedge_after=0.01)) == "ok"
+
+
+def test_circuit_opens_and_recovers_after_probe():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=0.05)
+    breaker.check()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    time.sleep(0.06)
+    breaker.check()  # Probe allowed
+    with pytest.raises(CircuitOpenError):
+        breaker.check()  # Only one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
@@ -0,0 +1,160 @@
+"""
+Test: Multiplexed sprite connections
+
+Concurrent requests to one sprite must share a single connection and each
+get only its own responses; when the sprite sleeps mid-request the channel
+must wake it, reconnect and replay the request so it still completes.
+Runs against the local fake sprite API.
+
+Run:
+    cd backend
+    python -m pytest tests/services/test_sprite_connections.py -v
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.sprite_connections import SpriteChannel, SpriteChannelError
+from app.services.sprites import LocalSpritesAPI
+
+
+def event(message: dict, event_type: str, content: str) -> dict:
+    return {
+        "type": "agent_event",
+        "id": f"{message['id']}-{event_type}",
+        "timestamp": int(time.time() * 1000),
+        "request_id": message["id"],
+        "payload": {"event_type": event_type, "content": content},
+    }
+
+
+def slow_server(delay: float):
+    """Server that streams a text event, works for `delay`, then completes."""
+    received: list[str] = []
+
+    async def serve(message: dict):
+        received.append(message["id"])
+        text = message["payload"]["text"]
+        yield event(message, "text", f"working on {text}")
+        await asyncio.sleep(delay)
+        yield event(message, "complete", text)
+
+    serve.received = received
+    return serve
+
+
+async def collect(channel: SpriteChannel, text: str) -> list[tuple[str, str]]:
+    return [
+        (m["payload"]["event_type"], m["payload"]["content"])
+        async for m in channel.request("mission", {"text": text})
+    ]
+
+
+def test_concurrent_requests_share_one_connection():
+    api = LocalSpritesAPI(server=slow_server(0.02))
+
+    async def run():
+        await api.create("stack-a")
+        channel = SpriteChannel("stack-a", api, keepalive_seconds=60)
+        results = await asyncio.gather(*(collect(channel, f"q{i}") for i in range(10)))
+        # Sequential follow-up reuses it too
+        results.append(await collect(channel, "again"))
+        await channel.close()
+        return results
+
+    results = asyncio.run(run())
+
+    assert api.connects == {"stack-a": 1}
+    for i, messages in enumerate(results[:10]):
+        assert messages == [("text", f"working on q{i}"), ("complete", f"q{i}")]
+    assert results[10][-1] == ("complete", "again")
+
+
+def test_sprite_sleep_mid_request_reconnects_and_replays():
+    server = slow_server(0.1)
+    api = LocalSpritesAPI(server=server, wake_seconds=0.01)
+
+    async def run():
+        await api.create("stack-a")
+        channel = SpriteChannel("stack-a", api, keepalive_seconds=60, reconnect_base_seconds=0.01)
+        requests = [asyncio.create_task(collect(channel, q)) for q in ("a", "b")]
+        await asyncio.sleep(0.03)
+        api.sleep("stack-a")  # Drops the connection with both in flight
+        results = await asyncio.gather(*requests)
+        await channel.close()
+        return results
+
+    results = asyncio.run(run())
+
+    assert [r[-1] for r in results] == [("complete", "a"), ("complete", "b")]
+    assert api.connects["stack-a"] == 2
+    assert api.cold_wakes["stack-a"] == 1
+    # Each request was sent twice under the same id (original + replay)
+    assert len(server.received) == 4 and len(set(server.received)) == 2
+
+
+def test_idle_channel_reconnects_after_auto_sleep():
+    api = LocalSpritesAPI(sleep_after=0.05)
+
+    async def run():
+        await api.create("stack-a")
+        channel = SpriteChannel("stack-a", api, keepalive_seconds=60, idle_seconds=0.05)
+        await collect(channel, "first")
+        await asyncio.sleep(0.1)  # Sprite auto-sleeps
+        messages = await collect(channel, "second")
+        await channel.close()
+        return messages
+
+    messages = asyncio.run(run())
+
+    assert messages[-1][0] == "complete"
+    assert api.connects["stack-a"] == 2
+
+
+def test_silent_request_is_not_replayed_when_another_arrives():
+    server = slow_server(0.2)
+    api = LocalSpritesAPI(server=server, sleep_after=0.08)
+
+    async def run():
+        await api.create("stack-a")
+        channel = SpriteChannel("stack-a", api, keepalive_seconds=0.02, idle_seconds=0.05)
+        first = asyncio.create_task(collect(channel, "silent"))
+        await asyncio.sleep(0.12)  # First is silent past idle_seconds
+        second = await collect(channel, "second")
+        results = [await first, second]
+        await channel.close()
+        return results
+
+    results = asyncio.run(run())
+
+    assert [r[-1] for r in results] == [("complete", "silent"), ("complete", "second")]
+    assert api.connects["stack-a"] == 1
+    assert len(server.received) == 2  # Neither request ran twice
+
+
+def test_keepalive_holds_sprite_awake_during_long_request():
+    api = LocalSpritesAPI(server=slow_server(0.2), sleep_after=0.08)
+
+    async def run():
+        await api.create("stack-a")
+        channel = SpriteChannel("stack-a", api, keepalive_seconds=0.02)
+        messages = await collect(channel, "long")
+        await channel.close()
+        return messages
+
+    assert asyncio.run(run())[-1] == ("complete", "long")
+    assert api.connects["stack-a"] == 1
+    assert api.cold_wakes.get("stack-a", 0) == 0
+
+
+def test_unreachable_sprite_fails_pending_requests():
+    api = LocalSpritesAPI()  # stack-a never created
+
+    async def run():
+        channel = SpriteChannel("stack-a", api, keepalive_seconds=60, reconnect_base_seconds=0.001)
+        await collect(channel, "q")
+
+    with pytest.raises(SpriteChannelError):
+        asyncio.run(run())
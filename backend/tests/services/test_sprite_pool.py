@@ -0,0 +1,187 @@
+"""
+Test: Stack sprite warm pool
+
+New stacks must get an already-bootstrapped sprite from the pool (woken
+on assignment) and fall back to provisioning one only when the pool is
+empty. Runs against
+the local fake sprite API and an in-memory stand-in for the tables.
+
+Run:
+    cd backend
+    python -m pytest tests/services/test_sprite_pool.py -v
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import sprite_pool
+from app.services.sprite_pool import (
+    BOOTSTRAP_COMMANDS,
+    claim_sprite,
+    provision_stack_sprite,
+    refill_pool,
+)
+from app.services.sprites import LocalSpritesAPI
+
+STACK = "00000000-0000-0000-0000-000000000001"
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    fake = SimpleNamespace(
+        SPRITE_POOL_SIZE=2,
+        SPRITE_KEEPALIVE_SECONDS=15.0,
+        SPRITE_BOOTSTRAP_TIMEOUT_SECONDS=600.0,
+    )
+    monkeypatch.setattr(sprite_pool, "get_settings", lambda: fake)
+    return fake
+
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class Call:
+    def __init__(self, data):
+        self.data = data
+
+    def execute(self):
+        return Result(self.data)
+
+
+class Query:
+    """Minimal in-memory PostgREST query: eq/is_ filters, insert/update/delete."""
+
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+        self.filters = []
+        self.action = ("select", None)
+
+    def select(self, *args):
+        return self
+
+    def insert(self, rows):
+        self.action = ("insert", rows)
+        return self
+
+    def update(self, values):
+        self.action = ("update", values)
+        return self
+
+    def delete(self):
+        self.action = ("delete", None)
+        return self
+
+    def eq(self, key, value):
+        self.filters.append(lambda row: row.get(key) == value)
+        return self
+
+    def is_(self, key, value):
+        self.filters.append(lambda row: row.get(key) is None)
+        return self
+
+    def execute(self):
+        kind, payload = self.action
+        if kind == "insert":
+            now = datetime.now(timezone.utc).isoformat()
+            self.rows.extend({"created_at": now, "ready_at": None, **row} for row in payload)
+            return Result(payload)
+        matched = [row for row in self.rows if all(f(row) for f in self.filters)]
+        if kind == "update":
+            for row in matched:
+                row.update(payload)
+        elif kind == "delete":
+            self.rows[:] = [row for row in self.rows if row not in matched]
+        return Result(matched)
+
+
+class SpriteDb:
+    def __init__(self):
+        self.tables = {
+            "sprite_pool": [],
+            "stacks": [{"id": STACK, "user_id": "user", "sprite_name": None, "sprite_status": "pending"}],
+        }
+
+    def table(self, name):
+        return Query(self.tables[name])
+
+    def rpc(self, name, params):
+        assert name == "claim_pool_sprite"
+        return Call(self._claim(params))
+
+    def _claim(self, params):
+        stack = next(s for s in self.tables["stacks"] if s["id"] == params["p_stack_id"])
+        if stack["sprite_name"]:
+            return stack["sprite_name"]
+        ready = sorted((r for r in self.tables["sprite_pool"] if r["status"] == "ready"), key=lambda r: r["ready_at"])
+        if not ready:
+            return None
+        self.tables["sprite_pool"].remove(ready[0])
+        stack.update(sprite_name=ready[0]["name"], sprite_status="active")
+        return ready[0]["name"]
+
+
+def test_refill_bootstraps_sprites_up_to_pool_size():
+    db, api = SpriteDb(), LocalSpritesAPI()
+
+    assert asyncio.run(refill_pool(db, api, size=2)) == 2
+    assert asyncio.run(refill_pool(db, api, size=2)) == 0  # Already full
+
+    pool = db.tables["sprite_pool"]
+    assert [row["status"] for row in pool] == ["ready", "ready"]
+    sprite = api.sprites[pool[0]["name"]]
+    assert sprite["commands"][:len(BOOTSTRAP_COMMANDS)] == list(BOOTSTRAP_COMMANDS)
+    assert "/workspace/requirements.txt" in sprite["files"]
+
+
+def test_new_stack_gets_pooled_sprite_woken():
+    db, api = SpriteDb(), LocalSpritesAPI()
+    asyncio.run(refill_pool(db, api, size=1))
+    pooled = db.tables["sprite_pool"][0]["name"]
+    api.sleep(pooled)  # Pool sprites sleep while they wait
+
+    sprite = asyncio.run(claim_sprite(db, STACK, "user", api))
+
+    assert sprite == pooled
+    stack = db.tables["stacks"][0]
+    assert (stack["sprite_name"], stack["sprite_status"]) == (pooled, "active")
+    assert db.tables["sprite_pool"] == []
+    assert api.cold_wakes[pooled] == 1  # Woken at assignment, not on first use
+    assert api.sprites[pooled]["status"] == "warm"
+
+
+def test_empty_pool_provisions_for_the_stack():
+    db, api = SpriteDb(), LocalSpritesAPI()
+
+    sprite = asyncio.run(provision_stack_sprite(db, STACK, "user", api))
+
+    assert sprite.startswith("stack-") and sprite in api.sprites
+    assert db.tables["stacks"][0]["sprite_status"] == "active"
+    # Assigned stacks keep their sprite
+    assert asyncio.run(provision_stack_sprite(db, STACK, "user", api)) == sprite
+
+
+def test_failed_bootstrap_destroys_sprite_and_marks_stack_failed():
+    db = SpriteDb()
+    api = LocalSpritesAPI(fail_commands={"python3 -m venv /workspace/.venv"})
+
+    assert asyncio.run(provision_stack_sprite(db, STACK, "user", api)) is None
+    assert db.tables["stacks"][0]["sprite_status"] == "failed"
+    assert api.sprites == {}
+
+    assert asyncio.run(refill_pool(db, api, size=1)) == 0
+    assert db.tables["sprite_pool"] == []
+
+
+def test_stale_provisioning_sprites_are_replaced():
+    db, api = SpriteDb(), LocalSpritesAPI()
+    long_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    db.tables["sprite_pool"].append({"name": "pool-dead", "status": "provisioning", "created_at": long_ago})
+
+    assert asyncio.run(refill_pool(db, api, size=1)) == 1
+    assert [row["name"] for row in db.tables["sprite_pool"]] != ["pool-dead"]
+    assert len(db.tables["sprite_pool"]) == 1